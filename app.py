@@ -5,15 +5,18 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import dash
-from dash import Input, Output
+from dash import ClientsideFunction, Input, Output
 
 from config import config
 from src.components.layout import create_layout, get_page_layout
 from src.components.filters import register_filter_callbacks
-from src.components.pages.business_sales import register_business_callbacks
-from src.components.pages.customer_behavior import register_customer_callbacks
-from src.components.pages.advertising_marketing import register_advertising_callbacks
-from src.components.pages.service_quality import register_service_callbacks
+from src.components.pages.registry import register_page_callbacks
+from src.components.prefetch import init_prefetch, prefetcher
+from src.database.alerts import anomaly_monitor, init_anomaly_alerts
+from src.database.scheduler import db_scheduler, init_scheduler_report
+from src.database.watcher import data_watcher, init_data_events
+from src.utils.compression import init_compression, payload_stats
+from src.utils.serialization import init_json_engine
 
 # Настройка логирования
 logging.basicConfig(
@@ -28,8 +31,9 @@ def create_app():
     
     app = dash.Dash(
         __name__,
+        # style.css и custom.js (клиентские callback'и) подключаются из папки ассетов автоматически
+        assets_folder=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'assets'),
         external_stylesheets=[
-            'src\\assets\\style.css',
             'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css',
             'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
             
@@ -43,6 +47,24 @@ def create_app():
     app.title = "Малинка Analytics"
     app.layout = create_layout()
     
+    # Сжатие ответов (gzip/brotli) и отчет о размерах ответов callback'ов
+    init_compression(app.server, payload_stats)
+    
+    # Быстрая сериализация ответов callback'ов (orjson, если установлен)
+    init_json_engine(app.server)
+    
+    # Предзагрузка страниц при наведении на ссылку навигации
+    init_prefetch(app.server, prefetcher)
+    
+    # Метрики очередей к базе по классам приоритета
+    init_scheduler_report(app.server, db_scheduler)
+    
+    # Уведомления об изменении данных вместо опроса сервера каждой вкладкой
+    init_data_events(app.server, data_watcher)
+    
+    # Фоновый поиск аномалий в дневных метриках
+    init_anomaly_alerts(app.server, anomaly_monitor)
+    
     # Регистрация callback'ов
     register_callbacks(app)
     
@@ -63,11 +85,35 @@ def register_callbacks(app):
     
     # Регистрируем callback'и для фильтров
     register_filter_callbacks(app)
-    # Регистрируем callback'и для каждой страницы
-    register_business_callbacks(app)
-    register_customer_callbacks(app)
-    register_advertising_callbacks(app)
-    register_service_callbacks(app)
+    
+    # Подписка вкладки на события об изменении данных (src/assets/custom.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='events', function_name='connect'),
+        Output('data-version', 'data'),
+        Input('app-load', 'data')
+    )
+    
+    # Опрос версий данных для вкладок сверх лимита потоков событий (src/assets/custom.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='events', function_name='poll'),
+        Output('data-version', 'data', allow_duplicate=True),
+        Input('data-poll', 'n_intervals'),
+        prevent_initial_call=True
+    )
+    
+    # Текущий диапазон дат для предзагрузки страниц (src/assets/custom.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='prefetch', function_name='track_filters'),
+        Output('prefetch-filters', 'data'),
+        [Input('date-range', 'start_date'),
+         Input('date-range', 'end_date')]
+    )
+    # Регистрируем callback'и панелей всех страниц (модули страниц загружаются при первом переходе)
+    register_page_callbacks(app)
+
+def create_server():
+    """WSGI-приложение для запуска через gunicorn (см. README)"""
+    return create_app().server
 
 def main():
     """Основная функция запуска приложения"""
@@ -78,10 +124,12 @@ def main():
         logger.info(f"Debug mode: {config.app.debug}")
         logger.info(f"Server will run on: {config.app.host}:{config.app.port}")
         
+        # Каждая вкладка держит поток событий (/_malinka/events), поэтому сервер многопоточный
         app.run(
             debug=config.app.debug,
             host=config.app.host,
-            port=config.app.port
+            port=config.app.port,
+            threaded=True
         )
         
     except Exception as e:
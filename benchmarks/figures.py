@@ -0,0 +1,150 @@
+"""
+Микробенчмарк построения графиков: plotly.express / graph_objects против fast_figures
+
+Запуск: python -m benchmarks.figures [--repeat 50] [--points 365]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from src.components import fast_figures as ff
+
+STYLE = dict(
+    plot_bgcolor='rgba(0,0,0,0)',
+    paper_bgcolor='rgba(0,0,0,0)',
+    font=dict(color="#2C3E50"),
+    title_font_size=18,
+    height=400
+)
+
+
+def make_data(points: int) -> dict:
+    """Синтетические данные в форме результатов запросов дашборда"""
+    rng = np.random.default_rng(42)
+    categories = [f"Категория {i}" for i in range(12)]
+    return {
+        'trend': pd.DataFrame({
+            'date': pd.date_range('2025-01-01', periods=points, freq='D'),
+            'daily_revenue': rng.gamma(5, 20000, points),
+        }),
+        'category': pd.DataFrame({
+            'category': categories,
+            'category_revenue': rng.gamma(5, 200000, len(categories)),
+        }),
+        'pie': pd.DataFrame({
+            'reason': ['Брак', 'Не подошел размер', 'Передумал', 'Долгая доставка', 'Другое'],
+            'returns_count': rng.integers(10, 500, 5),
+        }),
+        'grouped': pd.DataFrame({
+            'product_name': [f"Товар {i}" for i in range(15)],
+            'roi': rng.normal(1, 0.5, 15),
+            'category': [categories[i % 4] for i in range(15)],
+        }),
+    }
+
+
+def px_line(data):
+    fig = px.line(data['trend'], x='date', y='daily_revenue', title='Динамика продаж',
+                  color_discrete_sequence=['#2E86AB'])
+    fig.update_layout(**STYLE)
+    return fig
+
+
+def ff_line(data):
+    trend = data['trend']
+    return ff.figure([ff.line(trend['date'], trend['daily_revenue'], color='#2E86AB')],
+                     title='Динамика продаж')
+
+
+def px_hbar(data):
+    fig = px.bar(data['category'], x='category_revenue', y='category', orientation='h',
+                 title='Продажи по категориям', color='category_revenue',
+                 color_continuous_scale=['#A23B72', '#F18F01', '#C73E1D'])
+    fig.update_layout(**STYLE, showlegend=False)
+    return fig
+
+
+def ff_hbar(data):
+    category = data['category']
+    return ff.figure([ff.bar(category['category_revenue'], category['category'], orientation='h',
+                             color_values=category['category_revenue'],
+                             scale=['#A23B72', '#F18F01', '#C73E1D'])],
+                     title='Продажи по категориям', showlegend=False)
+
+
+def px_pie(data):
+    fig = px.pie(data['pie'], values='returns_count', names='reason', title='Анализ возвратов')
+    fig.update_layout(**STYLE)
+    return fig
+
+
+def ff_pie(data):
+    pie = data['pie']
+    return ff.figure([ff.pie(pie['reason'], pie['returns_count'])], title='Анализ возвратов')
+
+
+def px_grouped(data):
+    fig = px.bar(data['grouped'], x='product_name', y='roi', color='category', title='ROI по товарам')
+    fig.update_layout(**STYLE)
+    return fig
+
+
+def ff_grouped(data):
+    return ff.figure(ff.grouped_bars(data['grouped'], 'product_name', 'roi', 'category'),
+                     title='ROI по товарам')
+
+
+def go_dual_axis(data):
+    trend = data['trend']
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=trend['date'], y=trend['daily_revenue'], name='Выручка'))
+    fig.add_trace(go.Scatter(x=trend['date'], y=trend['daily_revenue'] / 1000, yaxis='y2', name='Рейтинг'))
+    fig.update_layout(**STYLE, yaxis2=dict(overlaying='y', side='right'))
+    return fig
+
+
+def ff_dual_axis(data):
+    trend = data['trend']
+    return ff.figure([ff.bar(trend['date'], trend['daily_revenue'], name='Выручка'),
+                      ff.line(trend['date'], trend['daily_revenue'] / 1000, name='Рейтинг', yaxis='y2')],
+                     yaxis2={'overlaying': 'y', 'side': 'right'})
+
+
+CASES = [
+    ('line', px_line, ff_line),
+    ('horizontal bar', px_hbar, ff_hbar),
+    ('pie', px_pie, ff_pie),
+    ('grouped bar', px_grouped, ff_grouped),
+    ('dual axis', go_dual_axis, ff_dual_axis),
+]
+
+
+def measure(build, data, repeat: int) -> float:
+    """Среднее время построения в миллисекундах"""
+    build(data)  # прогрев
+    start = time.perf_counter()
+    for _ in range(repeat):
+        build(data)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--points', type=int, default=365)
+    args = parser.parse_args()
+
+    data = make_data(args.points)
+    print(f"{'chart':<16}{'plotly, ms':>12}{'fast, ms':>12}{'speedup':>10}")
+    for name, slow, fast in CASES:
+        slow_ms = measure(slow, data, args.repeat)
+        fast_ms = measure(fast, data, args.repeat)
+        print(f"{name:<16}{slow_ms:>12.2f}{fast_ms:>12.3f}{slow_ms / fast_ms:>9.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Бенчмарк сериализации ответов callback'ов: json / orjson / orjson + typed arrays
+
+Запуск: python -m benchmarks.serialization [--repeat 20] [--points 730]
+"""
+import argparse
+import gzip
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+from config import config
+from src.components import fast_figures as ff
+from src.utils.serialization import orjson
+
+
+def make_page_figures(points: int) -> list:
+    """Графики, сопоставимые по объему с самой тяжелой страницей (бизнес-аналитика, ежедневные ряды)"""
+    rng = np.random.default_rng(7)
+    dates = pd.Series(pd.date_range('2024-01-01', periods=points, freq='D'))
+    revenue = pd.Series(rng.gamma(5, 20000, points))
+    orders = pd.Series(rng.integers(50, 500, points))
+    products = pd.Series([f"Товар {i}" for i in range(200)])
+    product_revenue = pd.Series(rng.gamma(3, 50000, 200))
+
+    return [
+        ff.figure([ff.line(dates, revenue)], title='Динамика продаж'),
+        ff.figure([ff.line(dates, orders), ff.line(dates, revenue / orders, yaxis='y2')],
+                  yaxis2={'overlaying': 'y', 'side': 'right'}),
+        ff.figure([ff.bar(product_revenue, products, orientation='h', color_values=product_revenue)]),
+        ff.figure([ff.bar(dates, revenue, color_values=revenue)]),
+        ff.figure([ff.line(dates, revenue.cumsum())]),
+        ff.figure([ff.line(dates, revenue.rolling(7).mean())]),
+    ]
+
+
+def measure(engine: str, typed_arrays: bool, points: int, repeat: int) -> tuple:
+    """Время сериализации (мс), размер ответа и размер после gzip (КБ)"""
+    config.typed_arrays = typed_arrays
+    payload = {'response': {f'chart-{i}': {'figure': fig} for i, fig in enumerate(make_page_figures(points))}}
+
+    pio.json.to_json_plotly(payload, engine=engine)  # прогрев
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = pio.json.to_json_plotly(payload, engine=engine)
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+
+    raw = body.encode('utf-8')
+    return elapsed, len(raw) / 1024, len(gzip.compress(raw, compresslevel=6)) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--points', type=int, default=730)
+    args = parser.parse_args()
+
+    variants = [('json', False), ('json', True)]
+    if orjson is not None:
+        variants += [('orjson', False), ('orjson', True)]
+    else:
+        print("orjson is not installed: only the json engine is measured")
+
+    print(f"{'engine':<10}{'typed arrays':>14}{'time, ms':>12}{'size, KB':>12}{'gzip, KB':>12}")
+    for engine, typed_arrays in variants:
+        elapsed, size, gzipped = measure(engine, typed_arrays, args.points, args.repeat)
+        print(f"{engine:<10}{str(typed_arrays):>14}{elapsed:>12.2f}{size:>12.1f}{gzipped:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
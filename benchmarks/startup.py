@@ -0,0 +1,106 @@
+"""
+Время старта приложения: импорт модулей и создание app без обращения к страницам
+
+Запуск: python -m benchmarks.startup [--repeat 5] [--top 15] [--budget-ms 1500]
+
+Код возврата 1, если медианное время старта превышает бюджет или при старте
+загружаются модули, которые должны импортироваться только при первом переходе
+на страницу (подходит для проверки в CI).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from config import config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_CODE = "import app; app.create_app()"
+
+# Модули, которые загружаются лениво: страницы, построение графиков и слой БД
+# (plotly.graph_objects не входит: его загружает dash.dcc.Graph при импорте dash)
+LAZY_MODULES = (
+    'pandas',
+    'numpy',
+    'sqlalchemy',
+    'plotly.express',
+    'plotly.subplots',
+    'src.database.connection',
+    'src.components.charts',
+    'src.components.fast_figures',
+    'src.components.pages.business_sales',
+    'src.components.pages.customer_behavior',
+    'src.components.pages.advertising_marketing',
+    'src.components.pages.service_quality',
+)
+
+
+def run_startup() -> tuple:
+    """Запустить старт приложения в отдельном процессе: время (мс) и вывод -X importtime"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Application failed to start:\n{result.stderr[-2000:]}")
+    return elapsed, result.stderr
+
+
+def parse_importtime(output: str) -> dict:
+    """Модули и их накопленное время импорта (мс) из вывода -X importtime"""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative_us, name = (part.strip() for part in line.split(':', 1)[1].split('|'))
+        modules[name] = int(cumulative_us) / 1000
+    return modules
+
+
+def top_level(modules: dict) -> dict:
+    """Время импорта пакетов верхнего уровня"""
+    result = {}
+    for name, cumulative_ms in modules.items():
+        package = name.split('.')[0]
+        result[package] = max(result.get(package, 0), cumulative_ms)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget-ms', type=int, default=config.startup_budget_ms)
+    args = parser.parse_args()
+
+    timings = []
+    modules = {}
+    for _ in range(args.repeat):
+        elapsed, output = run_startup()
+        timings.append(elapsed)
+        modules = parse_importtime(output)
+
+    median = statistics.median(timings)
+    packages = sorted(top_level(modules).items(), key=lambda item: item[1], reverse=True)
+
+    print(f"{'package':<32}{'cumulative, ms':>16}")
+    for package, cumulative_ms in packages[:args.top]:
+        print(f"{package:<32}{cumulative_ms:>16.1f}")
+    print()
+    print(f"Startup (median of {args.repeat}): {median:.0f} ms, budget {args.budget_ms} ms")
+
+    loaded = [name for name in LAZY_MODULES if name in modules]
+    if loaded:
+        print(f"Modules that must be imported lazily were loaded at startup: {', '.join(loaded)}")
+
+    if median > args.budget_ms or loaded:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
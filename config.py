@@ -10,6 +10,8 @@ class DatabaseConfig:
     user: str
     password: str
     ssl_mode: Optional[str] = None
+    pool_size: int = 10
+    max_overflow: int = 20
 
 @dataclass
 class AppConfig:
@@ -18,6 +20,24 @@ class AppConfig:
     port: int
     secret_key: str
 
+@dataclass
+class CompressionConfig:
+    enabled: bool
+    min_size: int
+    level: int
+    brotli_quality: int
+    report_bandwidth_kbps: int
+
+@dataclass
+class SchedulerConfig:
+    interactive_limit: int
+    export_limit: int
+    background_limit: int
+    warmup_limit: int
+    pressure_wait_ms: int
+    pressure_window_s: int
+    max_defer_s: int
+
 class Config:
     def __init__(self):
         # Database configuration
@@ -27,7 +47,9 @@ class Config:
             database=os.getenv('DB_NAME', 'db'),
             user=os.getenv('DB_USER', 'haha'),
             password=os.getenv('DB_PASSWORD', '123456'),
-            ssl_mode=os.getenv('DB_SSL_MODE', 'prefer')
+            ssl_mode=os.getenv('DB_SSL_MODE', 'prefer'),
+            pool_size=int(os.getenv('DB_POOL_SIZE', 10)),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 20))
         )
         
         # Application configuration
@@ -38,9 +60,62 @@ class Config:
             secret_key=os.getenv('SECRET_KEY', 'dev-secret-key')
         )
         
+        # Response compression configuration
+        self.compression = CompressionConfig(
+            enabled=os.getenv('COMPRESS_ENABLED', 'True').lower() == 'true',
+            min_size=int(os.getenv('COMPRESS_MIN_SIZE', 1024)),
+            level=int(os.getenv('COMPRESS_LEVEL', 6)),
+            brotli_quality=int(os.getenv('COMPRESS_BROTLI_QUALITY', 5)),
+            report_bandwidth_kbps=int(os.getenv('COMPRESS_REPORT_BANDWIDTH_KBPS', 2048))
+        )
+        
+        # Database admission control: per-class concurrency limits and interactive pressure thresholds
+        self.scheduler = SchedulerConfig(
+            interactive_limit=int(os.getenv('DB_INTERACTIVE_LIMIT', 30)),
+            export_limit=int(os.getenv('DB_EXPORT_LIMIT', 4)),
+            background_limit=int(os.getenv('DB_BACKGROUND_LIMIT', 6)),
+            warmup_limit=int(os.getenv('DB_WARMUP_LIMIT', 2)),
+            pressure_wait_ms=int(os.getenv('DB_PRESSURE_WAIT_MS', 200)),
+            pressure_window_s=int(os.getenv('DB_PRESSURE_WINDOW_S', 10)),
+            max_defer_s=int(os.getenv('DB_MAX_DEFER_S', 30))
+        )
+        
         # Feature flags
         self.enable_cache = os.getenv('ENABLE_CACHE', 'True').lower() == 'true'
         self.cache_timeout = int(os.getenv('CACHE_TIMEOUT', 300))
+        
+        # Serialization: JSON engine for callback responses (auto/orjson/json) and typed arrays
+        self.json_engine = os.getenv('JSON_ENGINE', 'auto').lower()
+        self.typed_arrays = os.getenv('TYPED_ARRAYS', 'True').lower() == 'true'
+        self.typed_array_min_length = int(os.getenv('TYPED_ARRAY_MIN_LENGTH', 32))
+        
+        # Prefetch: compute the likely next page at low priority (nav hover/focus, idle after render)
+        self.prefetch_enabled = os.getenv('PREFETCH_ENABLED', 'True').lower() == 'true'
+        self.prefetch_workers = int(os.getenv('PREFETCH_WORKERS', 1))
+        
+        # Data refresh: one change check per process, pushed to open tabs over Server-Sent Events
+        self.data_refresh_interval = int(os.getenv('DATA_REFRESH_INTERVAL_S', 30))
+        self.events_heartbeat = int(os.getenv('EVENTS_HEARTBEAT_S', 15))
+        # Each open event stream holds a server thread; tabs beyond the cap poll /_malinka/version instead
+        self.events_max_subscribers = int(os.getenv('EVENTS_MAX_SUBSCRIBERS', 100))
+        
+        # Anomaly alerts: background check of daily metrics (revenue, orders, tickets, ad spend, CTR)
+        self.anomaly_alerts_enabled = os.getenv('ANOMALY_ALERTS_ENABLED', 'True').lower() == 'true'
+        self.anomaly_check_interval = int(os.getenv('ANOMALY_CHECK_INTERVAL_S', 900))
+        
+        # Funnel: window for ordered per-user conversion (hours) and rows per streamed chunk of events
+        self.funnel_window_hours = int(os.getenv('FUNNEL_WINDOW_H', 24))
+        self.funnel_chunk_rows = int(os.getenv('FUNNEL_CHUNK_ROWS', 500000))
+        
+        # Approximate preview: sampled share of table blocks (%), independent sample replicates for
+        # confidence intervals and shortest period (days) previewed before the exact result
+        self.preview_enabled = os.getenv('PREVIEW_ENABLED', 'True').lower() == 'true'
+        self.preview_sample_percent = float(os.getenv('PREVIEW_SAMPLE_PCT', 5))
+        self.preview_replicates = int(os.getenv('PREVIEW_REPLICATES', 5))
+        self.preview_min_days = int(os.getenv('PREVIEW_MIN_DAYS', 90))
+        
+        # Startup: budget for importing and building the app (ms), checked by benchmarks.startup
+        self.startup_budget_ms = int(os.getenv('STARTUP_BUDGET_MS', 1500))
 
     def get_database_url(self) -> str:
         """Получить DSN для подключения к PostgreSQL"""
@@ -0,0 +1,300 @@
+/* Клиентские callback'и Малинка Analytics */
+
+// Максимум закэшированных состояний фильтров на страницу и общий размер кэша (символов JSON)
+const CLIENT_CACHE_MAX_ENTRIES = 10;
+const CLIENT_CACHE_MAX_CHARS = 2500000;
+
+function formatDate(date) {
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+    return `${date.getFullYear()}-${month}-${day}`;
+}
+
+function daysBefore(date, days) {
+    const result = new Date(date.getTime());
+    result.setDate(result.getDate() - days);
+    return result;
+}
+
+const PERIOD_DAYS = {'1d': 1, '7d': 7, '30d': 30, '90d': 90, '365d': 365};
+
+// Ключ кэша результатов: значения фильтров и версия данных
+function cacheKey(values, dataVersion) {
+    return JSON.stringify([values, dataVersion ? dataVersion.version : null]);
+}
+
+// В кэш не сохраняются предпросмотр по выборке (панель потом заменяется точным результатом)
+// и панели, построенные с ошибкой запроса к базе (сервер помечает их layout.meta.error / data-error)
+function isUncacheable(value) {
+    if (!value || typeof value !== 'object') {
+        return false;
+    }
+    const meta = value.layout && value.layout.meta;
+    if (meta && (meta.preview || meta.error)) {
+        return true;
+    }
+    return Boolean(value.props && (value.props['data-preview'] || value.props['data-error']));
+}
+
+// События сервера об изменении данных (одно соединение на вкладку вместо опроса по таймеру)
+const EVENTS_URL = '/_malinka/events';
+// Опрос версий данных, если сервер отклонил поток событий (лимит подписчиков)
+const VERSION_URL = '/_malinka/version';
+const dataEvents = {'source': null, 'tables': null, 'polling': false};
+
+function onDataVersion(event) {
+    const snapshot = JSON.parse(event.data);
+    const previous = dataEvents.tables;
+    // Первое событие задает исходные версии; после переподключения сравниваем с последними известными
+    snapshot.changed = previous === null ? [] : Object.keys(snapshot.tables).filter(
+        table => snapshot.tables[table] !== previous[table]
+    );
+    dataEvents.tables = snapshot.tables;
+    window.dash_clientside.set_props('data-version', {'data': snapshot});
+}
+
+function startPolling() {
+    if (dataEvents.source) {
+        dataEvents.source.close();
+        dataEvents.source = null;
+    }
+    dataEvents.polling = true;
+    window.dash_clientside.set_props('data-poll', {'disabled': false});
+}
+
+// Предзагрузка страниц: повторный запрос той же страницы и периода не чаще раза в интервал
+const PREFETCH_URL = '/_malinka/prefetch';
+const PREFETCH_INTERVAL_MS = 60000;
+const PREFETCH_IDLE_DELAY_MS = 1500;
+
+const prefetchState = {'filters': null, 'sent': {}, 'idleTimer': null};
+
+function prefetchPage(path) {
+    const filters = prefetchState.filters;
+    if (!filters || !path || path === window.location.pathname) {
+        return;
+    }
+    const key = `${path}|${filters.start_date}|${filters.end_date}`;
+    const now = Date.now();
+    if (prefetchState.sent[key] && now - prefetchState.sent[key] < PREFETCH_INTERVAL_MS) {
+        return;
+    }
+    prefetchState.sent[key] = now;
+    fetch(PREFETCH_URL, {
+        'method': 'POST',
+        'headers': {'Content-Type': 'application/json'},
+        'body': JSON.stringify(Object.assign({'path': path}, filters)),
+        'keepalive': true
+    }).catch(function () {});
+}
+
+function navLinkPath(target) {
+    const link = target && target.closest ? target.closest('a.nav-link') : null;
+    return link ? link.pathname : null;
+}
+
+function prefetchNavigation() {
+    document.querySelectorAll('a.nav-link').forEach(link => prefetchPage(link.pathname));
+}
+
+// Наведение или фокус на ссылке навигации - пользователь, вероятно, перейдет на эту страницу
+document.addEventListener('mouseover', event => prefetchPage(navLinkPath(event.target)));
+document.addEventListener('focusin', event => prefetchPage(navLinkPath(event.target)));
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    filters: {
+        /* Обновить диапазон дат в зависимости от выбранного периода */
+        update_date_range: function (period, currentStart, currentEnd) {
+            const endDate = new Date();
+
+            if (period === 'custom') {
+                // Показываем выбор дат для произвольного периода (сохраненный в сессии диапазон не сбрасываем)
+                if (currentStart && currentEnd) {
+                    return [{'display': 'block'}, window.dash_clientside.no_update, window.dash_clientside.no_update];
+                }
+                return [{'display': 'block'}, formatDate(daysBefore(endDate, 30)), formatDate(endDate)];
+            }
+
+            let startDate;
+            if (period === 'all') {
+                // Для "За все время" устанавливаем широкий диапазон
+                startDate = new Date(2025, 0, 1);
+            } else {
+                startDate = daysBefore(endDate, PERIOD_DAYS[period] || 30);
+            }
+            return [{'display': 'none'}, formatDate(startDate), formatDate(endDate)];
+        }
+    },
+
+    live: {
+        /* Live-режим KPI работает только для периода "Последние 24 часа" */
+        disabled: function (period) {
+            return period !== '1d';
+        }
+    },
+
+    events: {
+        /* Подписаться на события сервера об изменении данных */
+        connect: function () {
+            if (dataEvents.source || dataEvents.polling) {
+                return window.dash_clientside.no_update;
+            }
+            if (!window.EventSource) {
+                startPolling();
+                return window.dash_clientside.no_update;
+            }
+            dataEvents.source = new EventSource(EVENTS_URL);
+            dataEvents.source.addEventListener('data-version', onDataVersion);
+            dataEvents.source.addEventListener('error', function () {
+                // Обрыв сети браузер переподключает сам; закрытый поток - ответ 503 сверх лимита
+                if (dataEvents.source && dataEvents.source.readyState === EventSource.CLOSED) {
+                    startPolling();
+                }
+            });
+            return window.dash_clientside.no_update;
+        },
+
+        /* Запросить текущие версии данных (вместо потока событий) */
+        poll: function () {
+            fetch(VERSION_URL, {'cache': 'no-store'})
+                .then(response => response.ok ? response.text() : null)
+                .then(function (text) {
+                    if (text) {
+                        onDataVersion({'data': text});
+                    }
+                })
+                .catch(function () {});
+            return window.dash_clientside.no_update;
+        }
+    },
+
+    prefetch: {
+        /* Запомнить общий диапазон дат и после отрисовки страницы предзагрузить остальные */
+        track_filters: function (startDate, endDate) {
+            if (!startDate || !endDate) {
+                return window.dash_clientside.no_update;
+            }
+            prefetchState.filters = {'start_date': startDate, 'end_date': endDate};
+
+            const idle = window.requestIdleCallback || (callback => setTimeout(callback, 0));
+            clearTimeout(prefetchState.idleTimer);
+            prefetchState.idleTimer = setTimeout(() => idle(prefetchNavigation), PREFETCH_IDLE_DELAY_MS);
+            return prefetchState.filters;
+        }
+    },
+
+    cache: {
+        /* Определить состояние фильтров и отдать результат из кэша, если он уже есть */
+        resolve: function () {
+            const args = Array.prototype.slice.call(arguments);
+            const dataVersion = args.pop();
+            const cache = args.pop();
+            const request = args.pop();
+            const key = cacheKey(args, dataVersion);
+            const noUpdate = window.dash_clientside.no_update;
+
+            const entry = cache && cache.entries ? cache.entries[key] : null;
+            if (entry && entry.complete) {
+                return [noUpdate, key, {'key': key, 'outputs': entry.outputs}];
+            }
+            if (request && request.key === key) {
+                return [noUpdate, key, noUpdate];
+            }
+            return [{'key': key, 'values': args}, key, noUpdate];
+        },
+
+        /* Перенести кэш на новую версию данных и запросить заново панели по изменившимся таблицам */
+        refresh: function (dataVersion, key, cache, panelTables) {
+            const noUpdate = window.dash_clientside.no_update;
+            const outputs = window.dash_clientside.callback_context.outputs_list;
+            if (!dataVersion || !key) {
+                return outputs.map(() => noUpdate);
+            }
+            const [values, version] = JSON.parse(key);
+            if (version === dataVersion.version) {
+                return outputs.map(() => noUpdate);
+            }
+
+            const changed = dataVersion.changed || [];
+            const affected = Object.keys(panelTables || {}).filter(
+                panelId => panelTables[panelId].some(table => changed.includes(table))
+            );
+
+            // Записи для других состояний фильтров устарели; текущая сохраняется без обновляемых панелей
+            const newKey = cacheKey(values, dataVersion);
+            const result = {'order': [], 'entries': {}};
+            const entry = cache && cache.entries ? cache.entries[key] : null;
+            if (entry) {
+                const kept = {};
+                Object.keys(entry.outputs).forEach(function (propId) {
+                    const componentId = propId.split('.')[0];
+                    const stale = affected.some(
+                        panelId => componentId === panelId || componentId === `${panelId}-signature`
+                    );
+                    if (!stale) {
+                        kept[propId] = entry.outputs[propId];
+                    }
+                });
+                result.entries[newKey] = {'outputs': kept, 'complete': entry.complete && affected.length === 0};
+                result.order.push(newKey);
+            }
+
+            const request = {'values': values, 'version': dataVersion.version};
+            return [newKey, result].concat(outputs.slice(2).map(function (output) {
+                const panelId = output.id.replace(/-refresh$/, '');
+                return affected.includes(panelId) ? request : noUpdate;
+            }));
+        },
+
+        /* Применить закэшированные значения панелей */
+        apply: function (hit) {
+            const outputs = window.dash_clientside.callback_context.outputs_list;
+            if (!hit || !hit.outputs) {
+                return outputs.map(() => window.dash_clientside.no_update);
+            }
+            return outputs.map(function (output) {
+                const propId = `${output.id}.${output.property}`;
+                return propId in hit.outputs ? hit.outputs[propId] : window.dash_clientside.no_update;
+            });
+        },
+
+        /* Сохранить обновившиеся панели под ключом текущего состояния фильтров */
+        store: function () {
+            const args = Array.prototype.slice.call(arguments);
+            const cache = args.pop();
+            const key = args.pop();
+            const context = window.dash_clientside.callback_context;
+            if (!key) {
+                return window.dash_clientside.no_update;
+            }
+
+            const result = {
+                'order': cache && cache.order ? cache.order.filter(k => k !== key) : [],
+                'entries': Object.assign({}, cache ? cache.entries : {})
+            };
+            const entry = Object.assign({'outputs': {}}, result.entries[key]);
+            entry.outputs = Object.assign({}, entry.outputs);
+
+            // Записываем только сработавшие входы: остальные панели еще показывают прошлое состояние
+            // (предпросмотр, панели с ошибкой и сигнатуры их графиков не записываются)
+            const skipped = context.triggered.filter(trigger => isUncacheable(trigger.value))
+                .map(trigger => trigger.prop_id.split('.')[0]);
+            context.triggered.forEach(function (trigger) {
+                const componentId = trigger.prop_id.split('.')[0].replace(/-signature$/, '');
+                if (trigger.value !== null && trigger.value !== undefined && !skipped.includes(componentId)) {
+                    entry.outputs[trigger.prop_id] = trigger.value;
+                }
+            });
+            entry.complete = Object.keys(entry.outputs).length === context.inputs_list.length;
+
+            result.entries[key] = entry;
+            result.order.push(key);
+
+            while (result.order.length > CLIENT_CACHE_MAX_ENTRIES ||
+                   (result.order.length > 1 && JSON.stringify(result.entries).length > CLIENT_CACHE_MAX_CHARS)) {
+                delete result.entries[result.order.shift()];
+            }
+            return result;
+        }
+    }
+});
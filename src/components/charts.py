@@ -1,77 +1,56 @@
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import pandas as pd
 from typing import Dict, Any, List, Optional
 
+from src.components import fast_figures as ff
+
+# Качественная палитра Set3 (как px.colors.qualitative.Set3)
+SET3_COLORS = ['#8DD3C7', '#FFFFB3', '#BEBADA', '#FB8072', '#80B1D3', '#FDB462',
+               '#B3DE69', '#FCCDE5', '#D9D9D9', '#BC80BD', '#CCEBC5', '#FFED6F']
+
 class ChartBuilder:
     """Класс для построения графиков"""
-    
+
     @staticmethod
-    def create_sales_trend_chart(data: pd.DataFrame) -> go.Figure:
+    def create_sales_trend_chart(data: pd.DataFrame) -> Dict[str, Any]:
         """Создать график динамики продаж"""
         if data.empty:
-            return go.Figure().update_layout(title="Нет данных")
-        
-        fig = make_subplots(specs=[[{"secondary_y": True}]])
-        
-        # Линия заказов
-        fig.add_trace(
-            go.Scatter(
-                x=data['date'], 
-                y=data['orders_count'],
-                name="Количество заказов",
-                line=dict(color='#3498DB', width=3),
-                mode='lines+markers'
-            ),
-            secondary_y=False
-        )
-        
-        # Линия выручки
-        fig.add_trace(
-            go.Scatter(
-                x=data['date'], 
-                y=data['daily_revenue'],
-                name="Выручка",
-                line=dict(color='#27AE60', width=3),
-                mode='lines+markers'
-            ),
-            secondary_y=True
-        )
-        
-        fig.update_layout(
+            return ff.empty_figure()
+
+        return ff.figure(
+            [
+                # Линия заказов
+                ff.line(data['date'], data['orders_count'],
+                        name="Количество заказов",
+                        mode='lines+markers',
+                        line={'color': '#3498DB', 'width': 3}),
+                # Линия выручки
+                ff.line(data['date'], data['daily_revenue'],
+                        name="Выручка",
+                        mode='lines+markers',
+                        line={'color': '#27AE60', 'width': 3},
+                        yaxis='y2'),
+            ],
             title="Динамика продаж и выручки",
-            xaxis_title="Дата",
+            xaxis={'title': {'text': "Дата"}},
+            yaxis={'title': {'text': "Количество заказов"}},
+            yaxis2={'title': {'text': "Выручка (руб)"}, 'overlaying': 'y', 'side': 'right'},
             hovermode='x unified',
             legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
         )
-        
-        fig.update_yaxes(title_text="Количество заказов", secondary_y=False)
-        fig.update_yaxes(title_text="Выручка (руб)", secondary_y=True)
-        
-        return fig
-    
+
     @staticmethod
-    def create_category_sales_chart(data: pd.DataFrame) -> go.Figure:
+    def create_category_sales_chart(data: pd.DataFrame) -> Dict[str, Any]:
         """Создать круговую диаграмму продаж по категориям"""
         if data.empty:
-            return go.Figure().update_layout(title="Нет данных")
-        
-        fig = px.pie(
-            data, 
-            values='category_revenue', 
-            names='category',
+            return ff.empty_figure()
+
+        return ff.figure(
+            [ff.pie(data['category'], data['category_revenue'],
+                    colors=SET3_COLORS,
+                    textposition='inside',
+                    textinfo='percent+label',
+                    hovertemplate='<b>%{label}</b><br>Выручка: %{value:,.0f} руб<br>Доля: %{percent}')],
             title='Распределение продаж по категориям',
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        
-        fig.update_traces(
-            textposition='inside',
-            textinfo='percent+label',
-            hovertemplate='<b>%{label}</b><br>Выручка: %{value:,.0f} руб<br>Доля: %{percent}'
-        )
-        
-        fig.update_layout(
             showlegend=True,
             legend=dict(
                 orientation="v",
@@ -81,203 +60,138 @@ class ChartBuilder:
                 x=1.1
             )
         )
-        
-        return fig
-    
+
     @staticmethod
-    def create_funnel_chart(data: pd.DataFrame) -> go.Figure:
+    def create_funnel_chart(data: pd.DataFrame) -> Dict[str, Any]:
         """Создать воронку событий"""
         if data.empty:
-            return go.Figure().update_layout(title="Нет данных")
-        
+            return ff.empty_figure()
+
         # Сортируем по порядку воронки
         event_order = ['view', 'click', 'add_to_cart', 'wishlist', 'purchase', 'search']
         data['event_type'] = pd.Categorical(data['event_type'], categories=event_order, ordered=True)
         data = data.sort_values('event_type')
-        
-        fig = px.funnel(
-            data, 
-            x='events_count', 
-            y='event_type',
+
+        return ff.figure(
+            [ff.funnel(data['events_count'], data['event_type'].astype(str))],
             title='Воронка событий пользователей',
-            labels={'events_count': 'Количество событий', 'event_type': 'Тип события'}
+            **ff.axes('Количество событий', 'Тип события')
         )
-        
-        return fig
-    
+
     @staticmethod
-    def create_segmentation_chart(data: pd.DataFrame) -> go.Figure:
+    def create_segmentation_chart(data: pd.DataFrame) -> Dict[str, Any]:
         """Создать график сегментации пользователей"""
         if data.empty:
-            return go.Figure().update_layout(title="Нет данных")
-        
-        fig = px.pie(
-            data, 
-            values='users_count', 
-            names='segment',
-            title='Распределение пользователей по сегментам',
-            hole=0.4
+            return ff.empty_figure()
+
+        return ff.figure(
+            [ff.pie(data['segment'], data['users_count'], hole=0.4,
+                    textposition='inside', textinfo='percent+label')],
+            title='Распределение пользователей по сегментам'
         )
-        
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-        return fig
-    
+
     @staticmethod
-    def create_ad_performance_chart(data: pd.DataFrame) -> go.Figure:
+    def create_ad_performance_chart(data: pd.DataFrame) -> Dict[str, Any]:
         """Создать график эффективности рекламы"""
         if data.empty:
-            return go.Figure().update_layout(title="Нет данных")
-        
-        fig = make_subplots(rows=2, cols=1, subplot_titles=('ROI по кампаниям', 'Расходы vs Доходы'))
-        
-        # ROI
-        fig.add_trace(
-            go.Bar(
-                x=data['campaign_name'],
-                y=data['roi'],
-                name="ROI",
-                marker_color='#E74C3C'
-            ),
-            row=1, col=1
-        )
-        
-        # Расходы и доходы
-        fig.add_trace(
-            go.Bar(
-                x=data['campaign_name'],
-                y=data['total_spend'],
-                name="Расходы",
-                marker_color='#F39C12'
-            ),
-            row=2, col=1
-        )
-        
-        fig.add_trace(
-            go.Bar(
-                x=data['campaign_name'],
-                y=data['total_revenue'],
-                name="Доходы",
-                marker_color='#27AE60'
-            ),
-            row=2, col=1
+            return ff.empty_figure()
+
+        layout = ff.grid(rows=2, cols=1, titles=('ROI по кампаниям', 'Расходы vs Доходы'))
+        layout['xaxis']['tickangle'] = 45
+        layout['xaxis2']['tickangle'] = 45
+
+        return ff.figure(
+            [
+                # ROI
+                ff.bar(data['campaign_name'], data['roi'], name="ROI", color='#E74C3C'),
+                # Расходы и доходы
+                ff.cell(ff.bar(data['campaign_name'], data['total_spend'], name="Расходы", color='#F39C12'),
+                        row=2, col=1, cols=1),
+                ff.cell(ff.bar(data['campaign_name'], data['total_revenue'], name="Доходы", color='#27AE60'),
+                        row=2, col=1, cols=1),
+            ],
+            height=600,
+            showlegend=True,
+            **layout
         )
-        
-        fig.update_layout(height=600, showlegend=True)
-        fig.update_xaxes(tickangle=45)
-        
-        return fig
-    
+
     @staticmethod
-    def create_returns_analysis_chart(data: pd.DataFrame) -> go.Figure:
+    def create_returns_analysis_chart(data: pd.DataFrame) -> Dict[str, Any]:
         """Создать график анализа возвратов"""
         if data.empty:
-            return go.Figure().update_layout(title="Нет данных")
-        
-        fig = px.bar(
-            data,
-            x='returns_count',
-            y='reason',
-            orientation='h',
+            return ff.empty_figure()
+
+        return ff.figure(
+            [ff.bar(data['returns_count'], data['reason'], orientation='h',
+                    color_values=data['returns_count'], scale='Reds',
+                    colorbar_title='Количество возвратов')],
             title='Анализ причин возвратов',
-            labels={'returns_count': 'Количество возвратов', 'reason': 'Причина'},
-            color='returns_count',
-            color_continuous_scale='Reds'
+            **ff.axes('Количество возвратов', 'Причина')
         )
-        
-        return fig
-    
+
     @staticmethod
-    def create_traffic_channels_chart(data: pd.DataFrame) -> go.Figure:
+    def create_traffic_channels_chart(data: pd.DataFrame) -> Dict[str, Any]:
         """Создать график каналов трафика"""
         if data.empty:
-            return go.Figure().update_layout(title="Нет данных")
-        
-        fig = px.sunburst(
-            data,
-            path=['channel'],
-            values='sessions_count',
-            title='Распределение трафика по каналам',
-            color='sessions_count',
-            color_continuous_scale='Blues'
+            return ff.empty_figure()
+
+        return ff.figure(
+            [ff.hierarchy('sunburst', data['channel'], data['sessions_count'],
+                          color_values=data['sessions_count'], scale='Blues')],
+            title='Распределение трафика по каналам'
         )
-        
-        return fig
-    
+
     @staticmethod
-    def create_inventory_status_chart(data: pd.DataFrame) -> go.Figure:
+    def create_inventory_status_chart(data: pd.DataFrame) -> Dict[str, Any]:
         """Создать график статуса запасов"""
         if data.empty:
-            return go.Figure().update_layout(title="Нет данных")
-        
-        fig = px.treemap(
-            data,
-            path=['category'],
-            values='total_stock',
-            title='Остатки товаров на складе по категориям',
-            color='total_stock',
-            color_continuous_scale='Greens'
+            return ff.empty_figure()
+
+        return ff.figure(
+            [ff.hierarchy('treemap', data['category'], data['total_stock'],
+                          color_values=data['total_stock'], scale='Greens')],
+            title='Остатки товаров на складе по категориям'
         )
-        
-        return fig
-    
+
     @staticmethod
-    def create_support_metrics_chart(data: pd.DataFrame) -> go.Figure:
+    def create_support_metrics_chart(data: pd.DataFrame) -> Dict[str, Any]:
         """Создать график метрик поддержки"""
         if data.empty:
-            return go.Figure().update_layout(title="Нет данных")
-        
-        fig = make_subplots(rows=1, cols=2, subplot_titles=('Типы обращений', 'Время решения'))
-        
-        # Количество тикетов по типам
-        fig.add_trace(
-            go.Bar(
-                x=data['issue_type'],
-                y=data['tickets_count'],
-                name="Количество тикетов",
-                marker_color='#9B59B6'
-            ),
-            row=1, col=1
-        )
-        
-        # Время решения
-        fig.add_trace(
-            go.Bar(
-                x=data['issue_type'],
-                y=data['avg_resolution_time'],
-                name="Ср. время решения (мин)",
-                marker_color='#3498DB'
-            ),
-            row=1, col=2
+            return ff.empty_figure()
+
+        layout = ff.grid(rows=1, cols=2, titles=('Типы обращений', 'Время решения'))
+        layout['xaxis']['tickangle'] = 45
+        layout['xaxis2']['tickangle'] = 45
+
+        return ff.figure(
+            [
+                # Количество тикетов по типам
+                ff.bar(data['issue_type'], data['tickets_count'],
+                       name="Количество тикетов", color='#9B59B6'),
+                # Время решения
+                ff.cell(ff.bar(data['issue_type'], data['avg_resolution_time'],
+                               name="Ср. время решения (мин)", color='#3498DB'),
+                        row=1, col=2, cols=2),
+            ],
+            showlegend=False,
+            **layout
         )
-        
-        fig.update_layout(height=400, showlegend=False)
-        fig.update_xaxes(tickangle=45)
-        
-        return fig
-    
+
     @staticmethod
-    def create_supplier_performance_chart(data: pd.DataFrame) -> go.Figure:
+    def create_supplier_performance_chart(data: pd.DataFrame) -> Dict[str, Any]:
         """Создать график производительности поставщиков"""
         if data.empty:
-            return go.Figure().update_layout(title="Нет данных")
-        
-        fig = px.scatter(
-            data,
-            x='orders_count',
-            y='total_revenue',
-            size='supplier_rating',
-            color='supplier_rating',
-            hover_name='supplier_name',
+            return ff.empty_figure()
+
+        return ff.figure(
+            [ff.scatter(data['orders_count'], data['total_revenue'],
+                        size=data['supplier_rating'], size_max=60,
+                        color_values=data['supplier_rating'],
+                        text=data['supplier_name'],
+                        hovertemplate='<b>%{text}</b><br>Количество заказов: %{x}<br>Общая выручка: %{y}')],
             title='Производительность поставщиков',
-            labels={
-                'orders_count': 'Количество заказов',
-                'total_revenue': 'Общая выручка',
-                'supplier_rating': 'Рейтинг поставщика'
-            },
-            size_max=60
+            **ff.axes('Количество заказов', 'Общая выручка')
         )
-        
-        return fig
 
 # Глобальный экземпляр построителя графиков
-chart_builder = ChartBuilder()
\ No newline at end of file
+chart_builder = ChartBuilder()
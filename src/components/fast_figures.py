@@ -0,0 +1,285 @@
+"""
+Легковесное построение графиков в виде словарей plotly без валидации plotly.express
+"""
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from src.utils.serialization import encode_numeric
+
+# Общее оформление: прозрачный фон, единый цвет шрифта и высота. Задается прямо в layout,
+# а не шаблоном: шаблон копировался бы в каждый ответ, а зарегистрированный в plotly.io
+# шаблон браузеру по имени недоступен
+BASE_LAYOUT = {
+    'paper_bgcolor': 'rgba(0,0,0,0)',
+    'plot_bgcolor': 'rgba(0,0,0,0)',
+    'font': {'color': '#2C3E50'},
+    'title': {'font': {'size': 18}},
+    'height': 400,
+    'margin': {'t': 60, 'l': 60, 'r': 30, 'b': 60},
+    'xaxis': {'automargin': True, 'gridcolor': '#E5E8EB'},
+    'yaxis': {'automargin': True, 'gridcolor': '#E5E8EB'},
+    'colorway': ['#2E86AB', '#A23B72', '#F18F01', '#C73E1D', '#3C91E6',
+                 '#27AE60', '#9B59B6', '#F39C12', '#16A085', '#7F8C8D'],
+}
+
+# Непрерывная шкала по умолчанию (как у plotly.express)
+DEFAULT_COLORSCALE = ['#0d0887', '#46039f', '#7201a8', '#9c179e', '#bd3786',
+                      '#d8576b', '#ed7953', '#fb9f3a', '#fdca26', '#f0f921']
+
+ColorScale = Union[str, Sequence[str]]
+
+
+def values(data: Any) -> Any:
+    """Привести столбец к массиву, пригодному для передачи в plotly.js"""
+    if isinstance(data, pd.Series):
+        if pd.api.types.is_datetime64_any_dtype(data):
+            return np.datetime_as_string(data.to_numpy(dtype='datetime64[s]'), unit='s')
+        if pd.api.types.is_numeric_dtype(data):
+            # Длинные числовые ряды передаются как base64 typed array
+            return encode_numeric(data.to_numpy())
+        return data.tolist()
+    if isinstance(data, np.ndarray):
+        return encode_numeric(data)
+    return data
+
+
+def colorscale(scale: Optional[ColorScale]) -> Any:
+    """Преобразовать список цветов в непрерывную шкалу plotly"""
+    if scale is None:
+        scale = DEFAULT_COLORSCALE
+    if isinstance(scale, str):
+        return scale
+    if len(scale) == 1:
+        return [[0, scale[0]], [1, scale[0]]]
+    step = 1 / (len(scale) - 1)
+    return [[round(i * step, 6), color] for i, color in enumerate(scale)]
+
+
+def marker(color: Optional[str] = None, color_values: Any = None,
+           scale: Optional[ColorScale] = None, colorbar_title: Optional[str] = None,
+           **extra) -> Dict[str, Any]:
+    """Оформление маркеров: фиксированный цвет или цвет по значению"""
+    result = dict(extra)
+    if color_values is not None:
+        result.update({
+            'color': values(color_values),
+            'colorscale': colorscale(scale),
+            'showscale': True,
+            'colorbar': {'title': {'text': colorbar_title or ''}},
+        })
+    elif color is not None:
+        result['color'] = color
+    return result
+
+
+def figure(traces: List[Dict[str, Any]], title: Optional[str] = None, **layout) -> Dict[str, Any]:
+    """Собрать график из трейсов с общим оформлением (вложенные словари дополняют общие, как шаблон)"""
+    fig_layout = {key: dict(value) if isinstance(value, dict) else value for key, value in BASE_LAYOUT.items()}
+    if title is not None:
+        layout['title'] = {'text': title, **layout.get('title', {})}
+    for key, value in layout.items():
+        base = fig_layout.get(key)
+        fig_layout[key] = {**base, **value} if isinstance(base, dict) and isinstance(value, dict) else value
+    return {'data': traces, 'layout': fig_layout}
+
+
+def empty_figure(title: str = "Нет данных") -> Dict[str, Any]:
+    """Пустой график с единым стилем"""
+    fig = figure([], xaxis={'visible': False}, yaxis={'visible': False})
+    fig['layout']['title'] = {'text': title, 'x': 0.5, 'font': {'size': 16, 'color': '#6c757d'}}
+    return fig
+
+
+def axes(x_title: Optional[str] = None, y_title: Optional[str] = None, **extra) -> Dict[str, Any]:
+    """Подписи осей"""
+    layout = dict(extra)
+    if x_title is not None:
+        layout['xaxis'] = {'title': {'text': x_title}, **layout.get('xaxis', {})}
+    if y_title is not None:
+        layout['yaxis'] = {'title': {'text': y_title}, **layout.get('yaxis', {})}
+    return layout
+
+
+def line(x: Any, y: Any, name: Optional[str] = None, color: Optional[str] = None,
+         mode: str = 'lines', webgl: bool = False, **extra) -> Dict[str, Any]:
+    """Линейный трейс (WebGL для больших рядов)"""
+    trace = {
+        'type': 'scattergl' if webgl else 'scatter',
+        'mode': mode,
+        'x': values(x),
+        'y': values(y),
+    }
+    if name is not None:
+        trace['name'] = name
+    if color is not None:
+        trace['line'] = {'color': color}
+    trace.update(extra)
+    return trace
+
+
+def anomaly_markers(x: Any, y: Any, flags: Any, name: str = 'Аномалии',
+                    color: str = '#C73E1D', **extra) -> Dict[str, Any]:
+    """Трейс с маркерами аномальных точек ряда (трейс есть и без аномалий, чтобы не менялась структура графика)"""
+    flags = np.asarray(flags, dtype=bool)
+    x = x[flags] if isinstance(x, pd.Series) else np.asarray(x)[flags]
+    y = y[flags] if isinstance(y, pd.Series) else np.asarray(y)[flags]
+    return line(x, y, name=name, mode='markers',
+                marker={'color': color, 'size': 11, 'symbol': 'x', 'line': {'width': 1}}, **extra)
+
+
+def bar(x: Any, y: Any, name: Optional[str] = None, orientation: str = 'v',
+        color: Optional[str] = None, color_values: Any = None,
+        scale: Optional[ColorScale] = None, colorbar_title: Optional[str] = None,
+        **extra) -> Dict[str, Any]:
+    """Столбчатый трейс с фиксированным цветом или цветом по значению"""
+    trace = {
+        'type': 'bar',
+        'orientation': orientation,
+        'x': values(x),
+        'y': values(y),
+        'marker': marker(color, color_values, scale, colorbar_title),
+    }
+    if name is not None:
+        trace['name'] = name
+    trace.update(extra)
+    return trace
+
+
+def upper_errors(errors: Any) -> Dict[str, Any]:
+    """Односторонние планки погрешности (вверх или вправо) для значений - нижних оценок"""
+    errors = pd.Series(errors, dtype=float).fillna(0)
+    return {'type': 'data', 'symmetric': False, 'array': errors.tolist(), 'arrayminus': [0] * len(errors),
+            'thickness': 1, 'width': 3}
+
+
+def interval_errors(errors: Any) -> Dict[str, Any]:
+    """Симметричные планки доверительного интервала (полуширина) для оценок по выборке"""
+    errors = pd.Series(errors, dtype=float).fillna(0)
+    return {'type': 'data', 'array': errors.tolist(), 'thickness': 1, 'width': 3}
+
+
+def confidence_errors(data: pd.DataFrame, column: str, axis: str = 'y') -> Dict[str, Any]:
+    """Аргумент error_x/error_y трейса, если у столбца есть доверительный интервал (<column>_ci)"""
+    if f'{column}_ci' not in data:
+        return {}
+    return {f'error_{axis}': interval_errors(data[f'{column}_ci'])}
+
+
+def grouped_bars(data: pd.DataFrame, x: str, y: str, group: str, **extra) -> List[Dict[str, Any]]:
+    """Столбчатые трейсы по одному на значение категориального признака"""
+    traces = []
+    for group_value, group_data in data.groupby(group, sort=False):
+        traces.append(bar(group_data[x], group_data[y], name=str(group_value), **extra))
+    return traces
+
+
+def pie(labels: Any, vals: Any, hole: float = 0, colors: Optional[Sequence[str]] = None,
+        **extra) -> Dict[str, Any]:
+    """Круговая диаграмма"""
+    trace = {
+        'type': 'pie',
+        'labels': values(labels),
+        'values': values(vals),
+        'hole': hole,
+    }
+    if colors is not None:
+        trace['marker'] = {'colors': list(colors)}
+    trace.update(extra)
+    return trace
+
+
+def funnel(x: Any, y: Any, **extra) -> Dict[str, Any]:
+    """Воронка"""
+    trace = {'type': 'funnel', 'x': values(x), 'y': values(y)}
+    trace.update(extra)
+    return trace
+
+
+def hierarchy(kind: str, labels: Any, vals: Any, color_values: Any = None,
+              scale: Optional[ColorScale] = None, **extra) -> Dict[str, Any]:
+    """Одноуровневый sunburst или treemap"""
+    trace = {
+        'type': kind,
+        'labels': values(labels),
+        'parents': [''] * len(labels),
+        'values': values(vals),
+        'branchvalues': 'total',
+    }
+    if color_values is not None:
+        trace['marker'] = {
+            'colors': values(color_values),
+            'colorscale': colorscale(scale),
+            'showscale': True,
+        }
+    trace.update(extra)
+    return trace
+
+
+def scatter(x: Any, y: Any, size: Any = None, size_max: int = 60, color_values: Any = None,
+            scale: Optional[ColorScale] = None, text: Any = None, **extra) -> Dict[str, Any]:
+    """Точечный трейс с размером и цветом по значениям"""
+    trace_marker = marker(None, color_values, scale)
+    if size is not None:
+        sizes = np.asarray(size, dtype=float)
+        trace_marker.update({
+            'size': values(sizes),
+            'sizemode': 'area',
+            'sizeref': 2.0 * np.nanmax(sizes) / size_max ** 2 if len(sizes) and np.nanmax(sizes) > 0 else 1,
+        })
+    trace = {'type': 'scatter', 'mode': 'markers', 'x': values(x), 'y': values(y), 'marker': trace_marker}
+    if text is not None:
+        trace['text'] = values(text)
+    trace.update(extra)
+    return trace
+
+
+def heatmap(x: Any, y: Any, z: Any, scale: Optional[ColorScale] = None,
+            colorbar_title: Optional[str] = None, **extra) -> Dict[str, Any]:
+    """Тепловая карта: матрица z (строки соответствуют y, столбцы - x)"""
+    trace = {
+        'type': 'heatmap',
+        'x': values(x),
+        'y': values(y),
+        'z': values(z),
+        'colorscale': colorscale(scale),
+        'colorbar': {'title': {'text': colorbar_title or ''}},
+    }
+    trace.update(extra)
+    return trace
+
+
+def grid(rows: int, cols: int, titles: Sequence[str] = (), spacing: float = 0.12) -> Dict[str, Any]:
+    """Разметка осей для сетки подграфиков (аналог make_subplots без валидации)"""
+    layout = {}
+    annotations = []
+    width = (1 - spacing * (cols - 1)) / cols
+    height = (1 - spacing * (rows - 1)) / rows
+
+    for row in range(rows):
+        for col in range(cols):
+            index = row * cols + col + 1
+            suffix = '' if index == 1 else str(index)
+            x0 = col * (width + spacing)
+            y1 = 1 - row * (height + spacing)
+            layout[f'xaxis{suffix}'] = {'domain': [x0, x0 + width], 'anchor': f'y{suffix}'}
+            layout[f'yaxis{suffix}'] = {'domain': [y1 - height, y1], 'anchor': f'x{suffix}'}
+            if index <= len(titles):
+                annotations.append({
+                    'text': titles[index - 1],
+                    'x': x0 + width / 2, 'y': y1,
+                    'xref': 'paper', 'yref': 'paper',
+                    'xanchor': 'center', 'yanchor': 'bottom',
+                    'showarrow': False, 'font': {'size': 16},
+                })
+
+    layout['annotations'] = annotations
+    return layout
+
+
+def cell(trace: Dict[str, Any], row: int, col: int, cols: int) -> Dict[str, Any]:
+    """Привязать трейс к ячейке сетки подграфиков"""
+    index = (row - 1) * cols + col
+    if index > 1:
+        trace = dict(trace, xaxis=f'x{index}', yaxis=f'y{index}')
+    return trace
@@ -0,0 +1,86 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from dash import Patch, dcc, html
+
+# Поля трейса, которые меняются вместе с данными и передаются через Patch
+TRACE_DATA_KEYS = ('x', 'y', 'z', 'values', 'labels', 'parents', 'ids', 'text', 'customdata')
+# Поля marker, зависящие от данных (цветовая шкала по значению, размер точек)
+MARKER_DATA_KEYS = ('color', 'size')
+
+
+def signature_store_id(graph_id: str) -> str:
+    """Получить id хранилища сигнатуры для графика"""
+    return f"{graph_id}-signature"
+
+
+def create_chart_graph(graph_id: str, **graph_kwargs) -> html.Div:
+    """Создать график с собственным индикатором загрузки и хранилищем сигнатуры структуры"""
+    return html.Div([
+        dcc.Loading(dcc.Graph(id=graph_id, **graph_kwargs), type="circle"),
+        dcc.Store(id=signature_store_id(graph_id)),
+    ])
+
+
+def _figure_dict(fig: Any) -> Dict[str, Any]:
+    """Привести график к словарю plotly"""
+    if isinstance(fig, dict):
+        return fig
+    return fig.to_plotly_json()
+
+
+def _figure_skeleton(fig_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Получить структуру графика без данных трейсов и заголовка"""
+    data = []
+    for trace in fig_dict.get('data', []):
+        trace = {
+            key: (None if key in TRACE_DATA_KEYS else value)
+            for key, value in trace.items()
+        }
+        marker = trace.get('marker')
+        if isinstance(marker, dict):
+            trace['marker'] = {
+                key: (None if key in MARKER_DATA_KEYS else value)
+                for key, value in marker.items()
+            }
+        data.append(trace)
+
+    layout = {key: value for key, value in fig_dict.get('layout', {}).items() if key != 'title'}
+    return {'data': data, 'layout': layout}
+
+
+def figure_signature(fig: Any) -> str:
+    """Рассчитать сигнатуру структуры графика"""
+    skeleton = _figure_skeleton(_figure_dict(fig))
+    # В структуре нет массивов данных, поэтому достаточно строкового представления остальных значений
+    payload = json.dumps(skeleton, sort_keys=True, default=str)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def build_figure_update(fig: Any, previous_signature: Optional[str]) -> Tuple[Any, str]:
+    """Вернуть Patch с данными трейсов, если структура графика не изменилась, иначе полный график"""
+    fig_dict = _figure_dict(fig)
+    signature = figure_signature(fig_dict)
+
+    if previous_signature != signature:
+        return fig, signature
+
+    patch = Patch()
+    for index, trace in enumerate(fig_dict.get('data', [])):
+        for key in TRACE_DATA_KEYS:
+            if key in trace:
+                patch['data'][index][key] = trace[key]
+
+        marker = trace.get('marker')
+        if isinstance(marker, dict):
+            for key in MARKER_DATA_KEYS:
+                if key in marker:
+                    patch['data'][index]['marker'][key] = marker[key]
+
+    layout = fig_dict.get('layout', {})
+    if 'title' in layout:
+        patch['layout']['title'] = layout['title']
+
+    return patch, signature
+
@@ -1,11 +1,20 @@
-from dash import dcc, html, Output, Input, callback
+from dash import dcc, html, Output, Input, State, callback, ClientsideFunction
 import dash_bootstrap_components as dbc
 from datetime import datetime, timedelta
 from src.database.queries.common import CHANNELS_QUERY, REGIONS_QUERY, CATEGORIES_QUERY, SEGMENTS_QUERY
+from src.database.scheduler import BACKGROUND, INTERACTIVE, db_priority
+from src.database.watcher import data_watcher
+from cachetools import TTLCache
+from config import config
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Опции фильтров общие для всех вкладок и перечитываются только при изменении данных
+_options_cache = TTLCache(maxsize=64, ttl=config.cache_timeout)
+_options_lock = threading.Lock()
+
 def create_date_filter():
     """Создать фильтр по дате с предустановленными периодами"""
     end_date = datetime.now().date()
@@ -27,6 +36,8 @@ def create_date_filter():
                 {'label': '🎛️ Произвольный период', 'value': 'custom'}
             ],
             value='30d',
+            persistence=True,
+            persistence_type='session',
             clearable=False,
             className="mb-2"
         ),
@@ -37,6 +48,8 @@ def create_date_filter():
                 id='date-range',
                 start_date=start_date,
                 end_date=end_date,
+                persistence=True,
+                persistence_type='session',
                 display_format='YYYY-MM-DD',
                 style={'width': '100%'}
             ),
@@ -51,6 +64,8 @@ def create_issue_type_filter():
             id='issue-type-filter',
             options=[],  # Загружается через callback
             value='all',
+            persistence=True,
+            persistence_type='session',
             placeholder="Все типы",
             clearable=False,
             className="mb-2"
@@ -65,6 +80,8 @@ def create_segment_filter():
             id='service-segment-filter',
             options=[],  # Загружается через callback
             value='all',
+            persistence=True,
+            persistence_type='session',
             placeholder="Все сегменты",
             clearable=False,
             className="mb-2"
@@ -79,6 +96,8 @@ def create_region_filter():
             id='service-region-filter',
             options=[],  # Загружается через callback
             value='all',
+            persistence=True,
+            persistence_type='session',
             placeholder="Все регионы",
             clearable=False,
             className="mb-2"
@@ -94,6 +113,8 @@ def create_category_filter():
             id='basic-category-filter',
             options=[],  # Будет заполнено через callback
             value='all',
+            persistence=True,
+            persistence_type='session',
             clearable=False,
             placeholder="Все категории"
         ),
@@ -107,6 +128,8 @@ def create_supplier_filter():
             id='supplier-filter',
             options=[],
             value='all',
+            persistence=True,
+            persistence_type='session',
             clearable=False,
             placeholder="Все поставщики"
         ),
@@ -120,6 +143,8 @@ def create_channel_filter():
             id='channel-filter',
             options=[],  # Будет заполнено через callback
             value='all',
+            persistence=True,
+            persistence_type='session',
             clearable=False,
             placeholder="Загрузка каналов..."
         ),
@@ -128,44 +153,57 @@ def create_channel_filter():
 
 
 # Callback'ы для работы с фильтрами
+def create_exact_counts_toggle():
+    """Переключатель точного подсчета уникальных (по умолчанию - приближенный по скетчам HyperLogLog)"""
+    return html.Div([
+        html.Label("🎯 Уникальные значения", className="form-label"),
+        dbc.Switch(
+            id='exact-counts-toggle',
+            label="Точный подсчет",
+            value=False,
+            persistence=True,
+            persistence_type='session'
+        ),
+    ])
+
+def create_preview_toggle():
+    """Переключатель быстрого предпросмотра: сначала оценки по выборке, затем точные значения"""
+    return dbc.Switch(
+        id='preview-toggle',
+        label="Быстрый предпросмотр",
+        value=config.preview_enabled,
+        persistence=True,
+        persistence_type='session'
+    )
+
 def register_filter_callbacks(app):
     """Зарегистрировать callback'ы для фильтров"""
     
-    @app.callback(
+    # Расчет диапазона дат выполняется в браузере (src/assets/custom.js) без запроса к серверу
+    app.clientside_callback(
+        ClientsideFunction(namespace='filters', function_name='update_date_range'),
         [Output('date-range-container', 'style'),
          Output('date-range', 'start_date'),
          Output('date-range', 'end_date')],
-        [Input('period-selector', 'value')]
+        [Input('period-selector', 'value')],
+        [State('date-range', 'start_date'),
+         State('date-range', 'end_date')]
     )
-    def update_date_range(period):
-        """Обновить диапазон дат в зависимости от выбранного периода"""
-        end_date = datetime.now().date()
-        
-        if period == 'custom':
-            # Показываем выбор дат для произвольного периода
-            start_date = end_date - timedelta(days=30)
-            return {'display': 'block'}, start_date, end_date
-        
-        # Скрываем выбор дат для предустановленных периодов
-        style = {'display': 'none'}
-        
-        if period == '1d':
-            start_date = end_date - timedelta(days=1)
-        elif period == '7d':
-            start_date = end_date - timedelta(days=7)
-        elif period == '90d':
-            start_date = end_date - timedelta(days=90)
-        elif period == '365d':
-            start_date = end_date - timedelta(days=365)
-        elif period == 'all':
-            # Для "За все время" устанавливаем широкий диапазон
-            start_date = datetime(2025, 1, 1).date()  # Начало 2025 года
-        else:  # 30d по умолчанию
-            start_date = end_date - timedelta(days=30)
-            
-        return style, start_date, end_date
     
     def load_filter_options(query, default_label="Все"):
+        """Загрузить опции фильтра (один раз на версию данных для всех вкладок)"""
+        key = (query, default_label, data_watcher.version)
+        with _options_lock:
+            options = _options_cache.get(key)
+        if options is None:
+            options = _query_filter_options(query, default_label)
+            # Заглушку "Все" при ошибке не кэшируем: следующая загрузка повторит запрос
+            if len(options) > 1:
+                with _options_lock:
+                    _options_cache[key] = options
+        return options
+    
+    def _query_filter_options(query, default_label):
         """Вспомогательная функция для загрузки опций фильтра"""
         try:
             from src.database.connection import db_manager
@@ -249,6 +287,48 @@ def register_filter_callbacks(app):
             logger.error(f"Error loading suppliers: {e}")
             return [{'label': 'Все поставщики', 'value': 'all'}]
     
+    # Фильтры страницы рекламы (перечитываются при изменении данных, в фоновом классе)
+    @app.callback(
+        Output('campaign-filter', 'options'),
+        [Input('data-version', 'data')]
+    )
+    def load_campaigns(data_version):
+        """Загрузить кампании из базы данных"""
+        query = "SELECT DISTINCT campaign_name FROM ad_revenue WHERE campaign_name IS NOT NULL AND campaign_name != '' ORDER BY campaign_name"
+        with db_priority(BACKGROUND if data_version else INTERACTIVE):
+            return load_filter_options(query, "Все кампании")
+    
+    @app.callback(
+        Output('ad-channel-filter', 'options'),
+        [Input('data-version', 'data')]
+    )
+    def load_ad_channels(data_version):
+        """Загрузить каналы трафика для рекламы"""
+        query = "SELECT DISTINCT channel FROM traffic WHERE channel IS NOT NULL AND channel != '' ORDER BY channel"
+        with db_priority(BACKGROUND if data_version else INTERACTIVE):
+            return load_filter_options(query, "Все каналы")
+    
+    @app.callback(
+        Output('ad-category-filter', 'options'),
+        [Input('data-version', 'data')]
+    )
+    def load_ad_categories(data_version):
+        """Загрузить категории для рекламы"""
+        query = "SELECT DISTINCT category FROM products WHERE category IS NOT NULL AND category != '' ORDER BY category"
+        with db_priority(BACKGROUND if data_version else INTERACTIVE):
+            return load_filter_options(query, "Все категории")
+    
+    # Сброс фильтров качества обслуживания
+    @app.callback(
+        [Output('issue-type-filter', 'value'),
+         Output('service-segment-filter', 'value'),
+         Output('service-region-filter', 'value'),
+         Output('period-selector', 'value')],
+        [Input('reset-service-filters', 'n_clicks')]
+    )
+    def reset_service_filters(n_clicks):
+        return 'all', 'all', 'all', '30d'
+    
 
 
     return app
\ No newline at end of file
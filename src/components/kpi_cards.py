@@ -2,11 +2,13 @@ from dash import html
 import dash_bootstrap_components as dbc
 from typing import Dict, Any
 
-def create_kpi_card(title: str, value: str, delta: str = None, delta_color: str = "success") -> dbc.Card:
-    """Создать карточку KPI с метрикой"""
+def create_kpi_card(title: str, value: str, delta: str = None, delta_color: str = "success",
+                    ci: str = None) -> dbc.Card:
+    """Создать карточку KPI с метрикой (ci - полуширина доверительного интервала оценки по выборке)"""
     delta_element = []
     if delta:
-        delta_icon = "↗️" if delta_color == "success" else "↘️"
+        # Стрелка показывает направление изменения, цвет - хорошо это или плохо
+        delta_icon = "↘️" if str(delta).startswith('-') else "↗️"
         delta_element = [
             dbc.CardFooter([
                 html.Span(f"{delta_icon} {delta}", className=f"text-{delta_color}")
@@ -17,6 +19,7 @@ def create_kpi_card(title: str, value: str, delta: str = None, delta_color: str
         dbc.CardBody([
             html.H6(title, className="card-title text-muted"),
             html.H3(value, className="card-text fw-bold"),
+            *([html.Small(f"± {ci} (95%)", className="text-muted")] if ci else []),
         ]),
         *delta_element
     ], className="text-center h-100")
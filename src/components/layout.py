@@ -1,13 +1,13 @@
+from datetime import date
+from functools import lru_cache
+
 from dash import html, dcc
 import dash_bootstrap_components as dbc
 
+from config import config
+
 from .navigation import create_navigation
-from .pages import (
-    create_business_sales_layout,
-    create_customer_behavior_layout,
-    create_advertising_marketing_layout,
-    create_service_quality_layout
-)
+from .pages.registry import get_page_spec
 
 def create_layout():
     """Создать основной макет приложения с multi-page navigation"""
@@ -24,17 +24,19 @@ def create_layout():
         # Скрытые элементы
         dcc.Store(id='data-store'),
         dcc.Store(id='app-load', data='loaded'),  # Триггер загрузки приложения
-        dcc.Interval(id='interval-component', interval=300000, n_intervals=0),
+        dcc.Store(id='prefetch-filters'),  # Диапазон дат для предзагрузки страниц
+        dcc.Store(id='data-version'),  # Версии данных, обновляются событиями сервера (/_malinka/events)
+        # Опрос версий данных, если поток событий недоступен (лимит подписчиков или нет EventSource)
+        dcc.Interval(id='data-poll', interval=config.data_refresh_interval * 1000, n_intervals=0, disabled=True),
     ])
 
 def get_page_layout(pathname):
-    """Получить layout для текущего пути"""
-    if pathname == '/customer-behavior':
-        return create_customer_behavior_layout()
-    elif pathname == '/advertising-marketing':
-        return create_advertising_marketing_layout()
-    elif pathname == '/service-quality':
-        return create_service_quality_layout()
-    else:
-        # По умолчанию показываем бизнес-аналитику
-        return create_business_sales_layout()
\ No newline at end of file
+    """Получить layout для текущего пути (модуль страницы импортируется при первом переходе)"""
+    page = get_page_spec(pathname)
+    return _build_page_layout(page.path, date.today())
+
+@lru_cache(maxsize=16)
+def _build_page_layout(path, day):
+    """Построить layout страницы один раз в день: от даты зависит только период фильтра по умолчанию"""
+    page = get_page_spec(path)
+    return page.resolve(page.layout)()
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Live-режим KPI бизнес-аналитики для периода "Последние 24 часа"
+
+Пока выбран период LIVE_PERIOD, KPI карточки и динамика продаж обновляются каждые
+LIVE_INTERVAL_MS по накопительным итогам в памяти сервера (src/utils/live_kpi.py):
+из базы читается только прирост после последней учтенной транзакции и возврата.
+"""
+import logging
+
+from dash import ClientsideFunction, Input, Output, State, dcc
+from dash.exceptions import PreventUpdate
+
+from src.components.figure_patch import signature_store_id, build_figure_update
+
+logger = logging.getLogger(__name__)
+
+LIVE_PERIOD = '1d'
+LIVE_INTERVAL_MS = 5000
+
+LIVE_INTERVAL_ID = 'business-live-interval'
+
+
+def create_live_interval() -> dcc.Interval:
+    """Таймер live-режима (включается только для периода LIVE_PERIOD)"""
+    return dcc.Interval(id=LIVE_INTERVAL_ID, interval=LIVE_INTERVAL_MS, n_intervals=0, disabled=True)
+
+
+def register_live_kpi_callbacks(app):
+    """Зарегистрировать callback'и live-режима KPI бизнес-аналитики"""
+
+    # Включение таймера выполняется в браузере (src/assets/custom.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='live', function_name='disabled'),
+        Output(LIVE_INTERVAL_ID, 'disabled'),
+        Input('period-selector', 'value')
+    )
+
+    @app.callback(
+        [Output('business-kpi-cards', 'children', allow_duplicate=True),
+         Output('sales-trend-chart', 'figure', allow_duplicate=True),
+         Output(signature_store_id('sales-trend-chart'), 'data', allow_duplicate=True)],
+        Input(LIVE_INTERVAL_ID, 'n_intervals'),
+        [State('period-selector', 'value'),
+         State('date-range', 'start_date'),
+         State('date-range', 'end_date'),
+         State('basic-category-filter', 'value'),
+         State('supplier-filter', 'value'),
+         State(signature_store_id('sales-trend-chart'), 'data')],
+        prevent_initial_call=True
+    )
+    def update_live_kpi(n_intervals, period, start_date, end_date, category, supplier, signature):
+        if not n_intervals or period != LIVE_PERIOD:
+            raise PreventUpdate
+
+        # Модуль страницы и трекер загружаются при первом тике таймера
+        from src.components.pages import business_sales
+        from src.utils.live_kpi import get_live_tracker
+
+        try:
+            tracker = get_live_tracker(business_sales.build_business_params(start_date, end_date, category, supplier))
+            kpi = business_sales.format_business_kpi(tracker.refresh())
+            figure = business_sales.create_enhanced_sales_trend_chart(tracker.trend())
+        except Exception as e:
+            logger.error(f"Error updating live KPI: {e}")
+            raise PreventUpdate
+
+        update, signature = build_figure_update(figure, signature)
+        return business_sales.create_business_kpi_cards(kpi), update, signature
+
+    return app
@@ -1,5 +1,18 @@
-from .business_sales import create_business_sales_layout
-from .customer_behavior import create_customer_behavior_layout
-from .advertising_marketing import create_advertising_marketing_layout
-from .service_quality import create_service_quality_layout
+import importlib
 
+# Фабрики layout импортируются при первом обращении, чтобы не загружать все страницы при старте
+_LAYOUT_FACTORIES = {
+    'create_business_sales_layout': '.business_sales',
+    'create_customer_behavior_layout': '.customer_behavior',
+    'create_advertising_marketing_layout': '.advertising_marketing',
+    'create_service_quality_layout': '.service_quality',
+}
+
+__all__ = list(_LAYOUT_FACTORIES)
+
+
+def __getattr__(name):
+    if name in _LAYOUT_FACTORIES:
+        module = importlib.import_module(_LAYOUT_FACTORIES[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,18 +1,37 @@
-from dash import html, dcc, Input, Output, callback, State
+from dash import html, dcc
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import pandas as pd
 import logging
 
-from src.database.connection import db_manager
 from src.database.queries.advertising_marketing import *
 from src.components.kpi_cards import create_kpi_card
-from src.components.charts import chart_builder
-from src.components.filters import create_date_filter
+from src.components import fast_figures as ff
+from src.components.figure_patch import create_chart_graph
+from src.components.panels import create_panel_stores
+from src.components.filters import create_date_filter, create_exact_counts_toggle, create_preview_toggle
+from src.database.sampling import SampleSpec, use_preview
 from src.utils.data_processor import data_processor
+from src.utils.anomalies import anomaly_flags
+from src.utils.downsampling import choose_granularity
+from src.utils.sketches.store import sketch_store
 
 logger = logging.getLogger(__name__)
 
+# Сколько лидеров по выручке или показам берется из сводок для ранжирования по ROI и CTR
+TOP_CANDIDATES = 50
+
+# Запросы, которые в режиме предпросмотра выполняются по выборке строк рекламной статистики
+AD_SUMS = ('total_revenue', 'total_spend', 'total_clicks', 'total_impressions')
+PREVIEW_QUERIES = {
+    ADVERTISING_KPI_QUERY: SampleSpec(('ad_revenue',), scaled=('total_revenue', 'total_spend',
+                                                               'prev_total_revenue', 'prev_total_spend')),
+    AD_PERFORMANCE_QUERY: SampleSpec(('ad_revenue',), keys=('campaign_name',), scaled=AD_SUMS,
+                                     order_by='roi', ascending=False),
+    AD_TREND_QUERY: SampleSpec(('ad_revenue',), keys=('date',),
+                               scaled=('daily_revenue', 'daily_spend', 'daily_clicks', 'daily_impressions')),
+    ROI_TREND_QUERY: SampleSpec(('ad_revenue',), keys=('week_start',), scaled=('weekly_revenue', 'weekly_spend')),
+}
+
 def create_advertising_marketing_layout():
     """Создать layout для страницы рекламы и маркетинга"""
     return html.Div([
@@ -32,18 +51,21 @@ def create_advertising_marketing_layout():
         create_advertising_filters(),
         
         # KPI карточки
-        html.Div(id="advertising-kpi-cards", style={'marginBottom': '2rem'}),
+        dcc.Loading(
+            html.Div(id="advertising-kpi-cards", style={'marginBottom': '2rem'}),
+            type="circle"
+        ),
         
         # Основные графики
         dbc.Container([
             # Первый ряд
             dbc.Row([
                 dbc.Col(
-                    dcc.Graph(id="ad-performance-chart"),
+                    create_chart_graph("ad-performance-chart"),
                     lg=6, className="mb-4"
                 ),
                 dbc.Col(
-                    dcc.Graph(id="ad-trend-chart"),
+                    create_chart_graph("ad-trend-chart"),
                     lg=6, className="mb-4"
                 ),
             ]),
@@ -51,11 +73,11 @@ def create_advertising_marketing_layout():
             # Второй ряд
             dbc.Row([
                 dbc.Col(
-                    dcc.Graph(id="product-ad-performance-chart"),
+                    create_chart_graph("product-ad-performance-chart"),
                     lg=6, className="mb-4"
                 ),
                 dbc.Col(
-                    dcc.Graph(id="channel-conversion-chart"),
+                    create_chart_graph("channel-conversion-chart"),
                     lg=6, className="mb-4"
                 ),
             ]),
@@ -63,15 +85,18 @@ def create_advertising_marketing_layout():
             # Третий ряд
             dbc.Row([
                 dbc.Col(
-                    dcc.Graph(id="roi-trend-chart"),
+                    create_chart_graph("roi-trend-chart"),
                     lg=6, className="mb-4"
                 ),
                 dbc.Col(
-                    dcc.Graph(id="top-ctr-campaigns-chart"),
+                    create_chart_graph("top-ctr-campaigns-chart"),
                     lg=6, className="mb-4"
                 ),
             ]),
         ], fluid=True),
+        
+        # Скрытые элементы
+        *create_panel_stores('advertising'),
     ])
 
 def create_advertising_filters():
@@ -86,6 +111,8 @@ def create_advertising_filters():
                         id='campaign-filter',
                         options=[],  # Будет заполнено через callback
                         value='all',
+                        persistence=True,
+                        persistence_type='session',
                         clearable=False,
                         placeholder="Загрузка кампаний..."
                     ),
@@ -96,6 +123,8 @@ def create_advertising_filters():
                         id='ad-channel-filter',
                         options=[],  # Будет заполнено через callback
                         value='all',
+                        persistence=True,
+                        persistence_type='session',
                         clearable=False,
                         placeholder="Загрузка каналов..."
                     ),
@@ -106,145 +135,58 @@ def create_advertising_filters():
                         id='ad-category-filter',
                         options=[],  # Будет заполнено через callback
                         value='all',
+                        persistence=True,
+                        persistence_type='session',
                         clearable=False,
                         placeholder="Загрузка категорий..."
                     ),
                 ], lg=4, md=6, className="mb-3"),
+                dbc.Col([create_exact_counts_toggle(), create_preview_toggle()], lg=4, md=6),
             ]),
         ])
     ], className="mb-4")
 
+def build_advertising_params(start_date, end_date, selected_campaign, selected_channel, selected_category,
+                             exact_counts=False, preview=False):
+    """Параметры запросов рекламы и маркетинга из значений фильтров"""
+    prev_start_date, prev_end_date = data_processor.previous_period(start_date, end_date)
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'prev_start_date': prev_start_date,
+        'prev_end_date': prev_end_date,
+        'granularity': choose_granularity(start_date, end_date),
+        'campaign': selected_campaign if selected_campaign != 'all' else None,
+        'channel': selected_channel if selected_channel != 'all' else None,
+        'category': selected_category if selected_category != 'all' else None,
+        'exact_counts': exact_counts is True,
+        'preview': exact_counts is not True and use_preview(preview, start_date, end_date)
+    }
 
-def register_advertising_callbacks(app):
-    # Callbacks для загрузки фильтров из базы данных
-    @app.callback(
-        Output('campaign-filter', 'options'),
-        [Input('interval-component', 'n_intervals')]
-    )
-    def load_campaigns(n_intervals):
-        """Загрузить кампании из базы данных"""
-        try:
-            logger.info("Loading campaigns from database...")
-            query = "SELECT DISTINCT campaign_name FROM ad_revenue WHERE campaign_name IS NOT NULL AND campaign_name != '' ORDER BY campaign_name"
-            return load_filter_options(query, "Все кампании")
-        except Exception as e:
-            logger.error(f"Error loading campaigns: {e}")
-            return [{'label': 'Все кампании', 'value': 'all'}]
-
-    @app.callback(
-        Output('ad-channel-filter', 'options'),
-        [Input('interval-component', 'n_intervals')]
-    )
-    def load_ad_channels(n_intervals):
-        """Загрузить каналы трафика для рекламы"""
-        try:
-            logger.info("Loading ad channels from database...")
-            query = "SELECT DISTINCT channel FROM traffic WHERE channel IS NOT NULL AND channel != '' ORDER BY channel"
-            return load_filter_options(query, "Все каналы")
-        except Exception as e:
-            logger.error(f"Error loading ad channels: {e}")
-            return [{'label': 'Все каналы', 'value': 'all'}]
-
-    @app.callback(
-        Output('ad-category-filter', 'options'),
-        [Input('interval-component', 'n_intervals')]
-    )
-    def load_ad_categories(n_intervals):
-        """Загрузить категории для рекламы"""
-        try:
-            logger.info("Loading categories for advertising from database...")
-            query = "SELECT DISTINCT category FROM products WHERE category IS NOT NULL AND category != '' ORDER BY category"
-            return load_filter_options(query, "Все категории")
-        except Exception as e:
-            logger.error(f"Error loading categories for advertising: {e}")
-            return [{'label': 'Все категории', 'value': 'all'}]
-
-    def load_filter_options(query, default_label="Все"):
-        """Вспомогательная функция для загрузки опций фильтра"""
-        try:
-            result = db_manager.execute_query(query)
-            if not result.empty:
-                column_name = result.columns[0]
-                options = [{'label': default_label, 'value': 'all'}]
-                for _, row in result.iterrows():
-                    value = row[column_name]
-                    if value:
-                        options.append({
-                            'label': str(value),
-                            'value': str(value)
-                        })
-                logger.info(f"Успешно загружено {len(options)} опций для фильтра")
-                return options
-            else:
-                logger.warning(f"Нет данных для запроса: {query}")
-                return [{'label': default_label, 'value': 'all'}]
-                
-        except Exception as e:
-            logger.error(f"Ошибка загрузки опций фильтра: {e}")
-            return [{'label': default_label, 'value': 'all'}]
+# Функции построения панелей страницы (сами панели и фильтры объявлены в src/components/pages/registry.py)
+PANEL_RENDERERS = {
+    'advertising-kpi-cards':
+        lambda ctx: create_advertising_kpi_cards(get_advertising_kpi_data(ctx)),
+    'ad-performance-chart':
+        lambda ctx: create_ad_performance_chart(ctx.query(AD_PERFORMANCE_QUERY)),
+    'ad-trend-chart':
+        lambda ctx: create_ad_trend_chart(ctx.query(AD_TREND_QUERY)),
+    'product-ad-performance-chart':
+        lambda ctx: create_product_ad_performance_chart(get_product_ad_performance_data(ctx)),
+    'channel-conversion-chart':
+        lambda ctx: create_channel_conversion_chart(get_channel_conversion_data(ctx)),
+    'roi-trend-chart':
+        lambda ctx: create_roi_trend_chart(ctx.query(ROI_TREND_QUERY)),
+    'top-ctr-campaigns-chart':
+        lambda ctx: create_top_ctr_campaigns_chart(get_top_ctr_campaigns_data(ctx)),
+}
 
-    # Основной callback для обновления дашборда
-    @app.callback(
-        [Output('advertising-kpi-cards', 'children'),
-        Output('ad-performance-chart', 'figure'),
-        Output('ad-trend-chart', 'figure'),
-        Output('product-ad-performance-chart', 'figure'),
-        Output('channel-conversion-chart', 'figure'),
-        Output('roi-trend-chart', 'figure'),
-        Output('top-ctr-campaigns-chart', 'figure')],
-        [Input('date-range', 'start_date'),
-        Input('date-range', 'end_date'),
-        Input('campaign-filter', 'value'),
-        Input('ad-channel-filter', 'value'),
-        Input('ad-category-filter', 'value')]
-    )
-    def update_advertising_dashboard(start_date, end_date, selected_campaign, selected_channel, selected_category):
-        """Обновить дашборд рекламы и маркетинга"""
-        try:
-            params = {
-                'start_date': start_date,
-                'end_date': end_date,
-                'campaign': selected_campaign if selected_campaign != 'all' else None,
-                'channel': selected_channel if selected_channel != 'all' else None,
-                'category': selected_category if selected_category != 'all' else None
-            }
-            
-            # Получение данных
-            kpi_data = get_advertising_kpi_data(params)
-            ad_performance_data = db_manager.execute_query(AD_PERFORMANCE_QUERY, params)
-            ad_trend_data = db_manager.execute_query(AD_TREND_QUERY, params)
-            product_ad_data = db_manager.execute_query(PRODUCT_AD_PERFORMANCE_QUERY, params)
-            channel_data = db_manager.execute_query(CHANNEL_CONVERSION_QUERY, params)
-            roi_trend_data = db_manager.execute_query(ROI_TREND_QUERY, params)
-            ctr_data = db_manager.execute_query(TOP_CTR_CAMPAIGNS_QUERY, params)
-            
-            # Создание KPI карточек
-            kpi_cards = create_advertising_kpi_cards(kpi_data)
-            
-            # Создание графиков
-            ad_performance_fig = create_ad_performance_chart(ad_performance_data)
-            ad_trend_fig = create_ad_trend_chart(ad_trend_data)
-            product_ad_fig = create_product_ad_performance_chart(product_ad_data)
-            channel_fig = create_channel_conversion_chart(channel_data)
-            roi_trend_fig = create_roi_trend_chart(roi_trend_data)
-            ctr_fig = create_top_ctr_campaigns_chart(ctr_data)
-            
-            return [kpi_cards, ad_performance_fig, ad_trend_fig, product_ad_fig, 
-                channel_fig, roi_trend_fig, ctr_fig]
-            
-        except Exception as e:
-            logger.error(f"Error updating advertising dashboard: {e}")
-            empty_fig = px.bar(title="Нет данных")
-            return [html.Div("Ошибка загрузки данных")] + [empty_fig] * 6
-        
-    return app
-
-def get_advertising_kpi_data(params):
-    """Получить данные для KPI рекламы"""
+def get_advertising_kpi_data(ctx):
+    """Получить данные для KPI рекламы (с изменением к предыдущему периоду)"""
     try:
-        ad_performance_data = db_manager.execute_query(AD_PERFORMANCE_QUERY, params)
+        kpi_result = ctx.query(ADVERTISING_KPI_QUERY)
         
-        if ad_performance_data.empty:
+        if kpi_result.empty or pd.isna(kpi_result.iloc[0]['avg_roi']):
             return {
                 'total_revenue': '0 ₽',
                 'total_spend': '0 ₽',
@@ -252,136 +194,214 @@ def get_advertising_kpi_data(params):
                 'avg_ctr': '0%'
             }
         
-        total_revenue = ad_performance_data['total_revenue'].sum()
-        total_spend = ad_performance_data['total_spend'].sum()
-        avg_roi = ad_performance_data['roi'].mean() * 100
-        avg_ctr = ad_performance_data['ctr'].mean()
+        row = kpi_result.iloc[0]
+        total_revenue = row['total_revenue'] or 0
+        total_spend = row['total_spend'] or 0
+        avg_roi = row['avg_roi'] * 100
+        avg_ctr = row['avg_ctr']
+        prev_avg_roi = row['prev_avg_roi'] * 100 if pd.notna(row['prev_avg_roi']) else None
         
-        return {
+        kpi_data = {
             'total_revenue': data_processor.format_currency(total_revenue),
             'total_spend': data_processor.format_currency(total_spend),
             'avg_roi': f"{avg_roi:.1f}%",
             'avg_ctr': f"{avg_ctr:.1f}%"
         }
+        # Оценка по выборке (предпросмотр): полуширина доверительного интервала
+        if 'total_revenue_ci' in row:
+            ci = row.fillna(0)
+            kpi_data['revenue_ci'] = data_processor.format_currency(ci['total_revenue_ci'])
+            kpi_data['spend_ci'] = data_processor.format_currency(ci['total_spend_ci'])
+            kpi_data['roi_ci'] = f"{ci['avg_roi_ci'] * 100:.1f}%"
+            kpi_data['ctr_ci'] = f"{ci['avg_ctr_ci']:.1f}%"
+        kpi_data['revenue_delta'], kpi_data['revenue_delta_color'] = \
+            data_processor.format_delta(total_revenue, row['prev_total_revenue'])
+        kpi_data['spend_delta'], kpi_data['spend_delta_color'] = \
+            data_processor.format_delta(total_spend, row['prev_total_spend'], higher_is_better=False)
+        kpi_data['roi_delta'], kpi_data['roi_delta_color'] = \
+            data_processor.format_delta(avg_roi, prev_avg_roi)
+        kpi_data['ctr_delta'], kpi_data['ctr_delta_color'] = \
+            data_processor.format_delta(avg_ctr, row['prev_avg_ctr'])
+        return kpi_data
         
     except Exception as e:
         logger.error(f"Error getting advertising KPI data: {e}")
         return {}
 
+def create_error_chart():
+    """Заглушка графика при ошибке загрузки данных"""
+    return ff.empty_figure()
+
 def create_advertising_kpi_cards(kpi_data):
     """Создать KPI карточки для рекламы"""
     return dbc.Row([
         dbc.Col(create_kpi_card(
             "💰 Доход от рекламы", 
-            kpi_data.get('total_revenue', '0 ₽')
+            kpi_data.get('total_revenue', '0 ₽'),
+            kpi_data.get('revenue_delta'),
+            kpi_data.get('revenue_delta_color', 'success'),
+            kpi_data.get('revenue_ci')
         ), lg=3, md=6, className="mb-3"),
         
         dbc.Col(create_kpi_card(
             "💸 Расходы на рекламу", 
-            kpi_data.get('total_spend', '0 ₽')
+            kpi_data.get('total_spend', '0 ₽'),
+            kpi_data.get('spend_delta'),
+            kpi_data.get('spend_delta_color', 'success'),
+            kpi_data.get('spend_ci')
         ), lg=3, md=6, className="mb-3"),
         
         dbc.Col(create_kpi_card(
             "📈 Средний ROI", 
-            kpi_data.get('avg_roi', '0%')
+            kpi_data.get('avg_roi', '0%'),
+            kpi_data.get('roi_delta'),
+            kpi_data.get('roi_delta_color', 'success'),
+            kpi_data.get('roi_ci')
         ), lg=3, md=6, className="mb-3"),
         
         dbc.Col(create_kpi_card(
             "🎯 Средний CTR", 
-            kpi_data.get('avg_ctr', '0%')
+            kpi_data.get('avg_ctr', '0%'),
+            kpi_data.get('ctr_delta'),
+            kpi_data.get('ctr_delta_color', 'success'),
+            kpi_data.get('ctr_ci')
         ), lg=3, md=6, className="mb-3"),
     ], className="g-3")
 
 def create_ad_performance_chart(data):
     """Создать график эффективности рекламы"""
     if data.empty:
-        return px.bar(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.bar(
-        data,
-        x='campaign_name',
-        y='roi',
+    return ff.figure(
+        [ff.bar(data['campaign_name'], data['roi'],
+                color_values=data['roi'], colorbar_title='ROI',
+                **ff.confidence_errors(data, 'roi'))],
         title='ROI рекламных кампаний',
-        labels={'roi': 'ROI', 'campaign_name': 'Кампания'},
-        color='roi'
+        **ff.axes('Кампания', 'ROI')
     )
-    
-    return fig
 
 def create_ad_trend_chart(data):
     """Создать график трендов рекламы"""
     if data.empty:
-        return px.line(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.line(
-        data,
-        x='date',
-        y=['daily_revenue', 'daily_spend'],
+    # В оценке по выборке аномалии расходов не ищутся
+    anomalies = [] if 'daily_spend_ci' in data else [
+        ff.anomaly_markers(data['date'], data['daily_spend'], anomaly_flags(data['daily_spend']),
+                           name='Аномалии расходов')
+    ]
+    return ff.figure(
+        [ff.line(data['date'], data['daily_revenue'], name='daily_revenue',
+                 **ff.confidence_errors(data, 'daily_revenue')),
+         ff.line(data['date'], data['daily_spend'], name='daily_spend',
+                 **ff.confidence_errors(data, 'daily_spend')),
+         *anomalies],
         title='Динамика доходов и расходов на рекламу',
-        labels={'value': 'Сумма', 'variable': 'Метрика'}
+        legend={'title': {'text': 'Метрика'}},
+        **ff.axes('date', 'Сумма')
     )
+
+def get_product_ad_performance_data(ctx):
+    """ROI товаров среди лидеров по рекламной выручке из сводок (точно - запросом PRODUCT_AD_PERFORMANCE_QUERY)
+
+    Сводки ранжируют товары по выручке, поэтому ROI считается для TOP_CANDIDATES товаров
+    с наибольшей выручкой, а не для всех товаров периода.
+    """
+    params = ctx.params
+    if params['exact_counts']:
+        return ctx.query(PRODUCT_AD_PERFORMANCE_QUERY)
     
-    return fig
+    data = sketch_store.top('product_ads', TOP_CANDIDATES, params['start_date'], params['end_date'],
+                            filters={'campaign': params['campaign'], 'category': params['category']})
+    if data is None:
+        return ctx.query(PRODUCT_AD_PERFORMANCE_QUERY)
+    
+    spend = data['total_spend']
+    data['roi'] = ((data['total_revenue'] - spend) / spend.where(spend > 0)).fillna(0)
+    return data.sort_values('roi', ascending=False).head(15)
 
 def create_product_ad_performance_chart(data):
     """Создать график эффективности рекламы по товарам"""
     if data.empty:
-        return px.bar(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.bar(
-        data,
-        x='product_name',
-        y='roi',
+    return ff.figure(
+        ff.grouped_bars(data, 'product_name', 'roi', 'category'),
         title='ROI по товарам',
-        labels={'roi': 'ROI', 'product_name': 'Товар'},
-        color='category'
+        legend={'title': {'text': 'category'}},
+        **ff.axes('Товар', 'ROI')
     )
+
+def get_channel_conversion_data(ctx):
+    """Сессии, заказы и конверсия по каналам из скетчей (точно - запросом CHANNEL_CONVERSION_QUERY)"""
+    params = ctx.params
+    if params['exact_counts']:
+        return ctx.query(CHANNEL_CONVERSION_QUERY)
     
-    return fig
+    period = (params['start_date'], params['end_date'])
+    filters = {'channel': params['channel']}
+    sessions = sketch_store.distinct('sessions', *period, filters=filters, group_by=('channel',))
+    orders = sketch_store.distinct('channel_orders', *period, filters=filters, group_by=('channel',))
+    if sessions is None or orders is None:
+        return ctx.query(CHANNEL_CONVERSION_QUERY)
+    
+    data = sessions.rename(columns={'traffic_id': 'sessions'})[['channel', 'sessions']].merge(
+        orders.rename(columns={'transaction_id': 'orders'}), on='channel', how='left'
+    )
+    data['orders'] = data['orders'].fillna(0).astype(int)
+    data['conversion_rate'] = (data['orders'] * 100.0 / data['sessions'].where(data['sessions'] > 0)).fillna(0)
+    return data.sort_values('conversion_rate', ascending=False)
 
 def create_channel_conversion_chart(data):
     """Создать график конверсии по каналам"""
     if data.empty:
-        return px.bar(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.bar(
-        data,
-        x='channel',
-        y='conversion_rate',
+    return ff.figure(
+        [ff.bar(data['channel'], data['conversion_rate'],
+                color_values=data['conversion_rate'], colorbar_title='Конверсия (%)')],
         title='Конверсия по каналам трафика',
-        labels={'conversion_rate': 'Конверсия (%)', 'channel': 'Канал'},
-        color='conversion_rate'
+        **ff.axes('Канал', 'Конверсия (%)')
     )
-    
-    return fig
 
 def create_roi_trend_chart(data):
     """Создать график тренда ROI"""
     if data.empty:
-        return px.line(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.line(
-        data,
-        x='week_start',
-        y='weekly_roi',
+    return ff.figure(
+        [ff.line(data['week_start'], data['weekly_roi'], **ff.confidence_errors(data, 'weekly_roi'))],
         title='Тренд ROI по неделям',
-        labels={'weekly_roi': 'ROI', 'week_start': 'Неделя'}
+        **ff.axes('Неделя', 'ROI')
     )
+
+def get_top_ctr_campaigns_data(ctx):
+    """CTR кампаний среди лидеров по показам из сводок (точно - запросом TOP_CTR_CAMPAIGNS_QUERY)
+
+    Порог в 1000 показов проверяется по нижней границе числа показов.
+    """
+    params = ctx.params
+    if params['exact_counts']:
+        return ctx.query(TOP_CTR_CAMPAIGNS_QUERY)
+    
+    data = sketch_store.top('campaign_ctr', TOP_CANDIDATES, params['start_date'], params['end_date'],
+                            filters={'campaign_name': params['campaign']})
+    if data is None:
+        return ctx.query(TOP_CTR_CAMPAIGNS_QUERY)
     
-    return fig
+    data = data[data['total_impressions'] > 1000].copy()
+    data['ctr'] = data['total_clicks'] * 100.0 / data['total_impressions']
+    return data.sort_values('ctr', ascending=False).head(10)
 
 def create_top_ctr_campaigns_chart(data):
     """Создать график топ кампаний по CTR"""
     if data.empty:
-        return px.bar(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.bar(
-        data,
-        x='campaign_name',
-        y='ctr',
+    return ff.figure(
+        [ff.bar(data['campaign_name'], data['ctr'],
+                color_values=data['ctr'], colorbar_title='CTR (%)')],
         title='Топ кампаний по CTR',
-        labels={'ctr': 'CTR (%)', 'campaign_name': 'Кампания'},
-        color='ctr'
+        **ff.axes('Кампания', 'CTR (%)')
     )
-    
-    return fig
\ No newline at end of file
@@ -1,19 +1,38 @@
-from dash import html, dcc, Input, Output, callback, State
+from dash import html, dcc
 import dash_bootstrap_components as dbc
-import plotly.express as px
-import plotly.graph_objects as go 
 import pandas as pd
 import logging
 
-from src.database.connection import db_manager
 from src.database.queries.business_sales import *
 from src.components.kpi_cards import create_kpi_card
-from src.components.charts import chart_builder
-from src.components.filters import create_date_filter, create_category_filter, create_supplier_filter
+from src.components import fast_figures as ff
+from src.components.figure_patch import create_chart_graph
+from src.components.panels import create_panel_stores
+from src.components.live_kpi import create_live_interval
+from src.components.filters import (
+    create_date_filter, create_category_filter, create_supplier_filter, create_exact_counts_toggle, create_preview_toggle
+)
+from src.database.sampling import SampleSpec, use_preview
 from src.utils.data_processor import data_processor
+from src.utils.anomalies import anomaly_flags
+from src.utils.downsampling import choose_granularity
+from src.utils.forecasting import forecast_series
+from src.utils.seasonality import seasonality_by_series
+from src.utils.sketches.store import sketch_store
 
 logger = logging.getLogger(__name__)
 
+# Квантили стоимости позиций заказов
+ORDER_VALUE_QUANTILES = (0.5, 0.9, 0.99)
+
+# Запросы, которые в режиме предпросмотра выполняются по выборке строк продаж
+PREVIEW_QUERIES = {
+    KPI_TOTALS_QUERY: SampleSpec(('sales',), scaled=('total_revenue', 'prev_total_revenue')),
+    SALES_TREND_QUERY: SampleSpec(('sales',), keys=('date',), scaled=('orders_count', 'daily_revenue')),
+    CATEGORY_SALES_QUERY: SampleSpec(('sales',), keys=('category',), scaled=('orders_count', 'category_revenue'),
+                                     order_by='category_revenue', ascending=False),
+}
+
 def create_business_sales_layout():
     """Создать layout для страницы бизнес-аналитики"""
     return html.Div([
@@ -33,18 +52,21 @@ def create_business_sales_layout():
         create_business_filters(),
         
         # KPI карточки
-        html.Div(id="business-kpi-cards", className="business-kpi-section"),
+        dcc.Loading(
+            html.Div(id="business-kpi-cards", className="business-kpi-section"),
+            type="circle"
+        ),
         
         # Основные графики
         dbc.Container([
             # Первый ряд
             dbc.Row([
                 dbc.Col(
-                    dcc.Graph(id="sales-trend-chart"),
+                    create_chart_graph("sales-trend-chart"),
                     lg=6, className="business-chart-container"
                 ),
                 dbc.Col(
-                    dcc.Graph(id="category-sales-chart"),
+                    create_chart_graph("category-sales-chart"),
                     lg=6, className="business-chart-container"
                 ),
             ]),
@@ -52,11 +74,11 @@ def create_business_sales_layout():
             # Второй ряд
             dbc.Row([
                 dbc.Col(
-                    dcc.Graph(id="supplier-performance-chart"),
+                    create_chart_graph("supplier-performance-chart"),
                     lg=6, className="business-chart-container"
                 ),
                 dbc.Col(
-                    dcc.Graph(id="returns-analysis-chart"),
+                    create_chart_graph("returns-analysis-chart"),
                     lg=6, className="business-chart-container"
                 ),
             ]),
@@ -64,18 +86,40 @@ def create_business_sales_layout():
             # Третий ряд
             dbc.Row([
                 dbc.Col(
-                    dcc.Graph(id="inventory-status-chart"),
+                    create_chart_graph("inventory-status-chart"),
                     lg=6, className="business-chart-container"
                 ),
                 dbc.Col(
-                    dcc.Graph(id="top-products-chart"),
+                    create_chart_graph("top-products-chart"),
                     lg=6, className="business-chart-container"
                 ),
             ]),
+            
+            # Прогноз и сезонность выручки по категориям
+            dbc.Row([
+                dbc.Col(
+                    create_chart_graph("category-forecast-chart"),
+                    lg=6, className="business-chart-container"
+                ),
+                dbc.Col(
+                    create_chart_graph("category-seasonality-chart"),
+                    lg=6, className="business-chart-container"
+                ),
+            ]),
+            
+            # Распределение стоимости позиций заказов по категориям
+            dbc.Row([
+                dbc.Col(
+                    create_chart_graph("order-value-percentiles-chart"),
+                    lg=12, className="business-chart-container"
+                ),
+            ]),
         ], fluid=True),
         
         # Скрытые элементы
         dcc.Store(id='business-data-store'),
+        *create_panel_stores('business'),
+        create_live_interval(),
     ], className="business-sales-container")
 
 def create_business_filters():
@@ -83,266 +127,265 @@ def create_business_filters():
     return dbc.Card([
         dbc.CardBody([
             dbc.Row([
-                dbc.Col(create_date_filter(), lg=4, md=6),
-                dbc.Col(create_category_filter(), lg=4, md=6),
-                dbc.Col(create_supplier_filter(), lg=4, md=6),
+                dbc.Col(create_date_filter(), lg=3, md=6),
+                dbc.Col(create_category_filter(), lg=3, md=6),
+                dbc.Col(create_supplier_filter(), lg=3, md=6),
+                dbc.Col([create_exact_counts_toggle(), create_preview_toggle()], lg=3, md=6),
             ]),
         ])
     ], className="business-filters-card")
 
-# Callbacks для бизнес-аналитики
-def register_business_callbacks(app):
-    """Зарегистрировать callback'ы для бизнес-аналитики"""
-    
-    @app.callback(
-        [Output('business-kpi-cards', 'children'),
-         Output('sales-trend-chart', 'figure'),
-         Output('category-sales-chart', 'figure'),
-         Output('supplier-performance-chart', 'figure'),
-         Output('returns-analysis-chart', 'figure'),
-         Output('inventory-status-chart', 'figure'),
-         Output('top-products-chart', 'figure')],
-        [Input('date-range', 'start_date'),
-         Input('date-range', 'end_date'),
-         Input('basic-category-filter', 'value'),
-         Input('supplier-filter', 'value')]
-    )
-    def update_business_dashboard(start_date, end_date, selected_category, supplier):
-        """Обновить дашборд бизнес-аналитики"""
-        from datetime import datetime
-        try:
-            print(supplier)
-            # Параметры для запросов
-            params = {
-                'start_date': start_date,
-                'end_date': end_date,
-                'category': selected_category if selected_category != 'all' else None,
-                'supplier': supplier if supplier != 'all' else None,
-            }
-            
-            # Получение данных
-            kpi_data = get_business_kpi_data(params)
-            sales_trend_data = db_manager.execute_query(SALES_TREND_QUERY, params)
-            category_data = db_manager.execute_query(CATEGORY_SALES_QUERY, params)
-            supplier_data = db_manager.execute_query(SUPPLIER_PERFORMANCE_QUERY, params)
-            returns_data = db_manager.execute_query(RETURNS_ANALYSIS_QUERY, params)
-            inventory_data = db_manager.execute_query(INVENTORY_STATUS_QUERY, params)
-            top_products_data = db_manager.execute_query(TOP_PRODUCTS_QUERY, params)
-            
-            # Создание KPI карточек
-            kpi_cards = create_business_kpi_cards(kpi_data)
-            
-            # Создание графиков с улучшенным дизайном
-            sales_fig = create_enhanced_sales_trend_chart(sales_trend_data)
-            category_fig = create_enhanced_category_sales_chart(category_data)
-            supplier_fig = create_enhanced_supplier_performance_chart(supplier_data)
-            returns_fig = create_enhanced_returns_analysis_chart(returns_data)
-            inventory_fig = create_enhanced_inventory_status_chart(inventory_data)
-            top_products_fig = create_enhanced_top_products_chart(top_products_data)
-            
-            return [kpi_cards, sales_fig, category_fig, supplier_fig, returns_fig, inventory_fig, top_products_fig]
-            
-        except Exception as e:
-            logger.error(f"Error updating business dashboard: {e}")
-            empty_fig = create_empty_chart()
-            return [html.Div("Ошибка загрузки данных", className="text-danger")] + [empty_fig] * 6
-    
-    return app
+def build_business_params(start_date, end_date, selected_category, supplier, exact_counts=False, preview=False):
+    """Параметры запросов бизнес-аналитики из значений фильтров"""
+    prev_start_date, prev_end_date = data_processor.previous_period(start_date, end_date)
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'prev_start_date': prev_start_date,
+        'prev_end_date': prev_end_date,
+        'granularity': choose_granularity(start_date, end_date),
+        'category': selected_category if selected_category != 'all' else None,
+        'supplier': supplier if supplier != 'all' else None,
+        'exact_counts': exact_counts is True,
+        'preview': exact_counts is not True and use_preview(preview, start_date, end_date),
+    }
+
+# Функции построения панелей страницы (сами панели и фильтры объявлены в src/components/pages/registry.py)
+PANEL_RENDERERS = {
+    'business-kpi-cards':
+        lambda ctx: create_business_kpi_cards(get_business_kpi_data(ctx)),
+    'sales-trend-chart':
+        lambda ctx: create_enhanced_sales_trend_chart(ctx.query(SALES_TREND_QUERY)),
+    'category-sales-chart':
+        lambda ctx: create_enhanced_category_sales_chart(ctx.query(CATEGORY_SALES_QUERY)),
+    'supplier-performance-chart':
+        lambda ctx: create_enhanced_supplier_performance_chart(get_supplier_performance_data(ctx)),
+    'returns-analysis-chart':
+        lambda ctx: create_enhanced_returns_analysis_chart(ctx.query(RETURNS_ANALYSIS_QUERY)),
+    'inventory-status-chart':
+        lambda ctx: create_enhanced_inventory_status_chart(ctx.query(INVENTORY_STATUS_QUERY)),
+    'top-products-chart':
+        lambda ctx: create_enhanced_top_products_chart(get_top_products_data(ctx)),
+    'category-forecast-chart':
+        lambda ctx: create_category_forecast_chart(forecast_series('category', ctx.params)),
+    'category-seasonality-chart':
+        lambda ctx: create_category_seasonality_chart(seasonality_by_series('category', ctx.params)),
+    'order-value-percentiles-chart':
+        lambda ctx: create_order_value_percentiles_chart(get_order_value_percentiles_data(ctx)),
+}
 
 def create_empty_chart():
     """Создать пустой график с единым стилем"""
-    fig = go.Figure()
-    fig.update_layout(
-        title=dict(
-            text="Нет данных",
-            x=0.5,
-            font=dict(size=16, color="#6c757d")
-        ),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        height=400
-    )
-    return fig
+    return ff.empty_figure()
 
 def create_enhanced_sales_trend_chart(data):
     """Создать улучшенный график динамики продаж"""
     if data.empty:
         return create_empty_chart()
     
-    fig = px.line(
-        data,
-        x='date',
-        y='daily_revenue',
+    # В оценке по выборке аномалии не ищутся
+    anomalies = [] if 'daily_revenue_ci' in data else [
+        ff.anomaly_markers(data['date'], data['daily_revenue'], anomaly_flags(data['daily_revenue']))
+    ]
+    return ff.figure(
+        [ff.line(data['date'], data['daily_revenue'], name='Выручка', color='#2E86AB',
+                 **ff.confidence_errors(data, 'daily_revenue')),
+         *anomalies],
         title='Динамика продаж',
-        color_discrete_sequence=['#2E86AB']
-    )
-    
-    fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color="#2C3E50"),
-        title_font_size=18,
-        height=400
+        showlegend=False,
+        **ff.axes('date', 'daily_revenue')
     )
-    
-    return fig
 
 def create_enhanced_category_sales_chart(data):
     """Создать улучшенный график продаж по категориям"""
     if data.empty:
         return create_empty_chart()
     
-    fig = px.bar(
-        data,
-        x='category_revenue',
-        y='category',
-        orientation='h',
+    return ff.figure(
+        [ff.bar(data['category_revenue'], data['category'], orientation='h',
+                color_values=data['category_revenue'],
+                scale=['#A23B72', '#F18F01', '#C73E1D'],
+                colorbar_title='category_revenue',
+                **ff.confidence_errors(data, 'category_revenue', axis='x'))],
         title='Продажи по категориям',
-        color='category_revenue',
-        color_continuous_scale=['#A23B72', '#F18F01', '#C73E1D']
+        showlegend=False,
+        **ff.axes('category_revenue', 'category')
     )
+
+def get_top_products_data(ctx):
+    """Топ товаров по выручке из сводок тяжелых элементов (точно - запросом TOP_PRODUCTS_QUERY)"""
+    params = ctx.params
+    if params['exact_counts']:
+        return ctx.query(TOP_PRODUCTS_QUERY)
     
-    fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color="#2C3E50"),
-        title_font_size=18,
-        height=400,
-        showlegend=False
-    )
+    data = sketch_store.top('top_products', 10, params['start_date'], params['end_date'],
+                            filters={'category': params['category'], 'supplier': params['supplier']})
+    if data is None:
+        return ctx.query(TOP_PRODUCTS_QUERY)
+    return data
+
+def get_supplier_performance_data(ctx):
+    """Топ поставщиков по выручке из сводок тяжелых элементов (точно - запросом SUPPLIER_PERFORMANCE_QUERY)"""
+    params = ctx.params
+    if params['exact_counts']:
+        return ctx.query(SUPPLIER_PERFORMANCE_QUERY)
     
-    return fig
+    data = sketch_store.top('suppliers', 10, params['start_date'], params['end_date'],
+                            filters={'category': params['category'], 'supplier_name': params['supplier']})
+    if data is None:
+        return ctx.query(SUPPLIER_PERFORMANCE_QUERY)
+    return data
 
 def create_enhanced_supplier_performance_chart(data):
     """Создать улучшенный график производительности поставщиков"""
     if data.empty:
         return create_empty_chart()
     
-    fig = go.Figure()
-    
-    # Добавляем столбцы для выручки
-    fig.add_trace(go.Bar(
-        name='Выручка',
-        x=data['supplier_name'],
-        y=data['total_revenue'],
-        marker_color='#2E86AB',
-        hovertemplate='<b>%{x}</b><br>Выручка: %{y:,.0f} руб<br>Заказы: %{customdata}',
-        customdata=data['orders_count']
-    ))
+    # У оценки из сводок выручка - нижняя граница, планка показывает возможную недостачу
+    errors = {'error_y': ff.upper_errors(data['total_revenue_error'])} if 'total_revenue_error' in data else {}
     
-    # Добавляем линию для рейтинга
-    fig.add_trace(go.Scatter(
-        name='Рейтинг',
-        x=data['supplier_name'],
-        y=data['supplier_rating'],
-        mode='lines+markers',
-        line=dict(color='#F18F01', width=3),
-        marker=dict(size=8, color='#F18F01'),
-        yaxis='y2',
-        hovertemplate='<b>%{x}</b><br>Рейтинг: %{y:.1f}'
-    ))
-    
-    fig.update_layout(
+    return ff.figure(
+        [
+            # Столбцы для выручки
+            ff.bar(data['supplier_name'], data['total_revenue'],
+                   name='Выручка',
+                   color='#2E86AB',
+                   hovertemplate='<b>%{x}</b><br>Выручка: %{y:,.0f} руб<br>Заказы: %{customdata}',
+                   customdata=ff.values(data['orders_count']),
+                   **errors),
+            # Линия для рейтинга
+            ff.line(data['supplier_name'], data['supplier_rating'],
+                    name='Рейтинг',
+                    mode='lines+markers',
+                    line={'color': '#F18F01', 'width': 3},
+                    marker={'size': 8, 'color': '#F18F01'},
+                    yaxis='y2',
+                    hovertemplate='<b>%{x}</b><br>Рейтинг: %{y:.1f}'),
+        ],
         title='Производительность поставщиков',
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color="#2C3E50"),
-        xaxis=dict(tickangle=45),
-        yaxis=dict(title='Выручка (руб)', titlefont=dict(color='#2E86AB')),
-        yaxis2=dict(
-            title='Рейтинг',
-            titlefont=dict(color='#F18F01'),
-            overlaying='y',
-            side='right',
-            range=[0, 5]
-        ),
-        hovermode='x unified',
-        height=400
+        xaxis={'tickangle': 45},
+        yaxis={'title': {'text': 'Выручка (руб)', 'font': {'color': '#2E86AB'}}},
+        yaxis2={
+            'title': {'text': 'Рейтинг', 'font': {'color': '#F18F01'}},
+            'overlaying': 'y',
+            'side': 'right',
+            'range': [0, 5]
+        },
+        hovermode='x unified'
     )
-    
-    return fig
 
 def create_enhanced_returns_analysis_chart(data):
     """Создать улучшенный график анализа возвратов"""
     if data.empty:
         return create_empty_chart()
     
-    fig = px.pie(
-        data,
-        values='returns_count',
-        names='reason',
-        title='Анализ возвратов по причинам',
-        color_discrete_sequence=['#A23B72', '#F18F01', '#C73E1D', '#3C91E6', '#2E86AB']
-    )
-    
-    fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color="#2C3E50"),
-        title_font_size=18,
-        height=400
+    return ff.figure(
+        [ff.pie(data['reason'], data['returns_count'],
+                colors=['#A23B72', '#F18F01', '#C73E1D', '#3C91E6', '#2E86AB'])],
+        title='Анализ возвратов по причинам'
     )
-    
-    return fig
 
 def create_enhanced_inventory_status_chart(data):
     """Создать улучшенный график статуса склада"""
     if data.empty:
         return create_empty_chart()
     
-    fig = px.bar(
-        data,
-        x='total_stock',
-        y='category',
-        orientation='h',
+    return ff.figure(
+        [ff.bar(data['total_stock'], data['category'], orientation='h',
+                color_values=data['total_stock'],
+                scale=['#3C91E6', '#2E86AB'],
+                colorbar_title='total_stock')],
         title='Остатки на складе по категориям',
-        color='total_stock',
-        color_continuous_scale=['#3C91E6', '#2E86AB']
-    )
-    
-    fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color="#2C3E50"),
-        title_font_size=18,
-        height=400,
-        showlegend=False
+        showlegend=False,
+        **ff.axes('total_stock', 'category')
     )
-    
-    return fig
 
 def create_enhanced_top_products_chart(data):
     """Создать улучшенный график топ товаров"""
     if data.empty:
         return create_empty_chart()
     
-    fig = px.bar(
-        data,
-        x='total_revenue',
-        y='product_name',
-        orientation='h',
+    errors = {'error_x': ff.upper_errors(data['total_revenue_error'])} if 'total_revenue_error' in data else {}
+    
+    return ff.figure(
+        [ff.bar(data['total_revenue'], data['product_name'], orientation='h',
+                color_values=data['total_revenue'],
+                scale=['#C73E1D', '#F18F01'],
+                colorbar_title='total_revenue',
+                **errors)],
         title='Топ товаров по выручке',
-        color='total_revenue',
-        color_continuous_scale=['#C73E1D', '#F18F01']
+        showlegend=False,
+        **ff.axes('total_revenue', 'product_name', yaxis={'categoryorder': 'total ascending'})
     )
+
+def create_category_forecast_chart(forecast):
+    """Создать тепловую карту прогноза выручки по категориям"""
+    if forecast is None or not len(forecast.series):
+        return create_empty_chart()
     
-    fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color="#2C3E50"),
-        title_font_size=18,
-        height=400,
-        showlegend=False,
-        yaxis={'categoryorder': 'total ascending'}
+    # Категории с наибольшим прогнозом - вверху карты
+    order = forecast.mean.sum(axis=1).argsort()
+    
+    return ff.figure(
+        [ff.heatmap(pd.Series(forecast.dates), forecast.series[order].tolist(), forecast.mean[order],
+                    scale=['#E5E8EB', '#3C91E6', '#2E86AB'],
+                    colorbar_title='Выручка',
+                    hovertemplate='<b>%{y}</b><br>%{x|%d.%m.%Y}: %{z:,.0f} руб<extra></extra>')],
+        title=f'Прогноз выручки по категориям на {len(forecast.dates)} дней',
+        **ff.axes('Дата', 'Категория')
+    )
+
+def create_category_seasonality_chart(seasonality):
+    """Создать тепловую карту недельной сезонности по категориям"""
+    if seasonality is None or not len(seasonality.series):
+        return create_empty_chart()
+    
+    # Отклонение от среднего по ряду (%); категории с самой выраженной сезонностью - вверху карты
+    summary = seasonality.summary
+    order = summary['weekly_strength'].fillna(0).to_numpy().argsort()
+    means = seasonality.weekly_profile.mean(axis=1, keepdims=True)
+    deviation = (seasonality.weekly_profile / means.clip(min=1e-9) - 1) * 100
+    labels = [f"{name} ({strength:.2f})" for name, strength in
+              zip(summary['series'].iloc[order], summary['weekly_strength'].fillna(0).iloc[order])]
+    
+    return ff.figure(
+        [ff.heatmap(['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс'], labels, deviation[order],
+                    scale=['#C73E1D', '#F7F7F7', '#27AE60'], zmid=0,
+                    colorbar_title='% к среднему',
+                    hovertemplate='<b>%{y}</b><br>%{x}: %{z:+.1f}%<extra></extra>')],
+        title='Недельная сезонность по категориям (сила цикла в скобках)',
+        **ff.axes('День недели', 'Категория')
     )
+
+def get_order_value_percentiles_data(ctx):
+    """p50/p90/p99 стоимости позиций заказов по категориям (из скетчей t-digest, до их сборки - точно)"""
+    params = ctx.params
+    data = sketch_store.quantiles(
+        'order_value', ORDER_VALUE_QUANTILES, params['start_date'], params['end_date'],
+        filters={'category': params['category'], 'supplier': params['supplier']}, group_by=('category',)
+    )
+    if data is None:
+        return ctx.query(ORDER_VALUE_PERCENTILES_QUERY)
+    return data[data['count'] > 0].sort_values('p50', ascending=False)
+
+def create_order_value_percentiles_chart(data):
+    """Создать график p50/p90/p99 стоимости позиций заказов по категориям"""
+    if data.empty:
+        return create_empty_chart()
     
-    return fig
+    return ff.figure(
+        [ff.bar(data['category'], data[label], name=label) for label in ('p50', 'p90', 'p99')],
+        title='Стоимость позиций заказов: p50 / p90 / p99',
+        barmode='group',
+        legend={'title': {'text': 'Квантиль'}},
+        **ff.axes('Категория', 'Стоимость (руб)')
+    )
 
 # Остальные функции остаются без изменений
-def get_business_kpi_data(params):
+def get_business_kpi_data(ctx):
     """Получить данные для KPI бизнес-аналитики"""
     try:
-        kpi_result = db_manager.execute_query(KPI_QUERY, params)
+        kpi_result = get_business_kpi_row(ctx)
         
         if kpi_result.empty:
             return {
@@ -352,45 +395,105 @@ def get_business_kpi_data(params):
                 'return_rate': '0%'
             }
         
-        row = kpi_result.iloc[0]
-        total_revenue = row['total_revenue'] or 0
-        total_orders = row['total_orders'] or 0
-        total_returns = row['total_returns'] or 0
-        avg_order_value = row['avg_order_value'] or 0
-        
-        return_rate = (total_returns / total_orders * 100) if total_orders > 0 else 0
-        
-        return {
-            'total_revenue': data_processor.format_currency(total_revenue),
-            'total_orders': f"{total_orders:,}",
-            'avg_order_value': data_processor.format_currency(avg_order_value),
-            'return_rate': data_processor.format_percentage(return_rate)
-        }
+        return format_business_kpi(kpi_result.iloc[0])
         
     except Exception as e:
         logger.error(f"Error getting business KPI data: {e}")
         return {}
 
+def get_business_kpi_row(ctx):
+    """Строка KPI: суммы из базы, уникальные заказы и возвраты - из скетчей (точно - запросом KPI_QUERY)"""
+    params = ctx.params
+    if params['exact_counts']:
+        return ctx.query(KPI_QUERY)
+    
+    totals = ctx.query(KPI_TOTALS_QUERY)
+    if totals.empty:
+        return totals
+    row = totals.iloc[0].to_dict()
+    filters = {'category': params['category'], 'supplier': params['supplier']}
+    for prefix, start, end in (('', params['start_date'], params['end_date']),
+                               ('prev_', params['prev_start_date'], params['prev_end_date'])):
+        if start is None or end is None:
+            row[f'{prefix}total_orders'] = row[f'{prefix}total_returns'] = None
+            continue
+        orders = sketch_store.distinct('orders', start, end, filters)
+        returns = sketch_store.distinct('returns', start, end, filters)
+        if orders is None or returns is None:
+            return ctx.query(KPI_QUERY)
+        row[f'{prefix}total_orders'] = int(orders['transaction_id'].iloc[0])
+        row[f'{prefix}total_returns'] = int(returns['return_id'].iloc[0])
+    return pd.DataFrame([row])
+
+def format_business_kpi(row):
+    """Отформатировать значения KPI (строка KPI_QUERY или снимок live-режима)
+    
+    Если в строке есть значения предыдущего периода (prev_*), добавляются изменения к нему.
+    """
+    total_revenue = row['total_revenue'] or 0
+    total_orders = row['total_orders'] or 0
+    total_returns = row['total_returns'] or 0
+    avg_order_value = row['avg_order_value'] or 0
+    
+    return_rate = (total_returns / total_orders * 100) if total_orders > 0 else 0
+    
+    kpi_data = {
+        'total_revenue': data_processor.format_currency(total_revenue),
+        'total_orders': f"{total_orders:,}",
+        'avg_order_value': data_processor.format_currency(avg_order_value),
+        'return_rate': data_processor.format_percentage(return_rate)
+    }
+    
+    # Оценка по выборке (предпросмотр): полуширина доверительного интервала
+    if pd.notna(row.get('total_revenue_ci')):
+        kpi_data['revenue_ci'] = data_processor.format_currency(row['total_revenue_ci'])
+    if pd.notna(row.get('avg_order_value_ci')):
+        kpi_data['aov_ci'] = data_processor.format_currency(row['avg_order_value_ci'])
+    
+    if 'prev_total_orders' in row:
+        prev_orders = row['prev_total_orders'] or 0
+        prev_return_rate = ((row['prev_total_returns'] or 0) / prev_orders * 100) if prev_orders > 0 else None
+        kpi_data['revenue_delta'], kpi_data['revenue_delta_color'] = \
+            data_processor.format_delta(total_revenue, row['prev_total_revenue'])
+        kpi_data['orders_delta'], kpi_data['orders_delta_color'] = \
+            data_processor.format_delta(total_orders, prev_orders)
+        kpi_data['aov_delta'], kpi_data['aov_delta_color'] = \
+            data_processor.format_delta(avg_order_value, row['prev_avg_order_value'])
+        kpi_data['returns_delta'], kpi_data['returns_delta_color'] = \
+            data_processor.format_delta(return_rate, prev_return_rate, higher_is_better=False)
+    
+    return kpi_data
+
 def create_business_kpi_cards(kpi_data):
     """Создать KPI карточки для бизнес-аналитики"""
     return dbc.Row([
         dbc.Col(create_kpi_card(
             "💰 Общая выручка", 
-            kpi_data.get('total_revenue', '0 ₽')
+            kpi_data.get('total_revenue', '0 ₽'),
+            kpi_data.get('revenue_delta'),
+            kpi_data.get('revenue_delta_color', 'success'),
+            kpi_data.get('revenue_ci')
         ), lg=3, md=6, className="mb-3 kpi-card-revenue"),
         
         dbc.Col(create_kpi_card(
             "📦 Количество заказов", 
-            kpi_data.get('total_orders', '0')
+            kpi_data.get('total_orders', '0'),
+            kpi_data.get('orders_delta'),
+            kpi_data.get('orders_delta_color', 'success')
         ), lg=3, md=6, className="mb-3 kpi-card-orders"),
         
         dbc.Col(create_kpi_card(
             "🛒 Средний чек", 
-            kpi_data.get('avg_order_value', '0 ₽')
+            kpi_data.get('avg_order_value', '0 ₽'),
+            kpi_data.get('aov_delta'),
+            kpi_data.get('aov_delta_color', 'success'),
+            kpi_data.get('aov_ci')
         ), lg=3, md=6, className="mb-3 kpi-card-avg-order"),
         
         dbc.Col(create_kpi_card(
             "🔄 Уровень возвратов", 
-            kpi_data.get('return_rate', '0%')
+            kpi_data.get('return_rate', '0%'),
+            kpi_data.get('returns_delta'),
+            kpi_data.get('returns_delta_color', 'danger')
         ), lg=3, md=6, className="mb-3 kpi-card-returns"),
     ], className="g-3")
\ No newline at end of file
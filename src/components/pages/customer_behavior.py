@@ -1,18 +1,44 @@
-from dash import html, dcc, Input, Output, callback
+from dash import html, dcc
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import pandas as pd
 import logging
 
-from src.database.connection import db_manager
 from src.database.queries.customer_behavior import *
 from src.components.kpi_cards import create_kpi_card
 from src.components.charts import chart_builder
-from src.components.filters import create_date_filter, create_region_filter, create_segment_filter, create_supplier_filter
+from src.components import fast_figures as ff
+from src.components.figure_patch import create_chart_graph
+from src.components.panels import create_panel_stores
+from src.components.filters import (
+    create_date_filter, create_region_filter, create_segment_filter, create_supplier_filter, create_exact_counts_toggle,
+    create_preview_toggle
+)
+from src.database.failures import record_query_failure
+from src.database.sampling import SampleSpec, use_preview
 from src.utils.data_processor import data_processor
+from src.utils.cohorts import cohort_matrix
+from src.utils.feature_store import customer_features
+from src.utils.funnel import ordered_funnel
+from src.utils.sketches.store import sketch_store
 
 logger = logging.getLogger(__name__)
 
+# Сколько последних когорт периода показывается на тепловой карте
+COHORT_MAX_DISPLAY = 24
+
+# Уровни лояльности по числу покупок за период (как в CUSTOMER_LOYALTY_QUERY)
+LOYALTY_BINS = [-1, 0, 2, 4, float('inf')]
+LOYALTY_LEVELS = ['Неактивный', 'Новый', 'Постоянный', 'VIP']
+
+# Запросы, которые в режиме предпросмотра выполняются по выборке событий и сессий. Число уникальных
+# клиентов по выборке не оценивается масштабированием, поэтому в KPI выборка берется только из событий,
+# а график устройств строится по числу сессий
+PREVIEW_QUERIES = {
+    CUSTOMER_KPI_QUERY: SampleSpec(('events',), scaled=('views', 'purchases', 'prev_views', 'prev_purchases')),
+    USER_DEVICES_QUERY: SampleSpec(('traffic',), keys=('device',), scaled=('sessions_count',),
+                                   order_by='sessions_count', ascending=False),
+}
+
 def create_customer_behavior_layout():
     """Создать layout для страницы клиентов и поведения"""
     return html.Div([
@@ -32,18 +58,21 @@ def create_customer_behavior_layout():
         create_customer_filters(),
         
         # KPI карточки
-        html.Div(id="customer-kpi-cards", style={'marginBottom': '2rem'}),
+        dcc.Loading(
+            html.Div(id="customer-kpi-cards", style={'marginBottom': '2rem'}),
+            type="circle"
+        ),
         
         # Основные графики
         dbc.Container([
             # Первый ряд
             dbc.Row([
                 dbc.Col(
-                    dcc.Graph(id="user-segments-chart"),
+                    create_chart_graph("user-segments-chart"),
                     lg=6, className="mb-4"
                 ),
                 dbc.Col(
-                    dcc.Graph(id="funnel-chart"),
+                    create_chart_graph("funnel-chart"),
                     lg=6, className="mb-4"
                 ),
             ]),
@@ -51,11 +80,11 @@ def create_customer_behavior_layout():
             # Второй ряд
             dbc.Row([
                 dbc.Col(
-                    dcc.Graph(id="regional-activity-chart"),
+                    create_chart_graph("regional-activity-chart"),
                     lg=6, className="mb-4"
                 ),
                 dbc.Col(
-                    dcc.Graph(id="segment-behavior-chart"),
+                    create_chart_graph("segment-behavior-chart"),
                     lg=6, className="mb-4"
                 ),
             ]),
@@ -63,11 +92,11 @@ def create_customer_behavior_layout():
             # Третий ряд
             dbc.Row([
                 dbc.Col(
-                    dcc.Graph(id="traffic-channels-chart"),
+                    create_chart_graph("traffic-channels-chart"),
                     lg=6, className="mb-4"
                 ),
                 dbc.Col(
-                    dcc.Graph(id="user-devices-chart"),
+                    create_chart_graph("user-devices-chart"),
                     lg=6, className="mb-4"
                 ),
             ]),
@@ -75,11 +104,30 @@ def create_customer_behavior_layout():
             # Четвертый ряд
             dbc.Row([
                 dbc.Col(
-                    dcc.Graph(id="customer-loyalty-chart"),
+                    create_chart_graph("customer-loyalty-chart"),
+                    lg=12, className="mb-4"
+                ),
+            ]),
+            
+            # Пятый ряд
+            dbc.Row([
+                dbc.Col(
+                    create_chart_graph("cohort-retention-chart"),
+                    lg=12, className="mb-4"
+                ),
+            ]),
+            
+            # Шестой ряд
+            dbc.Row([
+                dbc.Col(
+                    create_chart_graph("rfm-segments-chart"),
                     lg=12, className="mb-4"
                 ),
             ]),
         ], fluid=True),
+        
+        # Скрытые элементы
+        *create_panel_stores('customer'),
     ])
 
 def create_customer_filters():
@@ -91,107 +139,200 @@ def create_customer_filters():
                 dbc.Col(create_segment_filter(), lg=3, md=6, className="mb-3"),
                 dbc.Col(create_region_filter(), lg=3, md=6, className="mb-3"),
                 dbc.Col(create_supplier_filter(), lg=3, md=6)
+            ]),
+            dbc.Row([
+                dbc.Col([create_exact_counts_toggle(), create_preview_toggle()], lg=3, md=6)
             ])
         ])
     ], className="mb-4")
 
-# Callbacks для клиентов и поведения
-def register_customer_callbacks(app):
-    """Зарегистрировать callback'ы для анализа клиентов"""
+def build_customer_params(start_date, end_date, segment, region, supplier, exact_counts=False, preview=False):
+    """Параметры запросов анализа клиентов из значений фильтров"""
+    prev_start_date, prev_end_date = data_processor.previous_period(start_date, end_date)
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'prev_start_date': prev_start_date,
+        'prev_end_date': prev_end_date,
+        'segment': segment if segment != 'all' else None,
+        'region': region if region != 'all' else None,
+        'supplier': supplier if supplier != 'all' else None,
+        'exact_counts': exact_counts is True,
+        'preview': exact_counts is not True and use_preview(preview, start_date, end_date)
+    }
+
+# Функции построения панелей страницы (сами панели и фильтры объявлены в src/components/pages/registry.py)
+PANEL_RENDERERS = {
+    'customer-kpi-cards':
+        lambda ctx: create_customer_kpi_cards(get_customer_kpi_data(ctx)),
+    'user-segments-chart':
+        lambda ctx: chart_builder.create_segmentation_chart(get_user_segments_data(ctx)),
+    'funnel-chart':
+        lambda ctx: create_ordered_funnel_chart(ctx),
+    'regional-activity-chart':
+        lambda ctx: create_regional_activity_chart(get_regional_activity_data(ctx)),
+    'segment-behavior-chart':
+        lambda ctx: create_segment_behavior_chart(get_segment_behavior_data(ctx)),
+    'traffic-channels-chart':
+        lambda ctx: chart_builder.create_traffic_channels_chart(get_traffic_channels_data(ctx)),
+    'user-devices-chart':
+        lambda ctx: create_user_devices_chart(ctx.query(USER_DEVICES_QUERY)),
+    'customer-loyalty-chart':
+        lambda ctx: create_customer_loyalty_chart(get_customer_loyalty_data(ctx)),
+    'cohort-retention-chart':
+        lambda ctx: create_cohort_retention_chart(ctx.params),
+    'rfm-segments-chart':
+        lambda ctx: create_rfm_segments_chart(get_rfm_segments_data(ctx)),
+}
+
+def get_user_segments_data(ctx):
+    """Клиенты по сегментам: без поставщика - по справочнику, с поставщиком - из скетчей покупателей"""
+    params = ctx.params
+    if params['exact_counts']:
+        return ctx.query(USER_SEGMENTS_QUERY)
+    if params['supplier'] is None:
+        return ctx.query(SEGMENT_SIZES_QUERY)
     
-    @app.callback(
-        [Output('customer-kpi-cards', 'children'),
-         Output('user-segments-chart', 'figure'),
-         Output('funnel-chart', 'figure'),
-         Output('regional-activity-chart', 'figure'),
-         Output('segment-behavior-chart', 'figure'),
-         Output('traffic-channels-chart', 'figure'),
-         Output('user-devices-chart', 'figure'),
-         Output('customer-loyalty-chart', 'figure')],
-        [Input('date-range', 'start_date'),
-         Input('date-range', 'end_date'),
-         Input('service-segment-filter', 'value'),
-         Input('service-region-filter', 'value'),
-         Input('supplier-filter', 'value')]
+    filters = {key: params[key] for key in ('segment', 'region', 'supplier')}
+    data = sketch_store.distinct('buyers', filters=filters, group_by=('segment',))
+    if data is None:
+        return ctx.query(USER_SEGMENTS_QUERY)
+    return data.rename(columns={'customer_id': 'users_count'})
+
+def get_traffic_channels_data(ctx):
+    """Сессии и уникальные посетители по каналам из скетчей (с фильтром поставщика - точным запросом)"""
+    params = ctx.params
+    if params['exact_counts'] or params['supplier'] is not None:
+        return ctx.query(TRAFFIC_CHANNELS_QUERY)
+    
+    # Как и в TRAFFIC_CHANNELS_QUERY, учитываются только клиенты из справочника сегментов
+    data = sketch_store.distinct(
+        'sessions', params['start_date'], params['end_date'],
+        filters={'segment': params['segment'], 'region': params['region']},
+        group_by=('channel',), require=('segment',)
     )
-    def update_customer_dashboard(start_date, end_date, segment, region, supplier):
-        """Обновить дашборд клиентов и поведения"""
-        try:
-            params = {
-                'start_date': start_date,
-                'end_date': end_date,
-                'segment': segment if segment != 'all' else None,
-                'region': region if region != 'all' else None,
-                'supplier': supplier if supplier != 'all' else None
-            }
-            
-            # Получение данных
-            kpi_data = get_customer_kpi_data(params)
-            segments_data = db_manager.execute_query(USER_SEGMENTS_QUERY, params)
-            funnel_data = db_manager.execute_query(EVENTS_FUNNEL_QUERY, params)
-            regional_data = db_manager.execute_query(REGIONAL_ACTIVITY_QUERY, params)
-            segment_behavior_data = db_manager.execute_query(SEGMENT_BEHAVIOR_QUERY, params)
-            traffic_data = db_manager.execute_query(TRAFFIC_CHANNELS_QUERY, params)
-            devices_data = db_manager.execute_query(USER_DEVICES_QUERY, params)
-            loyalty_data = db_manager.execute_query(CUSTOMER_LOYALTY_QUERY, params)
-            
-            # Создание KPI карточек
-            kpi_cards = create_customer_kpi_cards(kpi_data)
-            
-            # Создание графиков
-            segments_fig = chart_builder.create_segmentation_chart(segments_data)
-            funnel_fig = chart_builder.create_funnel_chart(funnel_data)
-            regional_fig = create_regional_activity_chart(regional_data)
-            segment_behavior_fig = create_segment_behavior_chart(segment_behavior_data)
-            traffic_fig = chart_builder.create_traffic_channels_chart(traffic_data)
-            devices_fig = create_user_devices_chart(devices_data)
-            loyalty_fig = create_customer_loyalty_chart(loyalty_data)
-            
-            return [kpi_cards, segments_fig, funnel_fig, regional_fig, 
-                   segment_behavior_fig, traffic_fig, devices_fig, loyalty_fig]
-            
-        except Exception as e:
-            logger.error(f"Error updating customer dashboard: {e}")
-            empty_fig = px.pie(title="Нет данных")
-            return [html.Div("Ошибка загрузки данных")] + [empty_fig] * 7
+    if data is None:
+        return ctx.query(TRAFFIC_CHANNELS_QUERY)
+    data = data.rename(columns={'traffic_id': 'sessions_count', 'customer_id': 'unique_users'})
+    return data.sort_values('sessions_count', ascending=False)
+
+def get_customer_features(ctx):
+    """Признаки клиентов за период из витрины
+
+    None, если выбран поставщик (витрина его не различает) или витрина еще строится -
+    тогда панели строятся запросами.
+    """
+    if ctx.params.get('supplier') is not None:
+        return None
+    return ctx.memo('customer-features', lambda: customer_features.customer_features(ctx.params))
+
+def get_regional_activity_data(ctx):
+    """Активность по регионам: группировка признаков клиентов"""
+    features = get_customer_features(ctx)
+    if features is None:
+        return ctx.query(REGIONAL_ACTIVITY_QUERY)
     
-    return app
+    data = features.groupby('region').agg(
+        total_users=('customer_id', 'size'),
+        total_orders=('orders', 'sum'),
+        total_lines=('lines', 'sum'),
+    ).reset_index()
+    data['orders_per_user'] = data['total_lines'] / data['total_users']
+    return data.drop(columns='total_lines').sort_values('total_orders', ascending=False)
 
-def get_customer_kpi_data(params):
-    """Получить данные для KPI клиентов"""
+def get_segment_behavior_data(ctx):
+    """Поведение сегментов: группировка признаков клиентов"""
+    features = get_customer_features(ctx)
+    if features is None:
+        return ctx.query(SEGMENT_BEHAVIOR_QUERY)
+    
+    data = features.groupby('segment').agg(
+        total_orders=('lines', 'sum'),
+        revenue=('revenue', 'sum'),
+        total_returns=('returns', 'sum'),
+    ).reset_index()
+    data['avg_order_value'] = data['revenue'] / data['total_orders'].where(data['total_orders'] > 0)
+    return data.drop(columns='revenue').sort_values('total_orders', ascending=False)
+
+def get_customer_loyalty_data(ctx):
+    """Уровни лояльности: группировка признаков клиентов"""
+    features = get_customer_features(ctx)
+    if features is None:
+        return ctx.query(CUSTOMER_LOYALTY_QUERY)
+    
+    levels = pd.cut(features['lines'], LOYALTY_BINS, labels=LOYALTY_LEVELS)
+    data = features.groupby(levels, observed=True).agg(
+        customers_count=('customer_id', 'size'),
+        avg_order_value=('avg_order_value', 'mean'),
+    ).rename_axis('loyalty_level').reset_index()
+    data['loyalty_level'] = data['loyalty_level'].astype(str)
+    return data.sort_values('customers_count', ascending=False)
+
+def get_rfm_segments_data(ctx):
+    """Сегменты RFM: число клиентов, выручка и средняя давность последней покупки"""
+    features = get_customer_features(ctx)
+    if features is None:
+        # Сегменты RFM считаются только по витрине: с фильтром поставщика панель пустая,
+        # а пока витрина строится, пустая панель не кэшируется
+        if ctx.params.get('supplier') is None:
+            record_query_failure()
+        return pd.DataFrame()
+    
+    return features.groupby('rfm_segment').agg(
+        customers_count=('customer_id', 'size'),
+        revenue=('revenue', 'sum'),
+        recency_days=('recency_days', 'mean'),
+    ).reset_index().sort_values('customers_count', ascending=False)
+
+def get_customer_kpi_data(ctx):
+    """Получить данные для KPI клиентов (с изменением к предыдущему периоду)"""
     try:
-        segments_data = db_manager.execute_query(USER_SEGMENTS_QUERY, params)
-        funnel_data = db_manager.execute_query(EVENTS_FUNNEL_QUERY, params)
-        orders_data = db_manager.execute_query(REGIONAL_ACTIVITY_QUERY, params)  # содержит total_orders
+        kpi_result = ctx.query(CUSTOMER_KPI_QUERY)
+        if kpi_result.empty:
+            return {}
+        row = kpi_result.iloc[0].fillna(0)
         
-        total_users = segments_data['users_count'].sum() if not segments_data.empty else 0
-        total_orders = orders_data['total_orders'].sum() if not orders_data.empty else 0
+        total_users = int(row['total_users'])
         
-        # Конверсия из воронки
-        conversion_rate = 0
-        if not funnel_data.empty:
-            views = funnel_data[funnel_data['event_type'] == 'view']['events_count'].sum()
-            purchases = funnel_data[funnel_data['event_type'] == 'purchase']['events_count'].sum()
-            conversion_rate = (purchases / views * 100) if views > 0 else 0
+        # Конверсия из воронки: покупки / просмотры
+        conversion_rate = (row['purchases'] / row['views'] * 100) if row['views'] > 0 else 0
+        prev_conversion_rate = (row['prev_purchases'] / row['prev_views'] * 100) if row['prev_views'] > 0 else None
         
         # Среднее количество заказов на пользователя
-        avg_orders_per_user = (total_orders / total_users) if total_users > 0 else 0
+        avg_orders_per_user = (row['total_orders'] / total_users) if total_users > 0 else 0
+        prev_avg_orders_per_user = (row['prev_total_orders'] / total_users) if total_users > 0 else None
         
         # Доля активных пользователей (сделавших хотя бы один заказ)
-        active_users = orders_data[orders_data['total_orders'] > 0]['total_users'].sum() if not orders_data.empty else 0
-        active_user_rate = (active_users / total_users * 100) if total_users > 0 else 0
+        active_user_rate = (row['active_users'] / total_users * 100) if total_users > 0 else 0
+        prev_active_user_rate = (row['prev_active_users'] / total_users * 100) if total_users > 0 else None
         
-        return {
+        kpi_data = {
             'total_users': f"{total_users:,}",
             'conversion_rate': f"{conversion_rate:.1f}%",
             'avg_orders_per_user': f"{avg_orders_per_user:.2f}",
             'active_user_rate': f"{active_user_rate:.1f}%"
         }
+        # Оценка по выборке событий: относительные погрешности покупок и просмотров складываются квадратично
+        if 'views_ci' in row and row['views'] > 0 and row['purchases'] > 0:
+            relative = ((row['purchases_ci'] / row['purchases']) ** 2 + (row['views_ci'] / row['views']) ** 2) ** 0.5
+            kpi_data['conversion_ci'] = f"{conversion_rate * relative:.1f}%"
+        # Число пользователей не зависит от периода, поэтому изменение для него не показывается
+        kpi_data['conversion_delta'], kpi_data['conversion_delta_color'] = \
+            data_processor.format_delta(conversion_rate, prev_conversion_rate)
+        kpi_data['orders_delta'], kpi_data['orders_delta_color'] = \
+            data_processor.format_delta(avg_orders_per_user, prev_avg_orders_per_user)
+        kpi_data['active_delta'], kpi_data['active_delta_color'] = \
+            data_processor.format_delta(active_user_rate, prev_active_user_rate)
+        return kpi_data
         
     except Exception as e:
         logger.error(f"Error getting customer KPI data: {e}")
         return {}
 
+def create_error_chart():
+    """Заглушка графика при ошибке загрузки данных"""
+    return ff.empty_figure()
+
 def create_customer_kpi_cards(kpi_data):
     """Создать KPI карточки для клиентов"""
     return dbc.Row([
@@ -202,78 +343,125 @@ def create_customer_kpi_cards(kpi_data):
         
         dbc.Col(create_kpi_card(
             "📊 Конверсия", 
-            kpi_data.get('conversion_rate', '0%')
+            kpi_data.get('conversion_rate', '0%'),
+            kpi_data.get('conversion_delta'),
+            kpi_data.get('conversion_delta_color', 'success'),
+            kpi_data.get('conversion_ci')
         ), lg=3, md=6, className="mb-3"),
         
         dbc.Col(create_kpi_card(
             "🛒 Ср. заказов на пользователя", 
-            kpi_data.get('avg_orders_per_user', '0')
+            kpi_data.get('avg_orders_per_user', '0'),
+            kpi_data.get('orders_delta'),
+            kpi_data.get('orders_delta_color', 'success')
         ), lg=3, md=6, className="mb-3"),
         
         dbc.Col(create_kpi_card(
             "🎯 Активные пользователи", 
-            kpi_data.get('active_user_rate', '0%')
+            kpi_data.get('active_user_rate', '0%'),
+            kpi_data.get('active_delta'),
+            kpi_data.get('active_delta_color', 'success')
         ), lg=3, md=6, className="mb-3"),
     ], className="g-3")
 
 def create_regional_activity_chart(data):
     """Создать график активности по регионам"""
     if data.empty:
-        return px.bar(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.bar(
-        data,
-        x='region',
-        y='total_orders',
+    return ff.figure(
+        [ff.bar(data['region'], data['total_orders'],
+                color_values=data['total_orders'], colorbar_title='Количество заказов')],
         title='Активность по регионам',
-        labels={'total_orders': 'Количество заказов', 'region': 'Регион'},
-        color='total_orders'
+        **ff.axes('Регион', 'Количество заказов')
     )
-    
-    return fig
 
 def create_segment_behavior_chart(data):
     """Создать график поведения сегментов"""
     if data.empty:
-        return px.bar(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.bar(
-        data,
-        x='segment',
-        y='total_orders',
+    return ff.figure(
+        [ff.bar(data['segment'], data['total_orders'],
+                color_values=data['avg_order_value'], colorbar_title='avg_order_value')],
         title='Поведение сегментов клиентов',
-        labels={'total_orders': 'Количество заказов', 'segment': 'Сегмент'},
-        color='avg_order_value'
+        **ff.axes('Сегмент', 'Количество заказов')
     )
-    
-    return fig
 
 def create_user_devices_chart(data):
     """Создать график устройств пользователей"""
     if data.empty:
-        return px.pie(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.pie(
-        data,
-        values='sessions_count',
-        names='device',
+    return ff.figure(
+        [ff.pie(data['device'], data['sessions_count'])],
         title='Распределение по устройствам'
     )
-    
-    return fig
 
 def create_customer_loyalty_chart(data):
     """Создать график лояльности клиентов"""
     if data.empty:
-        return px.bar(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.bar(
-        data,
-        x='loyalty_level',
-        y='customers_count',
+    return ff.figure(
+        [ff.bar(data['loyalty_level'], data['customers_count'],
+                color_values=data['avg_order_value'], colorbar_title='avg_order_value')],
         title='Уровни лояльности клиентов',
-        labels={'customers_count': 'Количество клиентов', 'loyalty_level': 'Уровень лояльности'},
-        color='avg_order_value'
+        **ff.axes('Уровень лояльности', 'Количество клиентов')
+    )
+
+def create_ordered_funnel_chart(ctx):
+    """Создать упорядоченную воронку: клиенты на шагах, отток между шагами и медианное время до шага"""
+    funnel = ordered_funnel(ctx.params)
+    if funnel is None:
+        # Потоковый расчет недоступен: воронка по числу событий каждого типа
+        return chart_builder.create_funnel_chart(ctx.query(EVENTS_FUNNEL_QUERY).copy())
+    
+    data = funnel.to_frame()
+    if not data['users'].iloc[0]:
+        return ff.empty_figure()
+    
+    data['median_hours'] = data['median_seconds'] / 3600
+    return ff.figure(
+        [ff.funnel(data['users'], data['step'],
+                   textinfo='value+percent initial',
+                   customdata=data[['drop_off', 'median_hours']].round(1).to_numpy(),
+                   hovertemplate='%{y}: %{x} клиентов<br>Отток с предыдущего шага: %{customdata[0]}%'
+                                 '<br>Медиана времени от начала: %{customdata[1]} ч<extra></extra>')],
+        title=f'Воронка клиентов (окно {funnel.window_hours} ч)',
+        **ff.axes('Количество клиентов', 'Шаг воронки')
+    )
+
+def create_cohort_retention_chart(params):
+    """Создать тепловую карту удержания когорт (месяц первой покупки x месяцев с первой покупки)"""
+    cohorts = cohort_matrix(params)
+    if cohorts is None:
+        return ff.empty_figure()
+    
+    cohorts = cohorts.between(params['start_date'], params['end_date'], COHORT_MAX_DISPLAY)
+    if not len(cohorts.months):
+        return ff.empty_figure()
+    
+    labels = cohorts.months.strftime('%Y-%m').tolist()
+    return ff.figure(
+        [ff.heatmap(list(range(cohorts.active.shape[1])), labels, cohorts.retention(),
+                    scale=['#F7F7F7', '#3C91E6', '#2E86AB'],
+                    colorbar_title='Удержание (%)',
+                    customdata=cohorts.revenue,
+                    hovertemplate='Когорта %{y}, месяц %{x}<br>Удержание: %{z:.1f}%'
+                                  '<br>Выручка: %{customdata:,.0f} руб<extra></extra>')],
+        title='Удержание клиентов по когортам',
+        **ff.axes('Месяцев с первой покупки', 'Когорта (месяц первой покупки)', yaxis={'autorange': 'reversed'})
     )
+
+def create_rfm_segments_chart(data):
+    """Создать график сегментов RFM (давность, частота и сумма покупок)"""
+    if data.empty:
+        return ff.empty_figure()
     
-    return fig
\ No newline at end of file
+    return ff.figure(
+        [ff.bar(data['rfm_segment'], data['customers_count'],
+                color_values=data['revenue'], colorbar_title='Выручка (руб)')],
+        title='Сегменты клиентов по RFM',
+        **ff.axes('Сегмент RFM', 'Количество клиентов')
+    )
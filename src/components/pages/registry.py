@@ -0,0 +1,151 @@
+"""
+Реестр страниц: пути, фильтры и панели каждой страницы
+
+Модуль не импортирует модули страниц, графики и слой БД, поэтому callback'и всех
+страниц регистрируются при старте, а тяжелые модули загружаются при первом переходе.
+"""
+from dash import Input
+
+from src.components.live_kpi import register_live_kpi_callbacks
+from src.components.panels import Panel, PageSpec, register_panels
+
+# Таблицы, по которым строятся панели (продажи всегда фильтруются через товары и поставщиков)
+SALES = ('sales', 'products', 'suppliers')
+CUSTOMERS = SALES + ('user_segments',)
+SUPPORT = ('customer_support', 'user_segments')
+
+PAGES = [
+    PageSpec(
+        name='business',
+        path='/',
+        module='src.components.pages.business_sales',
+        layout='create_business_sales_layout',
+        params='build_business_params',
+        preview_queries='PREVIEW_QUERIES',
+        inputs=[
+            Input('date-range', 'start_date'),
+            Input('date-range', 'end_date'),
+            Input('basic-category-filter', 'value'),
+            Input('supplier-filter', 'value'),
+            Input('exact-counts-toggle', 'value'),
+            Input('preview-toggle', 'value'),
+        ],
+        panels=[
+            Panel('business-kpi-cards', prop='children', tables=SALES + ('returns',)),
+            Panel('sales-trend-chart', tables=SALES),
+            Panel('category-sales-chart', tables=SALES),
+            Panel('supplier-performance-chart', tables=SALES),
+            Panel('returns-analysis-chart', tables=SALES + ('returns',)),
+            Panel('inventory-status-chart', tables=('inventory', 'products', 'suppliers')),
+            Panel('top-products-chart', tables=SALES),
+            Panel('category-forecast-chart', tables=SALES),
+            Panel('category-seasonality-chart', tables=SALES),
+            Panel('order-value-percentiles-chart', tables=SALES),
+        ],
+        error_chart='create_empty_chart',
+    ),
+    PageSpec(
+        name='customer',
+        path='/customer-behavior',
+        module='src.components.pages.customer_behavior',
+        layout='create_customer_behavior_layout',
+        params='build_customer_params',
+        preview_queries='PREVIEW_QUERIES',
+        inputs=[
+            Input('date-range', 'start_date'),
+            Input('date-range', 'end_date'),
+            Input('service-segment-filter', 'value'),
+            Input('service-region-filter', 'value'),
+            Input('supplier-filter', 'value'),
+            Input('exact-counts-toggle', 'value'),
+            Input('preview-toggle', 'value'),
+        ],
+        panels=[
+            Panel('customer-kpi-cards', prop='children', tables=CUSTOMERS + ('events',)),
+            Panel('user-segments-chart', tables=CUSTOMERS),
+            Panel('funnel-chart', tables=CUSTOMERS + ('events',)),
+            Panel('regional-activity-chart', tables=CUSTOMERS),
+            Panel('segment-behavior-chart', tables=CUSTOMERS + ('returns',)),
+            Panel('traffic-channels-chart', tables=CUSTOMERS + ('traffic',)),
+            Panel('user-devices-chart', tables=CUSTOMERS + ('traffic',)),
+            Panel('customer-loyalty-chart', tables=CUSTOMERS),
+            Panel('cohort-retention-chart', tables=CUSTOMERS),
+            Panel('rfm-segments-chart', tables=CUSTOMERS + ('returns', 'customer_support')),
+        ],
+    ),
+    PageSpec(
+        name='advertising',
+        path='/advertising-marketing',
+        module='src.components.pages.advertising_marketing',
+        layout='create_advertising_marketing_layout',
+        params='build_advertising_params',
+        preview_queries='PREVIEW_QUERIES',
+        inputs=[
+            Input('date-range', 'start_date'),
+            Input('date-range', 'end_date'),
+            Input('campaign-filter', 'value'),
+            Input('ad-channel-filter', 'value'),
+            Input('ad-category-filter', 'value'),
+            Input('exact-counts-toggle', 'value'),
+            Input('preview-toggle', 'value'),
+        ],
+        panels=[
+            Panel('advertising-kpi-cards', prop='children', tables=('ad_revenue',)),
+            Panel('ad-performance-chart', tables=('ad_revenue',)),
+            Panel('ad-trend-chart', tables=('ad_revenue',)),
+            Panel('product-ad-performance-chart', tables=('ad_revenue', 'products')),
+            Panel('channel-conversion-chart', tables=('sales', 'traffic')),
+            Panel('roi-trend-chart', tables=('ad_revenue',)),
+            Panel('top-ctr-campaigns-chart', tables=('ad_revenue',)),
+        ],
+    ),
+    PageSpec(
+        name='service',
+        path='/service-quality',
+        module='src.components.pages.service_quality',
+        layout='create_service_quality_layout',
+        params='build_service_params',
+        inputs=[
+            Input('date-range', 'start_date'),
+            Input('date-range', 'end_date'),
+            Input('issue-type-filter', 'value'),
+            Input('service-segment-filter', 'value'),
+            Input('service-region-filter', 'value'),
+        ],
+        panels=[
+            Panel('service-kpi-cards', prop='children', tables=SUPPORT + ('returns', 'sales')),
+            Panel('support-metrics-chart', tables=('customer_support',)),
+            Panel('support-trend-chart', tables=SUPPORT),
+            Panel('segment-support-chart', tables=SUPPORT),
+            Panel('resolution-time-chart', tables=SUPPORT),
+            Panel('support-returns-chart', tables=SUPPORT + ('returns', 'sales')),
+            Panel('regional-support-chart', tables=SUPPORT),
+            Panel('resolution-percentiles-chart', tables=SUPPORT),
+        ],
+    ),
+]
+
+# По умолчанию показываем бизнес-аналитику
+DEFAULT_PAGE = PAGES[0]
+
+_pages_by_path = {page.path: page for page in PAGES}
+_pages_by_name = {page.name: page for page in PAGES}
+
+
+def get_page_spec(pathname: str) -> PageSpec:
+    """Страница для текущего пути"""
+    return _pages_by_path.get(pathname, DEFAULT_PAGE)
+
+
+def get_page(name: str) -> PageSpec:
+    """Страница по имени"""
+    return _pages_by_name[name]
+
+
+def register_page_callbacks(app):
+    """Зарегистрировать callback'и панелей всех страниц"""
+    for page in PAGES:
+        register_panels(app, page)
+    # Live-режим KPI бизнес-аналитики для периода "Последние 24 часа"
+    register_live_kpi_callbacks(app)
+    return app
@@ -1,18 +1,28 @@
-from dash import html, dcc, Input, Output, callback, State
+from dash import html, dcc
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import pandas as pd
 import logging
 
-from src.database.connection import db_manager
 from src.database.queries.service_quality import *
 from src.components.kpi_cards import create_kpi_card
 from src.components.charts import chart_builder
+from src.components import fast_figures as ff
+from src.components.figure_patch import create_chart_graph
+from src.components.panels import create_panel_stores
 from src.components.filters import create_date_filter, create_issue_type_filter, create_segment_filter, create_region_filter
 from src.utils.data_processor import data_processor
+from src.utils.anomalies import anomaly_flags
+from src.utils.downsampling import choose_granularity
+from src.utils.sketches.store import sketch_store
 
 logger = logging.getLogger(__name__)
 
+# Квантили времени решения для SLA (KPI и график по типам обращений)
+RESOLUTION_QUANTILES = (0.5, 0.9, 0.99)
+# Границы интервалов распределения времени решения (минуты) и их подписи
+RESOLUTION_BUCKET_EDGES = (60, 240, 1440)
+RESOLUTION_BUCKET_LABELS = ['До 1 часа', '1-4 часа', '4-24 часа', 'Более 24 часов']
+
 def create_service_quality_layout():
     """Создать layout для страницы качества обслуживания"""
     return html.Div([
@@ -32,18 +42,21 @@ def create_service_quality_layout():
         create_service_filters(),
         
         # KPI карточки
-        html.Div(id="service-kpi-cards", style={'marginBottom': '2rem'}),
+        dcc.Loading(
+            html.Div(id="service-kpi-cards", style={'marginBottom': '2rem'}),
+            type="circle"
+        ),
         
         # Основные графики
         dbc.Container([
             # Первый ряд
             dbc.Row([
                 dbc.Col(
-                    dcc.Graph(id="support-metrics-chart"),
+                    create_chart_graph("support-metrics-chart"),
                     lg=6, className="mb-4"
                 ),
                 dbc.Col(
-                    dcc.Graph(id="support-trend-chart"),
+                    create_chart_graph("support-trend-chart"),
                     lg=6, className="mb-4"
                 ),
             ]),
@@ -51,11 +64,11 @@ def create_service_quality_layout():
             # Второй ряд
             dbc.Row([
                 dbc.Col(
-                    dcc.Graph(id="segment-support-chart"),
+                    create_chart_graph("segment-support-chart"),
                     lg=6, className="mb-4"
                 ),
                 dbc.Col(
-                    dcc.Graph(id="resolution-time-chart"),
+                    create_chart_graph("resolution-time-chart"),
                     lg=6, className="mb-4"
                 ),
             ]),
@@ -63,15 +76,26 @@ def create_service_quality_layout():
             # Третий ряд
             dbc.Row([
                 dbc.Col(
-                    dcc.Graph(id="support-returns-chart"),
+                    create_chart_graph("support-returns-chart"),
                     lg=6, className="mb-4"
                 ),
                 dbc.Col(
-                    dcc.Graph(id="regional-support-chart"),
+                    create_chart_graph("regional-support-chart"),
                     lg=6, className="mb-4"
                 ),
             ]),
+            
+            # Четвертый ряд
+            dbc.Row([
+                dbc.Col(
+                    create_chart_graph("resolution-percentiles-chart"),
+                    lg=12, className="mb-4"
+                ),
+            ]),
         ], fluid=True),
+        
+        # Скрытые элементы
+        *create_panel_stores('service'),
     ])
 
 def create_service_filters():
@@ -87,81 +111,110 @@ def create_service_filters():
         ])
     ], className="mb-4")
 
-# Callbacks для качества обслуживания
-def register_service_callbacks(app):
-    @app.callback(
-        [Output('service-kpi-cards', 'children'),
-         Output('support-metrics-chart', 'figure'),
-         Output('support-trend-chart', 'figure'),
-         Output('segment-support-chart', 'figure'),
-         Output('resolution-time-chart', 'figure'),
-         Output('support-returns-chart', 'figure'),
-         Output('regional-support-chart', 'figure')],
-        [Input('date-range', 'start_date'),
-         Input('date-range', 'end_date'),
-         Input('issue-type-filter', 'value'),
-         Input('service-segment-filter', 'value'),
-         Input('service-region-filter', 'value')]
-    )
-    def update_service_dashboard(start_date, end_date, issue_type, segment, region):
-        """Обновить дашборд с применением фильтров"""
-        try:
-            params = {
-                'start_date': start_date,
-                'end_date': end_date,
-                'issue_type': issue_type,
-                'segment': segment,
-                'region': region
-            }
+def build_service_params(start_date, end_date, issue_type, segment, region):
+    """Параметры запросов качества обслуживания из значений фильтров"""
+    prev_start_date, prev_end_date = data_processor.previous_period(start_date, end_date)
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'prev_start_date': prev_start_date,
+        'prev_end_date': prev_end_date,
+        'granularity': choose_granularity(start_date, end_date),
+        'issue_type': issue_type,
+        'segment': segment,
+        'region': region
+    }
 
-            # SQL-запросы должны учитывать фильтры (см. ниже)
-            kpi_data = get_service_kpi_data(params)
-            support_data = db_manager.execute_query(SUPPORT_METRICS_QUERY, params)
-            support_trend_data = db_manager.execute_query(SUPPORT_TREND_QUERY, params)
-            segment_support_data = db_manager.execute_query(SEGMENT_SUPPORT_QUERY, params)
-            resolution_time_data = db_manager.execute_query(RESOLUTION_TIME_ANALYSIS_QUERY, params)
-            support_returns_data = db_manager.execute_query(SUPPORT_RETURNS_CORRELATION_QUERY, params)
-            regional_support_data = db_manager.execute_query(REGIONAL_SUPPORT_QUERY, params)
+# Функции построения панелей страницы (сами панели и фильтры объявлены в src/components/pages/registry.py)
+PANEL_RENDERERS = {
+    'service-kpi-cards':
+        lambda ctx: create_service_kpi_cards(get_service_kpi_data(ctx)),
+    'support-metrics-chart':
+        lambda ctx: chart_builder.create_support_metrics_chart(ctx.query(SUPPORT_METRICS_QUERY)),
+    'support-trend-chart':
+        lambda ctx: create_support_trend_chart(ctx.query(SUPPORT_TREND_QUERY)),
+    'segment-support-chart':
+        lambda ctx: create_segment_support_chart(ctx.query(SEGMENT_SUPPORT_QUERY)),
+    'resolution-time-chart':
+        lambda ctx: create_resolution_time_chart(get_resolution_time_data(ctx)),
+    'support-returns-chart':
+        lambda ctx: create_support_returns_chart(ctx.query(SUPPORT_RETURNS_CORRELATION_QUERY)),
+    'regional-support-chart':
+        lambda ctx: create_regional_support_chart(ctx.query(REGIONAL_SUPPORT_QUERY)),
+    'resolution-percentiles-chart':
+        lambda ctx: create_resolution_percentiles_chart(get_resolution_percentiles_data(ctx)),
+}
 
-            # KPI карточки
-            kpi_cards = create_service_kpi_cards(kpi_data)
+def resolution_filters(params):
+    """Фильтры скетчей времени решения ('all' - без фильтра)"""
+    return {key: params[key] if params[key] != 'all' else None for key in ('issue_type', 'segment', 'region')}
 
-            # Графики
-            support_fig = chart_builder.create_support_metrics_chart(support_data)
-            support_trend_fig = create_support_trend_chart(support_trend_data)
-            segment_support_fig = create_segment_support_chart(segment_support_data)
-            resolution_time_fig = create_resolution_time_chart(resolution_time_data)
-            support_returns_fig = create_support_returns_chart(support_returns_data)
-            regional_support_fig = create_regional_support_chart(regional_support_data)
+def get_resolution_percentile_rows(ctx):
+    """p50/p90/p99 времени решения за период и за предыдущий период (из скетчей, до их сборки - точно)"""
+    params = ctx.params
+    filters = resolution_filters(params)
+    current = sketch_store.quantiles('resolution_time', RESOLUTION_QUANTILES,
+                                     params['start_date'], params['end_date'], filters)
+    previous = None
+    if current is not None and params['prev_start_date'] is not None:
+        previous = sketch_store.quantiles('resolution_time', RESOLUTION_QUANTILES,
+                                          params['prev_start_date'], params['prev_end_date'], filters)
+        if previous is None:
+            current = None
+    if current is not None:
+        return current, previous
 
-            return [kpi_cards, support_fig, support_trend_fig, segment_support_fig,
-                    resolution_time_fig, support_returns_fig, regional_support_fig]
+    row = ctx.query(RESOLUTION_PERCENTILE_KPI_QUERY).iloc[0]
+    columns = ['count'] + [f"p{q * 100:g}" for q in RESOLUTION_QUANTILES]
+    current = pd.DataFrame([{column: row[column] for column in columns}])
+    previous = pd.DataFrame([{column: row[f'prev_{column}'] for column in columns}])
+    return current, previous
 
-        except Exception as e:
-            logger.error(f"Error updating dashboard: {e}")
-            empty_fig = px.bar(title="Нет данных")
-            return [html.Div("Ошибка загрузки данных")] + [empty_fig]*6
+def get_resolution_percentile_kpis(ctx):
+    """KPI p50/p90/p99 времени решения за период и изменение к предыдущему периоду"""
+    current, previous = get_resolution_percentile_rows(ctx)
+    if not current['count'].iloc[0]:
+        return {}
+    
+    kpi_data = {}
+    for q in RESOLUTION_QUANTILES:
+        column = f"p{q * 100:g}"
+        value = current[column].iloc[0]
+        prev_value = previous[column].iloc[0] if previous is not None and previous['count'].iloc[0] else None
+        kpi_data[column] = f"{value:.0f} мин"
+        kpi_data[f'{column}_delta'], kpi_data[f'{column}_delta_color'] = \
+            data_processor.format_delta(value, prev_value, higher_is_better=False)
+    return kpi_data
 
-    # Сброс фильтров
-    @app.callback(
-        [Output('issue-type-filter', 'value'),
-         Output('service-segment-filter', 'value'),
-         Output('service-region-filter', 'value'),
-         Output('period-selector', 'value')],
-        [Input('reset-service-filters', 'n_clicks')]
-    )
-    def reset_filters(n_clicks):
-        return 'all', 'all', 'all', '30d'
+def get_resolution_time_data(ctx):
+    """Распределение времени решения по интервалам (из скетчей; при ошибке - запросом)"""
+    params = ctx.params
+    counts = sketch_store.distribution('resolution_time', RESOLUTION_BUCKET_EDGES,
+                                       params['start_date'], params['end_date'], resolution_filters(params))
+    if counts is None:
+        return ctx.query(RESOLUTION_TIME_ANALYSIS_QUERY)
+    if not counts.sum():
+        return pd.DataFrame()
+    return pd.DataFrame({
+        'resolution_time_bucket': RESOLUTION_BUCKET_LABELS,
+        'tickets_count': counts.round().astype(int),
+    })
 
-    return app
+def get_resolution_percentiles_data(ctx):
+    """p50/p90/p99 времени решения по типам обращений (из скетчей, до их сборки - точно)"""
+    params = ctx.params
+    data = sketch_store.quantiles('resolution_time', RESOLUTION_QUANTILES, params['start_date'], params['end_date'],
+                                  resolution_filters(params), group_by=('issue_type',))
+    if data is None:
+        return ctx.query(RESOLUTION_PERCENTILES_QUERY)
+    return data[data['count'] > 0].sort_values('p90', ascending=False)
 
-def get_service_kpi_data(params):
-    """Получить данные для KPI качества обслуживания"""
+def get_service_kpi_data(ctx):
+    """Получить данные для KPI качества обслуживания (с изменением к предыдущему периоду)"""
     try:
-        support_data = db_manager.execute_query(SUPPORT_METRICS_QUERY, params)
-        returns_data = db_manager.execute_query(SUPPORT_RETURNS_CORRELATION_QUERY, params)
+        kpi_result = ctx.query(SERVICE_KPI_QUERY)
         
-        if support_data.empty:
+        if kpi_result.empty or not kpi_result.iloc[0]['total_tickets']:
             return {
                 'total_tickets': '0',
                 'avg_resolution_time': '0 мин',
@@ -169,125 +222,151 @@ def get_service_kpi_data(params):
                 'returns_rate': '0%'
             }
         
-        total_tickets = support_data['tickets_count'].sum()
-        avg_resolution_time = support_data['avg_resolution_time'].mean()
-        resolution_rate = support_data['resolution_rate'].mean()
+        row = kpi_result.iloc[0]
+        total_tickets = int(row['total_tickets'])
+        avg_resolution_time = row['avg_resolution_time']
+        resolution_rate = row['resolution_rate']
+        prev_total_tickets = row['prev_total_tickets'] or 0
         
         # Вычисляем долю возвратов: sum(returns) / sum(tickets)
-        returns_rate = 0
-        if not returns_data.empty:
-            total_returns = returns_data['returns_count'].sum()
-            returns_rate = (total_returns / total_tickets * 100) if total_tickets > 0 else 0
+        returns_rate = (row['returns_count'] or 0) / total_tickets * 100
+        prev_returns_rate = ((row['prev_returns_count'] or 0) / prev_total_tickets * 100) if prev_total_tickets > 0 else None
         
-        return {
+        kpi_data = {
             'total_tickets': f"{total_tickets:,}",
             'avg_resolution_time': f"{avg_resolution_time:.0f} мин",
             'resolution_rate': f"{resolution_rate:.1f}%",
             'returns_rate': f"{returns_rate:.1f}%"
         }
+        kpi_data.update(get_resolution_percentile_kpis(ctx))
+        kpi_data['tickets_delta'], kpi_data['tickets_delta_color'] = \
+            data_processor.format_delta(total_tickets, prev_total_tickets, higher_is_better=False)
+        kpi_data['resolution_time_delta'], kpi_data['resolution_time_delta_color'] = \
+            data_processor.format_delta(avg_resolution_time, row['prev_avg_resolution_time'], higher_is_better=False)
+        kpi_data['resolution_rate_delta'], kpi_data['resolution_rate_delta_color'] = \
+            data_processor.format_delta(resolution_rate, row['prev_resolution_rate'])
+        kpi_data['returns_delta'], kpi_data['returns_delta_color'] = \
+            data_processor.format_delta(returns_rate, prev_returns_rate, higher_is_better=False)
+        return kpi_data
         
     except Exception as e:
         logger.error(f"Error getting service KPI data: {e}")
         return {}
 
+def create_error_chart():
+    """Заглушка графика при ошибке загрузки данных"""
+    return ff.empty_figure()
+
 def create_service_kpi_cards(kpi_data):
     """Создать KPI карточки для качества обслуживания"""
     return dbc.Row([
         dbc.Col(create_kpi_card(
             "📞 Всего обращений", 
-            kpi_data.get('total_tickets', '0')
+            kpi_data.get('total_tickets', '0'),
+            kpi_data.get('tickets_delta'),
+            kpi_data.get('tickets_delta_color', 'success')
         ), lg=3, md=6, className="mb-3"),
         
         dbc.Col(create_kpi_card(
             "⏱️ Ср. время решения", 
-            kpi_data.get('avg_resolution_time', '0 мин')
+            kpi_data.get('avg_resolution_time', '0 мин'),
+            kpi_data.get('resolution_time_delta'),
+            kpi_data.get('resolution_time_delta_color', 'success')
         ), lg=3, md=6, className="mb-3"),
         
         dbc.Col(create_kpi_card(
             "✅ Уровень решения", 
-            kpi_data.get('resolution_rate', '0%')
+            kpi_data.get('resolution_rate', '0%'),
+            kpi_data.get('resolution_rate_delta'),
+            kpi_data.get('resolution_rate_delta_color', 'success')
         ), lg=3, md=6, className="mb-3"),
         
         dbc.Col(create_kpi_card(
             "↩️ Доля возвратов", 
-            kpi_data.get('returns_rate', '0%')
+            kpi_data.get('returns_rate', '0%'),
+            kpi_data.get('returns_delta'),
+            kpi_data.get('returns_delta_color', 'success')
         ), lg=3, md=6, className="mb-3"),
+        
+        *[dbc.Col(create_kpi_card(
+            f"⏳ Время решения {label}", 
+            kpi_data.get(label, '—'),
+            kpi_data.get(f'{label}_delta'),
+            kpi_data.get(f'{label}_delta_color', 'success')
+        ), lg=4, md=6, className="mb-3") for label in ('p50', 'p90', 'p99')],
     ], className="g-3")
 
 def create_support_trend_chart(data):
     """Создать график тренда обращений"""
     if data.empty:
-        return px.line(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.line(
-        data,
-        x='date',
-        y='daily_tickets',
+    anomalies = ff.anomaly_markers(data['date'], data['daily_tickets'], anomaly_flags(data['daily_tickets']))
+    return ff.figure(
+        [ff.line(data['date'], data['daily_tickets'], name='Обращения'), anomalies],
         title='Динамика обращений в поддержку',
-        labels={'daily_tickets': 'Количество обращений', 'date': 'Дата'}
+        showlegend=False,
+        **ff.axes('Дата', 'Количество обращений')
     )
-    
-    return fig
 
 def create_segment_support_chart(data):
     """Создать график поддержки по сегментам"""
     if data.empty:
-        return px.bar(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.bar(
-        data,
-        x='segment',
-        y='tickets_count',
+    return ff.figure(
+        [ff.bar(data['segment'], data['tickets_count'],
+                color_values=data['resolution_rate'], colorbar_title='resolution_rate')],
         title='Обращения по сегментам клиентов',
-        labels={'tickets_count': 'Количество обращений', 'segment': 'Сегмент'},
-        color='resolution_rate'
+        **ff.axes('Сегмент', 'Количество обращений')
     )
-    
-    return fig
 
 def create_resolution_time_chart(data):
     """Создать график времени решения"""
     if data.empty:
-        return px.bar(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.bar(
-        data,
-        x='resolution_time_bucket',
-        y='tickets_count',
+    return ff.figure(
+        [ff.bar(data['resolution_time_bucket'], data['tickets_count'])],
         title='Распределение времени решения обращений',
-        labels={'tickets_count': 'Количество обращений', 'resolution_time_bucket': 'Время решения'}
+        **ff.axes('Время решения', 'Количество обращений')
     )
-    
-    return fig
 
 def create_support_returns_chart(data):
     """Создать график связи поддержки и возвратов"""
     if data.empty:
-        return px.bar(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.bar(
-        data,
-        x='issue_type',
-        y=['support_tickets', 'returns_count'],
+    return ff.figure(
+        [ff.bar(data['issue_type'], data['support_tickets'], name='support_tickets'),
+         ff.bar(data['issue_type'], data['returns_count'], name='returns_count')],
         title='Связь обращений и возвратов',
-        labels={'value': 'Количество', 'variable': 'Метрика'},
-        barmode='group'
+        barmode='group',
+        legend={'title': {'text': 'Метрика'}},
+        **ff.axes('issue_type', 'Количество')
     )
-    
-    return fig
 
 def create_regional_support_chart(data):
     """Создать график поддержки по регионам"""
     if data.empty:
-        return px.bar(title="Нет данных")
+        return ff.empty_figure()
     
-    fig = px.bar(
-        data,
-        x='region',
-        y='tickets_count',
+    return ff.figure(
+        [ff.bar(data['region'], data['tickets_count'],
+                color_values=data['avg_resolution_time'], colorbar_title='avg_resolution_time')],
         title='Обращения по регионам',
-        labels={'tickets_count': 'Количество обращений', 'region': 'Регион'},
-        color='avg_resolution_time'
+        **ff.axes('Регион', 'Количество обращений')
     )
+
+def create_resolution_percentiles_chart(data):
+    """Создать график p50/p90/p99 времени решения по типам обращений"""
+    if data.empty:
+        return ff.empty_figure()
     
-    return fig
\ No newline at end of file
+    return ff.figure(
+        [ff.bar(data['issue_type'], data[label], name=label) for label in ('p50', 'p90', 'p99')],
+        title='Время решения обращений: p50 / p90 / p99',
+        barmode='group',
+        legend={'title': {'text': 'Квантиль'}},
+        **ff.axes('Тип обращения', 'Время решения (мин)')
+    )
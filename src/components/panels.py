@@ -0,0 +1,412 @@
+import importlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cachetools import TTLCache
+from dash import ClientsideFunction, Input, Output, State, ctx, dcc, html, no_update
+from dash.exceptions import PreventUpdate
+
+from config import config
+from src.components.figure_patch import signature_store_id, build_figure_update
+from src.database.failures import record_query_failure, track_query_failures
+from src.database.scheduler import current_priority
+from src.database.watcher import data_watcher
+from src.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Сколько живет общий контекст одного изменения фильтров (секунды)
+PANEL_CONTEXT_TTL = 30
+PANEL_CONTEXT_MAXSIZE = 64
+
+# Сколько результатов панелей хранится на сервере (время жизни - config.cache_timeout)
+PANEL_RESULTS_MAXSIZE = 512
+
+
+class PanelContext:
+    """Общий контекст запроса: параметры фильтров и результаты уже выполненных запросов"""
+
+    def __init__(self, params: Dict[str, Any]):
+        self.params = params
+        self._results: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def memo(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Вычислить значение один раз на контекст, даже если его запрашивают несколько панелей
+
+        Ошибки запросов при вычислении запоминаются вместе со значением и учитываются
+        каждой панелью, которая его получила.
+        """
+        with self._lock:
+            if key in self._results:
+                return self._cached(key)
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._results:
+                    return self._cached(key)
+            with track_query_failures() as failures:
+                value = compute()
+            with self._lock:
+                self._results[key] = (value, bool(failures))
+            if failures:
+                record_query_failure()
+            return value
+
+    def _cached(self, key: str) -> Any:
+        value, failed = self._results[key]
+        if failed:
+            record_query_failure()
+        return value
+
+    def query(self, query: str, params: Optional[Dict[str, Any]] = None):
+        """Выполнить SQL запрос с параметрами контекста (один раз на контекст)"""
+        # Слой БД (pandas, SQLAlchemy и подключение) загружается при первом запросе данных
+        from src.database.connection import db_manager
+
+        query_params = self.params if params is None else params
+        key = f"query:{query}:{_params_key(query_params)}"
+        return self.memo(key, lambda: db_manager.execute_query(query, query_params))
+
+
+class PreviewContext:
+    """Контекст предпросмотра одной панели: запросы из списка страницы выполняются по выборке
+
+    Остальные запросы и вычисления выполняются через общий контекст. sampled - использовала
+    ли панель выборку (тогда после предпросмотра строится точный результат).
+    """
+
+    def __init__(self, context: PanelContext, queries: Dict[str, Any]):
+        self.params = context.params
+        self.memo = context.memo
+        self._context = context
+        self._queries = queries
+        self.sampled = False
+
+    def query(self, query: str, params: Optional[Dict[str, Any]] = None):
+        """Оценка по выборке для запросов из списка предпросмотра, остальные - точно"""
+        spec = self._queries.get(query)
+        if spec is None:
+            return self._context.query(query, params)
+
+        from src.database.sampling import estimate_query
+
+        self.sampled = True
+        query_params = self.params if params is None else params
+        key = f"sample:{query}:{_params_key(query_params)}"
+        return self.memo(key, lambda: estimate_query(query, spec, query_params))
+
+
+@dataclass
+class Panel:
+    """Панель страницы: выход, обновляемое свойство и таблицы, по которым она строится"""
+    output_id: str
+    prop: str = 'figure'
+    tables: Tuple[str, ...] = ()
+
+
+@dataclass
+class PageSpec:
+    """Объявление страницы: callback'и регистрируются по нему без импорта модуля страницы
+
+    Модуль страницы импортируется при первом обращении к нему (отрисовка layout или
+    обновление панели) и предоставляет фабрику layout, построение параметров запросов,
+    словарь функций построения панелей и заглушку для графиков. preview_queries - словарь
+    запросов, которые в режиме предпросмотра (params['preview']) выполняются по выборке.
+    """
+    name: str
+    path: str
+    module: str
+    layout: str
+    params: str
+    inputs: List[Input]
+    panels: List[Panel]
+    renderers: str = 'PANEL_RENDERERS'
+    error_chart: str = 'create_error_chart'
+    preview_queries: Optional[str] = None
+
+    def resolve(self, attribute: str) -> Any:
+        """Получить объект модуля страницы, импортировав модуль при первом обращении"""
+        return getattr(importlib.import_module(self.module), attribute)
+
+
+_contexts = TTLCache(maxsize=PANEL_CONTEXT_MAXSIZE, ttl=PANEL_CONTEXT_TTL)
+_contexts_lock = threading.Lock()
+
+_results = TTLCache(maxsize=PANEL_RESULTS_MAXSIZE, ttl=config.cache_timeout)
+_results_lock = threading.Lock()
+
+# Одинаковые панели, запрошенные одновременно разными пользователями, строятся один раз
+_panel_flight = SingleFlight()
+
+
+def _params_key(params: Dict[str, Any]) -> str:
+    """Нормализованный ключ параметров запроса"""
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def get_panel_context(page: str, params: Dict[str, Any]) -> PanelContext:
+    """Получить общий контекст для панелей страницы с данными параметрами и версией данных
+
+    Контекст общий только внутри класса приоритета: иначе интерактивная панель ждала бы
+    блокировку memo, которую держит предзагрузка, отложенная планировщиком.
+    """
+    key = f"{page}:{current_priority()}:{data_watcher.version}:{_params_key(params)}"
+    with _contexts_lock:
+        context = _contexts.get(key)
+        if context is None:
+            context = PanelContext(params)
+            _contexts[key] = context
+        return context
+
+
+def _track_failures(build: Callable[[], Any]) -> Callable[[], Tuple[Any, bool]]:
+    """Построение, которое возвращает и признак ошибки запросов к базе во время построения"""
+    def run():
+        with track_query_failures() as failures:
+            value = build()
+        return value, bool(failures)
+    return run
+
+
+def render_panel(page: 'PageSpec', panel: Panel, params: Dict[str, Any]) -> Any:
+    """Построить панель или взять результат для тех же параметров из кэша сервера
+
+    Ключ кэша включает версии таблиц панели, поэтому после изменения данных панель
+    строится заново. Одновременные запросы одной панели с одинаковыми параметрами
+    ждут одно построение. Панель, при построении которой запрос к базе завершился
+    ошибкой, не кэшируется и помечается для клиентского кэша (mark_error).
+    """
+    key = (page.name, panel.output_id, _params_key(params), data_watcher.versions_key(panel.tables))
+    if config.enable_cache:
+        with _results_lock:
+            cached = _results.get(key)
+        if cached is not None:
+            return cached
+
+    render = page.resolve(page.renderers)[panel.output_id]
+    # Интерактивный запрос не ждет предзагрузку, которую планировщик может отложить или отклонить
+    (value, failed), _ = _panel_flight.do((current_priority(),) + key,
+                                          _track_failures(lambda: render(get_panel_context(page.name, params))))
+
+    if failed:
+        return mark_error(value)
+    if config.enable_cache:
+        with _results_lock:
+            _results[key] = value
+    return value
+
+
+def _mark(value: Any, flag: str) -> Any:
+    """Добавить признак в layout.meta графика или data-атрибут обертки остальных панелей"""
+    if isinstance(value, dict) and 'layout' in value:
+        layout = dict(value['layout'], meta=dict(value['layout'].get('meta') or {}, **{flag: True}))
+        return dict(value, layout=layout)
+    return html.Div(value, **{f'data-{flag}': 'true'})
+
+
+def mark_preview(value: Any) -> Any:
+    """Пометить предпросмотр, чтобы клиентский кэш не сохранял его вместо точного результата"""
+    return _mark(value, 'preview')
+
+
+def mark_error(value: Any) -> Any:
+    """Пометить панель, построенную с ошибкой (или заглушку ошибки), чтобы клиентский кэш ее не сохранял"""
+    return _mark(value, 'error')
+
+
+def render_preview(page: 'PageSpec', panel: Panel, params: Dict[str, Any]) -> Tuple[Any, bool]:
+    """Построить предпросмотр панели: (значение, True), если панель использовала выборку
+
+    Панель, не выполнявшая запросов из списка предпросмотра, построена точно и повторно
+    не строится.
+    """
+    key = (page.name, panel.output_id, 'preview', _params_key(params), data_watcher.versions_key(panel.tables))
+    if config.enable_cache:
+        with _results_lock:
+            cached = _results.get(key)
+        if cached is not None:
+            return cached
+
+    render = page.resolve(page.renderers)[panel.output_id]
+    queries = page.resolve(page.preview_queries)
+
+    def build():
+        context = PreviewContext(get_panel_context(page.name, params), queries)
+        value = render(context)
+        return (mark_preview(value), True) if context.sampled else (value, False)
+
+    (result, failed), _ = _panel_flight.do((current_priority(),) + key, _track_failures(build))
+    if failed:
+        value, sampled = result
+        return mark_error(value), sampled
+    if config.enable_cache:
+        with _results_lock:
+            _results[key] = result
+    return result
+
+
+def filter_state_id(page: str) -> str:
+    """Хранилище состояния фильтров, по которому панели запрашивают данные с сервера"""
+    return f"{page}-filter-state"
+
+
+def refresh_store_id(output_id: str) -> str:
+    """Хранилище запроса на обновление панели после изменения ее данных"""
+    return f"{output_id}-refresh"
+
+
+def refine_store_id(output_id: str) -> str:
+    """Хранилище запроса точного результата панели после предпросмотра"""
+    return f"{output_id}-refine"
+
+
+def create_panel_stores(page: str) -> List[dcc.Store]:
+    """Служебные хранилища страницы: запрос к серверу, ключ фильтров, клиентский кэш результатов,
+    запросы обновления панелей при изменении данных и запросы точных результатов после предпросмотра"""
+    from src.components.pages.registry import get_page
+
+    panels = get_page(page).panels
+    return [
+        dcc.Store(id=filter_state_id(page)),
+        dcc.Store(id=f"{page}-filter-key"),
+        dcc.Store(id=f"{page}-cache-hit"),
+        dcc.Store(id=f"{page}-result-cache", storage_type='session'),
+        dcc.Store(id=f"{page}-panel-tables", data={panel.output_id: list(panel.tables) for panel in panels}),
+        *[dcc.Store(id=refresh_store_id(panel.output_id)) for panel in panels],
+        *[dcc.Store(id=refine_store_id(panel.output_id)) for panel in panels],
+    ]
+
+
+def _panel_outputs(panel: Panel) -> List[tuple]:
+    """Свойства, которые обновляет панель: значение и сигнатура структуры графика"""
+    outputs = [(panel.output_id, panel.prop)]
+    if panel.prop == 'figure':
+        outputs.append((signature_store_id(panel.output_id), 'data'))
+    return outputs
+
+
+def register_panels(app, page: PageSpec):
+    """Зарегистрировать отдельный callback для каждой панели страницы и клиентский кэш результатов"""
+    _register_client_cache(app, page.name, page.inputs, page.panels)
+    for panel in page.panels:
+        _register_panel(app, page, panel)
+    return app
+
+
+def _register_client_cache(app, page: str, inputs: List[Input], panels: List[Panel]):
+    """Связать фильтры страницы с кэшем результатов в sessionStorage браузера"""
+    # Повторно выбранное состояние фильтров отдается из кэша без запроса к серверу
+    # (ключ кэша включает версию данных)
+    app.clientside_callback(
+        ClientsideFunction(namespace='cache', function_name='resolve'),
+        [Output(filter_state_id(page), 'data'),
+         Output(f"{page}-filter-key", 'data'),
+         Output(f"{page}-cache-hit", 'data')],
+        inputs,
+        [State(filter_state_id(page), 'data'),
+         State(f"{page}-result-cache", 'data'),
+         State('data-version', 'data')]
+    )
+
+    # После изменения данных запрашиваются заново только панели по изменившимся таблицам
+    app.clientside_callback(
+        ClientsideFunction(namespace='cache', function_name='refresh'),
+        [Output(f"{page}-filter-key", 'data', allow_duplicate=True),
+         Output(f"{page}-result-cache", 'data', allow_duplicate=True)]
+        + [Output(refresh_store_id(panel.output_id), 'data') for panel in panels],
+        Input('data-version', 'data'),
+        [State(f"{page}-filter-key", 'data'),
+         State(f"{page}-result-cache", 'data'),
+         State(f"{page}-panel-tables", 'data')],
+        prevent_initial_call=True
+    )
+
+    properties = [prop for panel in panels for prop in _panel_outputs(panel)]
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='cache', function_name='apply'),
+        [Output(component_id, prop, allow_duplicate=True) for component_id, prop in properties],
+        Input(f"{page}-cache-hit", 'data'),
+        prevent_initial_call=True
+    )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='cache', function_name='store'),
+        Output(f"{page}-result-cache", 'data'),
+        [Input(component_id, prop) for component_id, prop in properties],
+        [State(f"{page}-filter-key", 'data'),
+         State(f"{page}-result-cache", 'data')],
+        prevent_initial_call=True
+    )
+
+
+def _register_panel(app, page: PageSpec, panel: Panel):
+    """Зарегистрировать callback'и одной панели с собственной обработкой ошибок
+
+    В режиме предпросмотра первый callback отдает оценку по выборке и запрашивает точный
+    результат, второй строит его и заменяет предпросмотр.
+    """
+    is_figure = panel.prop == 'figure'
+
+    outputs = [Output(component_id, prop) for component_id, prop in _panel_outputs(panel)]
+    states = []
+    if is_figure:
+        states.append(State(signature_store_id(panel.output_id), 'data'))
+
+    refresh_id = refresh_store_id(panel.output_id)
+    refine_id = refine_store_id(panel.output_id)
+
+    def build(values: list, exact: bool, signatures: tuple) -> Tuple[list, bool]:
+        """Значения выходов панели и признак предпросмотра (exact - без предпросмотра)"""
+        sampled = False
+        try:
+            params = page.resolve(page.params)(*values)
+            if page.preview_queries and params.get('preview') and not exact:
+                value, sampled = render_preview(page, panel, params)
+            else:
+                value = render_panel(page, panel, dict(params, preview=False) if exact else params)
+        except Exception as e:
+            logger.error(f"Error rendering panel {panel.output_id}: {e}")
+            value = mark_error(page.resolve(page.error_chart)() if is_figure else create_error_message())
+
+        if not is_figure:
+            return [value], sampled
+
+        update, signature = build_figure_update(value, signatures[0])
+        return [update, signature], sampled
+
+    @app.callback(outputs + [Output(refine_id, 'data')],
+                  [Input(filter_state_id(page.name), 'data'), Input(refresh_id, 'data')], states)
+    def update_panel(filter_state, refresh, *signatures):
+        # Обновление после изменения данных приходит с текущими значениями фильтров
+        request = refresh if ctx.triggered_id == refresh_id else filter_state
+        if not request:
+            raise PreventUpdate
+
+        values, sampled = build(request['values'], False, signatures)
+        return values + [{'values': request['values']} if sampled else no_update]
+
+    @app.callback([Output(component_id, prop, allow_duplicate=True) for component_id, prop in _panel_outputs(panel)],
+                  Input(refine_id, 'data'), [State(f"{page.name}-filter-key", 'data')] + states,
+                  prevent_initial_call=True)
+    def refine_panel(refine, filter_key, *signatures):
+        # Фильтры успели измениться (ключ - значения фильтров и версия данных) - точный
+        # результат для прежних значений уже не нужен
+        if not refine or (filter_key and json.loads(filter_key)[0] != refine['values']):
+            raise PreventUpdate
+
+        values, _ = build(refine['values'], True, signatures)
+        return values
+
+    return update_panel
+
+
+def create_error_message() -> html.Div:
+    """Сообщение об ошибке загрузки данных для нефигурных панелей"""
+    return html.Div("Ошибка загрузки данных", className="text-danger")
@@ -0,0 +1,127 @@
+"""
+Предварительный расчет панелей страницы, на которую пользователь, вероятно, перейдет
+"""
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify, request
+
+from config import config
+from src.components.panels import PageSpec, render_panel, render_preview
+from src.components.pages.registry import get_page_spec
+from src.database.scheduler import WARMUP, AdmissionRejected, db_priority
+
+logger = logging.getLogger(__name__)
+
+# Насколько понижается приоритет потоков предзагрузки (nice, только Linux)
+PREFETCH_NICENESS = 10
+
+# Входы, общие для всех страниц: остальные фильтры страницы берутся из layout (значения по умолчанию)
+SHARED_INPUTS = {
+    ('date-range', 'start_date'): 'start_date',
+    ('date-range', 'end_date'): 'end_date',
+}
+
+
+def _lower_priority():
+    """Понизить приоритет потока предзагрузки, чтобы он не мешал интерактивным запросам"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PREFETCH_NICENESS)
+    except (AttributeError, OSError) as e:
+        logger.debug(f"Failed to lower prefetch thread priority: {e}")
+
+
+class Prefetcher:
+    """Очередь предзагрузки страниц с фоновыми потоками низкого приоритета"""
+
+    def __init__(self, workers: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='prefetch',
+            initializer=_lower_priority
+        )
+        self._pending = set()
+        self._defaults = {}
+        self._lock = threading.Lock()
+
+    def layout_defaults(self, page: PageSpec) -> list:
+        """Значения входов страницы в ее layout - то, что отправит браузер при первом открытии"""
+        with self._lock:
+            defaults = self._defaults.get(page.name)
+        if defaults is None:
+            components = {
+                component.id: component for component in page.resolve(page.layout)()._traverse()
+                if isinstance(getattr(component, 'id', None), str)
+            }
+            defaults = [
+                getattr(components.get(page_input.component_id), page_input.component_property, None)
+                for page_input in page.inputs
+            ]
+            with self._lock:
+                self._defaults[page.name] = defaults
+        return defaults
+
+    def filter_values(self, page: PageSpec, shared: dict) -> list:
+        """Значения фильтров страницы: общий диапазон дат и значения по умолчанию из layout для остальных"""
+        values = []
+        for page_input, default in zip(page.inputs, self.layout_defaults(page)):
+            name = SHARED_INPUTS.get((page_input.component_id, page_input.component_property))
+            values.append(shared.get(name) if name else default)
+        return values
+
+    def submit(self, page: PageSpec, shared: dict) -> bool:
+        """Поставить расчет панелей страницы в очередь; False, если он уже выполняется"""
+        # Остальные фильтры берутся по умолчанию: очередь различает страницы по общим входам
+        shared = {name: shared.get(name) for name in SHARED_INPUTS.values()}
+        key = (page.name, json.dumps(shared, sort_keys=True, default=str))
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+        self._executor.submit(self._run, page, shared, key)
+        return True
+
+    def _run(self, page: PageSpec, shared: dict, key: tuple):
+        try:
+            # Предзагрузка - прогрев кэша: при нагрузке на интерактивные запросы она отклоняется
+            with db_priority(WARMUP):
+                params = page.resolve(page.params)(*self.filter_values(page, shared))
+                for panel in page.panels:
+                    # Те же расчеты, что запросит страница: предпросмотр, затем точный результат
+                    if page.preview_queries and params.get('preview'):
+                        render_preview(page, panel, params)
+                        render_panel(page, panel, dict(params, preview=False))
+                    else:
+                        render_panel(page, panel, params)
+            logger.info(f"Prefetched page {page.name}")
+        except AdmissionRejected as e:
+            logger.info(f"Prefetch of page {page.name} skipped: {e}")
+        except Exception as e:
+            logger.warning(f"Failed to prefetch page {page.name}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+
+def init_prefetch(server, prefetcher: 'Prefetcher') -> 'Prefetcher':
+    """Подключить маршрут предзагрузки страниц к Flask серверу"""
+
+    @server.route('/_malinka/prefetch', methods=['POST'])
+    def prefetch_page():
+        """Рассчитать панели страницы заранее с текущим диапазоном дат"""
+        body = request.get_json(silent=True) or {}
+        if not config.prefetch_enabled or not body.get('start_date') or not body.get('end_date'):
+            return jsonify({'queued': False}), 202
+
+        page = get_page_spec(body.get('path'))
+        queued = prefetcher.submit(page, body)
+        return jsonify({'page': page.name, 'queued': queued}), 202
+
+    return prefetcher
+
+
+# Глобальная очередь предзагрузки
+prefetcher = Prefetcher(config.prefetch_workers)
@@ -0,0 +1,140 @@
+"""
+Фоновый поиск аномалий в ключевых дневных метриках
+
+Один цикл на процесс раз в интервал запрашивает только новые завершенные дни и
+передает их онлайн-детектору (src/utils/anomalies.py): состояние обновляется за O(1)
+на день и метрику. Найденные аномалии пишутся в лог и доступны по /_malinka/anomalies.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from flask import jsonify
+
+from config import config
+from src.database.queries.common import DAILY_METRICS_QUERY
+from src.database.scheduler import BACKGROUND, db_priority
+
+logger = logging.getLogger(__name__)
+
+# Метрики (столбцы DAILY_METRICS_QUERY), за которыми следит детектор
+ANOMALY_METRICS = ('revenue', 'orders', 'tickets', 'ad_spend', 'ctr')
+# История для набора статистики при первом запуске (дни)
+ANOMALY_HISTORY_DAYS = 90
+# Сколько последних аномалий хранится для отчета
+ANOMALY_ALERTS_MAXLEN = 200
+
+
+class AnomalyMonitor:
+    """Онлайн-детектор по дневным метрикам и журнал найденных аномалий"""
+
+    def __init__(self, interval_s: int):
+        self.interval = interval_s
+        self.detector = None
+        self.last_date = None
+        self.alerts = deque(maxlen=ANOMALY_ALERTS_MAXLEN)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def check(self) -> List[Dict[str, Any]]:
+        """Обработать завершенные дни после последнего учтенного и вернуть новые аномалии"""
+        # numpy и слой БД загружаются при первой проверке
+        from src.database.connection import db_manager
+        from src.utils.anomalies import OnlineAnomalyDetector
+
+        until = date.today() - timedelta(days=1)
+        with self._lock:
+            if self.detector is None:
+                self.detector = OnlineAnomalyDetector(ANOMALY_METRICS)
+            last_date = self.last_date
+        initial = last_date is None
+        since = until - timedelta(days=ANOMALY_HISTORY_DAYS - 1) if initial else last_date + timedelta(days=1)
+        if since > until:
+            return []
+
+        # Запрос выполняется без блокировки: отчет доступен, пока идет чтение дней
+        with db_priority(BACKGROUND):
+            data = db_manager.execute_query(DAILY_METRICS_QUERY, {
+                'since': since.isoformat(), 'until': until.isoformat()
+            })
+        if data.empty:
+            return []
+
+        with self._lock:
+            if self.last_date != last_date:
+                # Эти дни уже учла параллельная проверка
+                return []
+
+            found = []
+            values = data[list(ANOMALY_METRICS)].to_numpy(dtype=float)
+            # Цикл только по новым дням (обычно один); метрики обрабатываются одной векторной операцией
+            for day, row in zip(data['date'], values):
+                scores, flags = self.detector.update(row)
+                for index in flags.nonzero()[0]:
+                    found.append({
+                        'date': str(day),
+                        'metric': ANOMALY_METRICS[index],
+                        'value': float(row[index]),
+                        'expected': float(self.detector.expected[index]),
+                        'score': round(float(scores[index]), 2),
+                    })
+            self.last_date = until
+            self.alerts.extend(found)
+
+        # История первого запуска только набирает статистику и попадает в отчет без предупреждений
+        if not initial:
+            for alert in found:
+                logger.warning(
+                    f"Anomaly in {alert['metric']} on {alert['date']}: "
+                    f"{alert['value']:.2f} (expected {alert['expected']:.2f}, score {alert['score']})"
+                )
+        return found
+
+    def report(self) -> Dict[str, Any]:
+        """Последние найденные аномалии"""
+        with self._lock:
+            return {
+                'last_date': self.last_date.isoformat() if self.last_date else None,
+                'alerts': list(self.alerts),
+            }
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning(f"Anomaly check failed: {e}")
+            time.sleep(self.interval)
+
+    def start(self):
+        """Запустить фоновую проверку (один раз на процесс)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='anomaly-monitor', daemon=True)
+        self._thread.start()
+
+
+def init_anomaly_alerts(server, monitor: AnomalyMonitor) -> AnomalyMonitor:
+    """Подключить отчет об аномалиях к Flask серверу и запустить проверку при первом запросе"""
+    state = {'started': False}
+
+    @server.before_request
+    def start_on_first_request():
+        if config.anomaly_alerts_enabled and not state['started']:
+            state['started'] = True
+            monitor.start()
+
+    @server.route('/_malinka/anomalies')
+    def anomalies_report():
+        """Аномалии в дневных метриках, найденные фоновой проверкой"""
+        return jsonify(monitor.report())
+
+    return monitor
+
+
+# Глобальный монитор аномалий
+anomaly_monitor = AnomalyMonitor(config.anomaly_check_interval)
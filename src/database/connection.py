@@ -1,17 +1,36 @@
+import json
 import logging
+import re
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import URL
 from sqlalchemy.exc import SQLAlchemyError
 from contextlib import contextmanager
+from typing import Iterator
 import pandas as pd
 
 from config import config
+from src.database.failures import QueryFailed, mark_failed, query_failed, record_query_failure
+from src.database.scheduler import current_priority, db_scheduler
+from src.utils.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Имена параметров запроса (:name, но не приведение типа ::date)
+BIND_PARAM_PATTERN = re.compile(r'(?<![:\w]):(\w+)')
+
+
+def query_key(query: str, params: dict = None) -> str:
+    """Нормализованный ключ запроса: текст без лишних пробелов и только используемые параметры"""
+    normalized = ' '.join(query.split())
+    used = {name: value for name, value in (params or {}).items()
+            if name in set(BIND_PARAM_PATTERN.findall(normalized))}
+    return normalized + '|' + json.dumps(used, sort_keys=True, default=str)
+
 class DatabaseManager:
     def __init__(self):
         self.engine = None
+        # Одинаковые одновременные запросы выполняются в базе один раз
+        self.single_flight = SingleFlight()
         self._connect()
     
     def _connect(self):
@@ -20,8 +39,8 @@ class DatabaseManager:
             database_url = config.get_database_url()
             self.engine = create_engine(
                 database_url,
-                pool_size=10,
-                max_overflow=20,
+                pool_size=config.db.pool_size,
+                max_overflow=config.db.max_overflow,
                 pool_pre_ping=True,
                 echo=config.app.debug
             )
@@ -50,21 +69,66 @@ class DatabaseManager:
             if connection:
                 connection.close()
     
-    def execute_query(self, query: str, params: dict = None) -> pd.DataFrame:
-        """Выполнить SQL запрос и вернуть DataFrame"""
+    def execute_query(self, query: str, params: dict = None, strict: bool = False) -> pd.DataFrame:
+        """Выполнить SQL запрос и вернуть DataFrame
+
+        Одновременные вызовы с тем же запросом, параметрами и классом приоритета ждут
+        одно выполнение и получают копию его результата. Запросы низкого приоритета
+        могут быть отклонены планировщиком (AdmissionRejected). При ошибке запроса -
+        пустой DataFrame с пометкой (query_failed), а при strict - исключение QueryFailed.
+        """
+        priority = current_priority()
         try:
-            with self.get_connection() as conn:
-                # Для PostgreSQL используем правильный формат параметров
-                if params:
-                    result = pd.read_sql(text(query), conn, params=params)
-                else:
-                    result = pd.read_sql(text(query), conn)
-                return result
-        except Exception as e:
-            logger.error(f"Query execution failed: {e}")
-            logger.error(f"Query: {query}")
-            logger.error(f"Params: {params}")
-            return pd.DataFrame()
+            result, shared = self.single_flight.do(
+                (priority, query_key(query, params)),
+                lambda: self._execute_query(query, params, priority)
+            )
+        except Exception:
+            # Отказ планировщика: вызывающий код может заменить его пустым результатом
+            record_query_failure()
+            raise
+        if query_failed(result):
+            record_query_failure()
+            if strict:
+                raise QueryFailed("Query execution failed")
+        return result.copy() if shared else result
+    
+    def _execute_query(self, query: str, params: dict = None, priority: str = None) -> pd.DataFrame:
+        """Выполнить SQL запрос в базе данных после допуска планировщиком"""
+        with db_scheduler.slot(priority):
+            try:
+                with self.get_connection() as conn:
+                    # Для PostgreSQL используем правильный формат параметров
+                    if params:
+                        result = pd.read_sql(text(query), conn, params=params)
+                    else:
+                        result = pd.read_sql(text(query), conn)
+                    return result
+            except Exception as e:
+                logger.error(f"Query execution failed: {e}")
+                logger.error(f"Query: {query}")
+                logger.error(f"Params: {params}")
+                return mark_failed(pd.DataFrame())
+    
+    def iter_query(self, query: str, params: dict = None, chunksize: int = 100000) -> Iterator[pd.DataFrame]:
+        """Выполнить SQL запрос и читать результат частями по chunksize строк
+
+        Строки передаются через курсор на стороне сервера, поэтому в памяти одновременно
+        находится не больше одной части. Результат не разделяется с другими вызовами;
+        ошибка записывается в лог и пробрасывается, чтобы неполный результат не был
+        принят за полный.
+        """
+        with db_scheduler.slot(current_priority()):
+            try:
+                with self.get_connection() as conn:
+                    conn = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+                    yield from pd.read_sql(text(query), conn, params=params or {}, chunksize=chunksize)
+            except Exception as e:
+                logger.error(f"Streaming query failed: {e}")
+                logger.error(f"Query: {query}")
+                logger.error(f"Params: {params}")
+                record_query_failure()
+                raise
     
     def test_connection(self) -> bool:
         """Проверить подключение к базе данных"""
@@ -0,0 +1,58 @@
+"""
+Учет ошибок запросов к базе
+
+DatabaseManager.execute_query при ошибке возвращает пустой DataFrame с пометкой (страницы
+показывают «Нет данных» вместо исключения). Пометка отличает такой результат от
+действительно пустого: результаты построения панели с ошибкой не кэшируются, а
+инкрементальные расчеты (витрины, когорты, прогнозы) не принимают его за отсутствие строк.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+FAILED_ATTR = 'query_failed'
+
+_failures: ContextVar = ContextVar('query_failures', default=None)
+
+
+class QueryFailed(Exception):
+    """Запрос к базе завершился ошибкой (для вызовов, которым пустой результат не подходит)"""
+
+
+class QueryFailures:
+    """Число запросов с ошибкой в пределах блока track_query_failures"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __bool__(self) -> bool:
+        return self.count > 0
+
+
+@contextmanager
+def track_query_failures() -> Iterator[QueryFailures]:
+    """Считать ошибки запросов, выполненных в блоке (в том же потоке или контексте)"""
+    failures = QueryFailures()
+    token = _failures.set(failures)
+    try:
+        yield failures
+    finally:
+        _failures.reset(token)
+
+
+def record_query_failure():
+    """Учесть ошибку запроса в текущем блоке track_query_failures (если он есть)"""
+    failures: Optional[QueryFailures] = _failures.get()
+    if failures is not None:
+        failures.count += 1
+
+
+def mark_failed(frame: Any) -> Any:
+    """Пометить пустой результат как результат запроса с ошибкой"""
+    frame.attrs[FAILED_ATTR] = True
+    return frame
+
+
+def query_failed(frame: Any) -> bool:
+    """Получен ли результат запроса с ошибкой"""
+    return bool(getattr(frame, 'attrs', {}).get(FAILED_ATTR))
@@ -25,10 +25,10 @@ GROUP BY campaign_name
 ORDER BY roi DESC
 """
 
-# Динамика рекламных показателей
+# Динамика рекламных показателей (шаг агрегации :granularity - day/week/month)
 AD_TREND_QUERY = """
 SELECT 
-    date,
+    DATE_TRUNC(:granularity, date)::date as date,
     SUM(revenue) as daily_revenue,
     SUM(spend) as daily_spend,
     SUM(clicks) as daily_clicks,
@@ -36,7 +36,7 @@ SELECT
 FROM ad_revenue
 WHERE date BETWEEN :start_date AND :end_date
     AND (:campaign IS NULL OR campaign_name = :campaign)
-GROUP BY date
+GROUP BY 1
 ORDER BY date
 """
 
@@ -116,4 +116,92 @@ GROUP BY campaign_name
 HAVING SUM(impressions) > 1000
 ORDER BY ctr DESC
 LIMIT 10
-"""
\ No newline at end of file
+"""
+
+# KPI рекламы за период и за предыдущий период такой же длины (один проход по union-диапазону)
+ADVERTISING_KPI_QUERY = """
+WITH campaigns AS (
+    SELECT 
+        campaign_name,
+        COUNT(*) FILTER (WHERE date BETWEEN :start_date AND :end_date) as rows_count,
+        SUM(revenue) FILTER (WHERE date BETWEEN :start_date AND :end_date) as revenue,
+        SUM(spend) FILTER (WHERE date BETWEEN :start_date AND :end_date) as spend,
+        SUM(clicks) FILTER (WHERE date BETWEEN :start_date AND :end_date) as clicks,
+        SUM(impressions) FILTER (WHERE date BETWEEN :start_date AND :end_date) as impressions,
+        COUNT(*) FILTER (WHERE date BETWEEN :prev_start_date AND :prev_end_date) as prev_rows_count,
+        SUM(revenue) FILTER (WHERE date BETWEEN :prev_start_date AND :prev_end_date) as prev_revenue,
+        SUM(spend) FILTER (WHERE date BETWEEN :prev_start_date AND :prev_end_date) as prev_spend,
+        SUM(clicks) FILTER (WHERE date BETWEEN :prev_start_date AND :prev_end_date) as prev_clicks,
+        SUM(impressions) FILTER (WHERE date BETWEEN :prev_start_date AND :prev_end_date) as prev_impressions
+    FROM ad_revenue
+    WHERE date BETWEEN :prev_start_date AND :end_date
+        AND (:campaign IS NULL OR campaign_name = :campaign)
+    GROUP BY campaign_name
+)
+SELECT 
+    SUM(revenue) as total_revenue,
+    SUM(spend) as total_spend,
+    AVG(CASE WHEN spend > 0 THEN (revenue - spend) / spend ELSE 0 END) FILTER (WHERE rows_count > 0) as avg_roi,
+    AVG(CASE WHEN impressions > 0 THEN clicks * 100.0 / impressions ELSE 0 END) FILTER (WHERE rows_count > 0) as avg_ctr,
+    SUM(prev_revenue) as prev_total_revenue,
+    SUM(prev_spend) as prev_total_spend,
+    AVG(CASE WHEN prev_spend > 0 THEN (prev_revenue - prev_spend) / prev_spend ELSE 0 END) FILTER (WHERE prev_rows_count > 0) as prev_avg_roi,
+    AVG(CASE WHEN prev_impressions > 0 THEN prev_clicks * 100.0 / prev_impressions ELSE 0 END) FILTER (WHERE prev_rows_count > 0) as prev_avg_ctr
+FROM campaigns
+"""
+
+# Выручка по дням в разрезе кампаний (для поиска сезонности и аномалий по всем кампаниям)
+CAMPAIGN_DAILY_REVENUE_QUERY = """
+SELECT 
+    date::date as date,
+    campaign_name as series,
+    SUM(revenue) as revenue
+FROM ad_revenue
+WHERE date BETWEEN :history_start AND :history_end
+    AND (:campaign IS NULL OR campaign_name = :campaign)
+GROUP BY 1, 2
+"""
+
+# Заказы по дням и каналам сессий клиента в день покупки после последней учтенной транзакции (скетчи конверсии каналов)
+CHANNEL_ORDERS_SKETCH_QUERY = """
+SELECT
+    s.transaction_date::date AS day,
+    t.channel,
+    s.transaction_id,
+    MAX(s.transaction_id) AS last_id
+FROM sales s
+JOIN traffic t
+    ON t.customer_id = s.customer_id
+   AND t.session_start::date = s.transaction_date::date
+WHERE s.transaction_id > :last_id
+GROUP BY 1, 2, 3;
+"""
+
+# Рекламная выручка, расходы и клики товаров по дням, кампаниям и категориям начиная с дня :since (сводки товаров)
+PRODUCT_AD_SKETCH_QUERY = """
+SELECT
+    ar.date::date AS day,
+    ar.campaign_name AS campaign,
+    p.category,
+    p.product_id,
+    p.product_name,
+    SUM(ar.revenue) AS total_revenue,
+    SUM(ar.spend) AS total_spend,
+    SUM(ar.clicks) AS total_clicks
+FROM ad_revenue ar
+JOIN products p ON ar.product_id = p.product_id
+WHERE (:since IS NULL OR ar.date >= CAST(:since AS date))
+GROUP BY 1, 2, 3, 4, 5;
+"""
+
+# Показы и клики кампаний по дням начиная с дня :since (сводки кампаний для CTR)
+CAMPAIGN_CTR_SKETCH_QUERY = """
+SELECT
+    date::date AS day,
+    campaign_name,
+    SUM(impressions) AS total_impressions,
+    SUM(clicks) AS total_clicks
+FROM ad_revenue
+WHERE (:since IS NULL OR date >= CAST(:since AS date))
+GROUP BY 1, 2;
+"""
@@ -2,26 +2,30 @@
 SQL запросы для бизнес-аналитики и продаж
 """
 
-# Основные KPI метрики
+# Основные KPI метрики за период и за предыдущий период такой же длины (один проход по union-диапазону)
 KPI_QUERY = """
 SELECT 
-    COUNT(DISTINCT s.transaction_id) as total_orders,
-    SUM(s.quantity * p.price) as total_revenue,
-    COUNT(DISTINCT r.return_id) as total_returns,
-    AVG(s.quantity * p.price) as avg_order_value
+    COUNT(DISTINCT s.transaction_id) FILTER (WHERE s.transaction_date BETWEEN :start_date AND :end_date) as total_orders,
+    SUM(s.quantity * p.price) FILTER (WHERE s.transaction_date BETWEEN :start_date AND :end_date) as total_revenue,
+    COUNT(DISTINCT r.return_id) FILTER (WHERE s.transaction_date BETWEEN :start_date AND :end_date) as total_returns,
+    AVG(s.quantity * p.price) FILTER (WHERE s.transaction_date BETWEEN :start_date AND :end_date) as avg_order_value,
+    COUNT(DISTINCT s.transaction_id) FILTER (WHERE s.transaction_date BETWEEN :prev_start_date AND :prev_end_date) as prev_total_orders,
+    SUM(s.quantity * p.price) FILTER (WHERE s.transaction_date BETWEEN :prev_start_date AND :prev_end_date) as prev_total_revenue,
+    COUNT(DISTINCT r.return_id) FILTER (WHERE s.transaction_date BETWEEN :prev_start_date AND :prev_end_date) as prev_total_returns,
+    AVG(s.quantity * p.price) FILTER (WHERE s.transaction_date BETWEEN :prev_start_date AND :prev_end_date) as prev_avg_order_value
 FROM sales s
 JOIN products p ON s.product_id = p.product_id
 LEFT JOIN returns r ON s.transaction_id = r.transaction_id
 JOIN suppliers sup ON p.supplier_id = sup.supplier_id
-WHERE s.transaction_date BETWEEN :start_date AND :end_date
+WHERE s.transaction_date BETWEEN :prev_start_date AND :end_date
     AND (:category IS NULL OR p.category = :category)
     AND (:supplier IS NULL OR sup.supplier_name = :supplier)
 """
 
-# Динамика продаж
+# Динамика продаж (шаг агрегации :granularity - day/week/month)
 SALES_TREND_QUERY = """
 SELECT 
-    DATE(s.transaction_date) as date,
+    DATE_TRUNC(:granularity, s.transaction_date)::date as date,
     COUNT(DISTINCT s.transaction_id) as orders_count,
     SUM(s.quantity * p.price) as daily_revenue
 FROM sales s
@@ -30,7 +34,7 @@ JOIN suppliers sup ON p.supplier_id = sup.supplier_id
 WHERE s.transaction_date BETWEEN :start_date AND :end_date
     AND (:category IS NULL OR p.category = :category)
     AND (:supplier IS NULL OR sup.supplier_name = :supplier)
-GROUP BY DATE(s.transaction_date)
+GROUP BY 1
 ORDER BY date
 """
 
@@ -125,4 +129,186 @@ WHERE s.transaction_date BETWEEN :start_date AND :end_date
 GROUP BY p.product_id, p.product_name, p.category
 ORDER BY total_revenue DESC
 LIMIT 10
-"""
\ No newline at end of file
+"""
+
+# Прирост продаж по дням после последней учтенной транзакции (live-режим KPI)
+LIVE_SALES_DELTA_QUERY = """
+SELECT 
+    s.transaction_date::date as date,
+    COUNT(DISTINCT s.transaction_id) as orders_count,
+    COUNT(*) as lines_count,
+    SUM(s.quantity * p.price) as revenue,
+    MAX(s.transaction_id) as last_transaction_id
+FROM sales s
+JOIN products p ON s.product_id = p.product_id
+JOIN suppliers sup ON p.supplier_id = sup.supplier_id
+WHERE s.transaction_id > :last_transaction_id
+    AND s.transaction_date BETWEEN :start_date AND :end_date
+    AND (:category IS NULL OR p.category = :category)
+    AND (:supplier IS NULL OR sup.supplier_name = :supplier)
+GROUP BY 1
+"""
+
+# Прирост возвратов после последнего учтенного возврата (live-режим KPI)
+LIVE_RETURNS_DELTA_QUERY = """
+SELECT 
+    COUNT(DISTINCT r.return_id) as returns_count,
+    MAX(r.return_id) as last_return_id
+FROM returns r
+JOIN sales s ON s.transaction_id = r.transaction_id
+JOIN products p ON s.product_id = p.product_id
+JOIN suppliers sup ON p.supplier_id = sup.supplier_id
+WHERE r.return_id > :last_return_id
+    AND s.transaction_date BETWEEN :start_date AND :end_date
+    AND (:category IS NULL OR p.category = :category)
+    AND (:supplier IS NULL OR sup.supplier_name = :supplier)
+"""
+
+# Итоги предыдущего периода для изменений KPI в live-режиме (период завершен: перечитывается при полном пересчете)
+LIVE_PREVIOUS_KPI_QUERY = """
+SELECT 
+    COUNT(DISTINCT s.transaction_id) as prev_total_orders,
+    SUM(s.quantity * p.price) as prev_total_revenue,
+    COUNT(DISTINCT r.return_id) as prev_total_returns,
+    AVG(s.quantity * p.price) as prev_avg_order_value
+FROM sales s
+JOIN products p ON s.product_id = p.product_id
+LEFT JOIN returns r ON s.transaction_id = r.transaction_id
+JOIN suppliers sup ON p.supplier_id = sup.supplier_id
+WHERE s.transaction_date BETWEEN :prev_start_date AND :prev_end_date
+    AND (:category IS NULL OR p.category = :category)
+    AND (:supplier IS NULL OR sup.supplier_name = :supplier)
+"""
+
+# Выручка по дням в разрезе ряда (категория, поставщик или товар) для прогнозирования
+DAILY_SERIES_REVENUE_QUERY = """
+SELECT 
+    s.transaction_date::date as date,
+    {series} as series,
+    SUM(s.quantity * p.price) as revenue
+FROM sales s
+JOIN products p ON s.product_id = p.product_id
+JOIN suppliers sup ON p.supplier_id = sup.supplier_id
+WHERE s.transaction_date BETWEEN :history_start AND :history_end
+    AND (:category IS NULL OR p.category = :category)
+    AND (:supplier IS NULL OR sup.supplier_name = :supplier)
+GROUP BY 1, 2
+"""
+
+# Готовые запросы выручки по дням для каждого разреза прогноза
+DAILY_REVENUE_BY_SERIES_QUERIES = {
+    'category': DAILY_SERIES_REVENUE_QUERY.format(series='p.category'),
+    'supplier': DAILY_SERIES_REVENUE_QUERY.format(series='sup.supplier_name'),
+    'product': DAILY_SERIES_REVENUE_QUERY.format(series='p.product_name'),
+}
+
+# Суммы KPI за период и за предыдущий период без подсчета уникальных (заказы и возвраты берутся из скетчей HyperLogLog)
+KPI_TOTALS_QUERY = """
+SELECT 
+    SUM(s.quantity * p.price) FILTER (WHERE s.transaction_date BETWEEN :start_date AND :end_date) as total_revenue,
+    AVG(s.quantity * p.price) FILTER (WHERE s.transaction_date BETWEEN :start_date AND :end_date) as avg_order_value,
+    SUM(s.quantity * p.price) FILTER (WHERE s.transaction_date BETWEEN :prev_start_date AND :prev_end_date) as prev_total_revenue,
+    AVG(s.quantity * p.price) FILTER (WHERE s.transaction_date BETWEEN :prev_start_date AND :prev_end_date) as prev_avg_order_value
+FROM sales s
+JOIN products p ON s.product_id = p.product_id
+JOIN suppliers sup ON p.supplier_id = sup.supplier_id
+WHERE s.transaction_date BETWEEN :prev_start_date AND :end_date
+    AND (:category IS NULL OR p.category = :category)
+    AND (:supplier IS NULL OR sup.supplier_name = :supplier)
+"""
+
+# Заказы по дням, категориям и поставщикам после последней учтенной транзакции (скетчи уникальных заказов)
+ORDERS_SKETCH_QUERY = """
+SELECT
+    s.transaction_date::date AS day,
+    p.category,
+    sup.supplier_name AS supplier,
+    s.transaction_id,
+    MAX(s.transaction_id) AS last_id
+FROM sales s
+JOIN products p ON s.product_id = p.product_id
+JOIN suppliers sup ON p.supplier_id = sup.supplier_id
+WHERE s.transaction_id > :last_id
+GROUP BY 1, 2, 3, 4;
+"""
+
+# Возвраты по дням продажи, категориям и поставщикам после последнего учтенного возврата (скетчи уникальных возвратов)
+RETURNS_SKETCH_QUERY = """
+SELECT
+    s.transaction_date::date AS day,
+    p.category,
+    sup.supplier_name AS supplier,
+    r.return_id,
+    MAX(r.return_id) AS last_id
+FROM returns r
+JOIN sales s ON s.transaction_id = r.transaction_id
+JOIN products p ON s.product_id = p.product_id
+JOIN suppliers sup ON p.supplier_id = sup.supplier_id
+WHERE r.return_id > :last_id
+GROUP BY 1, 2, 3, 4;
+"""
+
+# Стоимость позиций заказов по дням, категориям и поставщикам после последней учтенной транзакции (скетчи квантилей)
+ORDER_VALUE_SKETCH_QUERY = """
+SELECT
+    s.transaction_date::date AS day,
+    p.category,
+    sup.supplier_name AS supplier,
+    s.quantity * p.price AS value,
+    s.transaction_id AS last_id
+FROM sales s
+JOIN products p ON s.product_id = p.product_id
+JOIN suppliers sup ON p.supplier_id = sup.supplier_id
+WHERE s.transaction_id > :last_id;
+"""
+
+# Точные p50/p90/p99 стоимости позиций заказов по категориям (пока скетчи квантилей не построены)
+ORDER_VALUE_PERCENTILES_QUERY = """
+SELECT
+    p.category,
+    COUNT(*) AS count,
+    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY s.quantity * p.price) AS p50,
+    PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY s.quantity * p.price) AS p90,
+    PERCENTILE_CONT(0.99) WITHIN GROUP (ORDER BY s.quantity * p.price) AS p99
+FROM sales s
+JOIN products p ON s.product_id = p.product_id
+JOIN suppliers sup ON p.supplier_id = sup.supplier_id
+WHERE s.transaction_date BETWEEN :start_date AND :end_date
+    AND (:category IS NULL OR p.category = :category)
+    AND (:supplier IS NULL OR sup.supplier_name = :supplier)
+GROUP BY p.category
+ORDER BY p50 DESC
+"""
+
+# Выручка и продажи товаров по дням, категориям и поставщикам начиная с дня :since (сводки топ товаров)
+TOP_PRODUCTS_SKETCH_QUERY = """
+SELECT
+    s.transaction_date::date AS day,
+    p.category,
+    sup.supplier_name AS supplier,
+    p.product_id,
+    p.product_name,
+    SUM(s.quantity * p.price) AS total_revenue,
+    COUNT(s.transaction_id) AS sales_count
+FROM sales s
+JOIN products p ON s.product_id = p.product_id
+JOIN suppliers sup ON p.supplier_id = sup.supplier_id
+WHERE (:since IS NULL OR s.transaction_date >= CAST(:since AS date))
+GROUP BY 1, 2, 3, 4, 5;
+"""
+
+# Выручка и заказы поставщиков по дням и категориям начиная с дня :since (сводки топ поставщиков)
+SUPPLIER_SKETCH_QUERY = """
+SELECT
+    sa.transaction_date::date AS day,
+    p.category,
+    s.supplier_name,
+    AVG(s.rating) AS supplier_rating,
+    SUM(sa.quantity * p.price) AS total_revenue,
+    COUNT(DISTINCT sa.transaction_id) AS orders_count
+FROM sales sa
+JOIN products p ON sa.product_id = p.product_id
+JOIN suppliers s ON p.supplier_id = s.supplier_id
+WHERE (:since IS NULL OR sa.transaction_date >= CAST(:since AS date))
+GROUP BY 1, 2, 3;
+"""
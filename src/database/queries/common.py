@@ -40,4 +40,56 @@ SELECT DISTINCT supplier_name
 FROM suppliers 
 WHERE supplier_name IS NOT NULL 
 ORDER BY supplier_name
-"""
\ No newline at end of file
+"""
+
+# Счетчики изменений таблиц из статистики PostgreSQL (без сканирования самих таблиц)
+TABLE_CHANGES_QUERY = """
+SELECT 
+    relname AS table_name,
+    n_tup_ins + n_tup_upd + n_tup_del AS changes
+FROM pg_stat_user_tables
+"""
+
+# Ключевые метрики по дням для фонового поиска аномалий (дни без данных - нули, CTR - NULL)
+DAILY_METRICS_QUERY = """
+WITH days AS (
+    SELECT generate_series(CAST(:since AS date), CAST(:until AS date), INTERVAL '1 day')::date AS date
+),
+sales_daily AS (
+    SELECT 
+        s.transaction_date::date AS date,
+        SUM(s.quantity * p.price) AS revenue,
+        COUNT(DISTINCT s.transaction_id) AS orders
+    FROM sales s
+    JOIN products p ON s.product_id = p.product_id
+    WHERE s.transaction_date >= CAST(:since AS date) AND s.transaction_date < CAST(:until AS date) + 1
+    GROUP BY 1
+),
+tickets_daily AS (
+    SELECT support_date::date AS date, COUNT(ticket_id) AS tickets
+    FROM customer_support
+    WHERE support_date >= CAST(:since AS date) AND support_date < CAST(:until AS date) + 1
+    GROUP BY 1
+),
+ads_daily AS (
+    SELECT 
+        date::date AS date,
+        SUM(spend) AS ad_spend,
+        CASE WHEN SUM(impressions) > 0 THEN SUM(clicks) * 100.0 / SUM(impressions) END AS ctr
+    FROM ad_revenue
+    WHERE date >= CAST(:since AS date) AND date < CAST(:until AS date) + 1
+    GROUP BY 1
+)
+SELECT 
+    d.date,
+    COALESCE(sd.revenue, 0) AS revenue,
+    COALESCE(sd.orders, 0) AS orders,
+    COALESCE(td.tickets, 0) AS tickets,
+    COALESCE(ad.ad_spend, 0) AS ad_spend,
+    ad.ctr
+FROM days d
+LEFT JOIN sales_daily sd ON sd.date = d.date
+LEFT JOIN tickets_daily td ON td.date = d.date
+LEFT JOIN ads_daily ad ON ad.date = d.date
+ORDER BY d.date
+"""
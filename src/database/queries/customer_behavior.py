@@ -163,4 +163,182 @@ SELECT
 FROM customer_orders
 GROUP BY loyalty_level
 ORDER BY customers_count DESC;
-"""
\ No newline at end of file
+"""
+
+# KPI клиентов за период и за предыдущий период такой же длины (события и продажи читаются одним проходом)
+CUSTOMER_KPI_QUERY = """
+WITH filtered_users AS (
+    SELECT DISTINCT us.customer_id
+    FROM user_segments us
+    LEFT JOIN sales s ON us.customer_id = s.customer_id
+    LEFT JOIN products p ON s.product_id = p.product_id
+    LEFT JOIN suppliers sp ON p.supplier_id = sp.supplier_id
+    WHERE (:segment IS NULL OR us.segment = :segment)
+      AND (:region IS NULL OR us.region = :region)
+      AND (:supplier IS NULL OR sp.supplier_name = :supplier)
+),
+events_kpi AS (
+    SELECT
+        COUNT(*) FILTER (WHERE e.event_type = 'view' AND e.event_timestamp BETWEEN :start_date AND :end_date) AS views,
+        COUNT(*) FILTER (WHERE e.event_type = 'purchase' AND e.event_timestamp BETWEEN :start_date AND :end_date) AS purchases,
+        COUNT(*) FILTER (WHERE e.event_type = 'view' AND e.event_timestamp BETWEEN :prev_start_date AND :prev_end_date) AS prev_views,
+        COUNT(*) FILTER (WHERE e.event_type = 'purchase' AND e.event_timestamp BETWEEN :prev_start_date AND :prev_end_date) AS prev_purchases
+    FROM events e
+    JOIN filtered_users u ON e.customer_id = u.customer_id
+    WHERE e.event_timestamp BETWEEN :prev_start_date AND :end_date
+),
+orders_kpi AS (
+    SELECT
+        COUNT(DISTINCT s.transaction_id) FILTER (WHERE s.transaction_date BETWEEN :start_date AND :end_date) AS total_orders,
+        COUNT(DISTINCT s.customer_id) FILTER (WHERE s.transaction_date BETWEEN :start_date AND :end_date) AS active_users,
+        COUNT(DISTINCT s.transaction_id) FILTER (WHERE s.transaction_date BETWEEN :prev_start_date AND :prev_end_date) AS prev_total_orders,
+        COUNT(DISTINCT s.customer_id) FILTER (WHERE s.transaction_date BETWEEN :prev_start_date AND :prev_end_date) AS prev_active_users
+    FROM sales s
+    JOIN user_segments us ON s.customer_id = us.customer_id
+    JOIN products p ON s.product_id = p.product_id
+    JOIN suppliers sp ON p.supplier_id = sp.supplier_id
+    WHERE s.transaction_date BETWEEN :prev_start_date AND :end_date
+      AND (:segment IS NULL OR us.segment = :segment)
+      AND (:region IS NULL OR us.region = :region)
+      AND (:supplier IS NULL OR sp.supplier_name = :supplier)
+)
+SELECT
+    (SELECT COUNT(*) FROM filtered_users) AS total_users,
+    ev.views, ev.purchases, ev.prev_views, ev.prev_purchases,
+    o.total_orders, o.active_users, o.prev_total_orders, o.prev_active_users
+FROM events_kpi ev
+CROSS JOIN orders_kpi o;
+"""
+
+# Выручка клиентов по месяцам (одна строка на клиента и месяц с покупками) для когортного анализа
+CUSTOMER_MONTHLY_SALES_QUERY = """
+SELECT
+    s.customer_id,
+    DATE_TRUNC('month', s.transaction_date)::date AS month,
+    SUM(s.quantity * p.price) AS revenue
+FROM sales s
+JOIN products p ON s.product_id = p.product_id
+JOIN suppliers sp ON p.supplier_id = sp.supplier_id
+WHERE (:since IS NULL OR s.transaction_date >= CAST(:since AS date))
+  AND s.transaction_date < CAST(:until AS date)
+  AND (:supplier IS NULL OR sp.supplier_name = :supplier)
+  AND (:segment IS NULL OR s.customer_id IN (
+        SELECT customer_id FROM user_segments WHERE segment = :segment
+      ))
+  AND (:region IS NULL OR s.customer_id IN (
+        SELECT customer_id FROM user_segments WHERE region = :region
+      ))
+GROUP BY 1, 2;
+"""
+
+# Клиенты с сегментом и регионом (справочник витрины признаков клиентов)
+CUSTOMER_ATTRIBUTES_QUERY = """
+SELECT customer_id, segment, region
+FROM user_segments;
+"""
+
+# Продажи по клиентам и дням после последней учтенной транзакции (витрина признаков клиентов)
+CUSTOMER_SALES_DELTA_QUERY = """
+SELECT
+    s.customer_id,
+    s.transaction_date::date AS day,
+    COUNT(DISTINCT s.transaction_id) AS orders,
+    COUNT(*) AS lines,
+    SUM(s.quantity * p.price) AS revenue,
+    MAX(s.transaction_id) AS last_id
+FROM sales s
+JOIN products p ON s.product_id = p.product_id
+WHERE s.transaction_id > :last_id
+GROUP BY 1, 2;
+"""
+
+# Возвраты по клиентам и дням продажи после последнего учтенного возврата (витрина признаков клиентов)
+CUSTOMER_RETURNS_DELTA_QUERY = """
+SELECT
+    s.customer_id,
+    s.transaction_date::date AS day,
+    COUNT(DISTINCT r.return_id) AS returns,
+    MAX(r.return_id) AS last_id
+FROM returns r
+JOIN sales s ON s.transaction_id = r.transaction_id
+WHERE r.return_id > :last_id
+GROUP BY 1, 2;
+"""
+
+# Обращения в поддержку по клиентам и дням после последнего учтенного обращения (витрина признаков клиентов)
+CUSTOMER_TICKETS_DELTA_QUERY = """
+SELECT
+    customer_id,
+    support_date::date AS day,
+    COUNT(ticket_id) AS tickets,
+    MAX(ticket_id) AS last_id
+FROM customer_support
+WHERE ticket_id > :last_id
+GROUP BY 1, 2;
+"""
+
+# События шагов воронки по клиентам в порядке (клиент, время) для потокового расчета упорядоченной воронки
+EVENTS_ORDERED_QUERY = """
+WITH filtered_users AS (
+    SELECT DISTINCT us.customer_id
+    FROM user_segments us
+    LEFT JOIN sales s ON us.customer_id = s.customer_id
+    LEFT JOIN products p ON s.product_id = p.product_id
+    LEFT JOIN suppliers sp ON p.supplier_id = sp.supplier_id
+    WHERE (:segment IS NULL OR us.segment = :segment)
+      AND (:region IS NULL OR us.region = :region)
+      AND (:supplier IS NULL OR sp.supplier_name = :supplier)
+)
+SELECT
+    e.customer_id,
+    EXTRACT(EPOCH FROM e.event_timestamp) AS ts,
+    array_position(CAST(:event_types AS text[]), e.event_type::text) - 1 AS step
+FROM events e
+JOIN filtered_users u ON e.customer_id = u.customer_id
+WHERE e.event_timestamp BETWEEN :start_date AND :end_date
+  AND e.event_type::text = ANY(CAST(:event_types AS text[]))
+ORDER BY e.customer_id, e.event_timestamp;
+"""
+
+# Число клиентов по сегментам без учета продаж (сегментация без фильтра поставщика)
+SEGMENT_SIZES_QUERY = """
+SELECT
+    us.segment,
+    COUNT(DISTINCT us.customer_id) AS users_count
+FROM user_segments us
+WHERE (:segment IS NULL OR us.segment = :segment)
+  AND (:region IS NULL OR us.region = :region)
+GROUP BY us.segment;
+"""
+
+# Покупатели по дням, сегментам, регионам и поставщикам после последней учтенной транзакции (скетчи уникальных клиентов)
+BUYERS_SKETCH_QUERY = """
+SELECT
+    s.transaction_date::date AS day,
+    us.segment,
+    us.region,
+    sp.supplier_name AS supplier,
+    s.customer_id,
+    MAX(s.transaction_id) AS last_id
+FROM sales s
+JOIN user_segments us ON us.customer_id = s.customer_id
+JOIN products p ON s.product_id = p.product_id
+JOIN suppliers sp ON p.supplier_id = sp.supplier_id
+WHERE s.transaction_id > :last_id
+GROUP BY 1, 2, 3, 4, 5;
+"""
+
+# Сессии по дням, каналам, сегментам и регионам после последней учтенной сессии (скетчи сессий и уникальных посетителей)
+SESSIONS_SKETCH_QUERY = """
+SELECT
+    t.session_start::date AS day,
+    t.channel,
+    us.segment,
+    us.region,
+    t.traffic_id,
+    t.customer_id,
+    t.traffic_id AS last_id
+FROM traffic t
+LEFT JOIN user_segments us ON us.customer_id = t.customer_id
+WHERE t.traffic_id > :last_id;
+"""
@@ -16,10 +16,10 @@ GROUP BY issue_type
 ORDER BY tickets_count DESC
 """
 
-# Динамика обращений
+# Динамика обращений (шаг агрегации :granularity - day/week/month)
 SUPPORT_TREND_QUERY = """
 SELECT 
-    DATE(support_date) AS date,
+    DATE_TRUNC(:granularity, support_date)::date AS date,
     COUNT(ticket_id) AS daily_tickets,
     AVG(resolution_time_minutes) AS avg_resolution_time
 FROM customer_support
@@ -31,7 +31,7 @@ WHERE support_date BETWEEN :start_date AND :end_date
   AND (:region = 'all' OR customer_id IN (
         SELECT customer_id FROM user_segments WHERE region = :region
       ))
-GROUP BY DATE(support_date)
+GROUP BY 1
 ORDER BY date
 """
 
@@ -124,4 +124,132 @@ WHERE cs.support_date BETWEEN :start_date AND :end_date
   AND (:region = 'all' OR us.region = :region)
 GROUP BY us.region
 ORDER BY tickets_count DESC
-"""
\ No newline at end of file
+"""
+
+# KPI поддержки за период и за предыдущий период такой же длины (один проход по union-диапазону)
+SERVICE_KPI_QUERY = """
+WITH tickets AS (
+    SELECT 
+        cs.issue_type,
+        cs.ticket_id,
+        cs.customer_id,
+        cs.resolution_time_minutes,
+        cs.resolved,
+        cs.support_date BETWEEN :start_date AND :end_date AS is_current,
+        cs.support_date BETWEEN :prev_start_date AND :prev_end_date AS is_previous
+    FROM customer_support cs
+    WHERE cs.support_date BETWEEN :prev_start_date AND :end_date
+      AND (:issue_type = 'all' OR cs.issue_type = :issue_type)
+),
+issue_metrics AS (
+    SELECT 
+        issue_type,
+        COUNT(ticket_id) FILTER (WHERE is_current) AS tickets_count,
+        AVG(resolution_time_minutes) FILTER (WHERE is_current) AS avg_resolution_time,
+        COUNT(*) FILTER (WHERE is_current AND resolved) * 100.0 / NULLIF(COUNT(*) FILTER (WHERE is_current), 0) AS resolution_rate,
+        COUNT(ticket_id) FILTER (WHERE is_previous) AS prev_tickets_count,
+        AVG(resolution_time_minutes) FILTER (WHERE is_previous) AS prev_avg_resolution_time,
+        COUNT(*) FILTER (WHERE is_previous AND resolved) * 100.0 / NULLIF(COUNT(*) FILTER (WHERE is_previous), 0) AS prev_resolution_rate
+    FROM tickets
+    GROUP BY issue_type
+),
+period_returns AS (
+    SELECT 
+        r.return_id,
+        r.customer_id,
+        s.transaction_date BETWEEN :start_date AND :end_date AS is_current,
+        s.transaction_date BETWEEN :prev_start_date AND :prev_end_date AS is_previous
+    FROM returns r
+    JOIN sales s ON s.transaction_id = r.transaction_id
+    WHERE s.transaction_date BETWEEN :prev_start_date AND :end_date
+),
+returns_metrics AS (
+    SELECT 
+        COUNT(DISTINCT (t.issue_type, pr.return_id)) FILTER (WHERE t.is_current AND pr.is_current) AS returns_count,
+        COUNT(DISTINCT (t.issue_type, pr.return_id)) FILTER (WHERE t.is_previous AND pr.is_previous) AS prev_returns_count
+    FROM tickets t
+    JOIN period_returns pr ON pr.customer_id = t.customer_id
+    WHERE (:segment = 'all' OR t.customer_id IN (
+            SELECT customer_id FROM user_segments WHERE segment = :segment
+          ))
+      AND (:region = 'all' OR t.customer_id IN (
+            SELECT customer_id FROM user_segments WHERE region = :region
+          ))
+)
+SELECT 
+    SUM(m.tickets_count) AS total_tickets,
+    AVG(m.avg_resolution_time) AS avg_resolution_time,
+    AVG(m.resolution_rate) AS resolution_rate,
+    MAX(rm.returns_count) AS returns_count,
+    SUM(m.prev_tickets_count) AS prev_total_tickets,
+    AVG(m.prev_avg_resolution_time) AS prev_avg_resolution_time,
+    AVG(m.prev_resolution_rate) AS prev_resolution_rate,
+    MAX(rm.prev_returns_count) AS prev_returns_count
+FROM issue_metrics m
+CROSS JOIN returns_metrics rm
+"""
+
+# Время решения обращений по дням, типам, сегментам и регионам после последнего учтенного обращения (скетчи квантилей)
+RESOLUTION_TIME_SKETCH_QUERY = """
+SELECT
+    cs.support_date::date AS day,
+    cs.issue_type,
+    us.segment,
+    us.region,
+    cs.resolution_time_minutes AS value,
+    cs.ticket_id AS last_id
+FROM customer_support cs
+LEFT JOIN user_segments us ON us.customer_id = cs.customer_id
+WHERE cs.ticket_id > :last_id;
+"""
+
+# Точные p50/p90/p99 времени решения по типам обращений (пока скетчи квантилей не построены)
+RESOLUTION_PERCENTILES_QUERY = """
+SELECT
+    issue_type,
+    COUNT(*) AS count,
+    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY resolution_time_minutes) AS p50,
+    PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY resolution_time_minutes) AS p90,
+    PERCENTILE_CONT(0.99) WITHIN GROUP (ORDER BY resolution_time_minutes) AS p99
+FROM customer_support
+WHERE support_date BETWEEN :start_date AND :end_date
+  AND resolution_time_minutes IS NOT NULL
+  AND (:issue_type = 'all' OR issue_type = :issue_type)
+  AND (:segment = 'all' OR customer_id IN (
+        SELECT customer_id FROM user_segments WHERE segment = :segment
+      ))
+  AND (:region = 'all' OR customer_id IN (
+        SELECT customer_id FROM user_segments WHERE region = :region
+      ))
+GROUP BY issue_type
+ORDER BY p90 DESC
+"""
+
+# Точные p50/p90/p99 времени решения за период и за предыдущий период (KPI, пока скетчи не построены)
+RESOLUTION_PERCENTILE_KPI_QUERY = """
+SELECT
+    COUNT(*) FILTER (WHERE support_date BETWEEN :start_date AND :end_date) AS count,
+    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY resolution_time_minutes)
+        FILTER (WHERE support_date BETWEEN :start_date AND :end_date) AS p50,
+    PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY resolution_time_minutes)
+        FILTER (WHERE support_date BETWEEN :start_date AND :end_date) AS p90,
+    PERCENTILE_CONT(0.99) WITHIN GROUP (ORDER BY resolution_time_minutes)
+        FILTER (WHERE support_date BETWEEN :start_date AND :end_date) AS p99,
+    COUNT(*) FILTER (WHERE support_date BETWEEN :prev_start_date AND :prev_end_date) AS prev_count,
+    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY resolution_time_minutes)
+        FILTER (WHERE support_date BETWEEN :prev_start_date AND :prev_end_date) AS prev_p50,
+    PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY resolution_time_minutes)
+        FILTER (WHERE support_date BETWEEN :prev_start_date AND :prev_end_date) AS prev_p90,
+    PERCENTILE_CONT(0.99) WITHIN GROUP (ORDER BY resolution_time_minutes)
+        FILTER (WHERE support_date BETWEEN :prev_start_date AND :prev_end_date) AS prev_p99
+FROM customer_support
+WHERE support_date BETWEEN COALESCE(CAST(:prev_start_date AS date), CAST(:start_date AS date)) AND :end_date
+  AND resolution_time_minutes IS NOT NULL
+  AND (:issue_type = 'all' OR issue_type = :issue_type)
+  AND (:segment = 'all' OR customer_id IN (
+        SELECT customer_id FROM user_segments WHERE segment = :segment
+      ))
+  AND (:region = 'all' OR customer_id IN (
+        SELECT customer_id FROM user_segments WHERE region = :region
+      ))
+"""
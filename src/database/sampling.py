@@ -0,0 +1,110 @@
+"""
+Приближенное выполнение агрегирующих запросов по выборке блоков таблиц (TABLESAMPLE SYSTEM)
+
+Запрос выполняется config.preview_replicates раз на независимых выборках блоков (разные
+REPEATABLE), вместе - около config.preview_sample_percent процентов блоков. Суммы и
+количества каждой выборки масштабируются на обратную долю выборки; оценка - среднее по
+выборкам, 95% доверительный интервал - по разбросу между ними (t-распределение). Разброс
+между выборками блоков учитывает и похожесть строк внутри одного блока, которую не
+учитывает формула дисперсии для простой случайной выборки строк.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import config
+
+# Квантили t-распределения уровня 0.975 по числу степеней свободы
+T_975 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228}
+
+# Слова, которые после имени таблицы в FROM не являются ее псевдонимом
+_NOT_ALIAS = r'(?!(?:WHERE|JOIN|LEFT|RIGHT|INNER|FULL|CROSS|ON|GROUP|ORDER|LIMIT|TABLESAMPLE)\b)'
+
+
+@dataclass(frozen=True)
+class SampleSpec:
+    """Как выполнять запрос по выборке
+
+    tables - таблицы, чтение которых в FROM заменяется выборкой (JOIN не затрагиваются:
+    выборка обеих сторон соединения дает квадрат доли); keys - столбцы групп результата;
+    scaled - суммы и количества, которые масштабируются на долю выборки (остальные
+    числовые столбцы - средние и отношения - только усредняются по выборкам).
+    """
+    tables: Tuple[str, ...]
+    keys: Tuple[str, ...] = ()
+    scaled: Tuple[str, ...] = ()
+    order_by: Optional[str] = None
+    ascending: bool = True
+
+
+def sampled_query(query: str, tables: Sequence[str]) -> str:
+    """Запрос с выборкой блоков (параметры :sample_percent и :sample_seed) для таблиц tables в FROM"""
+    pattern = re.compile(
+        r'\bFROM\s+(?:' + '|'.join(map(re.escape, tables)) + r')\b(?:\s+(?:AS\s+)?' + _NOT_ALIAS + r'\w+)?',
+        re.IGNORECASE
+    )
+    result, count = pattern.subn(
+        lambda match: f"{match.group(0)} TABLESAMPLE SYSTEM (:sample_percent) REPEATABLE (:sample_seed)", query
+    )
+    if not count:
+        raise ValueError(f"Query does not read {', '.join(tables)} in FROM")
+    return result
+
+
+def use_preview(enabled: Any, start_date: Any, end_date: Any) -> bool:
+    """Показывать ли предпросмотр: переключатель включен и период не короче config.preview_min_days"""
+    if enabled is not True or not config.preview_enabled:
+        return False
+    if start_date is None or end_date is None:
+        return True
+    days = (date.fromisoformat(str(end_date)[:10]) - date.fromisoformat(str(start_date)[:10])).days
+    return days >= config.preview_min_days
+
+
+def combine_replicates(frames: List[pd.DataFrame], spec: SampleSpec, scale: float) -> pd.DataFrame:
+    """Оценки по результатам выборок: среднее и полуширина 95% интервала (столбцы <имя>_ci)"""
+    data = pd.concat([frame.assign(_replicate=index) for index, frame in enumerate(frames)], ignore_index=True)
+    keys = list(spec.keys)
+    if not keys:
+        keys = ['_group']
+        data['_group'] = 0
+    values = [column for column in data.columns if column not in keys and column != '_replicate']
+    if data.empty:
+        return data[[column for column in data.columns if column not in ('_group', '_replicate')]]
+
+    data[values] = data[values].apply(pd.to_numeric, errors='coerce')
+    scaled = [column for column in spec.scaled if column in values]
+    data[scaled] = data[scaled] * scale
+
+    wide = data.set_index(keys + ['_replicate'])[values].unstack('_replicate')
+    result = pd.DataFrame(index=wide.index)
+    for column in values:
+        matrix = wide[column].reindex(columns=range(len(frames)))
+        if column in scaled:
+            # Группа не попала в выборку - ее вклад в сумму этой выборки нулевой
+            matrix = matrix.fillna(0)
+        count = matrix.count(axis=1)
+        t = count.map(lambda n: T_975.get(n - 1, 1.96 + 2.36 / max(n - 1, 1)))
+        result[column] = matrix.mean(axis=1)
+        result[f'{column}_ci'] = t * matrix.std(axis=1, ddof=1) / np.sqrt(count)
+
+    result = result.reset_index().drop(columns=['_group'], errors='ignore')
+    if spec.order_by:
+        result = result.sort_values(spec.order_by, ascending=spec.ascending, ignore_index=True)
+    return result
+
+
+def estimate_query(query: str, spec: SampleSpec, params: Dict[str, Any]) -> pd.DataFrame:
+    """Оценка результата запроса по выборкам блоков с доверительными интервалами"""
+    from src.database.connection import db_manager
+
+    replicates = max(config.preview_replicates, 2)
+    percent = config.preview_sample_percent / replicates
+    sql = sampled_query(query, spec.tables)
+    frames = [db_manager.execute_query(sql, dict(params, sample_percent=percent, sample_seed=seed))
+              for seed in range(1, replicates + 1)]
+    return combine_replicates(frames, spec, 100.0 / percent)
@@ -0,0 +1,223 @@
+"""
+Допуск запросов к пулу соединений с учетом приоритета
+
+Классы работы (по убыванию приоритета):
+- interactive - callback'и, вызванные действиями пользователя;
+- export - выгрузки, запущенные пользователем (долгие, ограничены по числу);
+- background - фоновые обновления (проверка изменений данных, справочники фильтров), откладываются при нагрузке;
+- warmup - предзагрузка и прогрев кэшей, отклоняются при нагрузке.
+
+Класс задается контекстом вызова (db_priority), по умолчанию - interactive.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List
+
+from flask import jsonify
+
+from config import config
+
+INTERACTIVE = 'interactive'
+EXPORT = 'export'
+BACKGROUND = 'background'
+WARMUP = 'warmup'
+
+PRIORITY_ORDER = (INTERACTIVE, EXPORT, BACKGROUND, WARMUP)
+
+# Классы, которые при нагрузке на интерактивные запросы ждут или отклоняются
+DEFERRABLE = (BACKGROUND,)
+SHEDDABLE = (WARMUP,)
+
+# Сглаживание времени ожидания интерактивных запросов и размер окна для перцентилей
+WAIT_EWMA_ALPHA = 0.2
+WAIT_SAMPLES = 500
+
+# Как часто отложенные запросы перепроверяют нагрузку (секунды)
+DEFER_RECHECK_S = 0.5
+
+_current_priority: ContextVar = ContextVar('db_priority', default=INTERACTIVE)
+
+
+class AdmissionRejected(Exception):
+    """Запрос низкого приоритета отклонен из-за нагрузки на интерактивные запросы"""
+
+
+@contextmanager
+def db_priority(priority: str):
+    """Выполнять запросы к базе внутри блока с заданным классом приоритета"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> str:
+    """Класс приоритета текущего контекста"""
+    return _current_priority.get()
+
+
+class _Ticket:
+    __slots__ = ('enqueued',)
+
+    def __init__(self, enqueued: float):
+        self.enqueued = enqueued
+
+
+class _ClassStats:
+    """Метрики одного класса: допуски, отказы и время ожидания в очереди"""
+
+    def __init__(self):
+        self.admitted = 0
+        self.rejected = 0
+        self.deferred = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+
+    def record_wait(self, wait: float):
+        self.admitted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.waits.append(wait)
+
+
+class AdmissionScheduler:
+    """Очередь к пулу соединений с классами приоритета и лимитами параллельности"""
+
+    def __init__(self, total_slots: int, limits: Dict[str, int], pressure_wait_ms: int,
+                 pressure_window_s: int, max_defer_s: int):
+        self.total_slots = total_slots
+        self.limits = {cls: min(limits[cls], total_slots) for cls in PRIORITY_ORDER}
+        self.pressure_wait = pressure_wait_ms / 1000
+        self.pressure_window = pressure_window_s
+        self.max_defer = max_defer_s
+
+        self._cond = threading.Condition()
+        self._active = {cls: 0 for cls in PRIORITY_ORDER}
+        self._waiting = {cls: deque() for cls in PRIORITY_ORDER}
+        self._stats = {cls: _ClassStats() for cls in PRIORITY_ORDER}
+        self._interactive_wait = 0.0
+        self._last_interactive = 0.0
+
+    def _under_pressure(self, now: float) -> bool:
+        """Интерактивные запросы ждут в очереди или недавно ждали дольше порога"""
+        if self._waiting[INTERACTIVE]:
+            return True
+        return (now - self._last_interactive < self.pressure_window
+                and self._interactive_wait > self.pressure_wait)
+
+    def _can_admit(self, cls: str, ticket: _Ticket, now: float) -> bool:
+        if sum(self._active.values()) >= self.total_slots or self._active[cls] >= self.limits[cls]:
+            return False
+        # Внутри класса - по очереди, более приоритетные классы обслуживаются первыми
+        if self._waiting[cls][0] is not ticket:
+            return False
+        for higher in PRIORITY_ORDER[:PRIORITY_ORDER.index(cls)]:
+            if self._waiting[higher] and self._active[higher] < self.limits[higher]:
+                return False
+        if cls in DEFERRABLE and now - ticket.enqueued < self.max_defer and self._under_pressure(now):
+            return False
+        return True
+
+    @contextmanager
+    def slot(self, priority: str = None):
+        """Дождаться допуска к пулу соединений для класса priority (по умолчанию - из контекста)"""
+        cls = priority or current_priority()
+        stats = self._stats[cls]
+        enqueued = time.monotonic()
+
+        with self._cond:
+            if cls in SHEDDABLE and self._under_pressure(enqueued):
+                stats.rejected += 1
+                raise AdmissionRejected(f"{cls} query rejected: interactive queries are waiting")
+
+            ticket = _Ticket(enqueued)
+            self._waiting[cls].append(ticket)
+            deferred = False
+            try:
+                while not self._can_admit(cls, ticket, time.monotonic()):
+                    if cls in DEFERRABLE:
+                        deferred = deferred or self._under_pressure(time.monotonic())
+                        self._cond.wait(DEFER_RECHECK_S)
+                    else:
+                        self._cond.wait()
+            except BaseException:
+                self._waiting[cls].remove(ticket)
+                self._cond.notify_all()
+                raise
+
+            self._waiting[cls].popleft()
+            self._active[cls] += 1
+            admitted = time.monotonic()
+            wait = admitted - enqueued
+            stats.record_wait(wait)
+            stats.deferred += int(deferred)
+            if cls == INTERACTIVE:
+                self._interactive_wait += WAIT_EWMA_ALPHA * (wait - self._interactive_wait)
+                self._last_interactive = admitted
+            # Следующий в очереди класса мог стать первым
+            self._cond.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active[cls] -= 1
+                self._cond.notify_all()
+
+    def report(self) -> Dict[str, Any]:
+        """Состояние очередей и метрики ожидания по классам"""
+        with self._cond:
+            now = time.monotonic()
+            classes: List[Dict[str, Any]] = []
+            for cls in PRIORITY_ORDER:
+                stats = self._stats[cls]
+                waits = sorted(stats.waits)
+                classes.append({
+                    'class': cls,
+                    'limit': self.limits[cls],
+                    'active': self._active[cls],
+                    'waiting': len(self._waiting[cls]),
+                    'admitted': stats.admitted,
+                    'deferred': stats.deferred,
+                    'rejected': stats.rejected,
+                    'avg_wait_ms': round(stats.total_wait / stats.admitted * 1000, 1) if stats.admitted else 0.0,
+                    'p95_wait_ms': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else 0.0,
+                    'max_wait_ms': round(stats.max_wait * 1000, 1),
+                })
+            return {
+                'total_slots': self.total_slots,
+                'under_pressure': self._under_pressure(now),
+                'interactive_wait_ewma_ms': round(self._interactive_wait * 1000, 1),
+                'classes': classes,
+            }
+
+
+def init_scheduler_report(server, scheduler: AdmissionScheduler) -> AdmissionScheduler:
+    """Подключить отчет об очередях к базе к Flask серверу"""
+
+    @server.route('/_malinka/db-scheduler')
+    def db_scheduler_report():
+        """Очереди к пулу соединений и время ожидания по классам приоритета"""
+        return jsonify(scheduler.report())
+
+    return scheduler
+
+
+# Глобальный планировщик: слотов столько же, сколько соединений в пуле
+db_scheduler = AdmissionScheduler(
+    total_slots=config.db.pool_size + config.db.max_overflow,
+    limits={
+        INTERACTIVE: config.scheduler.interactive_limit,
+        EXPORT: config.scheduler.export_limit,
+        BACKGROUND: config.scheduler.background_limit,
+        WARMUP: config.scheduler.warmup_limit,
+    },
+    pressure_wait_ms=config.scheduler.pressure_wait_ms,
+    pressure_window_s=config.scheduler.pressure_window_s,
+    max_defer_s=config.scheduler.max_defer_s
+)
@@ -0,0 +1,171 @@
+"""
+Отслеживание изменений данных и рассылка уведомлений клиентам (Server-Sent Events)
+
+Один фоновый цикл на процесс проверяет счетчики изменений таблиц и увеличивает
+версии изменившихся таблиц. Подключенные вкладки получают событие и обновляют только
+панели, построенные по этим таблицам, вместо опроса сервера каждой вкладкой.
+
+Каждый открытый поток событий занимает поток сервера (нужен многопоточный или gevent
+воркер, см. README), поэтому число подписчиков ограничено config.events_max_subscribers:
+остальные вкладки раз в config.data_refresh_interval опрашивают /_malinka/version.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import Response, jsonify
+
+from config import config
+from src.database.queries.common import TABLE_CHANGES_QUERY
+from src.database.scheduler import BACKGROUND, db_priority
+
+logger = logging.getLogger(__name__)
+
+# Сколько событий может ждать отправки одному клиенту (медленные клиенты получают последнее)
+SUBSCRIBER_QUEUE_SIZE = 8
+
+
+class DataWatcher:
+    """Версии данных по таблицам и подписчики на их изменения"""
+
+    def __init__(self, interval_s: int):
+        self.interval = interval_s
+        self.version = 0
+        self._tables: Dict[str, int] = {}
+        self._changes: Dict[str, int] = {}
+        self._subscribers: List[queue.Queue] = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Текущая версия данных и версии таблиц"""
+        with self._lock:
+            return {'version': self.version, 'tables': dict(self._tables)}
+
+    def versions_key(self, tables: Iterable[str]) -> str:
+        """Ключ версий заданных таблиц (для ключей кэша результатов)"""
+        with self._lock:
+            return ','.join(f"{table}:{self._tables.get(table, 0)}" for table in sorted(tables))
+
+    def check(self) -> List[str]:
+        """Проверить счетчики изменений таблиц и разослать событие, если данные изменились"""
+        from src.database.connection import db_manager
+
+        with db_priority(BACKGROUND):
+            result = db_manager.execute_query(TABLE_CHANGES_QUERY)
+        if result.empty:
+            return []
+
+        counters = dict(zip(result['table_name'], result['changes'].astype(int)))
+        with self._lock:
+            first_check = not self._changes
+            changed = [table for table, changes in counters.items()
+                       if not first_check and self._changes.get(table) != changes]
+            self._changes = counters
+            if not changed:
+                return []
+            for table in changed:
+                self._tables[table] = self._tables.get(table, 0) + 1
+            self.version += 1
+            event = {'version': self.version, 'tables': dict(self._tables)}
+            subscribers = list(self._subscribers)
+
+        logger.info(f"Data changed in tables: {', '.join(sorted(changed))}")
+        for subscriber in subscribers:
+            _put_latest(subscriber, event)
+        return changed
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning(f"Data change check failed: {e}")
+            time.sleep(self.interval)
+
+    def start(self):
+        """Запустить фоновую проверку изменений (один раз на процесс)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='data-watcher', daemon=True)
+        self._thread.start()
+
+    def subscribe(self, limit: Optional[int] = None) -> Optional[queue.Queue]:
+        """Подписаться на изменения данных (None, если подписчиков уже limit)"""
+        self.start()
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                return None
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        """Отписаться от изменений данных"""
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+
+def _put_latest(subscriber: queue.Queue, event: Dict[str, Any]):
+    """Поставить событие в очередь клиента, вытесняя самое старое при переполнении"""
+    while True:
+        try:
+            subscriber.put_nowait(event)
+            return
+        except queue.Full:
+            try:
+                subscriber.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def _format_event(event: Dict[str, Any]) -> str:
+    return f"event: data-version\ndata: {json.dumps(event)}\n\n"
+
+
+def init_data_events(server, watcher: DataWatcher) -> DataWatcher:
+    """Подключить поток событий об изменении данных к Flask серверу"""
+
+    @server.route('/_malinka/events')
+    def data_events():
+        """Поток Server-Sent Events с версиями данных (503 сверх лимита - вкладка переходит на опрос)"""
+        subscriber = watcher.subscribe(config.events_max_subscribers)
+        if subscriber is None:
+            logger.info("Event stream subscriber limit reached, tab falls back to polling")
+            return Response(status=503, headers={'Retry-After': str(config.data_refresh_interval)})
+
+        def stream():
+            try:
+                yield _format_event(watcher.snapshot())
+                while True:
+                    try:
+                        yield _format_event(subscriber.get(timeout=config.events_heartbeat))
+                    except queue.Empty:
+                        # Комментарий поддерживает соединение через прокси
+                        yield ": keepalive\n\n"
+            finally:
+                watcher.unsubscribe(subscriber)
+
+        return Response(stream(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        })
+
+    @server.route('/_malinka/version')
+    def data_version():
+        """Текущие версии данных (для вкладок без потока событий)"""
+        watcher.start()
+        response = jsonify(watcher.snapshot())
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    return watcher
+
+
+# Глобальный наблюдатель за изменениями данных
+data_watcher = DataWatcher(config.data_refresh_interval)
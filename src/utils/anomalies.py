@@ -0,0 +1,81 @@
+"""
+Онлайн-обнаружение аномалий в дневных метриках
+
+Для каждого ряда хранятся экспоненциально сглаженные уровень, тренд и дисперсия остатков.
+Новая точка обрабатывается за O(1): оценка отклонения от ожидаемого значения и обновление
+состояния. Остатки ограничиваются (по Хьюберу), поэтому выбросы не сдвигают уровень и не
+раздувают дисперсию, а тренд не принимается за аномалию.
+"""
+from typing import Any, Sequence, Tuple
+
+import numpy as np
+
+# Скорость сглаживания уровня/дисперсии и доля ошибки, уходящая в тренд
+ANOMALY_ALPHA = 0.2
+ANOMALY_BETA = 0.1
+# Порог аномалии (в стандартных отклонениях остатка) и граница ограничения остатка при обновлении
+ANOMALY_THRESHOLD = 3.0
+HUBER_K = 2.0
+# Сколько точек ряд набирает статистику, прежде чем начать отмечать аномалии
+ANOMALY_WARMUP = 7
+
+
+class OnlineAnomalyDetector:
+    """Детектор аномалий для набора рядов: одно обновление - одна точка каждого ряда"""
+
+    def __init__(self, names: Sequence[str], alpha: float = ANOMALY_ALPHA, beta: float = ANOMALY_BETA,
+                 threshold: float = ANOMALY_THRESHOLD, warmup: int = ANOMALY_WARMUP):
+        n = len(names)
+        self.names = list(names)
+        self.alpha = alpha
+        self.beta = beta
+        self.threshold = threshold
+        self.warmup = warmup
+        self.level = np.zeros(n)
+        self.trend = np.zeros(n)
+        self.variance = np.zeros(n)
+        self.count = np.zeros(n, dtype=int)
+        # Ожидаемые значения для последней обработанной точки
+        self.expected = np.full(n, np.nan)
+
+    def update(self, values: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """Обработать по точке каждого ряда (NaN - нет данных): оценки отклонения и флаги аномалий"""
+        x = np.asarray(values, dtype=float)
+        observed = ~np.isnan(x)
+        first = observed & (self.count == 0)
+        active = observed & ~first
+
+        self.level = np.where(first, np.nan_to_num(x), self.level)
+        expected = self.level + self.trend
+        residual = np.where(active, x - expected, 0.0)
+        std = np.sqrt(self.variance)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            score = np.where(active & (std > 0), residual / std, 0.0)
+
+        ready = active & (self.count >= self.warmup)
+        flags = ready & (np.abs(score) > self.threshold)
+
+        # После накопления статистики выбросы ограничиваются и слабо влияют на состояние
+        clipped = np.where(ready & (std > 0), np.clip(residual, -HUBER_K * std, HUBER_K * std), residual)
+        self.level = np.where(active, expected + self.alpha * clipped, self.level)
+        self.trend = np.where(active, self.trend + self.alpha * self.beta * clipped, self.trend)
+        self.variance = np.where(active, (1 - self.alpha) * (self.variance + self.alpha * clipped ** 2), self.variance)
+        self.count = self.count + observed
+
+        self.expected = np.where(active, expected, np.nan)
+        return np.where(active, score, np.nan), flags
+
+    def scan(self, values: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """Обработать историю (матрица ряды x точки) по порядку: оценки и флаги для каждой точки"""
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        scores = np.full(values.shape, np.nan)
+        flags = np.zeros(values.shape, dtype=bool)
+        for t in range(values.shape[1]):
+            scores[:, t], flags[:, t] = self.update(values[:, t])
+        return scores, flags
+
+
+def anomaly_flags(values: Any, threshold: float = ANOMALY_THRESHOLD) -> np.ndarray:
+    """Флаги аномалий для одного ряда (по порядку точек)"""
+    _, flags = OnlineAnomalyDetector(['value'], threshold=threshold).scan(np.asarray(values, dtype=float)[None, :])
+    return flags[0]
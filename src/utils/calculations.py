@@ -4,6 +4,9 @@ from typing import Dict, Any, List, Tuple
 from datetime import datetime, timedelta
 import logging
 
+from src.utils.forecasting import fit_holt_winters, forecast_holt_winters
+from src.utils.seasonality import detect_seasonality_batch
+
 logger = logging.getLogger(__name__)
 
 class MetricCalculator:
@@ -58,23 +61,22 @@ class MetricCalculator:
     
     @staticmethod
     def forecast_sales(sales_data: pd.DataFrame, periods: int = 30) -> pd.DataFrame:
-        """Прогнозирование продаж на основе исторических данных"""
+        """Прогнозирование продаж на основе исторических данных (Холт-Уинтерс с недельной сезонностью)"""
         if sales_data.empty:
             return pd.DataFrame()
         
         try:
-            # Простое прогнозирование на основе скользящего среднего
-            sales_data = sales_data.set_index('date')
-            forecast = sales_data['orders_count'].rolling(window=7).mean().iloc[-1]
+            # Дневной ряд без пропусков: дни без заказов - нули
+            history = sales_data.set_index('date')['orders_count'].astype(float)
+            history.index = pd.to_datetime(history.index)
+            history = history.asfreq('D', fill_value=0)
             
-            # Создание прогноза на будущие периоды
-            last_date = sales_data.index.max()
-            forecast_dates = [last_date + timedelta(days=i) for i in range(1, periods + 1)]
-            forecast_values = [forecast * (0.95 + 0.1 * np.random.random()) for _ in range(periods)]
+            state = fit_holt_winters(history.to_numpy()[None, :])
+            forecast, _, _ = forecast_holt_winters(state, periods)
             
             return pd.DataFrame({
-                'date': forecast_dates,
-                'forecast': forecast_values
+                'date': pd.date_range(history.index.max() + timedelta(days=1), periods=periods, freq='D'),
+                'forecast': np.maximum(forecast[0], 0)
             })
         except Exception as e:
             logger.error(f"Error forecasting sales: {e}")
@@ -82,20 +84,24 @@ class MetricCalculator:
     
     @staticmethod
     def detect_seasonality(sales_data: pd.DataFrame) -> Dict[str, Any]:
-        """Обнаружение сезонности в данных о продажах"""
+        """Обнаружение сезонности в данных о продажах (пики и сила недельного и месячного циклов)"""
         if sales_data.empty:
             return {}
         
         try:
-            sales_data = sales_data.set_index('date')
-            weekly_pattern = sales_data['orders_count'].groupby(sales_data.index.dayofweek).mean()
-            monthly_pattern = sales_data['orders_count'].groupby(sales_data.index.day).mean()
+            history = sales_data.set_index('date')['orders_count'].astype(float)
+            history.index = pd.to_datetime(history.index)
+            history = history.asfreq('D', fill_value=0)
+            
+            result = detect_seasonality_batch(history.to_numpy()[None, :], history.index).iloc[0]
             
             return {
-                'weekly_peak_day': weekly_pattern.idxmax(),
-                'weekly_peak_value': weekly_pattern.max(),
-                'monthly_peak_day': monthly_pattern.idxmax(),
-                'monthly_peak_value': monthly_pattern.max()
+                'weekly_peak_day': int(result['weekly_peak_day']),
+                'weekly_peak_value': float(result['weekly_peak_value']),
+                'weekly_strength': float(result['weekly_strength']),
+                'monthly_peak_day': int(result['monthly_peak_day']),
+                'monthly_peak_value': float(result['monthly_peak_value']),
+                'monthly_strength': float(result['monthly_strength'])
             }
         except Exception as e:
             logger.error(f"Error detecting seasonality: {e}")
@@ -0,0 +1,231 @@
+"""
+Когортный анализ: месяц первой покупки x месяцев с первой покупки (удержание и выручка)
+
+Из базы читается только агрегат «клиент x месяц»; когорты строятся на numpy: месяц первой
+покупки - по отсортированному массиву клиентов (lexsort + unique), матрицы - одним bincount
+по плоскому индексу (когорта, возраст). Завершенные месяцы дописываются в состояние приростом,
+текущий месяц досчитывается к копии матриц при каждом обращении. Полная сборка идет в фоне:
+до первой сборки панель пустая и не кэшируется.
+"""
+import copy
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from cachetools import TTLCache
+
+from src.database.failures import QueryFailed, record_query_failure
+from src.database.queries.customer_behavior import CUSTOMER_MONTHLY_SALES_QUERY
+from src.database.scheduler import BACKGROUND, db_priority
+
+logger = logging.getLogger(__name__)
+
+# Полная пересборка раз в интервал: подхватывает исправления прошлых месяцев (секунды)
+COHORT_REBUILD_S = 24 * 3600
+# Сколько наборов фильтров хранит состояние и как долго без обращений
+COHORT_ENGINES_MAXSIZE = 16
+COHORT_ENGINE_TTL = 6 * 3600
+
+
+def month_index(values: Any) -> np.ndarray:
+    """Номера месяцев (с января 1970) для массива дат"""
+    return pd.to_datetime(values).to_numpy(dtype='datetime64[M]').astype(np.int64)
+
+
+def month_start(index: int) -> str:
+    """Первый день месяца по его номеру (ISO)"""
+    return str(np.datetime64(int(index), 'M').astype('datetime64[D]'))
+
+
+def accumulate(active: np.ndarray, revenue: np.ndarray, base: int, cohort: np.ndarray,
+               month: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Добавить строки «клиент x месяц» в матрицы когорта x возраст (новые матрицы, исходные не меняются)"""
+    size = max(active.shape[0], int(month.max()) - base + 1) if len(month) else active.shape[0]
+    active = np.pad(active, ((0, size - active.shape[0]), (0, size - active.shape[1])))
+    revenue = np.pad(revenue, ((0, size - revenue.shape[0]), (0, size - revenue.shape[1])))
+    if len(month):
+        flat = (cohort - base) * size + (month - cohort)
+        active += np.bincount(flat, minlength=size * size).reshape(size, size)
+        revenue += np.bincount(flat, weights=values, minlength=size * size).reshape(size, size)
+    return active, revenue
+
+
+@dataclass
+class CohortMatrix:
+    """Матрицы когорт: строки - месяц первой покупки, столбцы - месяцев с первой покупки"""
+    months: pd.DatetimeIndex
+    active: np.ndarray
+    revenue: np.ndarray
+
+    @property
+    def sizes(self) -> np.ndarray:
+        """Размер когорты - клиенты с покупкой в месяц привлечения"""
+        return self.active[:, 0] if self.active.size else np.zeros(0)
+
+    def retention(self) -> np.ndarray:
+        """Доля клиентов когорты с покупками в каждом месяце (%); будущие месяцы - NaN"""
+        ages = np.arange(self.active.shape[1])
+        observed = ages[None, :] <= (len(self.months) - 1 - np.arange(len(self.months)))[:, None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            retention = self.active / self.sizes[:, None] * 100
+        return np.where(observed & (self.sizes[:, None] > 0), retention, np.nan)
+
+    def between(self, start_date: Any, end_date: Any, max_cohorts: Optional[int] = None) -> 'CohortMatrix':
+        """Когорты, привлеченные в периоде (не больше max_cohorts последних), с возрастом до конца периода"""
+        start, end = month_index([start_date, end_date])
+        first, last = np.searchsorted(self.months.to_numpy(dtype='datetime64[M]').astype(np.int64), [start, end + 1])
+        if max_cohorts:
+            first = max(first, last - max_cohorts)
+        ages = max(last - first, 0)
+        return CohortMatrix(self.months[first:last], self.active[first:last, :ages], self.revenue[first:last, :ages])
+
+
+class CohortEngine:
+    """Состояние когорт для набора фильтров: отсортированный индекс клиентов и накопленные матрицы"""
+
+    def __init__(self, filters: Dict[str, Any]):
+        self.filters = filters
+        self._lock = threading.Lock()
+        self._building = False
+        self.ready = False
+        self._reset()
+
+    def _reset(self):
+        self.customers = np.zeros(0, dtype=np.int64)
+        self.first_month = np.zeros(0, dtype=np.int64)
+        self.base_month: Optional[int] = None
+        self.active = np.zeros((0, 0), dtype=np.int64)
+        self.revenue = np.zeros((0, 0))
+        self.loaded_through: Optional[int] = None
+        self.built_at = float('-inf')
+
+    def _load(self, since: Optional[int], until: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Строки «клиент x месяц» за месяцы since..until (since=None - вся история)"""
+        # Слой БД загружается при первом расчете
+        from src.database.connection import db_manager
+
+        data = db_manager.execute_query(CUSTOMER_MONTHLY_SALES_QUERY, dict(
+            self.filters,
+            since=month_start(since) if since is not None else None,
+            until=month_start(until + 1),
+        ), strict=True)
+        if data.empty:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        return (data['customer_id'].to_numpy(), month_index(data['month']),
+                data['revenue'].to_numpy(dtype=float))
+
+    def _cohorts(self, customer: np.ndarray, month: np.ndarray, commit: bool) -> np.ndarray:
+        """Месяц первой покупки для каждой строки; новых клиентов добавляет в индекс, если commit"""
+        customers, first_month = self.customers, self.first_month
+        pos = np.searchsorted(customers, customer)
+        known = pos < len(customers)
+        known[known] = customers[pos[known]] == customer[known]
+
+        if not known.all():
+            # Первая покупка новых клиентов - самый ранний месяц среди их строк
+            new_customer, new_month = customer[~known], month[~known]
+            order = np.lexsort((new_month, new_customer))
+            unique, first = np.unique(new_customer[order], return_index=True)
+            customers = np.concatenate([customers, unique])
+            first_month = np.concatenate([first_month, new_month[order][first]])
+            order = np.argsort(customers, kind='stable')
+            customers, first_month = customers[order], first_month[order]
+            pos = np.searchsorted(customers, customer)
+
+        if commit:
+            self.customers, self.first_month = customers, first_month
+        return first_month[pos]
+
+    def _apply(self, since: Optional[int], until: int):
+        """Добавить в состояние месяцы since..until; при ошибке запроса (QueryFailed) состояние не меняется"""
+        customer, month, values = self._load(since, until)
+        if len(month) and self.base_month is None:
+            self.base_month = int(month.min())
+        if len(month):
+            cohort = self._cohorts(customer, month, commit=True)
+            self.active, self.revenue = accumulate(self.active, self.revenue, self.base_month, cohort, month, values)
+        self.loaded_through = until
+
+    def _start_build(self, until: int):
+        """Запустить полную сборку в фоновом потоке (не больше одной одновременно)"""
+        if self._building:
+            return
+        self._building = True
+        threading.Thread(target=self._build, args=(until,), name='cohorts', daemon=True).start()
+
+    def _build(self, until: int):
+        """Собрать когорты заново в отдельной копии и подменить ими текущие"""
+        try:
+            fresh = copy.copy(self)
+            fresh._reset()
+            now = time.monotonic()
+            with db_priority(BACKGROUND):
+                fresh._apply(None, until)
+            fresh.built_at = now
+
+            with self._lock:
+                self.customers, self.first_month = fresh.customers, fresh.first_month
+                self.base_month, self.active, self.revenue = fresh.base_month, fresh.active, fresh.revenue
+                self.loaded_through, self.built_at = fresh.loaded_through, fresh.built_at
+                self.ready = True
+            logger.info(f"Cohorts built in {time.monotonic() - now:.1f}s")
+        except Exception as e:
+            logger.warning(f"Cohorts build failed: {e}")
+        finally:
+            self._building = False
+
+    def matrix(self, current_month: int) -> Optional[CohortMatrix]:
+        """Матрицы когорт по текущий месяц включительно (None, пока когорты строятся или при ошибке запроса)"""
+        last_complete = current_month - 1
+        with self._lock:
+            now = time.monotonic()
+            if not self.ready or now - self.built_at >= COHORT_REBUILD_S or last_complete < self.loaded_through:
+                self._start_build(last_complete)
+            if not self.ready:
+                # Пустая панель до окончания первой сборки не кэшируется
+                record_query_failure()
+                return None
+
+            try:
+                if self.loaded_through < last_complete:
+                    self._apply(self.loaded_through + 1, last_complete)
+                # Текущий месяц еще меняется: добавляется к копии матриц
+                customer, month, values = self._load(current_month, current_month)
+            except QueryFailed as e:
+                logger.warning(f"Failed to load cohort months: {e}")
+                return None
+
+            base = self.base_month if self.base_month is not None else (int(month.min()) if len(month) else None)
+            if base is None:
+                return None
+            cohort = self._cohorts(customer, month, commit=False)
+            active, revenue = accumulate(self.active, self.revenue, base, cohort, month, values)
+            # Матрица доводится до текущего месяца, даже если в нем еще нет покупок
+            size = current_month - base + 1
+            active = np.pad(active, ((0, size - active.shape[0]), (0, size - active.shape[1])))
+            revenue = np.pad(revenue, ((0, size - revenue.shape[0]), (0, size - revenue.shape[1])))
+
+        months = pd.DatetimeIndex(np.arange(base, current_month + 1).astype('datetime64[M]').astype('datetime64[ns]'))
+        return CohortMatrix(months, active, revenue)
+
+
+_engines = TTLCache(maxsize=COHORT_ENGINES_MAXSIZE, ttl=COHORT_ENGINE_TTL)
+_engines_lock = threading.Lock()
+
+
+def cohort_matrix(params: Dict[str, Any]) -> Optional[CohortMatrix]:
+    """Когорты по фильтрам сегмента, региона и поставщика (состояние общее для всех вкладок)"""
+    filters = {key: params.get(key) for key in ('segment', 'region', 'supplier')}
+    key = json.dumps(filters, sort_keys=True, default=str)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = CohortEngine(filters)
+        # Обращение продлевает жизнь состояния
+        _engines[key] = engine
+    return engine.matrix(int(month_index([pd.Timestamp.today()])[0]))
@@ -0,0 +1,159 @@
+import gzip
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from flask import jsonify, request
+
+from config import config
+
+try:
+    import brotli
+except ImportError:  # brotli указан в requirements.txt; без него ответы сжимаются только gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Типы содержимого, которые имеет смысл сжимать
+COMPRESSIBLE_MIMETYPES = (
+    'application/json',
+    'application/javascript',
+    'text/javascript',
+    'text/css',
+    'text/html',
+    'text/plain',
+)
+
+DASH_UPDATE_PATH = '_dash-update-component'
+
+
+class PayloadStats:
+    """Статистика размеров ответов по callback'ам"""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, callback_id: str, raw_size: int, sent_size: int, encoding: Optional[str]):
+        """Учесть один ответ callback'а"""
+        with self._lock:
+            stats = self._stats.setdefault(callback_id, {
+                'calls': 0,
+                'raw_bytes': 0,
+                'sent_bytes': 0,
+                'max_raw_bytes': 0,
+                'encodings': {},
+            })
+            stats['calls'] += 1
+            stats['raw_bytes'] += raw_size
+            stats['sent_bytes'] += sent_size
+            stats['max_raw_bytes'] = max(stats['max_raw_bytes'], raw_size)
+            encoding = encoding or 'identity'
+            stats['encodings'][encoding] = stats['encodings'].get(encoding, 0) + 1
+
+    def report(self, bandwidth_kbps: int) -> List[Dict[str, Any]]:
+        """Отчет: средний размер до и после сжатия и оценка времени передачи"""
+        bytes_per_ms = bandwidth_kbps * 1000 / 8 / 1000
+        with self._lock:
+            items = [(callback_id, dict(stats)) for callback_id, stats in self._stats.items()]
+
+        report = []
+        for callback_id, stats in items:
+            avg_raw = stats['raw_bytes'] / stats['calls']
+            avg_sent = stats['sent_bytes'] / stats['calls']
+            report.append({
+                'callback': callback_id,
+                'calls': stats['calls'],
+                'avg_raw_kb': round(avg_raw / 1024, 1),
+                'avg_sent_kb': round(avg_sent / 1024, 1),
+                'max_raw_kb': round(stats['max_raw_bytes'] / 1024, 1),
+                'compression_ratio': round(avg_raw / avg_sent, 2) if avg_sent else 1.0,
+                'transfer_ms_raw': round(avg_raw / bytes_per_ms, 1),
+                'transfer_ms_sent': round(avg_sent / bytes_per_ms, 1),
+                'encodings': stats['encodings'],
+            })
+        return sorted(report, key=lambda item: item['avg_raw_kb'], reverse=True)
+
+    def reset(self):
+        """Сбросить накопленную статистику"""
+        with self._lock:
+            self._stats.clear()
+
+
+def _choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Выбрать кодировку сжатия из поддерживаемых клиентом"""
+    accepted = {item.split(';')[0].strip().lower() for item in accept_encoding.split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    """Сжать тело ответа выбранным алгоритмом"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=config.compression.brotli_quality)
+    return gzip.compress(data, compresslevel=config.compression.level)
+
+
+def _callback_id() -> Optional[str]:
+    """Идентификатор callback'а (его выходы) для запроса обновления Dash"""
+    if not request.path.endswith(DASH_UPDATE_PATH):
+        return None
+    body = request.get_json(silent=True) or {}
+    return body.get('output')
+
+
+def init_compression(server, stats: Optional[PayloadStats] = None) -> PayloadStats:
+    """Подключить сжатие ответов и отчет о размерах ответов callback'ов к Flask серверу"""
+    stats = stats or PayloadStats()
+    if config.compression.enabled and brotli is None:
+        logger.warning("brotli is not installed, responses are compressed with gzip only (pip install brotli)")
+
+    @server.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or not 200 <= response.status_code < 300
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        data = response.get_data()
+        raw_size = len(data)
+        callback_id = _callback_id()
+
+        encoding = None
+        if config.compression.enabled and raw_size >= config.compression.min_size:
+            encoding = _choose_encoding(request.headers.get('Accept-Encoding', ''))
+
+        if encoding:
+            data = _compress(data, encoding)
+            response.set_data(data)
+            response.headers['Content-Encoding'] = encoding
+            response.headers['Content-Length'] = str(len(data))
+            response.vary.add('Accept-Encoding')
+
+        if callback_id:
+            stats.record(callback_id, raw_size, len(data), encoding)
+            logger.debug(f"Callback {callback_id}: {raw_size} -> {len(data)} bytes ({encoding or 'identity'})")
+
+        return response
+
+    @server.route('/_malinka/payload-report')
+    def payload_report():
+        """Размеры ответов callback'ов до и после сжатия"""
+        return jsonify({
+            'compression_enabled': config.compression.enabled,
+            'brotli_available': brotli is not None,
+            'min_size': config.compression.min_size,
+            'level': config.compression.level,
+            'bandwidth_kbps': config.compression.report_bandwidth_kbps,
+            'callbacks': stats.report(config.compression.report_bandwidth_kbps),
+        })
+
+    return stats
+
+
+# Глобальная статистика размеров ответов
+payload_stats = PayloadStats()
@@ -5,6 +5,8 @@ import logging
 from functools import lru_cache
 from datetime import datetime, timedelta
 
+from src.utils.anomalies import anomaly_flags
+
 logger = logging.getLogger(__name__)
 
 class DataProcessor:
@@ -30,6 +32,32 @@ class DataProcessor:
             return 0.0
         return ((current - previous) / previous) * 100
     
+    @staticmethod
+    def previous_period(start_date, end_date) -> tuple:
+        """Предыдущий период той же длины, заканчивающийся накануне start_date (даты в ISO формате)"""
+        try:
+            start = pd.to_datetime(start_date).normalize()
+            end = pd.to_datetime(end_date).normalize()
+        except Exception as e:
+            logger.warning(f"Failed to parse date range {start_date} - {end_date}: {e}")
+            return None, None
+        if pd.isna(start) or pd.isna(end):
+            return None, None
+        
+        prev_end = start - timedelta(days=1)
+        prev_start = prev_end - (end - start)
+        return prev_start.date().isoformat(), prev_end.date().isoformat()
+    
+    @staticmethod
+    def format_delta(current: float, previous: float, higher_is_better: bool = True) -> tuple:
+        """Изменение к предыдущему периоду для карточки KPI: (текст, цвет) или (None, цвет), если сравнивать не с чем"""
+        if previous is None or pd.isna(previous) or previous == 0 or current is None or pd.isna(current):
+            return None, 'success'
+        
+        change = DataProcessor.calculate_percentage_change(float(current), float(previous))
+        improved = change >= 0 if higher_is_better else change <= 0
+        return f"{change:+.1f}%", 'success' if improved else 'danger'
+    
     @staticmethod
     def format_currency(value: float) -> str:
         """Форматирование валюты"""
@@ -47,19 +75,17 @@ class DataProcessor:
     
     @staticmethod
     def detect_anomalies(df: pd.DataFrame, value_column: str, threshold: float = 2.0) -> pd.DataFrame:
-        """Обнаружение аномалий в данных"""
+        """Обнаружение аномалий в данных (копия с колонкой is_anomaly, исходный frame не меняется)
+        
+        Точки обрабатываются по порядку онлайн-детектором: отклонение от сглаженных уровня и тренда
+        в единицах робастной оценки разброса остатков.
+        """
         if df.empty or value_column not in df.columns:
             return df
-            
-        mean = df[value_column].mean()
-        std = df[value_column].std()
         
-        if std > 0:
-            df['is_anomaly'] = abs(df[value_column] - mean) > threshold * std
-        else:
-            df['is_anomaly'] = False
-            
-        return df
+        result = df.copy()
+        result['is_anomaly'] = anomaly_flags(df[value_column].to_numpy(dtype=float), threshold)
+        return result
 
 # Глобальный экземпляр процессора
 data_processor = DataProcessor()
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""
+Шаг агрегации временных рядов по длине периода
+
+Ряды агрегируются в SQL (DATE_TRUNC(:granularity, ...)): дневной шаг - только для периодов
+до DAILY_MAX_DAYS, поэтому в дневном ряду не больше DAILY_MAX_DAYS + 1 точек, в недельном -
+около WEEKLY_MAX_DAYS / 7, в месячном - по точке на месяц (за 10 лет - 120). Прореживать ряды
+на сервере или рисовать их через WebGL не нужно.
+"""
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Границы длины периода (в днях) для выбора шага агрегации временных рядов
+DAILY_MAX_DAYS = 92
+WEEKLY_MAX_DAYS = 548
+
+
+def choose_granularity(start_date, end_date) -> str:
+    """Выбрать шаг агрегации (day/week/month) по длине периода"""
+    try:
+        days = (pd.to_datetime(end_date) - pd.to_datetime(start_date)).days
+    except Exception as e:
+        logger.warning(f"Failed to parse date range {start_date} - {end_date}: {e}")
+        return 'day'
+
+    if days <= DAILY_MAX_DAYS:
+        return 'day'
+    if days <= WEEKLY_MAX_DAYS:
+        return 'week'
+    return 'month'
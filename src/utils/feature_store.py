@@ -0,0 +1,294 @@
+"""
+Витрина признаков клиентов, обновляемая приростом
+
+В памяти хранятся узкие журналы «клиент x день» по продажам, возвратам и обращениям в
+поддержку. Новые строки дочитываются из базы по id после последнего учтенного, поэтому
+повторного сканирования sales на каждый запрос нет. Признаки клиентов за период (заказы,
+выручка, средний чек, первая и последняя покупка, возвраты, обращения, RFM) считаются
+векторно через bincount по коду клиента; панели группируют уже готовую таблицу.
+
+Полная сборка (чтение всех продаж, возвратов и обращений) выполняется в фоновом потоке с
+приоритетом BACKGROUND и не держит блокировку витрины: до первой сборки витрина возвращает
+None и панели строятся запросами, при пересборке читатели получают прежние журналы.
+"""
+import copy
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from cachetools import TTLCache
+
+from src.database.queries.customer_behavior import (
+    CUSTOMER_ATTRIBUTES_QUERY,
+    CUSTOMER_RETURNS_DELTA_QUERY,
+    CUSTOMER_SALES_DELTA_QUERY,
+    CUSTOMER_TICKETS_DELTA_QUERY,
+)
+from src.database.failures import QueryFailed
+from src.database.scheduler import BACKGROUND, db_priority
+from src.database.watcher import data_watcher
+
+logger = logging.getLogger(__name__)
+
+# Таблицы, изменения которых дочитываются приростом, и справочник клиентов (его изменение - полная пересборка)
+FEATURE_TABLES = ('sales', 'products', 'returns', 'customer_support')
+ATTRIBUTE_TABLES = ('user_segments',)
+
+# Прирост дочитывается не реже раза в интервал, даже если изменения данных не отслеживаются (секунды)
+FEATURE_STORE_REFRESH_S = 60
+# Полная пересборка раз в интервал: подхватывает изменения уже учтенных строк (секунды)
+FEATURE_STORE_REBUILD_S = 6 * 3600
+
+# Число групп для оценок RFM и кэш признаков по периодам
+RFM_BINS = 5
+FEATURES_CACHE_MAXSIZE = 32
+
+# Журналы витрины: запрос прироста и накопленные столбцы
+EVENT_LOGS = {
+    'sales': (CUSTOMER_SALES_DELTA_QUERY, ('orders', 'lines', 'revenue')),
+    'returns': (CUSTOMER_RETURNS_DELTA_QUERY, ('returns',)),
+    'tickets': (CUSTOMER_TICKETS_DELTA_QUERY, ('tickets',)),
+}
+
+
+def day_index(values: Any) -> np.ndarray:
+    """Номера дней (с 1970-01-01) для массива дат"""
+    return pd.to_datetime(values).to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+def rfm_score(values: np.ndarray, higher_is_better: bool = True) -> np.ndarray:
+    """Оценка 1..RFM_BINS по квантилям значения среди клиентов с покупками"""
+    if not len(values):
+        return np.zeros(0, dtype=np.int64)
+    ranks = pd.Series(values).rank(pct=True, method='average').to_numpy()
+    score = np.clip(np.ceil(ranks * RFM_BINS), 1, RFM_BINS).astype(np.int64)
+    return score if higher_is_better else RFM_BINS + 1 - score
+
+
+def rfm_segment(recency: np.ndarray, frequency: np.ndarray) -> np.ndarray:
+    """Сегмент RFM по оценкам давности и частоты покупок"""
+    return np.select(
+        [
+            (recency >= 4) & (frequency >= 4),
+            (recency >= 3) & (frequency >= 3),
+            (recency >= 4) & (frequency <= 2),
+            (recency <= 2) & (frequency >= 3),
+            (recency <= 2) & (frequency <= 2),
+        ],
+        ['Чемпионы', 'Лояльные', 'Новые', 'Под угрозой ухода', 'Потерянные'],
+        default='Требуют внимания'
+    )
+
+
+class CustomerFeatureStore:
+    """Журналы активности клиентов и признаки клиентов за период"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._features = TTLCache(maxsize=FEATURES_CACHE_MAXSIZE, ttl=FEATURE_STORE_REBUILD_S)
+        self._building = False
+        self.ready = False
+        self._reset()
+
+    def _reset(self):
+        self.customers = np.zeros(0, dtype=np.int64)
+        self.segments = np.zeros(0, dtype=object)
+        self.regions = np.zeros(0, dtype=object)
+        self.logs: Dict[str, Dict[str, np.ndarray]] = {
+            name: {column: np.zeros(0) for column in ('customer', 'day') + columns}
+            for name, (_, columns) in EVENT_LOGS.items()
+        }
+        self.last_ids = {name: 0 for name in EVENT_LOGS}
+        self.generation = 0
+        self.built_at = float('-inf')
+        self.refreshed_at = float('-inf')
+        self.versions: Optional[str] = None
+        self.attributes_version: Optional[str] = None
+
+    def _load_customers(self):
+        from src.database.connection import db_manager
+
+        data = db_manager.execute_query(CUSTOMER_ATTRIBUTES_QUERY, strict=True).drop_duplicates('customer_id')
+        data = data.sort_values('customer_id')
+        self.customers = data['customer_id'].to_numpy()
+        self.segments = data['segment'].to_numpy(dtype=object)
+        self.regions = data['region'].to_numpy(dtype=object)
+
+    def _apply_delta(self, name: str) -> bool:
+        """Дочитать строки журнала после последнего учтенного id; True, если были новые строки"""
+        from src.database.connection import db_manager
+
+        query, columns = EVENT_LOGS[name]
+        delta = db_manager.execute_query(query, {'last_id': self.last_ids[name]}, strict=True)
+        if delta.empty:
+            return False
+
+        # Строки клиентов, которых нет в справочнике, в признаки не попадают (как в запросах от user_segments)
+        customer = delta['customer_id'].to_numpy()
+        pos = np.searchsorted(self.customers, customer)
+        known = pos < len(self.customers)
+        known[known] = self.customers[pos[known]] == customer[known]
+
+        log = self.logs[name]
+        appended = {'customer': pos[known], 'day': day_index(delta['day'])[known]}
+        appended.update({column: delta[column].to_numpy(dtype=float)[known] for column in columns})
+        # Журналы не изменяются на месте: читатели вне блокировки видят согласованные массивы
+        self.logs[name] = {column: np.concatenate([log[column], appended[column]]) for column in log}
+        self.last_ids[name] = max(self.last_ids[name], int(delta['last_id'].max()))
+        return True
+
+    def _start_build(self):
+        """Запустить полную сборку в фоновом потоке (не больше одной одновременно)"""
+        if self._building:
+            return
+        self._building = True
+        threading.Thread(target=self._build, name='customer-features', daemon=True).start()
+
+    def _build(self):
+        """Собрать журналы заново в отдельной копии и подменить ими текущие"""
+        try:
+            fresh = copy.copy(self)
+            fresh._reset()
+            now = time.monotonic()
+            # Версии берутся до чтения: изменения во время сборки дочитаются следующим приростом
+            fresh.versions = data_watcher.versions_key(FEATURE_TABLES + ATTRIBUTE_TABLES)
+            fresh.attributes_version = data_watcher.versions_key(ATTRIBUTE_TABLES)
+            with db_priority(BACKGROUND):
+                fresh._load_customers()
+                for name in EVENT_LOGS:
+                    fresh._apply_delta(name)
+
+            with self._lock:
+                self.customers, self.segments, self.regions = fresh.customers, fresh.segments, fresh.regions
+                self.logs, self.last_ids = fresh.logs, fresh.last_ids
+                self.versions, self.attributes_version = fresh.versions, fresh.attributes_version
+                self.built_at = self.refreshed_at = now
+                self.generation += 1
+                self.ready = True
+            logger.info(f"Customer feature store built in {time.monotonic() - now:.1f}s")
+        except Exception as e:
+            logger.warning(f"Customer feature store build failed: {e}")
+        finally:
+            self._building = False
+
+    def refresh(self) -> bool:
+        """Дочитать прирост, если данные изменились; False, пока витрина не построена
+
+        Первая сборка и пересборка при смене справочника клиентов запускаются в фоне.
+        """
+        versions = data_watcher.versions_key(FEATURE_TABLES + ATTRIBUTE_TABLES)
+        attributes_version = data_watcher.versions_key(ATTRIBUTE_TABLES)
+        with self._lock:
+            now = time.monotonic()
+            if not self.ready or attributes_version != self.attributes_version \
+                    or now - self.built_at >= FEATURE_STORE_REBUILD_S:
+                self._start_build()
+            if not self.ready:
+                return False
+            if versions == self.versions and now - self.refreshed_at < FEATURE_STORE_REFRESH_S:
+                return True
+
+            try:
+                changed = False
+                for name in EVENT_LOGS:
+                    changed = self._apply_delta(name) or changed
+            except QueryFailed as e:
+                # Версии не сдвигаются: прирост дочитается при следующем обращении
+                logger.warning(f"Customer feature store refresh failed: {e}")
+                return True
+
+            if changed:
+                self.generation += 1
+            self.versions = versions
+            self.refreshed_at = now
+            return True
+
+    @staticmethod
+    def _period_sum(log: Dict[str, np.ndarray], column: str, start_day: int, end_day: int, n: int) -> np.ndarray:
+        mask = (log['day'] >= start_day) & (log['day'] <= end_day)
+        return np.bincount(log['customer'][mask].astype(np.int64), weights=log[column][mask], minlength=n)
+
+    def features(self, start_date: Any, end_date: Any) -> Optional[pd.DataFrame]:
+        """Признаки всех клиентов справочника за период (одна строка на клиента; None до первой сборки)"""
+        if not self.refresh():
+            return None
+        start_day, end_day = day_index([start_date, end_date])
+        # Справочник, журналы и поколение берутся одним снимком: пересборка в другом потоке
+        # заменяет их под блокировкой, и расчет идет только по снимку
+        with self._lock:
+            key = (int(start_day), int(end_day), self.generation)
+            if key in self._features:
+                return self._features[key]
+            customers, segments, regions = self.customers, self.segments, self.regions
+            logs = dict(self.logs)
+
+        n = len(customers)
+        orders = self._period_sum(logs['sales'], 'orders', start_day, end_day, n)
+        lines = self._period_sum(logs['sales'], 'lines', start_day, end_day, n)
+        revenue = self._period_sum(logs['sales'], 'revenue', start_day, end_day, n)
+        returns = self._period_sum(logs['returns'], 'returns', start_day, end_day, n)
+        tickets = self._period_sum(logs['tickets'], 'tickets', start_day, end_day, n)
+
+        # Первая и последняя покупка в периоде
+        sales = logs['sales']
+        mask = (sales['day'] >= start_day) & (sales['day'] <= end_day)
+        customer, day = sales['customer'][mask].astype(np.int64), sales['day'][mask].astype(np.int64)
+        first_day = np.full(n, np.iinfo(np.int64).max)
+        last_day = np.full(n, np.iinfo(np.int64).min)
+        np.minimum.at(first_day, customer, day)
+        np.maximum.at(last_day, customer, day)
+
+        active = lines > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_order_value = np.where(active, revenue / lines, np.nan)
+        recency = np.where(active, end_day - last_day, np.nan)
+
+        # RFM: давность, частота и сумма покупок оцениваются среди клиентов с покупками в периоде
+        r_score = np.zeros(n, dtype=np.int64)
+        f_score = np.zeros(n, dtype=np.int64)
+        m_score = np.zeros(n, dtype=np.int64)
+        r_score[active] = rfm_score(recency[active], higher_is_better=False)
+        f_score[active] = rfm_score(orders[active])
+        m_score[active] = rfm_score(revenue[active])
+        segment = np.where(active, rfm_segment(r_score, f_score), 'Неактивные')
+
+        result = pd.DataFrame({
+            'customer_id': customers,
+            'segment': segments,
+            'region': regions,
+            'orders': orders.astype(np.int64),
+            'lines': lines.astype(np.int64),
+            'revenue': revenue,
+            'avg_order_value': avg_order_value,
+            'first_order': pd.to_datetime(np.where(active, first_day, 0).astype('datetime64[D]')).where(active),
+            'last_order': pd.to_datetime(np.where(active, last_day, 0).astype('datetime64[D]')).where(active),
+            'returns': returns.astype(np.int64),
+            'tickets': tickets.astype(np.int64),
+            'recency_days': recency,
+            'r_score': r_score,
+            'f_score': f_score,
+            'm_score': m_score,
+            'rfm_segment': segment,
+        })
+        with self._lock:
+            self._features[key] = result
+        return result
+
+    def customer_features(self, params: Dict[str, Any]) -> Optional[pd.DataFrame]:
+        """Признаки клиентов за период с фильтрами сегмента и региона (None до первой сборки)"""
+        features = self.features(params['start_date'], params['end_date'])
+        if features is None:
+            return None
+        mask = np.ones(len(features), dtype=bool)
+        if params.get('segment') is not None:
+            mask &= (features['segment'] == params['segment']).to_numpy()
+        if params.get('region') is not None:
+            mask &= (features['region'] == params['region']).to_numpy()
+        return features[mask]
+
+
+# Глобальная витрина признаков клиентов
+customer_features = CustomerFeatureStore()
@@ -0,0 +1,295 @@
+"""
+Прогнозирование временных рядов методом Холта-Уинтерса (аддитивная модель с недельной сезонностью)
+
+Модели обучаются сразу для всех рядов матрицы (ряды x дни): рекурсия идет по дням, а каждый
+шаг - векторная операция numpy над всеми рядами и всеми вариантами параметров сетки.
+Обученное состояние кэшируется и дополняется новыми днями без переобучения.
+"""
+import itertools
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from cachetools import TTLCache
+
+from src.database.failures import QueryFailed
+from src.database.queries.business_sales import DAILY_REVENUE_BY_SERIES_QUERIES
+
+logger = logging.getLogger(__name__)
+
+# Длина сезона (дней) и глубина истории для обучения
+SEASON_LENGTH = 7
+HISTORY_DAYS = 365
+FORECAST_HORIZON = 30
+
+# Полное переобучение (подбор параметров) не реже чем раз в столько дней дообучения
+REFIT_DAYS = 28
+
+# Сетка параметров сглаживания: лучший вариант выбирается для каждого ряда по ошибке прогноза на шаг вперед
+ALPHAS = (0.1, 0.3, 0.5, 0.8)
+BETAS = (0.0, 0.05, 0.2)
+GAMMAS = (0.05, 0.2, 0.4)
+
+# Ширина интервала прогноза (нормальное приближение, ~95%)
+INTERVAL_Z = 1.96
+
+# Сколько наборов фильтров хранит обученные модели и как долго без обращений
+FORECASTERS_MAXSIZE = 32
+FORECASTER_TTL = 6 * 3600
+
+
+@dataclass
+class HoltWintersState:
+    """Состояние моделей для набора рядов (по элементу или строке на ряд)"""
+    alpha: np.ndarray
+    beta: np.ndarray
+    gamma: np.ndarray
+    level: np.ndarray
+    trend: np.ndarray
+    # Сезонные поправки (ряды x SEASON_LENGTH); столбец season_pos относится к следующему дню
+    season: np.ndarray
+    season_pos: int
+    # Сумма квадратов ошибок прогноза на шаг вперед и их количество (для интервалов)
+    sse: np.ndarray
+    n_errors: int
+
+    @property
+    def sigma(self) -> np.ndarray:
+        """Среднеквадратичная ошибка прогноза на шаг вперед"""
+        return np.sqrt(self.sse / max(self.n_errors, 1))
+
+
+@dataclass
+class ForecastResult:
+    """Прогноз для всех рядов: матрицы ряды x дни"""
+    series: np.ndarray
+    dates: pd.DatetimeIndex
+    mean: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+
+    def to_frame(self) -> pd.DataFrame:
+        """Прогноз в длинном формате (series, date, forecast, lower, upper)"""
+        return pd.DataFrame({
+            'series': np.repeat(self.series, len(self.dates)),
+            'date': np.tile(self.dates.to_numpy(), len(self.series)),
+            'forecast': self.mean.ravel(),
+            'lower': self.lower.ravel(),
+            'upper': self.upper.ravel(),
+        })
+
+
+def _initial_state(values: np.ndarray, m: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Начальные уровень, тренд и сезонность по первым двум сезонам"""
+    n, t = values.shape
+    if t >= 2 * m:
+        first = values[:, :m].mean(axis=1)
+        second = values[:, m:2 * m].mean(axis=1)
+        return first, (second - first) / m, values[:, :m] - first[:, None]
+    # Короткая история: без тренда и сезонности
+    level = values[:, 0] if t else np.zeros(n)
+    return level.astype(float), np.zeros(n), np.zeros((n, m))
+
+
+def _smooth(values: np.ndarray, alpha, beta, gamma, level: np.ndarray, trend: np.ndarray,
+            season: np.ndarray, pos: int, warmup: int = 0) -> tuple:
+    """Прогнать рекурсию Холта-Уинтерса по дням
+
+    Состояние имеет форму (ряды, варианты параметров), сезонность - (ряды, варианты, сезон);
+    параметры транслируются на эти формы. Цикл идет только по дням.
+    """
+    level, trend, season = level.copy(), trend.copy(), season.copy()
+    sse = np.zeros(level.shape)
+    m = season.shape[-1]
+    for t in range(values.shape[1]):
+        y = values[:, t, None]
+        s = season[..., pos]
+        error = y - (level + trend + s)
+        if t >= warmup:
+            sse += error ** 2
+        new_level = alpha * (y - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[..., pos] = gamma * (y - new_level) + (1 - gamma) * s
+        level = new_level
+        pos = (pos + 1) % m
+    return level, trend, season, pos, sse
+
+
+def fit_holt_winters(values: np.ndarray, season_length: int = SEASON_LENGTH) -> HoltWintersState:
+    """Обучить модели для всех рядов матрицы (ряды x дни) с подбором параметров по сетке"""
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    n, t = values.shape
+    grid = np.array(list(itertools.product(ALPHAS, BETAS, GAMMAS)))
+    k = len(grid)
+
+    level, trend, season = _initial_state(values, season_length)
+    # Первый сезон ушел на инициализацию: ошибки на нем не участвуют в выборе параметров
+    warmup = season_length if t >= 2 * season_length else 0
+    level, trend, season, pos, sse = _smooth(
+        values, grid[:, 0], grid[:, 1], grid[:, 2],
+        np.repeat(level[:, None], k, axis=1),
+        np.repeat(trend[:, None], k, axis=1),
+        np.repeat(season[:, None, :], k, axis=1),
+        0, warmup
+    )
+
+    best = sse.argmin(axis=1)
+    rows = np.arange(n)
+    return HoltWintersState(
+        alpha=grid[best, 0], beta=grid[best, 1], gamma=grid[best, 2],
+        level=level[rows, best], trend=trend[rows, best], season=season[rows, best],
+        season_pos=pos, sse=sse[rows, best], n_errors=max(t - warmup, 0)
+    )
+
+
+def update_holt_winters(state: HoltWintersState, values: np.ndarray) -> HoltWintersState:
+    """Дообучить модели новыми днями (ряды x новые дни) с уже подобранными параметрами"""
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    level, trend, season, pos, sse = _smooth(
+        values, state.alpha[:, None], state.beta[:, None], state.gamma[:, None],
+        state.level[:, None], state.trend[:, None], state.season[:, None, :],
+        state.season_pos
+    )
+    return HoltWintersState(
+        alpha=state.alpha, beta=state.beta, gamma=state.gamma,
+        level=level[:, 0], trend=trend[:, 0], season=season[:, 0],
+        season_pos=pos, sse=state.sse + sse[:, 0], n_errors=state.n_errors + values.shape[1]
+    )
+
+
+def forecast_holt_winters(state: HoltWintersState, horizon: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Прогноз и границы интервала на horizon дней вперед (матрицы ряды x дни)"""
+    steps = np.arange(1, horizon + 1)
+    m = state.season.shape[1]
+    mean = (state.level[:, None] + state.trend[:, None] * steps
+            + state.season[:, (state.season_pos + steps - 1) % m])
+    spread = INTERVAL_Z * state.sigma[:, None] * np.sqrt(steps)
+    return mean, mean - spread, mean + spread
+
+
+def series_matrix(data: pd.DataFrame, start: date, end: date,
+                  series: Optional[Sequence[Any]] = None, value: str = 'revenue') -> Tuple[np.ndarray, np.ndarray]:
+    """Таблица (date, series, value) в матрицу ряды x дни; дни без продаж - нули"""
+    days = pd.date_range(start, end, freq='D')
+    if data.empty:
+        names = np.array(list(series) if series is not None else [], dtype=object)
+        return names, np.zeros((len(names), len(days)))
+
+    table = data.pivot_table(index='series', columns='date', values=value, aggfunc='sum', fill_value=0)
+    table.columns = pd.to_datetime(table.columns)
+    if series is not None:
+        table = table.reindex(series, fill_value=0)
+    table = table.reindex(columns=days, fill_value=0)
+    return table.index.to_numpy(dtype=object), table.to_numpy(dtype=float)
+
+
+class SeriesForecaster:
+    """Модели выручки по дням для всех рядов одного разреза (категории, поставщики, товары)
+
+    Состояние доводится до нужного дня приростом: запрашиваются только новые дни, а
+    параметры подбираются заново раз в REFIT_DAYS или при появлении новых рядов.
+    """
+
+    def __init__(self, dimension: str, filters: Dict[str, Any]):
+        self.dimension = dimension
+        self.filters = filters
+        self.series = np.array([], dtype=object)
+        self.state: Optional[HoltWintersState] = None
+        self.fitted_through: Optional[date] = None
+        self.refitted_through: Optional[date] = None
+        self._lock = threading.Lock()
+
+    def _load(self, start: date, end: date) -> pd.DataFrame:
+        # Слой БД загружается при первом прогнозе
+        from src.database.connection import db_manager
+
+        params = dict(self.filters, history_start=start.isoformat(), history_end=end.isoformat())
+        return db_manager.execute_query(DAILY_REVENUE_BY_SERIES_QUERIES[self.dimension], params, strict=True)
+
+    def fit_through(self, through: date):
+        """Довести модели до дня through включительно
+
+        При ошибке запроса модели и fitted_through остаются прежними: пустой результат
+        не должен дописаться в состояние нулевыми днями.
+        """
+        with self._lock:
+            try:
+                self._fit_through(through)
+            except QueryFailed as e:
+                logger.warning(f"Failed to load {self.dimension} revenue history, keeping fitted models: {e}")
+
+    def _fit_through(self, through: date):
+        if self.state is not None and self.fitted_through == through:
+            return
+
+        if (self.state is not None and through > self.fitted_through
+                and (through - self.refitted_through).days < REFIT_DAYS):
+            start = self.fitted_through + timedelta(days=1)
+            data = self._load(start, through)
+            if data.empty or set(data['series']) <= set(self.series):
+                _, values = series_matrix(data, start, through, self.series)
+                self.state = update_holt_winters(self.state, values)
+                self.fitted_through = through
+                return
+            logger.info(f"New {self.dimension} series appeared, refitting forecast models")
+
+        start = through - timedelta(days=HISTORY_DAYS - 1)
+        self.series, values = series_matrix(self._load(start, through), start, through)
+        self.state = fit_holt_winters(values) if len(self.series) else None
+        self.fitted_through = self.refitted_through = through
+
+    def forecast(self, horizon: int = FORECAST_HORIZON) -> Optional[ForecastResult]:
+        """Прогноз выручки (неотрицательный) для всех рядов на horizon дней после fitted_through"""
+        with self._lock:
+            if self.state is None:
+                return None
+            mean, lower, upper = forecast_holt_winters(self.state, horizon)
+            dates = pd.date_range(self.fitted_through + timedelta(days=1), periods=horizon, freq='D')
+            return ForecastResult(
+                series=self.series, dates=dates,
+                mean=np.maximum(mean, 0), lower=np.maximum(lower, 0), upper=np.maximum(upper, 0)
+            )
+
+
+_forecasters = TTLCache(maxsize=FORECASTERS_MAXSIZE, ttl=FORECASTER_TTL)
+_forecasters_lock = threading.Lock()
+
+
+def _last_complete_day(end_date: Any) -> date:
+    """Последний завершенный день периода: текущий день еще не закончился и в обучение не идет"""
+    yesterday = date.today() - timedelta(days=1)
+    try:
+        end = pd.to_datetime(end_date).date()
+    except Exception as e:
+        logger.warning(f"Failed to parse end date {end_date}: {e}")
+        return yesterday
+    return min(end, yesterday)
+
+
+def forecast_series(dimension: str, params: Dict[str, Any], horizon: int = FORECAST_HORIZON) -> Optional[ForecastResult]:
+    """Прогноз выручки по дням для всех рядов разреза после конца выбранного периода
+
+    Модели общие для всех вкладок с теми же фильтрами и дообучаются по мере появления новых дней.
+    """
+    through = _last_complete_day(params.get('end_date'))
+    filters = {key: params.get(key) for key in ('category', 'supplier')}
+    key = json.dumps([dimension, filters], sort_keys=True, default=str)
+
+    with _forecasters_lock:
+        forecaster = _forecasters.get(key)
+        if forecaster is None:
+            forecaster = SeriesForecaster(dimension, filters)
+        # Обращение продлевает жизнь моделей
+        _forecasters[key] = forecaster
+
+    if forecaster.fitted_through is not None and through < forecaster.fitted_through:
+        # Прогноз от прошлой даты: отдельные модели, чтобы не откатывать общие
+        forecaster = SeriesForecaster(dimension, filters)
+
+    forecaster.fit_through(through)
+    return forecaster.forecast(horizon)
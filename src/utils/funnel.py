@@ -0,0 +1,219 @@
+"""
+Упорядоченная воронка по пользователям (view -> click -> add_to_cart -> purchase)
+
+Пользователь проходит шаг k, если после прохождения шага k-1 у него есть событие шага k
+(строго позже), и от начала цепочки прошло не больше окна. События читаются из базы
+частями, отсортированными по (клиент, время); часть обрабатывается векторно - цикл
+только по шагам воронки: для каждого события шага k поиском (searchsorted) находится
+последнее более раннее прохождение шага k-1 того же клиента с самым поздним началом
+цепочки. Клиент на границе частей переносится в следующую часть, поэтому память
+ограничена размером части. Время до шага копится в гистограмме с логарифмическими
+интервалами, медиана оценивается по ней (погрешность - ширина интервала, около 4%).
+"""
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from cachetools import TTLCache
+
+from config import config
+from src.database.queries.customer_behavior import EVENTS_ORDERED_QUERY
+from src.database.watcher import data_watcher
+
+logger = logging.getLogger(__name__)
+
+# Шаги воронки по порядку
+FUNNEL_STEPS = ('view', 'click', 'add_to_cart', 'purchase')
+# Таблицы, от которых зависит результат (события и фильтр клиентов)
+FUNNEL_TABLES = ('events', 'user_segments', 'sales', 'products', 'suppliers')
+
+# Границы интервалов гистограммы времени до шага (секунды): 0 и логарифмическая шкала до года
+TIME_BINS = np.concatenate([[0.0], np.geomspace(1, 366 * 86400, 400)])
+
+FUNNEL_RESULTS_MAXSIZE = 32
+
+
+def dense_codes(customer: np.ndarray) -> np.ndarray:
+    """Номера клиентов 0..n-1 для массива, отсортированного по клиенту"""
+    if not len(customer):
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate([[0], np.cumsum(customer[1:] != customer[:-1])]).astype(np.int64)
+
+
+def funnel_chunk(user: np.ndarray, ts: np.ndarray, step: np.ndarray, n_steps: int,
+                 window_ms: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Упорядоченная воронка для части событий целых клиентов
+
+    user - номера клиентов (по возрастанию), ts - время в миллисекундах (по возрастанию
+    внутри клиента), step - номер шага события. Возвращает для каждого шага число клиентов,
+    прошедших его, и гистограмму времени от начала цепочки до первого прохождения шага.
+    """
+    users = np.zeros(n_steps, dtype=np.int64)
+    hist = np.zeros((n_steps, len(TIME_BINS) - 1), dtype=np.int64)
+    if not len(user):
+        return users, hist
+
+    # Составной ключ (клиент, время) монотонен по строкам части
+    ts0 = int(ts.min())
+    span = int(ts.max()) - ts0 + 1
+    key = user * span + (ts - ts0)
+
+    # Шаг 0: каждое событие начинает цепочку
+    prev = np.flatnonzero(step == 0)
+    prev_start = ts[prev]
+    users[0] = len(np.unique(user[prev]))
+    hist[0, 0] = users[0]
+
+    for k in range(1, n_steps):
+        cur = np.flatnonzero(step == k)
+        if not len(prev) or not len(cur):
+            break
+
+        # Самое позднее начало цепочки среди прохождений шага k-1 клиента к каждому моменту:
+        # смещение по клиенту делает накопленный максимум независимым для каждого клиента
+        latest_start = np.maximum.accumulate(user[prev] * span + (prev_start - ts0))
+        j = np.searchsorted(key[prev], key[cur], side='left') - 1
+        valid = j >= 0
+        j = np.maximum(j, 0)
+        valid &= user[prev][j] == user[cur]
+        start = latest_start[j] - user[cur] * span + ts0
+        elapsed = ts[cur] - start
+        valid &= elapsed <= window_ms
+
+        prev, prev_start = cur[valid], start[valid]
+        # Первое прохождение шага каждым клиентом (строки упорядочены по клиенту и времени)
+        _, first = np.unique(user[prev], return_index=True)
+        users[k] = len(first)
+        bins = np.searchsorted(TIME_BINS, elapsed[valid][first] / 1000, side='right') - 1
+        hist[k] = np.bincount(np.clip(bins, 0, hist.shape[1] - 1), minlength=hist.shape[1])
+
+    return users, hist
+
+
+def histogram_median(hist: np.ndarray) -> float:
+    """Медиана по гистограмме с интервалами TIME_BINS (линейно внутри интервала)"""
+    total = hist.sum()
+    if not total:
+        return float('nan')
+    cumulative = np.cumsum(hist)
+    index = int(np.searchsorted(cumulative, total / 2))
+    before = cumulative[index - 1] if index else 0
+    fraction = (total / 2 - before) / hist[index]
+    return float(TIME_BINS[index] + fraction * (TIME_BINS[index + 1] - TIME_BINS[index]))
+
+
+@dataclass
+class FunnelResult:
+    """Упорядоченная воронка: клиенты на каждом шаге и медианное время от начала цепочки"""
+    steps: Tuple[str, ...]
+    users: np.ndarray
+    median_seconds: np.ndarray
+    window_hours: int
+
+    @property
+    def conversion(self) -> np.ndarray:
+        """Доля клиентов первого шага, дошедших до шага (%)"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.users[0] > 0, self.users / self.users[0] * 100, 0.0)
+
+    @property
+    def step_conversion(self) -> np.ndarray:
+        """Доля клиентов предыдущего шага, прошедших шаг (%); для первого шага - 100"""
+        previous = np.concatenate([[self.users[0]], self.users[:-1]])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(previous > 0, self.users / previous * 100, 0.0)
+
+    @property
+    def drop_off(self) -> np.ndarray:
+        """Доля клиентов предыдущего шага, не прошедших шаг (%)"""
+        return 100 - self.step_conversion
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'step': list(self.steps),
+            'users': self.users,
+            'conversion': self.conversion,
+            'step_conversion': self.step_conversion,
+            'drop_off': self.drop_off,
+            'median_seconds': self.median_seconds,
+        })
+
+
+class FunnelAccumulator:
+    """Сумма воронок по частям событий с переносом клиента на границе частей"""
+
+    def __init__(self, n_steps: int, window_ms: int):
+        self.n_steps = n_steps
+        self.window_ms = window_ms
+        self.users = np.zeros(n_steps, dtype=np.int64)
+        self.hist = np.zeros((n_steps, len(TIME_BINS) - 1), dtype=np.int64)
+        self._carry: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def _process(self, customer: np.ndarray, ts: np.ndarray, step: np.ndarray):
+        users, hist = funnel_chunk(dense_codes(customer), ts, step, self.n_steps, self.window_ms)
+        self.users += users
+        self.hist += hist
+
+    def add(self, customer: np.ndarray, ts: np.ndarray, step: np.ndarray):
+        """Добавить часть событий, отсортированных по (клиент, время)"""
+        if self._carry is not None:
+            customer, ts, step = (np.concatenate([carried, new]) for carried, new in zip(self._carry, (customer, ts, step)))
+            self._carry = None
+        if not len(customer):
+            return
+
+        # События последнего клиента могут продолжиться в следующей части
+        boundaries = np.flatnonzero(customer[1:] != customer[:-1]) + 1
+        cut = int(boundaries[-1]) if len(boundaries) else 0
+        self._carry = (customer[cut:], ts[cut:], step[cut:])
+        self._process(customer[:cut], ts[:cut], step[:cut])
+
+    def result(self, steps: Sequence[str], window_hours: int) -> FunnelResult:
+        """Завершить расчет (учесть перенесенного клиента) и вернуть воронку"""
+        if self._carry is not None:
+            self._process(*self._carry)
+            self._carry = None
+        median = np.array([histogram_median(row) for row in self.hist])
+        median[0] = 0.0 if self.users[0] else np.nan
+        return FunnelResult(tuple(steps), self.users.copy(), median, window_hours)
+
+
+_results = TTLCache(maxsize=FUNNEL_RESULTS_MAXSIZE, ttl=config.cache_timeout)
+_results_lock = threading.Lock()
+
+
+def ordered_funnel(params: Dict[str, Any], steps: Sequence[str] = FUNNEL_STEPS,
+                   window_hours: Optional[int] = None) -> Optional[FunnelResult]:
+    """Упорядоченная воронка по фильтрам страницы (кэш по фильтрам и версии данных); None при ошибке"""
+    window_hours = window_hours or config.funnel_window_hours
+    key = json.dumps([params, list(steps), window_hours, data_watcher.versions_key(FUNNEL_TABLES)],
+                     sort_keys=True, default=str)
+    with _results_lock:
+        if key in _results:
+            return _results[key]
+
+    # Слой БД загружается при первом расчете
+    from src.database.connection import db_manager
+
+    try:
+        accumulator = FunnelAccumulator(len(steps), window_hours * 3600 * 1000)
+        chunks = db_manager.iter_query(EVENTS_ORDERED_QUERY, dict(params, event_types=list(steps)),
+                                       chunksize=config.funnel_chunk_rows)
+        for chunk in chunks:
+            accumulator.add(
+                chunk['customer_id'].to_numpy(),
+                np.round(chunk['ts'].to_numpy(dtype=float) * 1000).astype(np.int64),
+                chunk['step'].to_numpy(dtype=np.int64),
+            )
+        result = accumulator.result(steps, window_hours)
+    except Exception as e:
+        logger.warning(f"Ordered funnel failed: {e}")
+        return None
+
+    with _results_lock:
+        _results[key] = result
+    return result
@@ -0,0 +1,137 @@
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict
+
+import pandas as pd
+from cachetools import TTLCache
+
+from src.database.connection import db_manager
+from src.database.queries.business_sales import (
+    LIVE_PREVIOUS_KPI_QUERY, LIVE_RETURNS_DELTA_QUERY, LIVE_SALES_DELTA_QUERY,
+)
+
+logger = logging.getLogger(__name__)
+
+# Не чаще одного запроса прироста за интервал на набор фильтров (общий для всех вкладок)
+LIVE_MIN_REFRESH_S = 3
+# Полный пересчет раз в интервал: подхватывает транзакции, зафиксированные не по порядку id
+# (заодно перечитываются итоги предыдущего периода)
+LIVE_RESYNC_S = 600
+# Сколько хранится трекер без обращений и сколько наборов фильтров отслеживается одновременно
+LIVE_TRACKER_TTL = 3600
+LIVE_TRACKERS_MAXSIZE = 32
+
+
+class LiveKpiTracker:
+    """Накопительные KPI продаж за период: обновляются приростом после последнего id
+
+    Итоги предыдущего периода (prev_*) для изменений на карточках читаются при полном пересчете.
+    """
+
+    def __init__(self, params: Dict[str, Any]):
+        self.params = {
+            key: params.get(key)
+            for key in ('start_date', 'end_date', 'prev_start_date', 'prev_end_date', 'category', 'supplier')
+        }
+        self._lock = threading.Lock()
+        self._previous: Dict[str, Any] = {}
+        self._refreshed = float('-inf')
+        self._synced = float('-inf')
+        self._reset()
+
+    def _reset(self):
+        self.last_transaction_id = 0
+        self.last_return_id = 0
+        self.total_returns = 0
+        self._previous_stale = True
+        self._days: Dict[Any, Dict[str, float]] = {}
+
+    def refresh(self) -> Dict[str, Any]:
+        """Применить прирост продаж и возвратов и вернуть текущие значения KPI"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._refreshed >= LIVE_MIN_REFRESH_S:
+                if now - self._synced >= LIVE_RESYNC_S:
+                    self._reset()
+                    self._synced = now
+                if self._previous_stale:
+                    self._load_previous()
+                self._apply_sales()
+                self._apply_returns()
+                self._refreshed = now
+            return self.snapshot()
+
+    def _load_previous(self):
+        """Перечитать итоги предыдущего периода (при ошибке запроса остаются прежние до следующего обновления)"""
+        if self.params['prev_start_date'] is None or self.params['prev_end_date'] is None:
+            self._previous = dict.fromkeys(
+                ('prev_total_orders', 'prev_total_revenue', 'prev_total_returns', 'prev_avg_order_value')
+            )
+        else:
+            previous = db_manager.execute_query(LIVE_PREVIOUS_KPI_QUERY, self.params)
+            if previous.empty:
+                return
+            self._previous = previous.iloc[0].to_dict()
+        self._previous_stale = False
+
+    def _apply_sales(self):
+        delta = db_manager.execute_query(
+            LIVE_SALES_DELTA_QUERY, dict(self.params, last_transaction_id=self.last_transaction_id)
+        )
+        for row in delta.itertuples(index=False):
+            day = self._days.setdefault(row.date, {'orders_count': 0, 'lines_count': 0, 'revenue': 0.0})
+            day['orders_count'] += int(row.orders_count)
+            day['lines_count'] += int(row.lines_count)
+            day['revenue'] += float(row.revenue or 0)
+            self.last_transaction_id = max(self.last_transaction_id, int(row.last_transaction_id))
+
+    def _apply_returns(self):
+        delta = db_manager.execute_query(
+            LIVE_RETURNS_DELTA_QUERY, dict(self.params, last_return_id=self.last_return_id)
+        )
+        if delta.empty or pd.isna(delta.iloc[0]['last_return_id']):
+            return
+        self.total_returns += int(delta.iloc[0]['returns_count'])
+        self.last_return_id = int(delta.iloc[0]['last_return_id'])
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Текущие значения KPI и итоги предыдущего периода (в формате строки KPI_QUERY)"""
+        orders = sum(day['orders_count'] for day in self._days.values())
+        lines = sum(day['lines_count'] for day in self._days.values())
+        revenue = sum(day['revenue'] for day in self._days.values())
+        return {
+            'total_orders': orders,
+            'total_revenue': revenue,
+            'total_returns': self.total_returns,
+            'avg_order_value': revenue / lines if lines else 0,
+            **self._previous,
+        }
+
+    def trend(self) -> pd.DataFrame:
+        """Продажи по дням (в формате SALES_TREND_QUERY)"""
+        with self._lock:
+            rows = [
+                {'date': date, 'orders_count': day['orders_count'], 'daily_revenue': day['revenue']}
+                for date, day in sorted(self._days.items())
+            ]
+        return pd.DataFrame(rows, columns=['date', 'orders_count', 'daily_revenue'])
+
+
+_trackers = TTLCache(maxsize=LIVE_TRACKERS_MAXSIZE, ttl=LIVE_TRACKER_TTL)
+_trackers_lock = threading.Lock()
+
+
+def get_live_tracker(params: Dict[str, Any]) -> LiveKpiTracker:
+    """Трекер KPI для набора фильтров (общий для всех вкладок с теми же фильтрами)"""
+    tracker = LiveKpiTracker(params)
+    key = json.dumps(tracker.params, sort_keys=True, default=str)
+    with _trackers_lock:
+        existing = _trackers.get(key)
+        if existing is None:
+            _trackers[key] = tracker
+            return tracker
+        # Обращение продлевает жизнь трекера
+        _trackers[key] = existing
+        return existing
@@ -0,0 +1,149 @@
+"""
+Поиск недельной и месячной сезонности сразу для всех рядов матрицы (ряды x дни)
+
+Сила сезонности - автокорреляция на лаге периода (через FFT, без циклов по рядам),
+фаза - день недели или день месяца с наибольшим средним значением.
+"""
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from cachetools import TTLCache
+
+from config import config
+from src.database.queries.advertising_marketing import CAMPAIGN_DAILY_REVENUE_QUERY
+from src.database.queries.business_sales import DAILY_REVENUE_BY_SERIES_QUERIES
+from src.database.watcher import data_watcher
+from src.utils.forecasting import series_matrix
+
+logger = logging.getLogger(__name__)
+
+# Лаг недельного цикла и диапазон лагов месячного (длина месяца 28-31 день)
+WEEKLY_LAG = 7
+MONTHLY_LAGS = (28, 29, 30, 31)
+# Сколько полных циклов нужно, чтобы оценивать сезонность
+MIN_CYCLES = 2
+# Порог силы, начиная с которого сезонность считается выраженной
+SEASONALITY_THRESHOLD = 0.3
+
+# Источники рядов: запрос выручки по дням (date, series, revenue) и таблицы, от которых зависит результат
+SALES_TABLES = ('sales', 'products', 'suppliers')
+SERIES_SOURCES = {
+    'category': (DAILY_REVENUE_BY_SERIES_QUERIES['category'], SALES_TABLES),
+    'supplier': (DAILY_REVENUE_BY_SERIES_QUERIES['supplier'], SALES_TABLES),
+    'product': (DAILY_REVENUE_BY_SERIES_QUERIES['product'], SALES_TABLES),
+    'campaign': (CAMPAIGN_DAILY_REVENUE_QUERY, ('ad_revenue',)),
+}
+
+SEASONALITY_RESULTS_MAXSIZE = 64
+
+
+def autocorrelation(values: np.ndarray, max_lag: int) -> np.ndarray:
+    """Автокорреляция рядов без линейного тренда на лагах 0..max_lag (матрица ряды x лаги)"""
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    n, t = values.shape
+    x = values - values.mean(axis=1, keepdims=True)
+
+    # Линейный тренд убирается сразу для всех рядов (МНК в замкнутом виде)
+    centered_time = np.arange(t) - (t - 1) / 2
+    denominator = (centered_time ** 2).sum()
+    if denominator > 0:
+        x = x - np.outer(x @ centered_time / denominator, centered_time)
+
+    # Дополнение нулями до 2t исключает циклическое наложение
+    size = 1 << int(np.ceil(np.log2(max(2 * t, 2))))
+    spectrum = np.fft.rfft(x, n=size, axis=1)
+    acf = np.fft.irfft(spectrum * np.conj(spectrum), n=size, axis=1)[:, :max_lag + 1]
+
+    variance = acf[:, :1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(variance > 0, acf / variance, 0.0)
+
+
+def seasonal_profile(values: np.ndarray, labels: np.ndarray, size: int) -> np.ndarray:
+    """Средние значения рядов по меткам дней (день недели, день месяца): матрица ряды x size"""
+    onehot = np.zeros((len(labels), size))
+    onehot[np.arange(len(labels)), labels] = 1
+    counts = onehot.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, (values @ onehot) / counts, np.nan)
+
+
+def detect_seasonality_batch(values: np.ndarray, dates: pd.DatetimeIndex) -> pd.DataFrame:
+    """Недельная и месячная сезонность для всех рядов матрицы (ряды x дни) за один проход
+
+    Для каждого ряда: сила (автокорреляция на лаге периода, 0..1), день пика и среднее значение
+    в этот день; сила NaN, если история короче MIN_CYCLES циклов.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    n, t = values.shape
+    acf = autocorrelation(values, max(MONTHLY_LAGS))
+
+    weekly_strength = np.clip(acf[:, WEEKLY_LAG], 0, 1) if t >= MIN_CYCLES * WEEKLY_LAG else np.full(n, np.nan)
+    if t >= MIN_CYCLES * max(MONTHLY_LAGS):
+        monthly_strength = np.clip(acf[:, list(MONTHLY_LAGS)].max(axis=1), 0, 1)
+    else:
+        monthly_strength = np.full(n, np.nan)
+
+    weekly = seasonal_profile(values, dates.dayofweek.to_numpy(), 7)
+    monthly = seasonal_profile(values, dates.day.to_numpy() - 1, 31)
+    weekly_peak = np.nan_to_num(weekly, nan=-np.inf).argmax(axis=1)
+    monthly_peak = np.nan_to_num(monthly, nan=-np.inf).argmax(axis=1)
+    rows = np.arange(n)
+
+    return pd.DataFrame({
+        'weekly_strength': weekly_strength,
+        'weekly_peak_day': weekly_peak,
+        'weekly_peak_value': weekly[rows, weekly_peak],
+        'is_weekly': weekly_strength >= SEASONALITY_THRESHOLD,
+        'monthly_strength': monthly_strength,
+        'monthly_peak_day': monthly_peak + 1,
+        'monthly_peak_value': monthly[rows, monthly_peak],
+        'is_monthly': monthly_strength >= SEASONALITY_THRESHOLD,
+    })
+
+
+class SeasonalityResult:
+    """Сезонность рядов разреза: сводная таблица и недельные профили (ряды x дни недели)"""
+
+    def __init__(self, series: np.ndarray, summary: pd.DataFrame, weekly_profile: np.ndarray):
+        self.series = series
+        self.summary = summary
+        self.weekly_profile = weekly_profile
+
+
+_results = TTLCache(maxsize=SEASONALITY_RESULTS_MAXSIZE, ttl=config.cache_timeout)
+_results_lock = threading.Lock()
+
+
+def seasonality_by_series(dimension: str, params: Dict[str, Any]) -> Optional[SeasonalityResult]:
+    """Сезонность всех рядов разреза за выбранный период (кэш по фильтрам и версии данных)"""
+    query, tables = SERIES_SOURCES[dimension]
+    key = json.dumps([dimension, params, data_watcher.versions_key(tables)], sort_keys=True, default=str)
+    with _results_lock:
+        if key in _results:
+            return _results[key]
+
+    # Слой БД загружается при первом расчете
+    from src.database.connection import db_manager
+
+    start, end = params.get('start_date'), params.get('end_date')
+    if not start or not end:
+        return None
+    start, end = pd.to_datetime(start).date(), pd.to_datetime(end).date()
+    data = db_manager.execute_query(query, dict(params, history_start=start.isoformat(), history_end=end.isoformat()))
+    series, values = series_matrix(data, start, end)
+
+    result = None
+    if len(series):
+        dates = pd.date_range(start, end, freq='D')
+        summary = detect_seasonality_batch(values, dates)
+        summary.insert(0, 'series', series)
+        result = SeasonalityResult(series, summary, seasonal_profile(values, dates.dayofweek.to_numpy(), 7))
+
+    with _results_lock:
+        _results[key] = result
+    return result
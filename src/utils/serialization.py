@@ -0,0 +1,79 @@
+import base64
+import logging
+from typing import Any, Dict
+
+from config import config
+
+try:
+    import orjson
+except ImportError:  # orjson не обязателен: без него используется стандартный json
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Типы typed array, которые понимает plotly.js (little-endian)
+TYPED_ARRAY_CODES = {
+    'float64': 'f8',
+    'float32': 'f4',
+    'int32': 'i4',
+    'uint32': 'u4',
+    'int16': 'i2',
+    'uint16': 'u2',
+    'int8': 'i1',
+    'uint8': 'u1',
+}
+
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def configure_json_engine(engine: str = None) -> str:
+    """Выбрать движок JSON для ответов callback'ов (Dash сериализует их через plotly.io.json)"""
+    import plotly.io as pio
+
+    engine = engine or config.json_engine
+    if engine == 'auto':
+        engine = 'orjson'
+    if engine == 'orjson' and orjson is None:
+        logger.warning("orjson is not installed, falling back to the slower json engine (pip install orjson)")
+        engine = 'json'
+
+    pio.json.config.default_engine = engine
+    logger.info(f"JSON engine: {engine}")
+    return engine
+
+
+def init_json_engine(server):
+    """Настроить движок JSON перед первым запросом, чтобы не импортировать plotly при старте"""
+    state = {'configured': False}
+
+    @server.before_request
+    def configure_on_first_request():
+        if not state['configured']:
+            state['configured'] = True
+            configure_json_engine()
+
+
+def typed_array(array) -> Dict[str, str]:
+    """Закодировать числовой массив numpy в base64 typed array plotly.js"""
+    if array.dtype.kind == 'b':
+        array = array.astype('u1')
+    elif array.dtype.kind in 'iu' and array.dtype.name not in TYPED_ARRAY_CODES:
+        # int64 в plotly.js не поддерживается: сужаем до int32, если значения помещаются
+        fits = array.size == 0 or (array.min() >= INT32_MIN and array.max() <= INT32_MAX)
+        array = array.astype('i4' if fits else 'f8')
+    elif array.dtype.name not in TYPED_ARRAY_CODES:
+        array = array.astype('f8')
+
+    code = TYPED_ARRAY_CODES[array.dtype.name]
+    data = array.astype(f'<{code}', order='C', copy=False).tobytes()
+    return {'dtype': code, 'bdata': base64.b64encode(data).decode('ascii')}
+
+
+def encode_numeric(array) -> Any:
+    """Числовой массив в виде typed array, если он достаточно длинный и кодирование включено"""
+    if (not config.typed_arrays
+            or array.ndim != 1
+            or len(array) < config.typed_array_min_length
+            or array.dtype.kind not in 'biuf'):
+        return array
+    return typed_array(array)
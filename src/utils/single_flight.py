@@ -0,0 +1,63 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    """Выполняющийся вызов, результата которого ждут остальные"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Объединение одновременных вызовов с одинаковым ключом в одно выполнение"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Выполнить fn или дождаться уже выполняющегося вызова с тем же ключом
+
+        Возвращает результат и признак того, что он получен от другого вызова.
+        Ошибка выполнения передается всем ожидающим.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, call.waiters > 0
+
+    def stats(self) -> Dict[str, int]:
+        """Сколько вызовов выполнено и сколько получили чужой результат"""
+        with self._lock:
+            return {'executed': self.executed, 'shared': self.shared, 'in_flight': len(self._calls)}
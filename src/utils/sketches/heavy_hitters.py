@@ -0,0 +1,50 @@
+"""
+Сводки тяжелых элементов (top-k) с границами ошибки
+
+Сводка среза - не больше capacity элементов с наибольшим весом (выручка, число продаж,
+показы) и порог: вес любого элемента, не попавшего в сводку, не больше порога. Как и в
+Space-Saving, сводки объединяются сложением: для элемента сумма весов по срезам, где он
+есть, - нижняя граница, а сумма порогов срезов, где его нет, - возможная недостача.
+Сводки срезов строятся из точных дневных агрегатов, поэтому ошибка возникает только
+при объединении и ограничена суммой порогов.
+"""
+from typing import Tuple
+
+import numpy as np
+
+# Сколько элементов хранит сводка одного среза
+HEAVY_HITTERS_CAPACITY = 100
+
+
+def truncate(slices: np.ndarray, weight: np.ndarray, capacity: int = HEAVY_HITTERS_CAPACITY,
+             n_slices: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Оставить в каждом срезе capacity элементов с наибольшим весом
+
+    Возвращает маску оставленных строк и порог каждого среза (наибольший вес отброшенного
+    элемента, 0 - срез сохранен полностью).
+    """
+    threshold = np.zeros(max(n_slices, int(slices.max()) + 1 if len(slices) else 0))
+    if not len(slices):
+        return np.zeros(0, dtype=bool), threshold
+
+    order = np.lexsort((-weight, slices))
+    sorted_slices = slices[order]
+    first = np.flatnonzero(np.concatenate([[True], sorted_slices[1:] != sorted_slices[:-1]]))
+    rank = np.arange(len(order)) - np.repeat(first, np.diff(np.concatenate([first, [len(order)]])))
+
+    keep = np.zeros(len(slices), dtype=bool)
+    keep[order] = rank < capacity
+    np.maximum.at(threshold, slices[~keep], weight[~keep])
+    return keep, threshold
+
+
+def merge(item: np.ndarray, weight: np.ndarray, present_threshold: np.ndarray,
+          total_threshold: float, n_items: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Объединить сводки выбранных срезов: нижняя граница веса и ошибка (верхняя - нижняя) по элементам
+
+    item, weight - строки сводок выбранных срезов; present_threshold - порог среза каждой
+    строки; total_threshold - сумма порогов всех выбранных срезов.
+    """
+    lower = np.bincount(item, weights=weight, minlength=n_items)
+    covered = np.bincount(item, weights=present_threshold, minlength=n_items)
+    return lower, np.maximum(total_threshold - covered, 0.0)
@@ -0,0 +1,518 @@
+"""
+Таблицы скетчей по дням и значениям измерений
+
+Для каждого сочетания (день, значения измерений) - среза - хранится скетч. Новые строки
+дочитываются из базы по id после последнего учтенного и добавляются в скетчи своих срезов.
+Ответ для любого диапазона дат и набора фильтров - объединение скетчей выбранных срезов
+по группам, без обращения к базе:
+- HyperLogLog (уникальные значения): разреженные пары (регистр, ранг) только для непустых
+  регистров, объединение - максимум рангов (np.maximum.at по группам);
+- t-digest (квантили): центроиды (среднее, вес), объединение - повторное сжатие центроидов
+  выбранных срезов сразу для всех групп;
+- сводки тяжелых элементов (топ-N): наибольшие элементы среза и порог отброшенных,
+  объединение - сумма весов с границей ошибки из порогов.
+
+Полная сборка (чтение всей таблицы) выполняется в фоновом потоке с приоритетом BACKGROUND
+и не держит блокировку таблицы: до первой сборки запросы получают SketchNotReady и
+страницы отвечают точными запросами, при пересборке запросы отвечают прежними скетчами.
+"""
+import copy
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.database.queries.advertising_marketing import (
+    CAMPAIGN_CTR_SKETCH_QUERY, CHANNEL_ORDERS_SKETCH_QUERY, PRODUCT_AD_SKETCH_QUERY
+)
+from src.database.queries.business_sales import (
+    ORDERS_SKETCH_QUERY, ORDER_VALUE_SKETCH_QUERY, RETURNS_SKETCH_QUERY, SUPPLIER_SKETCH_QUERY,
+    TOP_PRODUCTS_SKETCH_QUERY
+)
+from src.database.queries.customer_behavior import BUYERS_SKETCH_QUERY, SESSIONS_SKETCH_QUERY
+from src.database.queries.service_quality import RESOLUTION_TIME_SKETCH_QUERY
+from src.database.scheduler import BACKGROUND, db_priority
+from src.database.watcher import data_watcher
+from src.utils.sketches import heavy_hitters, tdigest
+from src.utils.sketches.hll import HLL_PRECISION, hash_values, hll_estimate, hll_registers
+
+logger = logging.getLogger(__name__)
+
+# Прирост дочитывается не реже раза в интервал, даже если изменения данных не отслеживаются (секунды)
+SKETCH_REFRESH_S = 60
+# Полная пересборка раз в интервал: подхватывает изменения уже учтенных строк (секунды)
+SKETCH_REBUILD_S = 6 * 3600
+
+
+class SketchNotReady(Exception):
+    """Скетчи еще не построены (первая сборка идет в фоне)"""
+
+
+def day_index(values: Any) -> np.ndarray:
+    """Номера дней (с 1970-01-01) для массива дат"""
+    return pd.to_datetime(values).to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+def merge_entries(keys: np.ndarray, ranks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Объединить записи скетчей с одинаковым ключом (срез, регистр) максимумом ранга"""
+    if not len(keys):
+        return keys, ranks
+    order = np.argsort(keys, kind='stable')
+    keys, ranks = keys[order], ranks[order]
+    start = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    return keys[start], np.maximum.reduceat(ranks, start)
+
+
+class SketchTable:
+    """Скетчи столбцов items по дням и измерениям dimensions (базовый класс)
+
+    query возвращает day, измерения, items и last_id и принимает :last_id; tables - таблицы,
+    изменения которых дочитываются приростом, rebuild_tables - таблицы, изменение которых
+    требует полной пересборки (справочники измерений).
+    """
+
+    def __init__(self, name: str, query: str, dimensions: Sequence[str], items: Sequence[str],
+                 tables: Sequence[str], rebuild_tables: Sequence[str] = ()):
+        self.name = name
+        self.query = query
+        self.dimensions = tuple(dimensions)
+        self.items = tuple(items)
+        self.tables = tuple(tables)
+        self.rebuild_tables = tuple(rebuild_tables)
+        self._lock = threading.Lock()
+        self._building = False
+        self.ready = False
+        self._reset()
+
+    def _empty_entries(self):
+        """Пустой скетч всех срезов одного столбца"""
+        raise NotImplementedError
+
+    def _add(self, item: str, slices: np.ndarray, values: pd.Series):
+        """Добавить значения столбца item в скетчи срезов slices"""
+        raise NotImplementedError
+
+    def _reset(self):
+        self.slice_ids: Dict[tuple, int] = {}
+        self.slice_days = np.zeros(0, dtype=np.int64)
+        self.slice_dims = {dim: np.zeros(0, dtype=object) for dim in self.dimensions}
+        self.entries = {item: self._empty_entries() for item in self.items}
+        self.last_id = 0
+        self.built_at = float('-inf')
+        self.refreshed_at = float('-inf')
+        self.versions: Optional[str] = None
+        self.rebuild_version: Optional[str] = None
+
+    def _slices(self, days: np.ndarray, dims: Dict[str, np.ndarray]) -> np.ndarray:
+        """Номера срезов для строк (новые срезы добавляются)"""
+        codes, uniques = pd.MultiIndex.from_arrays([days] + [dims[dim] for dim in self.dimensions]).factorize()
+        ids = np.empty(len(uniques), dtype=np.int64)
+        new = []
+        for index, key in enumerate(uniques):
+            key = key if isinstance(key, tuple) else (key,)
+            slice_id = self.slice_ids.get(key)
+            if slice_id is None:
+                slice_id = self.slice_ids[key] = len(self.slice_ids)
+                new.append(key)
+            ids[index] = slice_id
+
+        if new:
+            self.slice_days = np.concatenate([self.slice_days, np.array([key[0] for key in new], dtype=np.int64)])
+            for position, dim in enumerate(self.dimensions, start=1):
+                values = np.array([key[position] for key in new], dtype=object)
+                self.slice_dims[dim] = np.concatenate([self.slice_dims[dim], values])
+        return ids[codes]
+
+    def _apply_delta(self) -> bool:
+        """Дочитать строки после последнего учтенного id; True, если были новые строки
+
+        Ошибка запроса - исключение QueryFailed: сборка не публикуется, версии не продвигаются.
+        """
+        from src.database.connection import db_manager
+
+        delta = db_manager.execute_query(self.query, {'last_id': self.last_id}, strict=True)
+        if delta.empty:
+            return False
+        delta = delta[delta['day'].notna()]
+
+        dims = {dim: delta[dim].astype(object).where(delta[dim].notna(), '').to_numpy() for dim in self.dimensions}
+        slices = self._slices(day_index(delta['day']), dims)
+        for item in self.items:
+            values = delta[item]
+            mask = values.notna().to_numpy()
+            self._add(item, slices[mask], values[mask])
+        self.last_id = max(self.last_id, int(delta['last_id'].max()))
+        return True
+
+    def _start_build(self):
+        """Запустить полную сборку в фоновом потоке (не больше одной одновременно)"""
+        if self._building:
+            return
+        self._building = True
+        threading.Thread(target=self._build, name=f"sketch-{self.name}", daemon=True).start()
+
+    def _build(self):
+        """Собрать скетчи заново в отдельной копии и подменить ими текущие"""
+        try:
+            fresh = copy.copy(self)
+            fresh._reset()
+            now = time.monotonic()
+            # Версии берутся до чтения: изменения во время сборки дочитаются следующим приростом
+            fresh.versions = data_watcher.versions_key(self.tables + self.rebuild_tables)
+            fresh.rebuild_version = data_watcher.versions_key(self.rebuild_tables) if self.rebuild_tables else None
+            with db_priority(BACKGROUND):
+                fresh._apply_delta()
+            fresh.built_at = fresh.refreshed_at = now
+
+            state = {key: value for key, value in fresh.__dict__.items() if key not in ('_lock', '_building')}
+            with self._lock:
+                self.__dict__.update(state)
+                self.ready = True
+            logger.info(f"Sketch table {self.name} built in {time.monotonic() - now:.1f}s")
+        except Exception as e:
+            logger.warning(f"Sketch table {self.name} build failed: {e}")
+        finally:
+            self._building = False
+
+    def refresh(self):
+        """Дочитать прирост, если данные изменились (вызывается под self._lock)
+
+        Первая сборка и пересборка при смене справочников запускаются в фоне; до окончания
+        первой сборки - SketchNotReady.
+        """
+        versions = data_watcher.versions_key(self.tables + self.rebuild_tables)
+        now = time.monotonic()
+        rebuild_version = data_watcher.versions_key(self.rebuild_tables) if self.rebuild_tables else None
+        if not self.ready or rebuild_version != self.rebuild_version or now - self.built_at >= SKETCH_REBUILD_S:
+            self._start_build()
+        if not self.ready:
+            raise SketchNotReady(self.name)
+        if versions == self.versions and now - self.refreshed_at < SKETCH_REFRESH_S:
+            return
+
+        self._apply_delta()
+        self.versions = versions
+        self.refreshed_at = now
+
+    def _groups(self, start_date: Any, end_date: Any, filters: Optional[Dict[str, Any]],
+                group_by: Sequence[str], require: Sequence[str]) -> Tuple[np.ndarray, pd.DataFrame]:
+        """Группа каждого среза (-1 - срез не выбран) и значения измерений групп
+
+        filters - значения измерений (None - без фильтра), group_by - измерения группировки,
+        require - измерения, которые должны быть заданы (непустые). Без группировки - одна группа.
+        """
+        selected = np.ones(len(self.slice_days), dtype=bool)
+        if start_date is not None:
+            selected &= self.slice_days >= day_index([start_date])[0]
+        if end_date is not None:
+            selected &= self.slice_days <= day_index([end_date])[0]
+        for dim, value in (filters or {}).items():
+            if value is not None:
+                selected &= self.slice_dims[dim] == value
+        for dim in require:
+            selected &= self.slice_dims[dim] != ''
+
+        slice_ids = np.flatnonzero(selected)
+        slice_group = np.full(len(self.slice_days), -1, dtype=np.int64)
+        if group_by:
+            codes, groups = pd.MultiIndex.from_arrays([self.slice_dims[dim][slice_ids] for dim in group_by]).factorize()
+            slice_group[slice_ids] = codes
+            return slice_group, pd.DataFrame(list(groups), columns=list(group_by))
+        slice_group[slice_ids] = 0
+        return slice_group, pd.DataFrame(index=[0])
+
+
+class DistinctSketchTable(SketchTable):
+    """Скетчи HyperLogLog: приближенное число уникальных значений столбцов items"""
+
+    def __init__(self, *args, precision: int = HLL_PRECISION, **kwargs):
+        self.precision = precision
+        self.m = 1 << precision
+        super().__init__(*args, **kwargs)
+
+    def _empty_entries(self):
+        # Ключ среза и регистра (slice * m + register) и ранг
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8)
+
+    def _add(self, item: str, slices: np.ndarray, values: pd.Series):
+        register, rank = hll_registers(hash_values(values.to_numpy()), self.precision)
+        keys, ranks = self.entries[item]
+        self.entries[item] = merge_entries(
+            np.concatenate([keys, slices * self.m + register]),
+            np.concatenate([ranks, rank])
+        )
+
+    def distinct(self, start_date: Any = None, end_date: Any = None, filters: Optional[Dict[str, Any]] = None,
+                 group_by: Sequence[str] = (), require: Sequence[str] = ()) -> pd.DataFrame:
+        """Приближенное число уникальных значений каждого столбца items за период (по группам)"""
+        with self._lock:
+            self.refresh()
+            slice_group, result = self._groups(start_date, end_date, filters, group_by, require)
+            for item in self.items:
+                keys, ranks = self.entries[item]
+                group = slice_group[keys // self.m]
+                mask = group >= 0
+                registers = np.zeros((len(result), self.m), dtype=np.uint8)
+                np.maximum.at(registers, (group[mask], keys[mask] % self.m), ranks[mask])
+                result[item] = np.round(hll_estimate(registers)).astype(np.int64)
+        return result
+
+
+class QuantileSketchTable(SketchTable):
+    """Скетчи t-digest: приближенные квантили и распределение столбца value"""
+
+    def __init__(self, *args, compression: float = tdigest.TDIGEST_COMPRESSION, **kwargs):
+        self.compression = compression
+        super().__init__(*args, **kwargs)
+
+    def _empty_entries(self):
+        # Центроиды: срез, среднее и вес (упорядочены по срезу и среднему)
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+    def _add(self, item: str, slices: np.ndarray, values: pd.Series):
+        group, mean, weight = self.entries[item]
+        self.entries[item] = tdigest.compress(
+            np.concatenate([group, slices]),
+            np.concatenate([mean, values.to_numpy(dtype=float)]),
+            np.concatenate([weight, np.ones(len(values))]),
+            self.compression
+        )
+
+    def _merged(self, item: str, start_date: Any, end_date: Any, filters: Optional[Dict[str, Any]],
+                group_by: Sequence[str], require: Sequence[str]) -> Tuple[pd.DataFrame, tuple]:
+        """Объединенный дайджест каждой группы: значения измерений групп и центроиды (группа, среднее, вес)"""
+        self.refresh()
+        slice_group, groups = self._groups(start_date, end_date, filters, group_by, require)
+        slices, mean, weight = self.entries[item]
+        group = slice_group[slices]
+        mask = group >= 0
+        return groups, tdigest.compress(group[mask], mean[mask], weight[mask], self.compression)
+
+    def quantiles(self, qs: Sequence[float], start_date: Any = None, end_date: Any = None,
+                  filters: Optional[Dict[str, Any]] = None, group_by: Sequence[str] = (),
+                  require: Sequence[str] = (), item: str = 'value') -> pd.DataFrame:
+        """Число значений и квантили qs (столбцы p50, p90, ...) за период по группам"""
+        with self._lock:
+            result, (group, mean, weight) = self._merged(item, start_date, end_date, filters, group_by, require)
+        result['count'] = np.bincount(group, weights=weight, minlength=len(result)).astype(np.int64)
+        values = tdigest.quantiles(group, mean, weight, len(result), qs)
+        for index, q in enumerate(qs):
+            result[f"p{q * 100:g}"] = values[:, index]
+        return result
+
+    def distribution(self, edges: Sequence[float], start_date: Any = None, end_date: Any = None,
+                     filters: Optional[Dict[str, Any]] = None, item: str = 'value') -> np.ndarray:
+        """Приближенное число значений в интервалах (-inf, e1), [e1, e2), ..., [en, +inf) за период"""
+        with self._lock:
+            _, (group, mean, weight) = self._merged(item, start_date, end_date, filters, (), ())
+        shares = np.concatenate([[0.0], tdigest.cdf(mean, weight, edges), [1.0]])
+        return np.diff(shares) * weight.sum()
+
+
+class HeavyHittersTable(SketchTable):
+    """Сводки тяжелых элементов: топ-N значений столбца key по весу weight с границами ошибки
+
+    query возвращает дневные агрегаты (day, измерения, key, weight, aux, attributes) начиная
+    с дня :since. У таблиц без последовательного id прирост дочитывается по дням: последний
+    учтенный день перечитывается целиком, и сводки его срезов заменяются.
+    """
+
+    def __init__(self, name: str, query: str, dimensions: Sequence[str], key: str, weight: str,
+                 aux: Sequence[str] = (), attributes: Sequence[str] = (),
+                 capacity: int = heavy_hitters.HEAVY_HITTERS_CAPACITY, **kwargs):
+        self.key = key
+        self.weight = weight
+        self.aux = tuple(aux)
+        self.attributes = tuple(attributes)
+        self.capacity = capacity
+        super().__init__(name, query, dimensions, (), **kwargs)
+
+    def _empty_entries(self):
+        # Строки сводок: срез, код элемента, вес и дополнительные суммы
+        columns = ('slice', 'item', self.weight) + self.aux
+        return {column: np.zeros(0, dtype=np.int64 if column in ('slice', 'item') else float) for column in columns}
+
+    def _reset(self):
+        super()._reset()
+        self.entries = self._empty_entries()
+        self.thresholds = np.zeros(0)
+        self.item_codes: Dict[Any, int] = {}
+        self.item_keys: list = []
+        self.item_attributes = {attribute: [] for attribute in self.attributes}
+        self.last_day: Optional[int] = None
+
+    def _items(self, delta: pd.DataFrame) -> np.ndarray:
+        """Коды элементов для строк (новые элементы добавляются, атрибуты берутся из последней строки)"""
+        codes, uniques = pd.factorize(delta[self.key].to_numpy(dtype=object))
+        ids = np.empty(len(uniques), dtype=np.int64)
+        for index, key in enumerate(uniques):
+            code = self.item_codes.get(key)
+            if code is None:
+                code = self.item_codes[key] = len(self.item_keys)
+                self.item_keys.append(key)
+                for values in self.item_attributes.values():
+                    values.append(None)
+            ids[index] = code
+
+        last_row = np.zeros(len(uniques), dtype=np.int64)
+        np.maximum.at(last_row, codes, np.arange(len(codes)))
+        for attribute, values in self.item_attributes.items():
+            for code, value in zip(ids, delta[attribute].to_numpy(dtype=object)[last_row]):
+                values[code] = value
+        return ids[codes]
+
+    def _apply_delta(self) -> bool:
+        """Перечитать дни начиная с последнего учтенного; True, если были строки"""
+        from src.database.connection import db_manager
+
+        since = None if self.last_day is None else str(np.datetime64(self.last_day, 'D'))
+        delta = db_manager.execute_query(self.query, {'since': since}, strict=True)
+        if delta.empty:
+            return False
+        delta = delta[delta['day'].notna() & delta[self.key].notna()]
+
+        days = day_index(delta['day'])
+        dims = {dim: delta[dim].astype(object).where(delta[dim].notna(), '').to_numpy() for dim in self.dimensions}
+        slices = self._slices(days, dims)
+        items = self._items(delta)
+
+        # Прежние сводки перечитанных дней заменяются целиком
+        self.thresholds = np.concatenate([self.thresholds, np.zeros(len(self.slice_days) - len(self.thresholds))])
+        if self.last_day is not None:
+            current = self.slice_days[self.entries['slice']] < self.last_day
+            self.entries = {column: values[current] for column, values in self.entries.items()}
+            self.thresholds[self.slice_days >= self.last_day] = 0
+
+        weight = delta[self.weight].fillna(0).to_numpy(dtype=float)
+        keep, thresholds = heavy_hitters.truncate(slices, weight, self.capacity, len(self.slice_days))
+        self.thresholds = np.maximum(self.thresholds, thresholds)
+        added = {'slice': slices[keep], 'item': items[keep], self.weight: weight[keep]}
+        for column in self.aux:
+            added[column] = delta[column].fillna(0).to_numpy(dtype=float)[keep]
+        self.entries = {column: np.concatenate([values, added[column]]) for column, values in self.entries.items()}
+        self.last_day = int(days.max()) if self.last_day is None else max(self.last_day, int(days.max()))
+        return True
+
+    def top(self, n: int, start_date: Any = None, end_date: Any = None,
+            filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Топ-n элементов по весу за период
+
+        Вес и столбцы aux - нижние границы (суммы по срезам, где элемент попал в сводку),
+        столбец <weight>_error - на сколько вес может быть больше. filters может содержать
+        и значение key (отбор одного элемента).
+        """
+        filters = dict(filters or {})
+        key_value = filters.pop(self.key, None)
+        with self._lock:
+            self.refresh()
+            slice_group, _ = self._groups(start_date, end_date, filters, (), ())
+            selected = slice_group >= 0
+            rows = selected[self.entries['slice']]
+            item = self.entries['item'][rows]
+            n_items = len(self.item_keys)
+            lower, error = heavy_hitters.merge(
+                item, self.entries[self.weight][rows], self.thresholds[self.entries['slice'][rows]],
+                self.thresholds[selected].sum(), n_items
+            )
+            result = pd.DataFrame({self.key: pd.Series(self.item_keys, dtype=object)})
+            for attribute, values in self.item_attributes.items():
+                result[attribute] = pd.Series(values, dtype=object)
+            result[self.weight] = lower
+            for column in self.aux:
+                result[column] = np.bincount(item, weights=self.entries[column][rows], minlength=n_items)
+            result[f'{self.weight}_error'] = error
+
+        result = result[np.bincount(item, minlength=n_items) > 0]
+        if key_value is not None:
+            result = result[result[self.key] == key_value]
+        return result.sort_values(self.weight, ascending=False).head(n).reset_index(drop=True)
+
+
+class SketchStore:
+    """Таблицы скетчей по именам; ошибки расчета не прерывают построение панелей
+
+    None вместо результата (ошибка или скетчи еще строятся) - страница отвечает точным запросом.
+    """
+
+    def __init__(self, tables: Sequence[SketchTable]):
+        self.tables = {table.name: table for table in tables}
+
+    def distinct(self, name: str, start_date: Any = None, end_date: Any = None,
+                 filters: Optional[Dict[str, Any]] = None, group_by: Sequence[str] = (),
+                 require: Sequence[str] = ()) -> Optional[pd.DataFrame]:
+        """Приближенное число уникальных значений (None при ошибке или до первой сборки - используется точный запрос)"""
+        try:
+            return self.tables[name].distinct(start_date, end_date, filters, group_by, require)
+        except SketchNotReady:
+            return None
+        except Exception as e:
+            logger.warning(f"Sketch estimate for {name} failed: {e}")
+            return None
+
+    def quantiles(self, name: str, qs: Sequence[float], start_date: Any = None, end_date: Any = None,
+                  filters: Optional[Dict[str, Any]] = None, group_by: Sequence[str] = (),
+                  require: Sequence[str] = ()) -> Optional[pd.DataFrame]:
+        """Приближенные квантили по группам (None при ошибке)"""
+        try:
+            return self.tables[name].quantiles(qs, start_date, end_date, filters, group_by, require)
+        except SketchNotReady:
+            return None
+        except Exception as e:
+            logger.warning(f"Quantile sketch for {name} failed: {e}")
+            return None
+
+    def distribution(self, name: str, edges: Sequence[float], start_date: Any = None, end_date: Any = None,
+                     filters: Optional[Dict[str, Any]] = None) -> Optional[np.ndarray]:
+        """Приближенное число значений в интервалах между edges (None при ошибке)"""
+        try:
+            return self.tables[name].distribution(edges, start_date, end_date, filters)
+        except SketchNotReady:
+            return None
+        except Exception as e:
+            logger.warning(f"Quantile sketch for {name} failed: {e}")
+            return None
+
+    def top(self, name: str, n: int, start_date: Any = None, end_date: Any = None,
+            filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """Топ-n элементов по весу с границами ошибки (None при ошибке)"""
+        try:
+            return self.tables[name].top(n, start_date, end_date, filters)
+        except SketchNotReady:
+            return None
+        except Exception as e:
+            logger.warning(f"Heavy hitters sketch for {name} failed: {e}")
+            return None
+
+
+# Глобальное хранилище скетчей: уникальные значения, квантили и топ-N
+sketch_store = SketchStore([
+    DistinctSketchTable('orders', ORDERS_SKETCH_QUERY, ('category', 'supplier'), ('transaction_id',),
+                        tables=('sales',), rebuild_tables=('products', 'suppliers')),
+    DistinctSketchTable('returns', RETURNS_SKETCH_QUERY, ('category', 'supplier'), ('return_id',),
+                        tables=('returns',), rebuild_tables=('products', 'suppliers')),
+    DistinctSketchTable('buyers', BUYERS_SKETCH_QUERY, ('segment', 'region', 'supplier'), ('customer_id',),
+                        tables=('sales',), rebuild_tables=('user_segments', 'products', 'suppliers')),
+    DistinctSketchTable('sessions', SESSIONS_SKETCH_QUERY, ('channel', 'segment', 'region'),
+                        ('traffic_id', 'customer_id'), tables=('traffic',), rebuild_tables=('user_segments',)),
+    DistinctSketchTable('channel_orders', CHANNEL_ORDERS_SKETCH_QUERY, ('channel',), ('transaction_id',),
+                        tables=('sales',)),
+    QuantileSketchTable('resolution_time', RESOLUTION_TIME_SKETCH_QUERY, ('issue_type', 'segment', 'region'),
+                        ('value',), tables=('customer_support',), rebuild_tables=('user_segments',)),
+    QuantileSketchTable('order_value', ORDER_VALUE_SKETCH_QUERY, ('category', 'supplier'), ('value',),
+                        tables=('sales',), rebuild_tables=('products', 'suppliers')),
+    HeavyHittersTable('top_products', TOP_PRODUCTS_SKETCH_QUERY, ('category', 'supplier'), key='product_id',
+                      weight='total_revenue', aux=('sales_count',), attributes=('product_name', 'category'),
+                      tables=('sales',), rebuild_tables=('products', 'suppliers')),
+    # Заказ с товарами нескольких категорий учитывается в orders_count каждой из них
+    HeavyHittersTable('suppliers', SUPPLIER_SKETCH_QUERY, ('category',), key='supplier_name',
+                      weight='total_revenue', aux=('orders_count',), attributes=('supplier_rating',),
+                      tables=('sales',), rebuild_tables=('products', 'suppliers')),
+    HeavyHittersTable('product_ads', PRODUCT_AD_SKETCH_QUERY, ('campaign', 'category'), key='product_id',
+                      weight='total_revenue', aux=('total_spend', 'total_clicks'),
+                      attributes=('product_name', 'category'), tables=('ad_revenue',), rebuild_tables=('products',)),
+    HeavyHittersTable('campaign_ctr', CAMPAIGN_CTR_SKETCH_QUERY, (), key='campaign_name',
+                      weight='total_impressions', aux=('total_clicks',), tables=('ad_revenue',)),
+])
@@ -0,0 +1,82 @@
+"""
+t-digest: приближенные квантили по центроидам (среднее, вес)
+
+Центроиды группы упорядочены по среднему; при сжатии соседние центроиды объединяются,
+пока их квантильный интервал укладывается в единицу шкалы k1 (arcsin) - у хвостов
+распределения центроиды мельче, поэтому p99 оценивается точнее медианы по относительной
+ошибке. Дайджесты объединяются конкатенацией центроидов и повторным сжатием, поэтому
+дайджесты по дням и значениям фильтров складываются в дайджест любого диапазона.
+Все операции векторные и работают сразу для многих групп (номер группы у каждого центроида).
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+
+# Параметр сжатия: около TDIGEST_COMPRESSION / 2 центроидов на группу
+TDIGEST_COMPRESSION = 200
+
+
+def scale_k(q: np.ndarray, compression: float = TDIGEST_COMPRESSION) -> np.ndarray:
+    """Шкала k1: квантиль -> номер центроида (мелкие центроиды у хвостов)"""
+    return compression / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0, 1) - 1)
+
+
+def _group_positions(group: np.ndarray, weight: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Накопленный вес внутри группы (до центроида) и полный вес группы для каждого центроида"""
+    cumulative = np.cumsum(weight)
+    totals = np.bincount(group, weights=weight)
+    before_group = np.concatenate([[0.0], np.cumsum(totals)])[group]
+    return cumulative - weight - before_group, totals[group]
+
+
+def compress(group: np.ndarray, mean: np.ndarray, weight: np.ndarray,
+             compression: float = TDIGEST_COMPRESSION) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Сжать центроиды каждой группы; результат упорядочен по (группа, среднее)"""
+    keep = weight > 0
+    group, mean, weight = group[keep], mean[keep], weight[keep]
+    if not len(group):
+        return group.astype(np.int64), mean.astype(float), weight.astype(float)
+
+    order = np.lexsort((mean, group))
+    group, mean, weight = group[order].astype(np.int64), mean[order].astype(float), weight[order].astype(float)
+
+    # Номер кластера - целая часть k1 от квантиля середины центроида; внутри группы он не убывает
+    before, total = _group_positions(group, weight)
+    cluster = np.floor(scale_k((before + weight / 2) / total, compression)).astype(np.int64)
+    start = np.flatnonzero(np.concatenate([[True], (group[1:] != group[:-1]) | (cluster[1:] != cluster[:-1])]))
+
+    merged_weight = np.add.reduceat(weight, start)
+    merged_mean = np.add.reduceat(weight * mean, start) / merged_weight
+    return group[start], merged_mean, merged_weight
+
+
+def quantiles(group: np.ndarray, mean: np.ndarray, weight: np.ndarray, n_groups: int,
+              qs: Sequence[float]) -> np.ndarray:
+    """Квантили qs для каждой группы сжатого дайджеста (матрица группы x квантили; NaN - пустая группа)"""
+    result = np.full((n_groups, len(qs)), np.nan)
+    if not len(group):
+        return result
+
+    # Положение середины центроида в группе (0..1); группа + положение монотонно по всем центроидам
+    before, total = _group_positions(group, weight)
+    position = group + (before + weight / 2) / total
+    first = np.searchsorted(group, np.arange(n_groups), side='left')
+    last = np.searchsorted(group, np.arange(n_groups), side='right') - 1
+    present = last >= first
+
+    groups = np.flatnonzero(present)
+    targets = groups[:, None] + np.asarray(qs, dtype=float)[None, :]
+    # Квантили за пределами крайних центроидов группы ограничиваются их средними
+    targets = np.clip(targets, position[first[groups]][:, None], position[last[groups]][:, None])
+    result[groups] = np.interp(targets.ravel(), position, mean).reshape(targets.shape)
+    return result
+
+
+def cdf(mean: np.ndarray, weight: np.ndarray, values: Sequence[float]) -> np.ndarray:
+    """Доля веса не больше каждого из values для одного сжатого дайджеста (центроиды по возрастанию)"""
+    values = np.asarray(values, dtype=float)
+    total = weight.sum()
+    if not total:
+        return np.zeros(len(values))
+    position = (np.cumsum(weight) - weight / 2) / total
+    return np.interp(values, mean, position, left=0.0, right=1.0)
@@ -0,0 +1,79 @@
+"""
+Фоновый поиск аномалий: запрос дней выполняется без блокировки монитора
+"""
+import sys
+import threading
+import time
+import types
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.database.alerts import ANOMALY_HISTORY_DAYS, ANOMALY_METRICS, AnomalyMonitor
+
+TIMEOUT_S = 5
+
+
+class FakeDatabase:
+    """Дневные метрики в памяти вместо базы; release - запрос ждет события"""
+
+    def __init__(self):
+        self.release = None
+        self.started = threading.Event()
+        self.queries = 0
+
+    def execute_query(self, query, params=None, strict=False):
+        self.queries += 1
+        self.started.set()
+        if self.release is not None:
+            self.release.wait(TIMEOUT_S)
+        days = pd.date_range(params['since'], params['until']).date
+        rng = np.random.default_rng(len(days))
+        data = pd.DataFrame(rng.normal(100, 5, (len(days), len(ANOMALY_METRICS))), columns=list(ANOMALY_METRICS))
+        return data.assign(date=days)
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setitem(sys.modules, 'src.database.connection', types.SimpleNamespace(db_manager=database))
+    return database
+
+
+def test_report_is_available_during_query(database):
+    database.release = threading.Event()
+    monitor = AnomalyMonitor(60)
+    thread = threading.Thread(target=monitor.check)
+    thread.start()
+    assert database.started.wait(TIMEOUT_S)
+
+    # Блокировка не удерживается на время запроса
+    acquired = monitor._lock.acquire(timeout=TIMEOUT_S)
+    assert acquired
+    monitor._lock.release()
+    assert monitor.report()['last_date'] is None
+
+    database.release.set()
+    thread.join(TIMEOUT_S)
+    assert monitor.report()['last_date'] == (date.today() - timedelta(days=1)).isoformat()
+    assert monitor.detector.count.max() == ANOMALY_HISTORY_DAYS
+
+
+def test_concurrent_checks_apply_days_once(database):
+    database.release = threading.Event()
+    monitor = AnomalyMonitor(60)
+    threads = [threading.Thread(target=monitor.check) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + TIMEOUT_S
+    while database.queries < 2:
+        assert time.monotonic() < deadline, "checks did not query concurrently"
+        time.sleep(0.001)
+
+    database.release.set()
+    for thread in threads:
+        thread.join(TIMEOUT_S)
+    # Дни, прочитанные обеими проверками, учитываются детектором один раз
+    assert monitor.detector.count.max() == ANOMALY_HISTORY_DAYS
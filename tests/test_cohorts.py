@@ -0,0 +1,112 @@
+"""
+Когорты: фоновая сборка, прирост по месяцам в сравнении с группировкой pandas, ошибки запросов
+"""
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.database.failures import QueryFailed, track_query_failures
+from src.utils.cohorts import CohortEngine, month_index
+
+TIMEOUT_S = 5
+
+SALES = pd.DataFrame({
+    'customer_id': [1, 1, 2, 2, 3, 1, 4, 3],
+    'month': pd.to_datetime(['2025-01-01', '2025-02-01', '2025-01-01', '2025-03-01',
+                             '2025-02-01', '2025-04-01', '2025-04-01', '2025-04-01']),
+    'revenue': [10.0, 20.0, 5.0, 7.0, 3.0, 8.0, 2.0, 4.0],
+})
+MARCH, APRIL = month_index(['2025-03-01', '2025-04-01'])
+
+
+class FakeDatabase:
+    """Строки «клиент x месяц» в памяти вместо базы; failing - запросы завершаются ошибкой"""
+
+    def __init__(self):
+        self.failing = False
+        self.release = None
+        self.loads = []
+
+    def execute_query(self, query, params=None, strict=False):
+        if self.release is not None:
+            self.release.wait(TIMEOUT_S)
+        if self.failing:
+            raise QueryFailed("Query execution failed")
+        self.loads.append((params['since'], params['until']))
+        mask = SALES['month'] < pd.Timestamp(params['until'])
+        if params['since'] is not None:
+            mask &= SALES['month'] >= pd.Timestamp(params['since'])
+        return SALES[mask].reset_index(drop=True)
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setitem(sys.modules, 'src.database.connection', types.SimpleNamespace(db_manager=database))
+    return database
+
+
+def wait_ready(engine):
+    deadline = time.monotonic() + TIMEOUT_S
+    while not engine.ready:
+        assert time.monotonic() < deadline, "cohorts not built"
+        time.sleep(0.001)
+
+
+def expected_active(sales):
+    """Активные клиенты когорты по возрасту группировкой pandas"""
+    sales = sales.assign(month=month_index(sales['month']))
+    cohort = sales.groupby('customer_id')['month'].transform('min')
+    base = cohort.min()
+    size = sales['month'].max() - base + 1
+    active = np.zeros((size, size), dtype=np.int64)
+    np.add.at(active, (cohort - base, sales['month'] - cohort), 1)
+    return active
+
+
+def test_first_build_runs_in_background(database):
+    database.release = threading.Event()
+    engine = CohortEngine({})
+    # Пока идет сборка, когорт нет, и пустая панель помечается как неудачная
+    with track_query_failures() as failures:
+        assert engine.matrix(APRIL) is None
+    assert failures
+    database.release.set()
+    wait_ready(engine)
+    np.testing.assert_array_equal(engine.matrix(APRIL).active, expected_active(SALES))
+
+
+def test_new_months_are_added_incrementally(database):
+    engine = CohortEngine({})
+    engine._build(MARCH - 1)
+    database.loads.clear()
+    result = engine.matrix(APRIL)
+    # Дочитывается только завершившийся март, затем текущий апрель
+    assert database.loads == [('2025-03-01', '2025-04-01'), ('2025-04-01', '2025-05-01')]
+    assert engine.loaded_through == MARCH
+    np.testing.assert_array_equal(result.active, expected_active(SALES))
+
+
+def test_failed_load_keeps_state(database):
+    engine = CohortEngine({})
+    engine._build(MARCH - 1)
+    active = engine.active
+
+    database.failing = True
+    assert engine.matrix(APRIL) is None
+    assert engine.loaded_through == MARCH - 1 and engine.active is active
+
+    database.failing = False
+    np.testing.assert_array_equal(engine.matrix(APRIL).active, expected_active(SALES))
+
+
+def test_failed_build_is_not_published(database):
+    database.failing = True
+    engine = CohortEngine({})
+    engine._build(MARCH)
+    assert not engine.ready and engine.loaded_through is None
@@ -0,0 +1,103 @@
+"""
+Витрина признаков клиентов: фоновая сборка, признаки в сравнении с группировкой pandas
+"""
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.database.failures import QueryFailed
+from src.database.queries.customer_behavior import (
+    CUSTOMER_ATTRIBUTES_QUERY, CUSTOMER_RETURNS_DELTA_QUERY, CUSTOMER_SALES_DELTA_QUERY, CUSTOMER_TICKETS_DELTA_QUERY,
+)
+from src.utils.feature_store import CustomerFeatureStore
+
+TIMEOUT_S = 5
+
+CUSTOMERS = pd.DataFrame({'customer_id': [1, 2, 3], 'segment': ['a', 'b', 'a'], 'region': ['x', 'x', 'y']})
+SALES = pd.DataFrame({
+    'customer_id': [1, 1, 2, 9],
+    'day': pd.to_datetime(['2025-01-02', '2025-01-10', '2025-01-05', '2025-01-05']),
+    'orders': [1, 2, 1, 1], 'lines': [1, 3, 2, 1], 'revenue': [10.0, 45.0, 20.0, 99.0],
+    'last_id': [1, 2, 3, 4],
+})
+RETURNS = pd.DataFrame({'customer_id': [2], 'day': pd.to_datetime(['2025-01-05']), 'returns': [1], 'last_id': [1]})
+TICKETS = pd.DataFrame({'customer_id': [3], 'day': pd.to_datetime(['2025-01-07']), 'tickets': [2], 'last_id': [1]})
+
+
+class FakeDatabase:
+    """Таблицы в памяти вместо базы; failing - запросы, которые завершаются ошибкой"""
+
+    def __init__(self):
+        self.tables = {
+            CUSTOMER_ATTRIBUTES_QUERY: CUSTOMERS, CUSTOMER_SALES_DELTA_QUERY: SALES,
+            CUSTOMER_RETURNS_DELTA_QUERY: RETURNS, CUSTOMER_TICKETS_DELTA_QUERY: TICKETS,
+        }
+        self.failing = set()
+        self.release = None
+
+    def execute_query(self, query, params=None, strict=False):
+        if self.release is not None:
+            self.release.wait(TIMEOUT_S)
+        if query in self.failing:
+            raise QueryFailed("Query execution failed")
+        data = self.tables[query]
+        if params is not None:
+            data = data[data['last_id'] > params['last_id']]
+        return data.reset_index(drop=True)
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setitem(sys.modules, 'src.database.connection', types.SimpleNamespace(db_manager=database))
+    return database
+
+
+def wait_ready(store):
+    deadline = time.monotonic() + TIMEOUT_S
+    while not store.ready:
+        assert time.monotonic() < deadline, "feature store not built"
+        time.sleep(0.001)
+
+
+def test_first_build_runs_in_background(database):
+    database.release = threading.Event()
+    store = CustomerFeatureStore()
+    # Пока идет сборка, витрина сразу отвечает None (панели строятся запросами)
+    assert store.features('2025-01-01', '2025-01-31') is None
+    database.release.set()
+    wait_ready(store)
+    assert store.features('2025-01-01', '2025-01-31') is not None
+
+
+def test_features_match_pandas_groupby(database):
+    store = CustomerFeatureStore()
+    store.refresh()
+    wait_ready(store)
+    features = store.features('2025-01-01', '2025-01-09').set_index('customer_id')
+
+    sales = SALES[(SALES['day'] <= '2025-01-09') & SALES['customer_id'].isin(CUSTOMERS['customer_id'])]
+    expected = sales.groupby('customer_id')[['orders', 'lines', 'revenue']].sum().reindex(
+        CUSTOMERS['customer_id'], fill_value=0)
+    np.testing.assert_array_equal(features['orders'], expected['orders'])
+    np.testing.assert_array_equal(features['lines'], expected['lines'])
+    np.testing.assert_allclose(features['revenue'], expected['revenue'])
+    assert features.loc[2, 'returns'] == 1 and features.loc[3, 'tickets'] == 2
+    assert features.loc[3, 'rfm_segment'] == 'Неактивные'
+
+
+def test_failed_build_keeps_store_not_ready(database):
+    database.failing.add(CUSTOMER_SALES_DELTA_QUERY)
+    store = CustomerFeatureStore()
+    store.refresh()
+    deadline = time.monotonic() + TIMEOUT_S
+    while store._building:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+    assert not store.ready
+    assert store.features('2025-01-01', '2025-01-31') is None
@@ -0,0 +1,147 @@
+"""
+Прогнозирование: векторная модель Холта-Уинтерса в сравнении с пошаговым расчетом по одному ряду
+"""
+import itertools
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.database.failures import QueryFailed
+from src.utils import forecasting
+from src.utils.forecasting import (
+    ALPHAS, BETAS, GAMMAS, SEASON_LENGTH, SeriesForecaster, fit_holt_winters, forecast_holt_winters,
+    update_holt_winters,
+)
+
+
+def naive_holt_winters(y, alpha, beta, gamma, m=SEASON_LENGTH):
+    """Аддитивный Холт-Уинтерс по одному ряду циклом: состояние и сумма квадратов ошибок после первого сезона"""
+    level = np.mean(y[:m])
+    trend = (np.mean(y[m:2 * m]) - level) / m
+    season = list(np.asarray(y[:m]) - level)
+    sse = 0.0
+    for t, value in enumerate(y):
+        s = season[t % m]
+        error = value - (level + trend + s)
+        if t >= m:
+            sse += error ** 2
+        new_level = alpha * (value - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[t % m] = gamma * (value - new_level) + (1 - gamma) * s
+        level = new_level
+    return level, trend, season, sse
+
+
+def sample_series(n_series=3, days=70, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    weekly = np.array([0, 5, 10, 5, 0, -10, -10])
+    return np.array([
+        100 + 10 * k + 0.5 * t + (k + 1) * weekly[t % SEASON_LENGTH] + rng.normal(0, 2, days)
+        for k in range(n_series)
+    ])
+
+
+def test_fit_matches_naive_grid_search():
+    values = sample_series()
+    state = fit_holt_winters(values)
+    for row, y in enumerate(values):
+        sse = {params: naive_holt_winters(y, *params)[3] for params in itertools.product(ALPHAS, BETAS, GAMMAS)}
+        best = min(sse, key=sse.get)
+        assert (state.alpha[row], state.beta[row], state.gamma[row]) == best
+
+        level, trend, season, best_sse = naive_holt_winters(y, *best)
+        assert np.isclose(state.level[row], level)
+        assert np.isclose(state.trend[row], trend)
+        assert np.isclose(state.sse[row], best_sse)
+        np.testing.assert_allclose(state.season[row], season)
+
+
+def test_incremental_update_equals_full_pass():
+    values = sample_series(days=88)
+    fitted = fit_holt_winters(values[:, :70])
+    updated = update_holt_winters(fitted, values[:, 70:])
+    for row, y in enumerate(values):
+        level, trend, season, _ = naive_holt_winters(y, fitted.alpha[row], fitted.beta[row], fitted.gamma[row])
+        assert np.isclose(updated.level[row], level)
+        assert np.isclose(updated.trend[row], trend)
+        np.testing.assert_allclose(updated.season[row], season)
+    assert updated.season_pos == 88 % SEASON_LENGTH
+    assert updated.n_errors == fitted.n_errors + 18
+
+
+def test_forecast_continues_trend_and_season():
+    t = np.arange(84 + 14)
+    weekly = np.array([0, 5, 10, 5, 0, -10, -10])
+    y = 50 + 0.5 * t + weekly[t % SEASON_LENGTH]
+    state = fit_holt_winters(y[None, :84])
+    mean, lower, upper = forecast_holt_winters(state, 14)
+    np.testing.assert_allclose(mean[0], y[84:], atol=1.0)
+    assert (lower <= mean).all() and (mean <= upper).all()
+
+
+def test_series_forecaster_extends_models_incrementally(monkeypatch):
+    monkeypatch.setattr(forecasting, 'HISTORY_DAYS', 70)
+    first_day = date(2025, 1, 1)
+    values = sample_series(days=84)
+    names = np.array(['a', 'b', 'c'], dtype=object)
+    data = pd.DataFrame({
+        'series': np.repeat(names, values.shape[1]),
+        'date': np.tile(pd.date_range(first_day, periods=values.shape[1]), len(names)),
+        'revenue': values.ravel(),
+    })
+    loads = []
+
+    def load(start, end):
+        loads.append((start, end))
+        return data[(data['date'] >= pd.Timestamp(start)) & (data['date'] <= pd.Timestamp(end))]
+
+    forecaster = SeriesForecaster('category', {})
+    forecaster._load = load
+    forecaster.fit_through(first_day + timedelta(days=69))
+    forecaster.fit_through(first_day + timedelta(days=83))
+    # Второй раз загружаются только новые дни
+    assert loads[1] == (first_day + timedelta(days=70), first_day + timedelta(days=83))
+
+    expected = update_holt_winters(fit_holt_winters(values[:, :70]), values[:, 70:])
+    result = forecaster.forecast(7)
+    mean, lower, upper = forecast_holt_winters(expected, 7)
+    np.testing.assert_array_equal(result.series, names)
+    np.testing.assert_allclose(result.mean, np.maximum(mean, 0))
+    np.testing.assert_allclose(result.upper, np.maximum(upper, 0))
+    assert result.dates[0] == pd.Timestamp(first_day + timedelta(days=84))
+
+
+def test_series_forecaster_keeps_models_when_query_fails(monkeypatch):
+    monkeypatch.setattr(forecasting, 'HISTORY_DAYS', 70)
+    first_day = date(2025, 1, 1)
+    values = sample_series(days=70)
+    names = np.array(['a', 'b', 'c'], dtype=object)
+    data = pd.DataFrame({
+        'series': np.repeat(names, values.shape[1]),
+        'date': np.tile(pd.date_range(first_day, periods=values.shape[1]), len(names)),
+        'revenue': values.ravel(),
+    })
+    failing = False
+
+    def load(start, end):
+        if failing:
+            raise QueryFailed("Query execution failed")
+        return data[(data['date'] >= pd.Timestamp(start)) & (data['date'] <= pd.Timestamp(end))]
+
+    forecaster = SeriesForecaster('category', {})
+    forecaster._load = load
+    forecaster.fit_through(first_day + timedelta(days=69))
+    state = forecaster.state
+
+    # Ни дообучение, ни полное переобучение не портят модели ошибкой запроса
+    failing = True
+    forecaster.fit_through(first_day + timedelta(days=75))
+    forecaster.fit_through(first_day + timedelta(days=120))
+    assert forecaster.state is state
+    assert forecaster.fitted_through == first_day + timedelta(days=69)
+
+    failing = False
+    forecaster.fit_through(first_day + timedelta(days=69))
+    assert forecaster.forecast(7).dates[0] == pd.Timestamp(first_day + timedelta(days=70))
@@ -0,0 +1,105 @@
+"""
+Упорядоченная воронка: сравнение с прямым перебором цепочек на малых данных
+"""
+import numpy as np
+import pytest
+
+from src.utils.funnel import TIME_BINS, FunnelAccumulator
+
+N_STEPS = 4
+WINDOW_MS = 10_000
+
+
+def naive_users(customer, ts, step, n_steps, window_ms):
+    """Число клиентов, прошедших каждый шаг: цепочка событий шагов 0..k строго по времени в пределах окна"""
+    users = np.zeros(n_steps, dtype=np.int64)
+    for client in np.unique(customer):
+        mask = customer == client
+        events = sorted(zip(ts[mask], step[mask]))
+        reached = 0
+        for start, first_step in events:
+            if first_step != 0:
+                continue
+            # Для фиксированного начала лучшая цепочка - самое раннее подходящее событие каждого шага
+            current, k = start, 1
+            while k < n_steps:
+                later = [t for t, s in events if s == k and t > current]
+                if not later or later[0] - start > window_ms:
+                    break
+                current, k = later[0], k + 1
+            reached = max(reached, k)
+        users[:reached] += 1
+    return users
+
+
+def random_events(seed, n_customers=40, max_events=16):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for client in range(n_customers):
+        n = rng.integers(1, max_events)
+        times = np.sort(rng.integers(0, 2 * WINDOW_MS, n))
+        rows += [(client * 7 + 3, t, s) for t, s in zip(times, rng.integers(0, N_STEPS, n))]
+    customer, ts, step = (np.array(column, dtype=np.int64) for column in zip(*rows))
+    return customer, ts, step
+
+
+def run(customer, ts, step, chunk):
+    accumulator = FunnelAccumulator(N_STEPS, WINDOW_MS)
+    for start in range(0, len(customer), chunk):
+        end = start + chunk
+        accumulator.add(customer[start:end], ts[start:end], step[start:end])
+    return accumulator.result(tuple(range(N_STEPS)), WINDOW_MS // 3_600_000)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_naive_reference(seed):
+    customer, ts, step = random_events(seed)
+    result = run(customer, ts, step, len(customer))
+    np.testing.assert_array_equal(result.users, naive_users(customer, ts, step, N_STEPS, WINDOW_MS))
+
+
+@pytest.mark.parametrize('chunk', [1, 2, 3, 7, 50])
+def test_customer_split_across_chunks(chunk):
+    customer, ts, step = random_events(42)
+    whole = run(customer, ts, step, len(customer))
+    split = run(customer, ts, step, chunk)
+    np.testing.assert_array_equal(split.users, whole.users)
+    np.testing.assert_array_equal(split.median_seconds, whole.median_seconds)
+
+
+@pytest.mark.parametrize('last_ts, passed', [(WINDOW_MS, 4), (WINDOW_MS + 1, 3)])
+def test_window_boundary(last_ts, passed):
+    customer = np.array([1, 1, 1, 1])
+    ts = np.array([0, 1_000, 2_000, last_ts])
+    step = np.array([0, 1, 2, 3])
+    result = run(customer, ts, step, len(customer))
+    np.testing.assert_array_equal(result.users, [1] * passed + [0] * (N_STEPS - passed))
+
+
+def test_later_start_rescues_chain():
+    # Цепочка от первого просмотра не укладывается в окно, от второго - укладывается
+    customer = np.array([1, 1, 1, 1, 1])
+    ts = np.array([0, 8_000, 9_000, 12_000, 17_000])
+    step = np.array([0, 0, 1, 2, 3])
+    result = run(customer, ts, step, 2)
+    np.testing.assert_array_equal(result.users, [1, 1, 1, 1])
+
+
+def test_same_timestamp_is_not_a_step():
+    customer = np.array([1, 1])
+    ts = np.array([5_000, 5_000])
+    step = np.array([0, 1])
+    result = run(customer, ts, step, len(customer))
+    np.testing.assert_array_equal(result.users, [1, 0, 0, 0])
+
+
+def test_median_time_to_step():
+    # Три клиента доходят до клика за 2, 4 и 6 секунд
+    customer = np.array([1, 1, 2, 2, 3, 3])
+    ts = np.array([0, 2_000, 0, 4_000, 0, 6_000])
+    step = np.array([0, 1, 0, 1, 0, 1])
+    result = run(customer, ts, step, 3)
+    width = np.diff(TIME_BINS)[np.searchsorted(TIME_BINS, 4.0) - 1]
+    assert result.median_seconds[0] == 0
+    assert abs(result.median_seconds[1] - 4.0) <= width
+    assert np.isnan(result.median_seconds[2])
@@ -0,0 +1,52 @@
+"""
+Шаг агрегации трендов: число точек графика, построенного панелью, ограничено выбором шага
+"""
+import types
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.components.pages.business_sales import PANEL_RENDERERS, build_business_params
+from src.database.queries.business_sales import SALES_TREND_QUERY
+from src.utils.downsampling import DAILY_MAX_DAYS, WEEKLY_MAX_DAYS
+
+END = date(2025, 6, 30)
+DAILY = pd.DataFrame({'date': pd.date_range(END - timedelta(days=3650), END)})
+DAILY['daily_revenue'] = np.random.default_rng(5).gamma(2, 500, len(DAILY))
+DAILY['orders_count'] = 10
+
+
+def trend_query(params):
+    """SALES_TREND_QUERY по дневным данным в памяти: DATE_TRUNC(:granularity) и сумма по шагу"""
+    data = DAILY[(DAILY['date'] >= pd.Timestamp(params['start_date'])) & (DAILY['date'] <= pd.Timestamp(params['end_date']))]
+    period = {'day': 'D', 'week': 'W-SUN', 'month': 'M'}[params['granularity']]
+    step = data['date'].dt.to_period(period).dt.start_time
+    return data.groupby(step)[['orders_count', 'daily_revenue']].sum().rename_axis('date').reset_index()
+
+
+def render_trend(days):
+    params = build_business_params((END - timedelta(days=days)).isoformat(), END.isoformat(), 'all', 'all')
+
+    def query(sql):
+        assert sql == SALES_TREND_QUERY
+        return trend_query(params)
+
+    figure = PANEL_RENDERERS['sales-trend-chart'](types.SimpleNamespace(params=params, query=query))
+    return params['granularity'], figure['data'][0]
+
+
+@pytest.mark.parametrize('days, granularity, max_points', [
+    (30, 'day', 31),
+    (DAILY_MAX_DAYS, 'day', DAILY_MAX_DAYS + 1),
+    (365, 'week', 54),
+    (WEEKLY_MAX_DAYS, 'week', WEEKLY_MAX_DAYS // 7 + 2),
+    (3650, 'month', 121),
+])
+def test_trend_panel_points_bounded_by_granularity(days, granularity, max_points):
+    chosen, trace = render_trend(days)
+    assert chosen == granularity
+    assert max_points - 2 <= len(trace['x']) <= max_points
+    # Ряд рисуется обычным SVG-трейсом без прореживания
+    assert trace['type'] == 'scatter'
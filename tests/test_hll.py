@@ -0,0 +1,98 @@
+"""
+HyperLogLog: оценки и объединение скетчей в сравнении с точными значениями, сборка таблицы скетчей
+"""
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.database.failures import QueryFailed
+from src.utils.sketches.hll import HLL_PRECISION, hash_values, hll_error, hll_estimate, hll_registers
+from src.utils.sketches.store import DistinctSketchTable, SketchNotReady
+
+ORDERS = pd.DataFrame({
+    'day': pd.to_datetime(['2025-01-01', '2025-01-01', '2025-01-02', '2025-01-03']),
+    'category': ['a', 'b', 'a', 'a'],
+    'transaction_id': [1, 2, 1, 3],
+    'last_id': [1, 2, 3, 4],
+})
+
+
+class FakeDatabase:
+    """Строки заказов в памяти вместо базы; failing - запросы завершаются ошибкой"""
+
+    def __init__(self):
+        self.failing = False
+
+    def execute_query(self, query, params=None, strict=False):
+        if self.failing:
+            raise QueryFailed("Query execution failed")
+        return ORDERS[ORDERS['last_id'] > params['last_id']].reset_index(drop=True)
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setitem(sys.modules, 'src.database.connection', types.SimpleNamespace(db_manager=database))
+    return database
+
+
+def hll_sketch(values, precision=HLL_PRECISION):
+    register, rank = hll_registers(hash_values(np.asarray(values)), precision)
+    registers = np.zeros(1 << precision, dtype=np.uint8)
+    np.maximum.at(registers, register, rank)
+    return registers
+
+
+@pytest.mark.parametrize('n', [10, 1_000, 50_000])
+def test_hll_estimate_close_to_exact(n):
+    values = np.arange(n, dtype=np.int64) * 31 + 7
+    estimate = hll_estimate(hll_sketch(values))[0]
+    assert abs(estimate - n) <= max(4 * hll_error() * n, 1)
+
+
+def test_hll_merge_equals_sketch_of_union():
+    a = np.arange(0, 30_000, dtype=np.int64)
+    b = np.arange(20_000, 60_000, dtype=np.int64)
+    merged = np.maximum(hll_sketch(a), hll_sketch(b))
+    np.testing.assert_array_equal(merged, hll_sketch(np.union1d(a, b)))
+
+    exact = len(np.union1d(a, b))
+    assert abs(hll_estimate(merged)[0] - exact) <= 4 * hll_error() * exact
+
+
+def test_hll_duplicates_do_not_count():
+    values = np.repeat(np.arange(500, dtype=np.int64), 20)
+    np.testing.assert_array_equal(hll_sketch(values), hll_sketch(np.arange(500, dtype=np.int64)))
+
+
+def test_sketch_table_build_matches_exact_counts(database):
+    table = DistinctSketchTable('orders', 'orders', ('category',), ('transaction_id',), tables=('sales',))
+    table._build()
+    assert table.ready and table.last_id == 4
+
+    result = table.distinct('2025-01-01', '2025-01-03', group_by=('category',)).set_index('category')
+    assert result['transaction_id'].to_dict() == {'a': 2, 'b': 1}
+
+
+def test_failed_build_is_not_published(database):
+    database.failing = True
+    table = DistinctSketchTable('orders', 'orders', ('category',), ('transaction_id',), tables=('sales',))
+    table._build()
+    assert not table.ready
+    with pytest.raises(SketchNotReady):
+        table.refresh()
+
+
+def test_failed_delta_keeps_versions(database):
+    table = DistinctSketchTable('orders', 'orders', ('category',), ('transaction_id',), tables=('sales',))
+    table._build()
+    versions = table.versions
+    table.refreshed_at = float('-inf')
+
+    database.failing = True
+    with pytest.raises(QueryFailed):
+        table.refresh()
+    assert table.versions == versions and table.refreshed_at == float('-inf') and table.last_id == 4
@@ -0,0 +1,69 @@
+"""
+Live-режим KPI: прирост после последнего id и изменения к предыдущему периоду
+"""
+import pandas as pd
+import pytest
+
+from src.components.pages.business_sales import build_business_params, format_business_kpi
+from src.database.failures import mark_failed
+from src.database.queries.business_sales import (
+    LIVE_PREVIOUS_KPI_QUERY, LIVE_RETURNS_DELTA_QUERY, LIVE_SALES_DELTA_QUERY,
+)
+from src.utils import live_kpi
+from src.utils.live_kpi import LiveKpiTracker
+
+SALES = pd.DataFrame({
+    'date': ['2025-03-02', '2025-03-02'], 'orders_count': [3, 2], 'lines_count': [4, 2],
+    'revenue': [400.0, 200.0], 'last_transaction_id': [10, 12],
+})
+PREVIOUS = pd.DataFrame({
+    'prev_total_orders': [4], 'prev_total_revenue': [500.0], 'prev_total_returns': [1], 'prev_avg_order_value': [100.0],
+})
+
+
+class FakeDatabase:
+    """Итоги и прирост в памяти вместо базы; failing - запросы, которые завершаются ошибкой"""
+
+    def __init__(self):
+        self.failing = set()
+        self.queries = []
+
+    def execute_query(self, query, params=None, strict=False):
+        self.queries.append((query, params))
+        if query in self.failing:
+            return mark_failed(pd.DataFrame())
+        if query == LIVE_PREVIOUS_KPI_QUERY:
+            return PREVIOUS
+        if query == LIVE_SALES_DELTA_QUERY:
+            return SALES[SALES['last_transaction_id'] > params['last_transaction_id']]
+        return pd.DataFrame({'returns_count': [0], 'last_return_id': [None]})
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(live_kpi, 'db_manager', database)
+    monkeypatch.setattr(live_kpi, 'LIVE_MIN_REFRESH_S', 0)
+    return database
+
+
+def test_live_snapshot_keeps_previous_period_deltas(database):
+    tracker = LiveKpiTracker(build_business_params('2025-03-02', '2025-03-02', 'all', 'all'))
+    kpi = format_business_kpi(tracker.refresh())
+    assert kpi['total_orders'] == '5'
+    assert kpi['orders_delta'] == '+25.0%' and kpi['revenue_delta'] == '+20.0%'
+
+    # Итоги предыдущего периода читаются один раз до полного пересчета
+    tracker.refresh()
+    assert [query for query, _ in database.queries].count(LIVE_PREVIOUS_KPI_QUERY) == 1
+    previous_params = next(params for query, params in database.queries if query == LIVE_PREVIOUS_KPI_QUERY)
+    assert (previous_params['prev_start_date'], previous_params['prev_end_date']) == ('2025-03-01', '2025-03-01')
+
+
+def test_previous_period_is_retried_after_failure(database):
+    database.failing.add(LIVE_PREVIOUS_KPI_QUERY)
+    tracker = LiveKpiTracker(build_business_params('2025-03-02', '2025-03-02', 'all', 'all'))
+    assert 'orders_delta' not in format_business_kpi(tracker.refresh())
+
+    database.failing.clear()
+    assert format_business_kpi(tracker.refresh())['orders_delta'] == '+25.0%'
@@ -0,0 +1,82 @@
+"""
+Кэш результатов панелей: панели, построенные с ошибкой запроса, не кэшируются и помечаются для клиентского кэша
+"""
+from src.components.panels import (
+    Panel, PageSpec, PanelContext, get_panel_context, mark_error, mark_preview, render_panel,
+)
+from src.database.failures import record_query_failure, track_query_failures
+from src.database.scheduler import WARMUP, db_priority
+
+renders = []
+failing = set()
+
+
+def build_chart(ctx):
+    renders.append(ctx.params['key'])
+    if ctx.params['key'] in failing:
+        # Как db_manager.execute_query при ошибке: пустой результат и учет ошибки
+        record_query_failure()
+    return {'data': [], 'layout': {}}
+
+
+PANEL_RENDERERS = {'test-chart': build_chart}
+PAGE = PageSpec(name='test', path='/test', module=__name__, layout='', params='', inputs=[],
+                panels=[Panel('test-chart')])
+
+
+def render(key):
+    return render_panel(PAGE, PAGE.panels[0], {'key': key})
+
+
+def test_successful_panel_is_cached():
+    render('ok')
+    render('ok')
+    assert renders.count('ok') == 1
+
+
+def test_panel_with_failed_query_is_not_cached():
+    failing.add('failed')
+    render('failed')
+    render('failed')
+    assert renders.count('failed') == 2
+
+    failing.discard('failed')
+    render('failed')
+    render('failed')
+    assert renders.count('failed') == 3
+
+
+def test_memo_failure_reaches_every_panel_sharing_the_value():
+    context = PanelContext({})
+
+    def compute():
+        record_query_failure()
+        return 'empty'
+
+    with track_query_failures() as first:
+        context.memo('query', compute)
+    with track_query_failures() as second:
+        assert context.memo('query', lambda: 'other') == 'empty'
+    assert first and second
+
+
+def test_panel_with_failed_query_is_marked_for_client_cache():
+    failing.add('marked')
+    value = render('marked')
+    assert value['layout']['meta'] == {'error': True}
+    failing.discard('marked')
+    assert 'meta' not in render('marked')['layout']
+
+
+def test_marks_keep_existing_meta_and_wrap_other_outputs():
+    value = mark_error(mark_preview({'data': [], 'layout': {'title': {'text': 'x'}}}))
+    assert value['layout'] == {'title': {'text': 'x'}, 'meta': {'preview': True, 'error': True}}
+    assert mark_error('text').to_plotly_json()['props']['data-error'] == 'true'
+
+
+def test_context_not_shared_across_priority_classes():
+    interactive = get_panel_context('test', {'key': 'ctx'})
+    assert get_panel_context('test', {'key': 'ctx'}) is interactive
+    with db_priority(WARMUP):
+        warmup = get_panel_context('test', {'key': 'ctx'})
+    assert warmup is not interactive
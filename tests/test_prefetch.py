@@ -0,0 +1,30 @@
+"""
+Предзагрузка страниц: значения фильтров совпадают с теми, что отправит браузер
+"""
+from datetime import date, timedelta
+
+from config import config
+from src.components.pages.business_sales import build_business_params
+from src.components.pages.registry import get_page_spec
+from src.components.prefetch import Prefetcher
+
+
+def test_filter_values_use_layout_defaults():
+    page = get_page_spec('/')
+    values = Prefetcher(1).filter_values(page, {'start_date': '2025-01-01', 'end_date': '2025-03-01'})
+    inputs = {(page_input.component_id, page_input.component_property): value
+              for page_input, value in zip(page.inputs, values)}
+    assert inputs[('date-range', 'start_date')] == '2025-01-01'
+    assert inputs[('basic-category-filter', 'value')] == 'all'
+    assert inputs[('exact-counts-toggle', 'value')] is False
+    assert inputs[('preview-toggle', 'value')] == config.preview_enabled
+
+
+def test_prefetched_params_match_first_visit(monkeypatch):
+    monkeypatch.setattr(config, 'preview_enabled', True)
+    page = get_page_spec('/')
+    start = date(2025, 1, 1)
+    for days, preview in ((config.preview_min_days, True), (config.preview_min_days - 1, False)):
+        shared = {'start_date': start.isoformat(), 'end_date': (start + timedelta(days=days)).isoformat()}
+        params = build_business_params(*Prefetcher(1).filter_values(page, shared))
+        assert params['preview'] is preview and params['exact_counts'] is False
@@ -0,0 +1,119 @@
+"""
+AdmissionScheduler: порядок допуска и отказов по классам приоритета при нагрузке
+"""
+import threading
+import time
+
+import pytest
+
+from src.database.scheduler import BACKGROUND, EXPORT, INTERACTIVE, WARMUP, AdmissionRejected, AdmissionScheduler
+
+TIMEOUT_S = 5
+
+
+def make_scheduler(pressure_wait_ms=1000, max_defer_s=TIMEOUT_S):
+    """Планировщик с одним слотом на все классы"""
+    limits = {INTERACTIVE: 1, EXPORT: 1, BACKGROUND: 1, WARMUP: 1}
+    return AdmissionScheduler(1, limits, pressure_wait_ms=pressure_wait_ms,
+                              pressure_window_s=60, max_defer_s=max_defer_s)
+
+
+def class_report(scheduler, cls):
+    return next(row for row in scheduler.report()['classes'] if row['class'] == cls)
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + TIMEOUT_S
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+def start_query(scheduler, cls, admitted, release=None):
+    """Поток-запрос класса cls: после допуска записывает класс и держит слот до release"""
+    def run():
+        with scheduler.slot(cls):
+            admitted.append(cls)
+            if release is not None:
+                release.wait(TIMEOUT_S)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def occupy(scheduler, admitted):
+    """Занять единственный слот интерактивным запросом; вернуть поток и событие освобождения"""
+    release = threading.Event()
+    thread = start_query(scheduler, INTERACTIVE, admitted, release)
+    wait_for(lambda: class_report(scheduler, INTERACTIVE)['active'] == 1)
+    return thread, release
+
+
+def test_higher_classes_admitted_first():
+    scheduler = make_scheduler()
+    admitted = []
+    holder, release = occupy(scheduler, admitted)
+
+    # Очередь собирается в обратном порядке приоритета
+    threads = []
+    for cls in (BACKGROUND, EXPORT, INTERACTIVE):
+        threads.append(start_query(scheduler, cls, admitted))
+        wait_for(lambda: class_report(scheduler, cls)['waiting'] == 1)
+
+    release.set()
+    for thread in [holder] + threads:
+        thread.join(TIMEOUT_S)
+    assert admitted == [INTERACTIVE, INTERACTIVE, EXPORT, BACKGROUND]
+
+
+def test_warmup_shed_while_interactive_waits():
+    scheduler = make_scheduler()
+    admitted = []
+    holder, release = occupy(scheduler, admitted)
+    waiter = start_query(scheduler, INTERACTIVE, admitted)
+    wait_for(lambda: class_report(scheduler, INTERACTIVE)['waiting'] == 1)
+
+    with pytest.raises(AdmissionRejected):
+        with scheduler.slot(WARMUP):
+            admitted.append(WARMUP)
+
+    release.set()
+    holder.join(TIMEOUT_S)
+    waiter.join(TIMEOUT_S)
+    assert admitted == [INTERACTIVE, INTERACTIVE]
+    assert class_report(scheduler, WARMUP)['rejected'] == 1
+
+
+def test_after_slow_interactive_background_deferred_and_warmup_shed():
+    # Любое ожидание интерактивного запроса дольше 0 мс - нагрузка на окно pressure_window_s
+    max_defer_s = 0.3
+    scheduler = make_scheduler(pressure_wait_ms=0, max_defer_s=max_defer_s)
+    admitted = []
+    holder, release = occupy(scheduler, admitted)
+    waiter = start_query(scheduler, INTERACTIVE, admitted)
+    wait_for(lambda: class_report(scheduler, INTERACTIVE)['waiting'] == 1)
+    time.sleep(0.01)
+    release.set()
+    holder.join(TIMEOUT_S)
+    waiter.join(TIMEOUT_S)
+    assert scheduler.report()['under_pressure']
+
+    with pytest.raises(AdmissionRejected):
+        with scheduler.slot(WARMUP):
+            pass
+
+    # Слот свободен, но фоновый запрос ждет до max_defer_s
+    started = time.monotonic()
+    with scheduler.slot(BACKGROUND):
+        waited = time.monotonic() - started
+    assert waited >= max_defer_s
+    assert class_report(scheduler, BACKGROUND)['deferred'] == 1
+
+
+def test_low_priority_admitted_without_pressure():
+    scheduler = make_scheduler()
+    for cls in (WARMUP, BACKGROUND, EXPORT):
+        with scheduler.slot(cls):
+            assert class_report(scheduler, cls)['active'] == 1
+    assert all(class_report(scheduler, cls)['admitted'] == 1 for cls in (WARMUP, BACKGROUND, EXPORT))
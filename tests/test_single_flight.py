@@ -0,0 +1,91 @@
+"""
+SingleFlight: одновременные вызовы с одинаковым ключом выполняются один раз
+"""
+import threading
+import time
+
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+THREADS = 8
+TIMEOUT_S = 5
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + TIMEOUT_S
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+def run_concurrently(flight, key, fn, n=THREADS):
+    results, errors = [None] * n, [None] * n
+
+    def call(index):
+        try:
+            results[index] = flight.do(key, fn)
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(TIMEOUT_S)
+    return results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        # Результат отдается только после того, как подключились все остальные вызовы
+        wait_for(lambda: flight.stats()['shared'] == THREADS - 1)
+        return {'value': 42}
+
+    results, errors = run_concurrently(flight, 'key', fn)
+    assert errors == [None] * THREADS
+    assert len(calls) == 1
+    assert all(result == ({'value': 42}, True) for result in results)
+    assert all(result[0] is results[0][0] for result in results)
+    assert flight.stats() == {'executed': 1, 'shared': THREADS - 1, 'in_flight': 0}
+
+
+def test_error_is_passed_to_all_waiters():
+    flight = SingleFlight()
+
+    def fn():
+        wait_for(lambda: flight.stats()['shared'] == THREADS - 1)
+        raise ValueError("query failed")
+
+    _, errors = run_concurrently(flight, 'key', fn)
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert flight.stats()['executed'] == 1
+
+
+def test_different_keys_and_sequential_calls_execute_separately():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == (1, False)
+    assert flight.do('b', lambda: 2) == (2, False)
+    assert flight.do('a', lambda: 3) == (3, False)
+    assert flight.stats() == {'executed': 3, 'shared': 0, 'in_flight': 0}
+
+
+def test_waiter_gets_result_after_leader_finishes():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=('key', lambda: release.wait(TIMEOUT_S) and 'done'))
+    leader.start()
+    wait_for(lambda: flight.stats()['in_flight'] == 1)
+
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(flight.do('key', pytest.fail)))
+    waiter.start()
+    wait_for(lambda: flight.stats()['shared'] == 1)
+    release.set()
+    leader.join(TIMEOUT_S)
+    waiter.join(TIMEOUT_S)
+    assert result == [('done', True)]
@@ -0,0 +1,54 @@
+"""
+t-digest: объединение скетчей в сравнении с точными квантилями и долями
+"""
+import numpy as np
+
+from src.utils.sketches import tdigest
+
+
+def digest(values, group=0):
+    return tdigest.compress(np.full(len(values), group), values, np.ones(len(values)))
+
+
+def rank_error(values, estimate, q):
+    """Насколько доля значений не больше оценки отличается от квантиля"""
+    return abs(np.mean(values <= estimate) - q)
+
+
+def test_tdigest_merge_matches_exact_quantiles():
+    rng = np.random.default_rng(7)
+    days = [rng.lognormal(3, 1, 5_000) for _ in range(4)]
+    parts = [digest(values) for values in days]
+    group, mean, weight = tdigest.compress(
+        np.zeros(sum(len(part[0]) for part in parts), dtype=np.int64),
+        np.concatenate([part[1] for part in parts]),
+        np.concatenate([part[2] for part in parts]),
+    )
+    values = np.concatenate(days)
+    qs = (0.5, 0.9, 0.99)
+    estimates = tdigest.quantiles(group, mean, weight, 1, qs)[0]
+    for q, estimate, tolerance in zip(qs, estimates, (0.01, 0.01, 0.003)):
+        assert rank_error(values, estimate, q) <= tolerance
+    assert weight.sum() == len(values)
+
+
+def test_tdigest_groups_are_independent():
+    rng = np.random.default_rng(11)
+    first, second = rng.normal(0, 1, 3_000), rng.exponential(5, 2_000)
+    combined = [np.concatenate(columns) for columns in zip(digest(first, 0), digest(second, 2))]
+    group, mean, weight = tdigest.compress(*combined)
+    result = tdigest.quantiles(group, mean, weight, 3, (0.5, 0.9))
+    for values, row in ((first, result[0]), (second, result[2])):
+        assert rank_error(values, row[0], 0.5) <= 0.01
+        assert rank_error(values, row[1], 0.9) <= 0.01
+    assert np.isnan(result[1]).all()
+
+
+def test_tdigest_cdf_matches_exact_shares():
+    rng = np.random.default_rng(3)
+    values = rng.gamma(2, 30, 10_000)
+    _, mean, weight = digest(values)
+    edges = [10, 60, 240]
+    shares = tdigest.cdf(mean, weight, edges)
+    exact = [np.mean(values <= edge) for edge in edges]
+    np.testing.assert_allclose(shares, exact, atol=0.01)